@@ -28,4 +28,127 @@ LOG_DIR = os.path.join(BASE_DIR, "logs")
 
 # Create necessary directories
 for directory in [RAW_DATA_DIR, PROCESSED_DATA_DIR, LOG_DIR]:
-    os.makedirs(directory, exist_ok=True)
\ No newline at end of file
+    os.makedirs(directory, exist_ok=True)
+
+# Extraction result cache (content-addressed, see src/utils/extraction_cache.py)
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "True").lower() == "true"
+EXTRACTION_CACHE_TTL_DAYS = int(os.getenv("EXTRACTION_CACHE_TTL_DAYS", "30"))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "5000"))
+
+# Near-duplicate reuse (see src/services/near_duplicate_index.py). A document whose first-page
+# perceptual hash is within NEAR_DUPLICATE_MAX_DISTANCE bits (of 256) of an earlier document of
+# the same type reuses its extraction once one critical field re-read from it agrees. With
+# NEAR_DUPLICATE_VERIFY off, or no provider able to re-read, only identical files are reused.
+# Needs the extraction cache.
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "True").lower() == "true"
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "20"))
+NEAR_DUPLICATE_VERIFY = os.getenv("NEAR_DUPLICATE_VERIFY", "True").lower() == "true"
+
+# Concurrent document extraction (see src/services/extraction_executor.py)
+EXTRACTION_MAX_WORKERS = int(os.getenv("EXTRACTION_MAX_WORKERS", "8"))
+TEXTRACT_MAX_CONCURRENCY = int(os.getenv("TEXTRACT_MAX_CONCURRENCY", "5"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "4"))
+DEEPSEEK_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "2"))
+
+# Coverage-driven extraction planning (see src/services/extraction_planner.py). Documents whose
+# Excel row already has every field they supply are not extracted; others are scoped to the gaps.
+EXTRACTION_PLANNER_ENABLED = os.getenv("EXTRACTION_PLANNER_ENABLED", "True").lower() == "true"
+
+# Emails processed at once by run_complete_workflow (provider limits above still apply)
+EMAIL_MAX_WORKERS = int(os.getenv("EMAIL_MAX_WORKERS", "3"))
+
+# Provider rate limits (see src/utils/rate_limiter.py); 0 disables a budget
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "15"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+DEEPSEEK_REQUESTS_PER_MINUTE = int(os.getenv("DEEPSEEK_REQUESTS_PER_MINUTE", "15"))
+DEEPSEEK_TOKENS_PER_MINUTE = int(os.getenv("DEEPSEEK_TOKENS_PER_MINUTE", "0"))
+TEXTRACT_REQUESTS_PER_MINUTE = int(os.getenv("TEXTRACT_REQUESTS_PER_MINUTE", "60"))
+
+# Graph delta-query mailbox sync (see src/email_handler/delta_sync.py)
+GRAPH_DELTA_SYNC_ENABLED = os.getenv("GRAPH_DELTA_SYNC_ENABLED", "True").lower() == "true"
+GRAPH_DELTA_FOLDER = os.getenv("GRAPH_DELTA_FOLDER", "inbox")
+GRAPH_DELTA_INITIAL_DAYS = int(os.getenv("GRAPH_DELTA_INITIAL_DAYS", "5"))
+
+# Attachment download: list metadata only and stream content via /$value
+ATTACHMENT_STREAMING_ENABLED = os.getenv("ATTACHMENT_STREAMING_ENABLED", "True").lower() == "true"
+ATTACHMENT_CHUNK_SIZE = int(os.getenv("ATTACHMENT_CHUNK_SIZE", str(1024 * 1024)))
+
+# Processed emails/folders/documents ledger (see src/utils/dedupe_ledger.py)
+DEDUPE_LEDGER_FILE = os.getenv("DEDUPE_LEDGER_FILE", "dedupe_ledger.db")
+DEDUPE_LEDGER_HOT_SIZE = int(os.getenv("DEDUPE_LEDGER_HOT_SIZE", "50000"))
+
+# Multi-page PDF analysis (see src/document_processor/textract_document_analysis.py).
+# With TEXTRACT_S3_BUCKET set, PDFs go through StartDocumentAnalysis/GetDocumentAnalysis;
+# otherwise each page is rendered and analyzed with page-parallel synchronous calls.
+TEXTRACT_MULTIPAGE_ENABLED = os.getenv("TEXTRACT_MULTIPAGE_ENABLED", "True").lower() == "true"
+TEXTRACT_S3_BUCKET = os.getenv("TEXTRACT_S3_BUCKET", "")
+TEXTRACT_S3_PREFIX = os.getenv("TEXTRACT_S3_PREFIX", "textract-input/")
+TEXTRACT_POLL_INTERVAL = float(os.getenv("TEXTRACT_POLL_INTERVAL", "2.0"))
+TEXTRACT_JOB_TIMEOUT = float(os.getenv("TEXTRACT_JOB_TIMEOUT", "300"))
+TEXTRACT_PAGE_DPI = int(os.getenv("TEXTRACT_PAGE_DPI", "300"))
+
+# Tiered Textract features (see src/document_processor/textract_processor.py).
+# Documents are read with DetectDocumentText first and re-analyzed with the
+# escalation features only when the cheap tier leaves required fields empty.
+TEXTRACT_TIERED_ENABLED = os.getenv("TEXTRACT_TIERED_ENABLED", "True").lower() == "true"
+TEXTRACT_ESCALATION_FEATURES = [
+    feature.strip().upper()
+    for feature in os.getenv("TEXTRACT_ESCALATION_FEATURES", "FORMS").split(",")
+    if feature.strip()
+]
+
+# Local passport MRZ reader run ahead of GPT/Textract (see src/document_processor/mrz_processor.py).
+# Needs pytesseract and the tesseract binary (a missing one is logged once and the reader
+# is skipped); passports whose MRZ check digits verify skip the cloud providers.
+MRZ_FAST_PATH_ENABLED = os.getenv("MRZ_FAST_PATH_ENABLED", "True").lower() == "true"
+
+# Document classification (see src/document_processor/document_classifier.py).
+# Stages (filename, file header, OCR text) stop once one reaches this confidence.
+CLASSIFIER_CONFIDENCE_THRESHOLD = float(os.getenv("CLASSIFIER_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Per-field confidence (see src/utils/field_result.py). Critical fields below this
+# confidence get a fallback call scoped to just those fields.
+FIELD_CONFIDENCE_THRESHOLD = float(os.getenv("FIELD_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Vision image budget for GPT/DeepSeek calls (see src/document_processor/image_payload.py).
+# Images are cropped, downscaled and re-encoded as JPEG under a per-document-type budget.
+VISION_IMAGE_BUDGET_ENABLED = os.getenv("VISION_IMAGE_BUDGET_ENABLED", "True").lower() == "true"
+VISION_IMAGE_DETAIL = os.getenv("VISION_IMAGE_DETAIL", "high")
+VISION_IMAGE_MAX_BYTES = int(os.getenv("VISION_IMAGE_MAX_BYTES", str(400 * 1024)))
+VISION_IMAGE_JPEG_QUALITY = int(os.getenv("VISION_IMAGE_JPEG_QUALITY", "85"))
+
+# Rendered PDF pages shared by Textract, GPT and the MRZ reader (see src/utils/pdf_rasterizer.py)
+PDF_RASTER_DPI = int(os.getenv("PDF_RASTER_DPI", "300"))
+PDF_RASTER_CACHE_DIR = os.getenv("PDF_RASTER_CACHE_DIR", "")
+PDF_RASTER_CACHE_MAX_MB = int(os.getenv("PDF_RASTER_CACHE_MAX_MB", "1024"))
+PDF_RASTER_MAX_WORKERS = int(os.getenv("PDF_RASTER_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Textract image preprocessing processes (see src/document_processor/image_preprocessing.py); 0 runs inline
+IMAGE_PREPROCESS_MAX_WORKERS = int(os.getenv("IMAGE_PREPROCESS_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Hedged Textract/DeepSeek calls (see src/services/enhanced_document_processor.py). Opt-in:
+# the fallback starts once Textract passes its latency percentile for the document type,
+# or immediately for types whose fallback rate is at least HEDGE_PARALLEL_FALLBACK_RATE.
+HEDGED_EXTRACTION_ENABLED = os.getenv("HEDGED_EXTRACTION_ENABLED", "False").lower() == "true"
+HEDGE_LATENCY_PERCENTILE = float(os.getenv("HEDGE_LATENCY_PERCENTILE", "0.9"))
+HEDGE_PARALLEL_FALLBACK_RATE = float(os.getenv("HEDGE_PARALLEL_FALLBACK_RATE", "0.5"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# Provider circuit breakers (see src/utils/circuit_breaker.py). A provider whose recent calls
+# mostly failed (or ran slower than CIRCUIT_SLOW_CALL_SECONDS; 0 disables) is skipped until
+# a probe call succeeds after CIRCUIT_RESET_SECONDS.
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "True").lower() == "true"
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "60"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Offline extraction through the OpenAI Batch API (see src/services/batch_extraction.py).
+# Backlogs are packaged into JSONL jobs that complete within the 24h window and do not
+# draw on the interactive OpenAI rate limit; results land in the extraction cache.
+OPENAI_BATCH_DIR = os.getenv("OPENAI_BATCH_DIR", os.path.join(BASE_DIR, "data", "batch_jobs"))
+OPENAI_BATCH_MAX_REQUESTS = int(os.getenv("OPENAI_BATCH_MAX_REQUESTS", "1000"))
+OPENAI_BATCH_MAX_BYTES = int(os.getenv("OPENAI_BATCH_MAX_BYTES", str(180 * 1024 * 1024)))
+OPENAI_BATCH_POLL_INTERVAL = float(os.getenv("OPENAI_BATCH_POLL_INTERVAL", "30"))
+OPENAI_BATCH_TIMEOUT = float(os.getenv("OPENAI_BATCH_TIMEOUT", str(25 * 3600)))
@@ -0,0 +1,115 @@
+"""Benchmark emails-per-minute of run_complete_workflow against worker count.
+
+Graph and the extraction providers are stubbed with fixed latencies; each
+email fetches its attachments and extracts its documents through the shared
+ExtractionExecutor, so provider concurrency limits still apply.
+
+Usage:
+    python scripts/benchmark_email_workers.py [--emails 24] [--documents 3] [--latency 0.3]
+"""
+import sys
+import os
+import time
+import random
+import logging
+import argparse
+import tempfile
+from unittest.mock import MagicMock, patch
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import test_complete_workflow as workflow
+from src.services.extraction_executor import ExtractionExecutor
+from src.services.extraction_store import ExtractionResultStore
+
+SERVICES = (
+    "OutlookClient", "AttachmentHandler", "TextractProcessor", "FolderProcessor",
+    "GPTProcessor", "EnhancedDocumentProcessorService", "FileSharer", "ExcelProcessor",
+    "DataCombiner", "ProcessTracker", "TeamsNotifier", "EmailSender",
+)
+
+
+class StubGraph:
+    """Stub Outlook client: a fixed inbox and a per-request latency."""
+
+    BATCH_MAX_REQUESTS = 20
+
+    def __init__(self, emails, latency: float):
+        self.emails = emails
+        self.latency = latency
+
+    def fetch_emails(self):
+        time.sleep(self.latency)
+        return list(self.emails)
+
+    def get_attachments_batch(self, email_ids, include_content=True):
+        time.sleep(self.latency)
+        return {}
+
+    def get_attachments(self, email_id, include_content=True):
+        time.sleep(self.latency)
+        return []
+
+
+class LatencyProvider:
+    """Stub extraction provider that sleeps for a jittered latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def process_document(self, file_path: str, doc_type: str):
+        time.sleep(self.latency * random.uniform(0.7, 1.3))
+        return {"passport_number": os.path.basename(file_path)}
+
+
+def make_tester(emails, documents: int, latency: float, workers: int):
+    with patch.multiple(workflow, **{name: MagicMock() for name in SERVICES}):
+        tester = workflow.WorkflowTester()
+    tester.folder_processor.check_for_documents.return_value = []
+    tester.outlook = StubGraph(emails, latency / 3)
+    tester.email_max_workers = workers
+    # Per-email document extraction is kept serial to isolate the email-level pool
+    tester.extraction_executor = ExtractionExecutor(max_workers=1)
+    provider = LatencyProvider(latency)
+
+    def process(email):
+        tester.outlook.get_attachments(email['id'])
+        paths = [("passport", f"/bench/{email['id']}_{i}.jpg") for i in range(documents)]
+        tester.extraction_executor.extract_all(
+            ExtractionResultStore(email['id']), paths, [('gpt', provider)])
+        return {"status": "success"}
+
+    tester._process_single_email = process
+    return tester
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=24)
+    parser.add_argument('--documents', type=int, default=3, help="documents per email")
+    parser.add_argument('--latency', type=float, default=0.3, help="seconds per provider call")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    random.seed(42)
+    os.chdir(tempfile.mkdtemp(prefix="email_workers_bench_"))
+
+    print(f"{args.emails} emails x {args.documents} documents, ~{args.latency:.2f}s per call")
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        emails = [{"id": f"w{workers}_m{i}", "subject": f"Addition {i}"} for i in range(args.emails)]
+        tester = make_tester(emails, args.documents, args.latency, workers)
+
+        start = time.perf_counter()
+        result = tester.run_complete_workflow()
+        elapsed = time.perf_counter() - start
+
+        per_minute = result['successful'] / elapsed * 60
+        baseline = baseline or per_minute
+        print(f"  {workers} workers: {elapsed:6.2f}s, {per_minute:6.1f} emails/min "
+              f"({per_minute / baseline:4.1f}x), {result['successful']} ok / {result['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark vision payload size, latency and accuracy with and without the image budget.
+
+Fixtures are document images/PDFs with a sidecar '<name>.expected.json':
+    {"doc_type": "passport", "fields": {"passport_number": "K1234567", ...}}
+
+Without --live only payload size, estimated image tokens and preparation time
+are reported; with --live each fixture is also sent to GPT (OPENAI_API_KEY)
+once at full size and once within budget, and the returned fields are scored
+against the expected values.
+
+Usage:
+    python scripts/benchmark_image_payload.py --fixtures path/to/fixtures [--live] [--detail high]
+"""
+import sys
+import os
+import json
+import time
+import logging
+import argparse
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.document_processor.image_payload import (
+    DEFAULT_BUDGETS, ImageBudget, estimate_image_tokens, load_image, prepare_image_payload
+)
+
+
+def load_fixtures(directory: str):
+    """(file path, doc type, expected fields) for every fixture with a sidecar."""
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.expected.json'):
+            continue
+        stem = name[:-len('.expected.json')]
+        documents = [f for f in os.listdir(directory)
+                     if os.path.splitext(f)[0] == stem and not f.endswith('.json')]
+        if not documents:
+            continue
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            expected = json.load(f)
+        fixtures.append((os.path.join(directory, documents[0]), expected['doc_type'], expected['fields']))
+    return fixtures
+
+
+def field_accuracy(extracted, expected) -> float:
+    """Share of expected fields returned with the same value (case and spacing ignored)."""
+    if not expected:
+        return 1.0
+    normalize = lambda value: ' '.join(str(value).upper().split())
+    hits = sum(1 for key, value in expected.items() if normalize(extracted.get(key, '')) == normalize(value))
+    return hits / len(expected)
+
+
+def measure_payloads(fixtures, budgets):
+    print(f"{'document':<32} {'original':>10} {'budgeted':>10} {'tokens':>13} {'prep':>8}")
+    totals = [0, 0]
+    for file_path, doc_type, _ in fixtures:
+        image = load_image(file_path)
+        full_tokens = estimate_image_tokens(image.size[0], image.size[1], 'high')
+        start = time.perf_counter()
+        payload = prepare_image_payload(file_path, doc_type, budgets, image=image)
+        elapsed = time.perf_counter() - start
+        totals[0] += payload.original_bytes
+        totals[1] += len(payload.data)
+        print(f"{os.path.basename(file_path):<32} {payload.original_bytes / 1024:9.0f}K "
+              f"{len(payload.data) / 1024:9.0f}K {full_tokens:>6}->{payload.estimated_tokens:<6} "
+              f"{elapsed * 1000:6.0f}ms")
+    if totals[0]:
+        print(f"  total upload {totals[0] / 1024:.0f}K -> {totals[1] / 1024:.0f}K "
+              f"({totals[1] / totals[0]:.0%})")
+
+
+def measure_live(fixtures, budgets):
+    from src.document_processor.gpt_processor import GPTProcessor
+
+    runs = [
+        ("original", GPTProcessor(cache=None, image_budget_enabled=False)),
+        ("budgeted", GPTProcessor(cache=None, image_budgets=budgets, image_budget_enabled=True)),
+    ]
+    for label, processor in runs:
+        latencies, scores = [], []
+        for file_path, doc_type, expected in fixtures:
+            start = time.perf_counter()
+            result = processor.process_document(file_path, doc_type)
+            latencies.append(time.perf_counter() - start)
+            scores.append(field_accuracy(result, expected))
+        latencies.sort()
+        print(f"  {label:<9} median {latencies[len(latencies) // 2]:5.2f}s  "
+              f"max {latencies[-1]:5.2f}s  field accuracy {sum(scores) / len(scores):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', required=True, help="directory of documents with .expected.json sidecars")
+    parser.add_argument('--live', action='store_true', help="call GPT and score field accuracy")
+    parser.add_argument('--detail', choices=['low', 'high', 'auto'], help="override the detail setting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    budgets = dict(DEFAULT_BUDGETS)
+    if args.detail:
+        budgets = {doc_type: ImageBudget(budget.max_side, budget.max_bytes, budget.quality,
+                                         budget.grayscale, budget.crop, args.detail)
+                   for doc_type, budget in budgets.items()}
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures with .expected.json sidecars in {args.fixtures}")
+        return
+    print(f"{len(fixtures)} fixtures")
+    measure_payloads(fixtures, budgets)
+    if args.live:
+        measure_live(fixtures, budgets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Micro-benchmark document classification and field extraction over recorded OCR texts.
+
+Usage:
+    python scripts/benchmark_patterns.py [--repeat 200] [--corpus tests/test_files/ocr_corpus.json]
+"""
+import sys
+import os
+import json
+import time
+import logging
+import argparse
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.document_processor.textract_processor import TextractProcessor
+from src.document_processor.document_classifier import DocumentClassifier
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'tests', 'test_files', 'ocr_corpus.json')
+
+
+def time_per_document(func, texts, repeat: int) -> float:
+    """Average microseconds per document for func(text)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with open(args.corpus, encoding='utf-8') as f:
+        texts = [document['text'] for document in json.load(f)]
+
+    textract = TextractProcessor(cache=None, document_analyzer=None)
+    classifier = DocumentClassifier()
+    empty_response = {'Blocks': []}
+
+    cases = [
+        ("detect_document_type", textract.detect_document_type),
+        ("DocumentClassifier.classify_text", classifier.classify_text),
+        ("_extract_passport_data", textract._extract_passport_data),
+        ("_extract_emirates_id_data", textract._extract_emirates_id_data),
+        ("_extract_visa_data", textract._extract_visa_data),
+        ("_extract_generic_data", lambda text: textract._extract_generic_data(text, empty_response)),
+    ]
+
+    print(f"{len(texts)} recorded OCR texts x {args.repeat} repeats")
+    for name, func in cases:
+        print(f"  {name:<38} {time_per_document(func, texts, args.repeat):8.1f} us/doc")
+
+
+if __name__ == "__main__":
+    main()
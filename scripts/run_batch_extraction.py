@@ -0,0 +1,63 @@
+"""Backfill the extraction cache for a folder of documents through the OpenAI Batch API.
+
+Documents are classified locally (filename and file header), packaged into
+batch jobs and polled to completion; the interactive pipeline then serves
+them from the extraction cache instead of the rate-limited chat endpoint.
+
+Usage:
+    python scripts/run_batch_extraction.py data/raw [--doc-type passport]
+    python scripts/run_batch_extraction.py --collect batch_abc123
+"""
+import sys
+import os
+import json
+import logging
+import argparse
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.document_processor.document_classifier import DocumentClassifier
+from src.document_processor.gpt_processor import GPTProcessor
+from src.services.batch_extraction import BatchExtractor
+
+DOCUMENT_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png')
+
+
+def find_documents(folder: str, doc_type: str = None):
+    """(file_path, doc_type) pairs for the documents under folder."""
+    classifier = DocumentClassifier()
+    documents = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if not name.lower().endswith(DOCUMENT_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, name)
+            documents.append((file_path, doc_type or classifier.classify(file_path).doc_type))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('folder', nargs='?', help="folder of documents to extract")
+    parser.add_argument('--doc-type', help="document type of every file (skips classification)")
+    parser.add_argument('--collect', metavar='BATCH_ID', help="collect a previously submitted batch")
+    args = parser.parse_args()
+    if not args.folder and not args.collect:
+        parser.error("a folder or --collect BATCH_ID is required")
+
+    logging.basicConfig(level=logging.INFO)
+    gpt = GPTProcessor()
+    if not gpt.client:
+        sys.exit("OPENAI_API_KEY not set")
+    extractor = BatchExtractor(gpt)
+
+    if args.collect:
+        report = extractor.collect(args.collect, extractor.wait(args.collect))
+    else:
+        report = extractor.run(find_documents(args.folder, args.doc_type))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
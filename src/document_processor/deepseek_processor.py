@@ -7,18 +7,43 @@ from typing import Dict, Optional
 from openai import OpenAI
 
 from src.utils.error_handling import handle_errors, ErrorCategory, ErrorSeverity
+from src.utils.extraction_cache import ExtractionCache, get_extraction_cache
+from src.utils.rate_limiter import RateLimiter, get_rate_limiter, create_chat_completion
+from src.document_processor.image_payload import ImageBudget, encode_image_url
+from config.settings import (
+    DEEPSEEK_REQUESTS_PER_MINUTE, DEEPSEEK_TOKENS_PER_MINUTE, VISION_IMAGE_BUDGET_ENABLED
+)
 
 logger = logging.getLogger(__name__)
 
 class DeepseekProcessor:
     """Document processor using DeepSeek API for improved OCR and document understanding."""
     
-    def __init__(self, api_key: str = None, base_url: str = None):
+    # Bump whenever prompts, the images sent or post-processing change so cached results are invalidated
+    PROMPT_VERSION = "deepseek-v2"
+    
+    # Source name for merged field results
+    PROVIDER = "deepseek"
+    
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 cache: Optional[ExtractionCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 image_budgets: Optional[Dict[str, ImageBudget]] = None,
+                 image_budget_enabled: bool = VISION_IMAGE_BUDGET_ENABLED):
         """Initialize DeepSeek processor."""
         self.api_key = api_key or os.getenv('DEEPSEEK_API_KEY')
         self.base_url = base_url or os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
         self.DEFAULT_VALUE = "."
         self.vision_model = "deepseek-reasoner"  # Use DeepSeek's vision model
+        self.cache = cache if cache is not None else get_extraction_cache()
+        # Per-document-type image size budgets (None uses image_payload.DEFAULT_BUDGETS)
+        self.image_budgets = image_budgets
+        self.image_budget_enabled = image_budget_enabled
+        self.rate_limiter = rate_limiter or get_rate_limiter(
+            "deepseek",
+            requests_per_minute=DEEPSEEK_REQUESTS_PER_MINUTE or None,
+            tokens_per_minute=DEEPSEEK_TOKENS_PER_MINUTE or None
+        )
         
         if not self.api_key:
             logger.warning("DEEPSEEK_API_KEY not set. DeepSeek processing will not be available.")
@@ -91,10 +116,9 @@ class DeepseekProcessor:
             
             # Encode the image
             try:
-                base64_image = self._encode_image(file_path)
-                mime_type = self._get_mime_type(file_path)
-                image_url = f"data:{mime_type};base64,{base64_image}"
-                logger.info(f"Successfully encoded image with MIME type: {mime_type}")
+                image_part = encode_image_url(file_path, 'passport', self.image_budgets,
+                                              enabled=self.image_budget_enabled)
+                logger.info(f"Successfully encoded image ({len(image_part['image_url']['url'])} chars)")
             except Exception as e:
                 logger.error(f"Failed to encode image: {str(e)}")
                 return {"first_name": self.DEFAULT_VALUE, "last_name": self.DEFAULT_VALUE}
@@ -118,7 +142,7 @@ class DeepseekProcessor:
                     "role": "user",
                     "content": [
                         {"type": "text", "text": name_extraction_prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
+                        image_part
                     ]
                 }
             ]
@@ -126,7 +150,8 @@ class DeepseekProcessor:
             # Call the vision model API
             logger.info(f"Calling DeepSeek Vision API for document analysis")
             try:
-                response = self.client.chat.completions.create(
+                response = create_chat_completion(
+                    self.client, self.rate_limiter,
                     model=self.vision_model,
                     messages=messages,
                     max_tokens=500
@@ -203,12 +228,19 @@ class DeepseekProcessor:
                 logger.error(f"File not found: {file_path}")
                 return {"error": "File not found"}
             
+            # Return cached result if this exact content was already extracted
+            content_hash = None
+            if self.cache:
+                content_hash = self.cache.hash_file(file_path)
+                cached = self.cache.get(content_hash, "deepseek", doc_type, self.PROMPT_VERSION)
+                if cached is not None:
+                    return cached
+            
             # Encode the image
             try:
-                base64_image = self._encode_image(file_path)
-                mime_type = self._get_mime_type(file_path)
-                image_url = f"data:{mime_type};base64,{base64_image}"
-                logger.info(f"Successfully encoded image with MIME type: {mime_type}")
+                image_part = encode_image_url(file_path, doc_type, self.image_budgets,
+                                              enabled=self.image_budget_enabled)
+                logger.info(f"Successfully encoded image ({len(image_part['image_url']['url'])} chars)")
             except Exception as e:
                 logger.error(f"Failed to encode image: {str(e)}")
                 return {"error": f"Image encoding failed: {str(e)}"}
@@ -277,7 +309,7 @@ class DeepseekProcessor:
                     "role": "user",
                     "content": [
                         {"type": "text", "text": extraction_prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
+                        image_part
                     ]
                 }
             ]
@@ -285,7 +317,8 @@ class DeepseekProcessor:
             # Call the vision model API
             logger.info(f"Calling DeepSeek Vision API for {doc_type} document analysis")
             try:
-                response = self.client.chat.completions.create(
+                response = create_chat_completion(
+                    self.client, self.rate_limiter,
                     model=self.vision_model,
                     messages=messages,
                     max_tokens=1000
@@ -313,6 +346,9 @@ class DeepseekProcessor:
                         else:
                             extracted_data[key] = str(value)
                     
+                    if content_hash:
+                        self.cache.put(content_hash, "deepseek", doc_type, self.PROMPT_VERSION, extracted_data)
+                    
                     logger.info(f"Successfully extracted {len(extracted_data)} fields from {doc_type}")
                     return extracted_data
                     
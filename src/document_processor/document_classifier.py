@@ -1,103 +1,239 @@
+import os
 import re
 import logging
-from typing import Dict, List, Optional, Tuple
-import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.document_processor import patterns
+from src.document_processor.mrz import MRZResult, parse_mrz
+from config.settings import CLASSIFIER_CONFIDENCE_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
+# Filename keywords in priority order; a hit decides routing without OCR
+FILENAME_KEYWORDS = [
+    ('passport', ('passport',)),
+    ('emirates_id', ('emirates', 'emiratesid', 'eid', 'id card')),
+    ('visa', ('visa', 'permit', 'residence')),
+]
+FILENAME_CONFIDENCE = 0.9
+
+# Keywords match whole words of the lower-cased filename: letters may not touch
+# them, so 'eid' hits 'eid_back.jpg' but not 'Heidi' or 'Reid'
+FILENAME_KEYWORD_PATTERNS = [
+    (doc_type, re.compile(r'(?<![a-z])(?:%s)(?![a-z])' % '|'.join(
+        r'[^a-z]+'.join(re.escape(word) for word in keyword.split()) for keyword in keywords
+    )))
+    for doc_type, keywords in FILENAME_KEYWORDS
+]
+
+SPREADSHEET_EXTENSIONS = ('.xlsx', '.xls')
+
+# Leading bytes of the formats documents arrive in
+DOCUMENT_SIGNATURES = (b'%PDF', b'\xff\xd8\xff', b'\x89PNG', b'II*\x00', b'MM\x00*', b'GIF8', b'BM')
+
+# Width/height of ID-1 cards (Emirates ID, 85.6 x 54 mm) and TD3 passport data pages (125 x 88 mm)
+CARD_ASPECT_RATIO = 85.6 / 54
+PASSPORT_PAGE_ASPECT_RATIO = 125 / 88
+ASPECT_TOLERANCE = 0.05
+
+
+class ClassificationResult:
+    """Document type with the confidence and stage that decided it."""
+
+    def __init__(self, doc_type: str, confidence: float, stage: str):
+        self.doc_type = doc_type
+        self.confidence = confidence
+        self.stage = stage
+
+    def __repr__(self) -> str:
+        return f"ClassificationResult({self.doc_type!r}, {self.confidence:.2f}, {self.stage!r})"
+
+
+def mrz_document_type(mrz: Optional[MRZResult]) -> Optional[str]:
+    """Document type implied by a validated MRZ, or None."""
+    if mrz is None or not mrz.valid:
+        return None
+    code = mrz.fields.get('document_type', '')
+    if code.startswith('P'):
+        return 'passport'
+    if code.startswith('V'):
+        return 'visa'
+    if code.startswith('I') and mrz.fields.get('issuing_state') == 'ARE':
+        return 'emirates_id'
+    return None
+
+
 class DocumentClassifier:
-    """Classifies document types based on content analysis rather than just filename."""
-    
-    def __init__(self):
-        # Key patterns to identify document types
-        self.document_patterns = {
-            'passport': [
-                r'passport\s+no', 
-                r'passport\s+number',
-                r'nationality.{0,20}date of birth',
-                r'surname.{0,50}given names',
-                r'place of issue.{0,50}authority'
-            ],
-            'emirates_id': [
-                r'united arab emirates.{0,50}id card', 
-                r'بطاقة الهوية.{0,50}الإمارات',
-                r'id number.{0,20}\d{3}-\d{4}-\d{7}-\d{1}',
-                r'رقم الهوية'
-            ],
-            'visa': [
-                r'entry permit', 
-                r'residence visa',
-                r'visa number',
-                r'sponsor\s+name',
-                r'permit no'
-            ]
-        }
+    """Single document classifier for routing and extraction.
+
+    Stages run from cheapest to most expensive and stop as soon as one
+    reaches the confidence threshold:
+
+    1. filename: extension and filename keywords
+    2. header: file signature, image proportions (ID-1 card vs. passport
+       page) and, when a local reader is available, a validated MRZ
+    3. text: validated MRZ in the OCR text, then weighted keyword scores
+
+    OCR text is only needed when the filename and header leave the type
+    open. When no stage is confident the best guess so far is returned.
+    """
     
-    def classify_document(self, ocr_text: str, filename: str = '') -> str:
+    def __init__(self, threshold: float = CLASSIFIER_CONFIDENCE_THRESHOLD,
+                 mrz_reader: Optional[Callable[[str], Optional[str]]] = None):
+        """Initialize classifier.
+
+        Args:
+            threshold: Confidence at which a stage decides the type
+            mrz_reader: Optional local OCR of a document's MRZ band, used by
+                the header stage (e.g. mrz_processor.read_mrz_band)
         """
-        Classify document type based on OCR text content with filename as fallback.
+        self.threshold = threshold
+        self.mrz_reader = mrz_reader
         
+    def classify(self, file_path: str = '', ocr_text: Optional[str] = None,
+                 text_reader: Optional[Callable[[str], str]] = None) -> ClassificationResult:
+        """Classify a document, running only the stages needed.
+
         Args:
-            ocr_text: Extracted text from document
-            filename: Original filename as fallback
-            
+            file_path: Document path (or bare filename)
+            ocr_text: OCR text if already available
+            text_reader: Called with file_path to OCR the document if the
+                text stage is reached without ocr_text
+
         Returns:
-            Document type: 'passport', 'emirates_id', 'visa', or 'unknown'
+            ClassificationResult
         """
+        best = ClassificationResult('unknown', 0.0, 'none')
+        stages = [
+            ('filename', lambda: self.classify_filename(file_path)),
+            ('header', lambda: self.classify_header(file_path)),
+            ('text', lambda: self._classify_text_stage(file_path, ocr_text, text_reader)),
+        ]
+        for stage, run in stages:
+            doc_type, confidence = run()
+            if doc_type != 'unknown' and confidence > best.confidence:
+                best = ClassificationResult(doc_type, confidence, stage)
+            if best.confidence >= self.threshold:
+                break
+        logger.debug(f"Classified {os.path.basename(file_path) or 'document'} as {best}")
+        return best
+
+    def _classify_text_stage(self, file_path: str, ocr_text: Optional[str],
+                             text_reader: Optional[Callable[[str], str]]) -> Tuple[str, float]:
+        if ocr_text is None and text_reader is not None and file_path:
+            try:
+                ocr_text = text_reader(file_path)
+            except Exception as e:
+                logger.warning(f"Could not read text for classification of {file_path}: {str(e)}")
         if not ocr_text:
-            logger.warning("No OCR text provided for classification")
-            return self._classify_by_filename(filename)
-        
-        # Normalize text for better matching
-        normalized_text = ocr_text.lower().replace('\n', ' ')
-        
-        # Calculate confidence scores for each document type
-        scores = {}
-        for doc_type, patterns in self.document_patterns.items():
-            matches = 0
-            for pattern in patterns:
-                if re.search(pattern, normalized_text, re.IGNORECASE):
-                    matches += 1
-            
-            # Calculate confidence score (0.0 to 1.0)
-            if len(patterns) > 0:
-                scores[doc_type] = matches / len(patterns)
-            else:
-                scores[doc_type] = 0.0
-                
-        logger.debug(f"Document classification scores: {scores}")
-        
-        # Get the type with highest confidence score
-        if scores:
-            max_score_type = max(scores, key=scores.get)
-            max_score = scores[max_score_type]
-            
-            # Only classify if confidence exceeds threshold
-            if max_score >= 0.3:  # At least 30% confidence
-                logger.info(f"Classified as {max_score_type} with {max_score:.2f} confidence")
-                return max_score_type
-        
-        # Fall back to filename-based classification if content classification fails
-        logger.warning("Could not confidently classify document from content, trying filename")
-        return self._classify_by_filename(filename)
+            return 'unknown', 0.0
+        return self.classify_text(ocr_text)
     
-    def _classify_by_filename(self, filename: str) -> str:
-        """Classify based on filename patterns (fallback method)."""
-        if not filename:
-            return 'unknown'
-            
-        name = filename.lower()
+    def classify_filename(self, file_path: str) -> Tuple[str, float]:
+        """Classify from extension and whole-word filename keywords."""
+        if not file_path:
+            return 'unknown', 0.0
+        name = os.path.basename(file_path).lower()
+        if name.endswith(SPREADSHEET_EXTENSIONS):
+            return 'excel', 1.0
+        for doc_type, pattern in FILENAME_KEYWORD_PATTERNS:
+            if pattern.search(name):
+                return doc_type, FILENAME_CONFIDENCE
+        return 'unknown', 0.0
+
+    def classify_header(self, file_path: str) -> Tuple[str, float]:
+        """Classify from the file header without OCR.
+
+        Files that are not PDFs or images are 'unknown' with full confidence.
+        Image proportions give a weak hint; a validated MRZ from the local
+        reader decides the type.
+        """
+        if not file_path or not os.path.isfile(file_path):
+            return 'unknown', 0.0
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(8)
+        except OSError:
+            return 'unknown', 0.0
+        if not head.startswith(DOCUMENT_SIGNATURES):
+            return 'unknown', 1.0
+
+        if self.mrz_reader is not None:
+            try:
+                doc_type = mrz_document_type(parse_mrz(self.mrz_reader(file_path) or ''))
+            except Exception as e:
+                logger.debug(f"Local MRZ read failed for {file_path}: {str(e)}")
+                doc_type = None
+            if doc_type:
+                return doc_type, 1.0
+
+        if head.startswith(b'%PDF'):
+            return 'unknown', 0.0
+        return self._classify_proportions(file_path)
+
+    def _classify_proportions(self, file_path: str) -> Tuple[str, float]:
+        """Weak hint from image proportions (the header is read, pixels are not decoded)."""
+        try:
+            from PIL import Image
+            with Image.open(file_path) as image:
+                width, height = image.size
+        except Exception:
+            return 'unknown', 0.0
+        ratio = max(width, height) / max(1, min(width, height))
+        if abs(ratio - CARD_ASPECT_RATIO) <= ASPECT_TOLERANCE:
+            return 'emirates_id', 0.5
+        if abs(ratio - PASSPORT_PAGE_ASPECT_RATIO) <= ASPECT_TOLERANCE:
+            return 'passport', 0.4
+        return 'unknown', 0.0
+
+    def classify_text(self, text: str) -> Tuple[str, float]:
+        """Classify OCR text: a validated MRZ decides, otherwise weighted keywords.
+
+        Returns:
+            (document type, confidence); the type is 'visa', 'emirates_id',
+            'passport' or 'unknown'
+        """
+        doc_type = mrz_document_type(parse_mrz(text))
+        if doc_type:
+            return doc_type, 1.0
+
+        # Convert to uppercase and normalize whitespace for consistent matching
+        normalized = patterns.WHITESPACE.sub(' ', text.upper())
+        scores = patterns.DOCUMENT_TYPE_KEYWORDS.scores(normalized)
+        logger.debug(f"Document type confidence scores: "
+                     f"visa={scores['visa']:.2f}, "
+                     f"emirates_id={scores['emirates_id']:.2f}, "
+                     f"passport={scores['passport']:.2f}")
+
+        max_score = max(scores.values())
+        if max_score < 0.5:
+            logger.warning("Low confidence in document type detection")
+            if "PASSPORT" in normalized:
+                return 'passport', 0.3
+            elif "EMIRATES" in normalized or "ID" in normalized:
+                return 'emirates_id', 0.2
+            return 'unknown', 0.0
+
+        # Ties go to visa, then Emirates ID, then passport; two strong keywords reach full confidence
+        for doc_type in ('visa', 'emirates_id', 'passport'):
+            if scores[doc_type] == max_score:
+                return doc_type, min(1.0, max_score / 2)
+        return 'unknown', 0.0
+    
+    def classify_document(self, ocr_text: str, filename: str = '') -> str:
+        """
+        Classify document type from its filename and OCR text.
         
-        if name.endswith(('.xlsx', '.xls')):
-            return 'excel'
-        elif 'passport' in name:
-            return 'passport'
-        elif 'emirates' in name or 'eid' in name or 'id card' in name:
-            return 'emirates_id'
-        elif 'visa' in name or 'permit' in name:
-            return 'visa'
+        Args:
+            ocr_text: Extracted text from document
+            filename: Original filename
             
-        return 'unknown'
+        Returns:
+            Document type: 'passport', 'emirates_id', 'visa', 'excel' or 'unknown'
+        """
+        result = self.classify(filename, ocr_text=ocr_text or None)
+        logger.info(f"Classified as {result.doc_type} with {result.confidence:.2f} confidence ({result.stage})")
+        return result.doc_type
     
     def validate_classification(self, doc_type: str, extracted_data: Dict) -> bool:
         """
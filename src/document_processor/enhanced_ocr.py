@@ -2,13 +2,15 @@ import boto3
 import requests
 import os
 import logging
-from typing import Dict, Tuple, List, Optional
+from typing import Dict, Tuple, Optional
 import json
 from PIL import Image
 import io
 from botocore.exceptions import BotoCoreError, ClientError
 
 from src.utils.error_handling import ServiceError, handle_errors, ErrorCategory, ErrorSeverity
+from src.document_processor.textract_response import TextractResponse
+from src.utils.field_result import FieldResult, merge_field_results
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +30,8 @@ class EnhancedOCRProcessor:
         self.deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
         self.deepseek_api_url = os.getenv('DEEPSEEK_API_URL')
         
-        # Configure confidence thresholds
+        # Textract key-values below this confidence are ignored
         self.MIN_CONFIDENCE = 0.6
-        self.HIGH_CONFIDENCE = 0.9
 
     @handle_errors(ErrorCategory.EXTERNAL_SERVICE, ErrorSeverity.HIGH)
     def process_document(self, file_path: str, doc_type: str) -> Tuple[str, Dict[str, str]]:
@@ -78,24 +79,23 @@ class EnhancedOCRProcessor:
                 FeatureTypes=['FORMS', 'TABLES']
             )
 
-            # Extract key-value pairs
+            # Extract key-value pairs from the indexed block graph
+            parsed = TextractResponse(response)
             key_values = {}
-            for block in response['Blocks']:
-                if block['BlockType'] == 'KEY_VALUE_SET':
-                    if 'KEY' in block['EntityTypes']:
-                        key_block = block
-                        value_block = self._get_value_block(response['Blocks'], key_block)
-                        if value_block:
-                            key = self._get_text(response['Blocks'], key_block)
-                            value = self._get_text(response['Blocks'], value_block)
-                            confidence = min(
-                                key_block.get('Confidence', 0),
-                                value_block.get('Confidence', 0)
-                            )
-                            key_values[key] = {
-                                'value': value,
-                                'confidence': confidence
-                            }
+            for key_block in parsed.by_type.get('KEY_VALUE_SET', []):
+                if 'KEY' in key_block.get('EntityTypes', []):
+                    value_block = self._get_value_block(parsed, key_block)
+                    if value_block:
+                        key = self._get_text(parsed, key_block)
+                        value = self._get_text(parsed, value_block)
+                        confidence = min(
+                            key_block.get('Confidence', 0),
+                            value_block.get('Confidence', 0)
+                        )
+                        key_values[key] = {
+                            'value': value,
+                            'confidence': confidence
+                        }
 
             return {
                 'key_values': key_values,
@@ -162,42 +162,21 @@ class EnhancedOCRProcessor:
                         deepseek_result: Dict, doc_type: str) -> Dict:
         """
         Combine and validate results from both services.
-        Uses confidence scores to select best results.
+        Textract key-values below MIN_CONFIDENCE are dropped; the more
+        confident value wins each field.
         """
-        combined_data = {}
-        
-        # Process Textract key-value pairs
+        textract_fields = FieldResult()
         for key, data in textract_result['key_values'].items():
-            if data['confidence'] >= self.MIN_CONFIDENCE:
-                key_normalized = self._normalize_key(key)
-                combined_data[key_normalized] = {
-                    'value': data['value'],
-                    'confidence': data['confidence'],
-                    'source': 'textract'
-                }
+            # Textract reports confidence in percent
+            confidence = data['confidence'] / 100 if data['confidence'] > 1 else data['confidence']
+            if confidence >= self.MIN_CONFIDENCE:
+                textract_fields.set(self._normalize_key(key), data['value'], confidence, 'textract')
 
-        # Process DeepSeek results
-        deepseek_data = self._parse_deepseek_response(deepseek_result)
-        for key, value in deepseek_data.items():
-            key_normalized = self._normalize_key(key)
-            
-            # If we already have this field from Textract with high confidence,
-            # keep the Textract value
-            if (key_normalized in combined_data and 
-                combined_data[key_normalized]['confidence'] >= self.HIGH_CONFIDENCE):
-                continue
-                
-            combined_data[key_normalized] = {
-                'value': value,
-                'confidence': 0.7,  # Default confidence for DeepSeek
-                'source': 'deepseek'
-            }
+        deepseek_fields = FieldResult(source='deepseek')
+        for key, value in self._parse_deepseek_response(deepseek_result).items():
+            deepseek_fields.set(self._normalize_key(key), value, None, 'deepseek')
 
-        # Return just the values for simplicity
-        return {
-            key: data['value'] 
-            for key, data in combined_data.items()
-        }
+        return merge_field_results([textract_fields, deepseek_fields])
 
     def _normalize_key(self, key: str) -> str:
         """Normalize key names from different sources."""
@@ -227,33 +206,13 @@ class EnhancedOCRProcessor:
         # In the future, we could add annotations or markings
         return original_path
 
-    def _get_value_block(self, blocks: List[Dict], key_block: Dict) -> Optional[Dict]:
+    def _get_value_block(self, response: TextractResponse, key_block: Dict) -> Optional[Dict]:
         """Get the value block associated with a key block in Textract response."""
-        for relationship in key_block.get('Relationships', []):
-            if relationship['Type'] == 'VALUE':
-                for value_id in relationship['Ids']:
-                    value_block = next(
-                        (block for block in blocks if block['Id'] == value_id),
-                        None
-                    )
-                    if value_block:
-                        return value_block
-        return None
+        return response.get_value_block(key_block)
 
-    def _get_text(self, blocks: List[Dict], block: Dict) -> str:
+    def _get_text(self, response: TextractResponse, block: Dict) -> str:
         """Get text from a block in Textract response."""
-        text = []
-        if 'Relationships' in block:
-            for relationship in block['Relationships']:
-                if relationship['Type'] == 'CHILD':
-                    for child_id in relationship['Ids']:
-                        child_block = next(
-                            (b for b in blocks if b['Id'] == child_id),
-                            None
-                        )
-                        if child_block and 'Text' in child_block:
-                            text.append(child_block['Text'])
-        return ' '.join(text)
+        return response.get_text(block)
 
     def _parse_deepseek_response(self, response: Dict) -> Dict:
         """Parse DeepSeek response into structured data."""
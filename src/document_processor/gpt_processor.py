@@ -4,12 +4,11 @@ import json
 import logging
 import os
 import base64
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 import re
 from openai import OpenAI
 import tempfile
 from PIL import Image
-import time
 import random
 import threading
 
@@ -21,17 +20,69 @@ load_dotenv()
 
 
 from src.utils.error_handling import handle_errors, ErrorCategory, ErrorSeverity
+from src.utils.extraction_cache import ExtractionCache, get_extraction_cache
+from src.utils.pdf_rasterizer import get_pdf_rasterizer
+from src.utils.rate_limiter import (
+    RateLimiter, get_rate_limiter, create_chat_completion,
+    headers_from_error, is_rate_limit_error, parse_retry_after
+)
+from src.document_processor.image_payload import ImageBudget, encode_image_url, get_budget
+from config.settings import (
+    OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE, VISION_IMAGE_BUDGET_ENABLED
+)
 
 logger = logging.getLogger(__name__)
 
 class GPTProcessor:
     """Document processor using OpenAI GPT-4o mini for improved OCR and document understanding."""
     
-    def __init__(self, api_key: str = None):
+    # Bump whenever prompts, the images sent or post-processing change so cached results are invalidated
+    PROMPT_VERSION = "gpt-v2"
+    
+    # Source name for merged field results
+    PROVIDER = "gpt"
+    
+    SYSTEM_PROMPT = "You are a document data extraction assistant. Extract the requested information accurately from the document image."
+    TEMPERATURE = 0.1
+    
+    # Field descriptions for prompts scoped to a few fields (process_fields)
+    FIELD_DESCRIPTIONS = {
+        'passport_number': 'The passport number',
+        'surname': 'The last name/surname (may be labeled as "Surname")',
+        'given_names': 'The first and middle names (may be labeled as "Given Name(s)")',
+        'full_name': "The person's full name",
+        'name_en': 'The full name in English',
+        'nationality': "The person's nationality",
+        'date_of_birth': 'Birth date in DD/MM/YYYY format',
+        'gender': 'Either "Male" or "Female"',
+        'emirates_id': 'The ID number in format 784-XXXX-XXXXXXX-X (MUST CONTAIN THE HYPHENS)',
+        'entry_permit_no': 'The entry permit number (may appear as "Entry Permit No", "File", or "File No.")',
+        'unified_no': ('The unified number: ONLY DIGITS, usually 8-15 digits, near "U.I.D. No", '
+                       '"Unified No" or "UID". NEVER contains slashes and is NOT the visa file number'),
+        'visa_file_number': 'The visa file number, ALWAYS with slashes (e.g. "201/2023/1234567")',
+        'expiry_date': 'Expiry date in DD/MM/YYYY format',
+        'issue_date': 'Issue date in DD/MM/YYYY format',
+    }
+    
+    def __init__(self, api_key: str = None, cache: Optional[ExtractionCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 image_budgets: Optional[Dict[str, ImageBudget]] = None,
+                 image_budget_enabled: bool = VISION_IMAGE_BUDGET_ENABLED):
         """Initialize GPT processor."""
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.DEFAULT_VALUE = "."
         self.vision_model = "gpt-4o-mini"  # GPT-4o mini model
+        self.cache = cache if cache is not None else get_extraction_cache()
+        # Per-document-type image size budgets (None uses image_payload.DEFAULT_BUDGETS)
+        self.image_budgets = image_budgets
+        self.image_budget_enabled = image_budget_enabled
+        # Process-wide limiter shared by all GPTProcessor instances
+        self.rate_limiter = rate_limiter or get_rate_limiter(
+            "openai",
+            requests_per_minute=OPENAI_REQUESTS_PER_MINUTE or None,
+            tokens_per_minute=OPENAI_TOKENS_PER_MINUTE or None,
+            min_interval=0.3
+        )
         
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not set. GPT processing will not be available.")
@@ -52,7 +103,8 @@ class GPTProcessor:
             file_path: Path to the document file
             
         Returns:
-            Tuple of (processed_file_path, is_temp_file)
+            Tuple of (processed_file_path, is_temp_file); rendered PDF pages
+            belong to the shared rasterizer cache and are not temporary
         """
         # Check file extension
         file_ext = os.path.splitext(file_path)[1].lower()
@@ -61,29 +113,10 @@ class GPTProcessor:
         if file_ext == '.pdf':
             logger.info(f"Converting PDF to image for API processing: {file_path}")
             try:
-                # Import pdf2image here to avoid making it a hard dependency
-                from pdf2image import convert_from_path
-                
-                # Create a temporary directory for the converted image
-                converted_dir = os.path.join(os.path.dirname(file_path), "converted")
-                os.makedirs(converted_dir, exist_ok=True)
-                
-                # Generate output path
-                output_path = os.path.join(converted_dir, f"{os.path.basename(file_path)}.jpg")
-                
-                # Convert first page of PDF to image
-                images = convert_from_path(file_path, first_page=1, last_page=1, dpi=300)
-                
-                if images and len(images) > 0:
-                    # Save the first page as image
-                    images[0].save(output_path, 'JPEG')
-                    logger.info(f"PDF successfully converted to image: {output_path}")
-                    return output_path, True  # Return path and flag as temporary
-                
-                logger.error(f"Failed to convert PDF to image, no pages extracted")
-                # Instead of proceeding with original file (which will fail), raise error
-                raise ValueError("PDF conversion failed - no pages extracted")
-                
+                # Rendered once per content hash and shared with Textract; the cache owns the file
+                output_path = get_pdf_rasterizer().page_path(file_path, page=1)
+                logger.info(f"PDF successfully converted to image: {output_path}")
+                return output_path, False
             except Exception as e:
                 logger.error(f"Error converting PDF to image: {str(e)}")
                 # Instead of proceeding with original, create explicit error
@@ -219,92 +252,61 @@ class GPTProcessor:
         # If the format is completely off, return original
         return eid
     
+    def process_fields(self, file_path: str, doc_type: str, fields: List[str]) -> Dict[str, str]:
+        """
+        Extract only the given fields, e.g. a visa's unified_no that another
+        provider read with low confidence. The prompt and the response are
+        much shorter than a full extraction.
+        
+        Args:
+            file_path: Path to the document file
+            doc_type: Type of document
+            fields: Field names to return
+            
+        Returns:
+            Dictionary with exactly the requested fields
+        """
+        return self.process_document(file_path, doc_type, fields=fields)
+    
+    def _field_prompt(self, doc_type: str, fields: List[str]) -> str:
+        """Extraction prompt asking for just the given fields."""
+        lines = "\n".join(
+            f"- {field}: {self.FIELD_DESCRIPTIONS.get(field, field.replace('_', ' '))}"
+            for field in fields
+        )
+        document = doc_type.replace('_', ' ') if doc_type else "document"
+        return (f"Extract ONLY the following information from this {document}:\n{lines}\n\n"
+                f"Return ONLY a clean JSON object with exactly these field names. "
+                f"Use \".\" for any field you cannot read.")
+    
     @handle_errors(ErrorCategory.EXTERNAL_SERVICE, ErrorSeverity.MEDIUM)
-    def process_document(self, file_path: str, doc_type: str) -> Dict[str, str]:
+    def process_document(self, file_path: str, doc_type: str,
+                         fields: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Process a document with GPT-4o mini to extract structured data.
-        Uses aggressive rate limiting to prevent hitting API limits.
+        Requests go through the shared OpenAI rate limiter (RPM/TPM budgets).
         
         Args:
             file_path: Path to the document file
             doc_type: Type of document ('passport', 'emirates_id', 'visa', etc.)
+            fields: Only extract these fields (see process_fields)
             
         Returns:
             Dictionary of extracted fields
         """
+        # Serve repeated documents from the content-addressed cache before rate limiting
+        content_hash = None
+        cache_type = self.cache_doc_type(doc_type, fields)
+        if self.cache and os.path.exists(file_path):
+            content_hash = self.cache.hash_file(file_path)
+            cached = self.cache.get(content_hash, "gpt", cache_type, self.PROMPT_VERSION)
+            if cached is not None:
+                return cached
+        
         if not self.client:
             logger.warning("OpenAI client not available, cannot process document")
             return {"error": "OpenAI client not available"}
-        
-        # ADVANCED RATE LIMITER
-        # Add class variables if they don't exist
-        if not hasattr(type(self), '_request_times'):
-            type(self)._request_times = []
-        if not hasattr(type(self), '_request_count'):
-            type(self)._request_count = 0
-        if not hasattr(type(self), '_rate_limit_lock'):
-            import threading
-            type(self)._rate_limit_lock = threading.RLock()
-            
-        # Use thread-safe locking to handle rate limiting
-        with type(self)._rate_limit_lock:
-            current_time = time.time()
-            
-            # Clean up old timestamps (older than 60 seconds)
-            type(self)._request_times = [t for t in type(self)._request_times if current_time - t < 60]
-            
-            # Calculate current rate
-            current_rate = len(type(self)._request_times)
-            
-            # If we're above 40 requests per minute, throttle
-            if current_rate >= 15:
-                # Calculate how long to wait
-                if type(self)._request_times:
-                    oldest_timestamp = min(type(self)._request_times)
-                    wait_time = 60 - (current_time - oldest_timestamp)
-                    
-                    # Make sure wait time is reasonable
-                    wait_time = max(1.0, min(wait_time, 5.0))
-                    
-                    logger.info(f"Rate limiting: Waiting {wait_time:.2f}s to avoid rate limits (current rate: {current_rate} requests/min)")
-                    time.sleep(wait_time)
-                    
-                    # Refresh times after waiting
-                    current_time = time.time()
-                    type(self)._request_times = [t for t in type(self)._request_times if current_time - t < 60]
-            
-            # Minimum delay between requests (300ms)
-            if type(self)._request_times and (current_time - max(type(self)._request_times)) < 0.3:
-                delay = 0.3 - (current_time - max(type(self)._request_times))
-                time.sleep(delay)
-                current_time = time.time()
-            
-            # Record this request time
-            type(self)._request_times.append(current_time)
-            type(self)._request_count += 1
-            
-            # Log request stats periodically
-            if type(self)._request_count % 5 == 0:
-                logger.info(f"GPT API request stats: {current_rate} requests in last minute, total: {type(self)._request_count}")
-        
-        # PROCESS OPTIMIZATION: Check document type for faster handling
-        # For passport or emirates_id, which have well-defined structures, we can skip processing if we have good existing data
-        if doc_type in ['passport', 'emirates_id']:
-            # See if we have key fields already from other documents
-            existing_fields = 0
-            if hasattr(self, '_extracted_cache'):
-                # Check if key fields for this document type already exist in our cache
-                if doc_type == 'passport' and all(k in self._extracted_cache for k in ['passport_number', 'surname', 'given_names', 'nationality']):
-                    existing_fields += 1
-                elif doc_type == 'emirates_id' and all(k in self._extracted_cache for k in ['emirates_id', 'name_en', 'nationality']):
-                    existing_fields += 1
-                    
-            # If we have strong existing data, we might skip processing 50% of the time
-            if existing_fields > 0 and random.random() < 0.5:
-                logger.info(f"Optimization: Skipping {doc_type} processing since we already have good data")
-                return {"skipped": "Already have good data for key fields"}
-        
-        temp_file_created = False    
+
         try:
             logger.info(f"Processing {doc_type} document with GPT-4o mini: {file_path}")
             
@@ -313,142 +315,14 @@ class GPTProcessor:
                 logger.error(f"File not found: {file_path}")
                 return {"error": "File not found"}
             
-            # Process the file (convert if needed)
-            processed_file, temp_file_created = self._process_document_file(file_path)
-            
-            # Encode the image
             try:
-                base64_image = self._encode_image(processed_file)
-                # Always use image MIME type for converted files
-                if temp_file_created:
-                    mime_type = "image/jpeg"  # Use the correct MIME type for the converted image
-                else:
-                    mime_type = self._get_mime_type(processed_file)
-                image_url = f"data:{mime_type};base64,{base64_image}"
-                logger.info(f"Successfully encoded image with MIME type: {mime_type}")
+                messages = self.build_messages(file_path, doc_type, fields)
             except Exception as e:
                 logger.error(f"Failed to encode image: {str(e)}")
                 return {"error": f"Image encoding failed: {str(e)}"}
             
-            # Create type-specific extraction prompt
-            system_prompt = "You are a document data extraction assistant. Extract the requested information accurately from the document image."
-            
-            if doc_type == 'passport':
-                extraction_prompt = """
-                Extract the following information from this passport document:
-                - passport_number: The passport number (very important)
-                - surname: The last name/surname (may be labeled as "Surname")
-                - given_names: The first and middle names (may be labeled as "Given Name(s)")
-                - nationality: The person's nationality
-                - date_of_birth: Birth date in DD/MM/YYYY format
-                - place_of_birth: Place of birth
-                - gender: Either "Male" or "Female" (may be labeled as "Sex")
-                - date_of_issue: Issue date in DD/MM/YYYY format
-                - date_of_expiry: Expiry date in DD/MM/YYYY format
-                
-                Pay special attention to accurately extracting:
-                1. The passport number
-                2. The surname and given names
-                3. The nationality
-                4. The date of birth
-                5. The gender/sex (report as "Male" or "Female", not as "M" or "F")
-                
-                Return ONLY a clean JSON object with these exact field names. Use "." for any missing fields.
-                """
-            elif doc_type == 'emirates_id':
-                extraction_prompt = """
-                Extract the following information from this Emirates ID card:
-                - emirates_id: The ID number in format 784-XXXX-XXXXXXX-X (MUST CONTAIN THE HYPHENS)
-                - name_en: The full name in English
-                - name_ar: The full name in Arabic if present
-                - nationality: The person's nationality
-                - gender: M or F
-                - date_of_birth: Birth date in DD/MM/YYYY format
-                - expiry_date: Expiry date in DD/MM/YYYY format
-                
-                Return ONLY a clean JSON object with these exact field names. Use "." for any missing fields.
-                """
-            elif doc_type == 'visa':
-                extraction_prompt = """
-                YOUR MOST CRITICAL TASK IS TO EXTRACT THESE TWO DISTINCT NUMBERS:
-
-                1. unified_no (HIGHEST PRIORITY):
-                - CONTAINS ONLY DIGITS, NO SLASHES OR HYPHENS
-                - Usually 8-15 digits long (e.g., "12345678" or "784123456789321" etc.)
-                - Appears near text like "U.I.D. No.", "ID Number", "Unified No.", "Unified Number", or "UID"
-                - May be displayed as "UID: 12345678" or "Unified No: 12345678" or "241104237 : U.I.D No" or "784197228451752 : U.I.D No"
-                - IS COMPLETELY DIFFERENT FROM VISA FILE NUMBER
-                - NEVER includes slashes - if you see slashes, it's NOT the unified number
-                - OFTEN appears at the top part of the document
-
-                2. visa_file_number (SECOND HIGHEST PRIORITY):
-                - ALWAYS CONTAINS SLASHES in format XXX/YYYY/ZZ.... or XXX/YYYY/Z/......
-                - Examples: "201/2023/1234567" or "101/2024/987654"
-                - Usually labeled as "ENTRY PERMIT NO", "File", "File No", "Visa File Number"
-                - First section (before first slash) is often "201" (Dubai) or "101" (Abu Dhabi)
-                - ALWAYS has slashes separating the parts
-
-                CRITICAL: These are two different numbers. DO NOT extract one from the other.
-                NEVER create a unified_no by removing slashes from visa_file_number.
-                If you can't find the unified_no, use "." instead of guessing.
-
-  
-                Extract the following CRITICAL information from this visa/residence permit:
-                - entry_permit_no: The entry permit number (can be same as visa_file_number)
-                - unified_no: The unified number (digits only, NO SLASHES)
-                - visa_file_number: The visa file number (has SLASHES in it)
-                - full_name: The person's full name (HIGHEST PRIORITY)
-                - nationality: The person's nationality (CRITICAL)
-                - passport_number: The passport number (CRITICAL)
-                - date_of_birth: Birth date in DD/MM/YYYY format (CRITICAL)
-                - gender: "Male" or "Female" (CRITICAL)
-                - profession: The profession/occupation listed
-                - issue_date: Issue date in DD/MM/YYYY format
-                - expiry_date: Expiry date in DD/MM/YYYY format
-                - sponsor_name: The sponsor's name (employer)
-
-                
-                Pay special attention to accurately extracting:
-                
-                1. entry_permit_no - this is critical (may appear as "Entry Permit No", "File", or "File No.")
-                2. unified_no - this is critical (typically a 10-digit number WITHOUT slashes)
-                3. visa_file_number should contain '/' (slashes) and often starts with '20/' or '10/'
-                4. The full name
-                5. The passport number
-                
-                Note that the entry permit number and visa file number might be the same in some documents, and different in others.
-                The unified number is typically a 10-digit number WITHOUT slashes and often appears near "U.I.D No".
-                
-                Return ONLY a clean JSON object with these exact field names. Use "." for any missing fields.
-                """
-
-            else:
-                extraction_prompt = f"""
-                Extract all important information from this {doc_type} document.
-                Pay special attention to:
-                - Personal identification numbers (passport number, emirated ID number, Visa File Number, Unified Number)
-                - Full name
-                - Dates (birth, issue, expiry)
-                - Nationality
-                - Gender
-                
-                Return ONLY a clean JSON object with extracted fields. Use "." for any missing fields.
-                """
-            
-            # Create message with image content
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": extraction_prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ]
-                }
-            ]
-            
             # Use lower temperature for more deterministic outputs
-            temperature = 0.1
+            temperature = self.TEMPERATURE
             
             # Call the vision model API
             logger.info(f"Calling GPT-4o mini API for {doc_type} document analysis")
@@ -462,10 +336,12 @@ class GPTProcessor:
                     # Add jitter to prevent thundering herd
                     jitter = random.uniform(0.1, 0.5)
                     
-                    response = self.client.chat.completions.create(
+                    # Waits (outside any lock) for request/token budget
+                    response = create_chat_completion(
+                        self.client, self.rate_limiter,
                         model=self.vision_model,
                         messages=messages,
-                        max_tokens=1500,
+                        max_tokens=self.max_tokens(fields),
                         temperature=temperature
                     )
                     
@@ -473,60 +349,27 @@ class GPTProcessor:
                     content = response.choices[0].message.content.strip()
                     logger.debug(f"OpenAI API response: {content}")
                     
-                    # Try to parse as JSON
-                    try:
-                        # Extract JSON from response if it contains other text
-                        json_start = content.find('{')
-                        json_end = content.rfind('}') + 1
-                        if json_start >= 0 and json_end > json_start:
-                            json_str = content[json_start:json_end]
-                            extracted_data = json.loads(json_str)
-                        else:
-                            extracted_data = json.loads(content)
-                        
-                        # Process and standardize extracted data
-                        processed_data = self._post_process_extracted_data(extracted_data, doc_type)
-                        
-                        # OPTIMIZATION: Cache good results for future reference
-                        # This lets us potentially skip some document processing
-                        if not hasattr(self, '_extracted_cache'):
-                            self._extracted_cache = {}
-                            
-                        # Update cache with non-default values
-                        for key, value in processed_data.items():
-                            if value != self.DEFAULT_VALUE:
-                                self._extracted_cache[key] = value
+                    processed_data = self.parse_response(content, doc_type, fields)
+                    if processed_data is not None:
+                        if content_hash:
+                            self.cache.put(content_hash, "gpt", cache_type, self.PROMPT_VERSION, processed_data)
                         
                         logger.info(f"Successfully extracted {len(processed_data)} fields from {doc_type}")
                         return processed_data
-                        
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse GPT response as JSON: {str(e)}")
-                        logger.warning(f"Raw response: {content}")
-                        
-                        # Try to extract fields with regex as fallback
-                        extracted_data = self._extract_with_regex(content, doc_type)
-                        if extracted_data:
-                            logger.info(f"Extracted {len(extracted_data)} fields using regex fallback")
-                            return extracted_data
-                        
-                        return {"error": "Failed to parse response", "raw_response": content}
                     
-                except Exception as e:
-                    error_message = str(e)
+                    logger.warning(f"Failed to parse GPT response as JSON")
+                    logger.warning(f"Raw response: {content}")
+                    return self._parse_with_regex(content, doc_type, fields)
                     
+                except Exception as e:
                     # Check if it's a rate limit error
-                    if "rate_limit_exceeded" in error_message or "429" in error_message:
-                        # Calculate backoff time with exponential increase
-                        delay = base_delay * (2 ** attempt) + jitter
-                        logger.info(f"Rate limit reached. Retrying in {delay:.2f}s (attempt {attempt+1}/{max_retries})")
-                        time.sleep(delay)
-                        
-                        # Apply more aggressive rate limiting after hitting a limit
-                        with type(self)._rate_limit_lock:
-                            # Force a longer delay for all subsequent requests
-                            type(self)._request_times = [t for t in type(self)._request_times if current_time - t < 30]
-                            type(self)._request_times.append(current_time)
+                    if is_rate_limit_error(e):
+                        # Without a Retry-After header, back off exponentially; the pause
+                        # applies to every caller sharing the limiter
+                        if not parse_retry_after((headers_from_error(e) or {}).get('retry-after')):
+                            delay = base_delay * (2 ** attempt) + jitter
+                            self.rate_limiter.penalize(delay)
+                        logger.info(f"Rate limit reached. Retrying (attempt {attempt+1}/{max_retries})")
                         
                         # Continue to next attempt if we haven't exhausted retries
                         if attempt < max_retries - 1:
@@ -543,14 +386,222 @@ class GPTProcessor:
         except Exception as e:
             logger.error(f"Error processing document with GPT-4o mini: {str(e)}")
             return {"error": f"Processing error: {str(e)}"}
-        finally:
-            # Clean up temporary file if one was created
-            if temp_file_created and os.path.exists(processed_file):
-                try:
-                    os.remove(processed_file)
-                    logger.debug("Cleaned up temporary files")
-                except:
-                    pass
+    
+    @staticmethod
+    def cache_doc_type(doc_type: str, fields: Optional[List[str]] = None) -> str:
+        """Document type part of the cache key; scoped extractions are cached separately."""
+        return f"{doc_type}[{','.join(sorted(fields))}]" if fields else doc_type
+    
+    def max_tokens(self, fields: Optional[List[str]] = None) -> int:
+        """Response token cap (scoped prompts return a few fields)."""
+        return 300 if fields else 1500
+    
+    def build_messages(self, file_path: str, doc_type: str,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Chat messages extracting a document (or only the given fields).
+        Shared by interactive calls and batch jobs, so both produce results
+        under the same cache key.
+        
+        Args:
+            file_path: Path to the document file
+            doc_type: Type of document
+            fields: Only extract these fields
+            
+        Returns:
+            System and user messages with the encoded image
+        """
+        image_part = self._encode_image_part(file_path, doc_type)
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": self._extraction_prompt(doc_type, fields)},
+                    image_part
+                ]
+            }
+        ]
+    
+    def _encode_image_part(self, file_path: str, doc_type: str) -> Dict[str, Any]:
+        """
+        Encode the image: within the document type's budget, or the full-size
+        original (PDFs converted to a 300-DPI JPEG) with the budget disabled.
+        """
+        if self.image_budget_enabled:
+            image_part = encode_image_url(file_path, doc_type, self.image_budgets)
+        else:
+            processed_file, temp_file_created = self._process_document_file(file_path)
+            try:
+                base64_image = self._encode_image(processed_file)
+            finally:
+                # Clean up temporary file if one was created
+                if temp_file_created and os.path.exists(processed_file):
+                    try:
+                        os.remove(processed_file)
+                        logger.debug("Cleaned up temporary files")
+                    except:
+                        pass
+            # Always use image MIME type for converted files
+            if temp_file_created:
+                mime_type = "image/jpeg"  # Use the correct MIME type for the converted image
+            else:
+                mime_type = self._get_mime_type(processed_file)
+            image_part = {"type": "image_url", "image_url": {
+                "url": f"data:{mime_type};base64,{base64_image}",
+                "detail": get_budget(doc_type, self.image_budgets).detail
+            }}
+        logger.info(f"Successfully encoded image for {doc_type} ({len(image_part['image_url']['url'])} chars)")
+        return image_part
+    
+    def _extraction_prompt(self, doc_type: str, fields: Optional[List[str]] = None) -> str:
+        """Type-specific extraction prompt (or one scoped to the given fields)."""
+        if fields:
+            extraction_prompt = self._field_prompt(doc_type, fields)
+        elif doc_type == 'passport':
+            extraction_prompt = """
+            Extract the following information from this passport document:
+            - passport_number: The passport number (very important)
+            - surname: The last name/surname (may be labeled as "Surname")
+            - given_names: The first and middle names (may be labeled as "Given Name(s)")
+            - nationality: The person's nationality
+            - date_of_birth: Birth date in DD/MM/YYYY format
+            - place_of_birth: Place of birth
+            - gender: Either "Male" or "Female" (may be labeled as "Sex")
+            - date_of_issue: Issue date in DD/MM/YYYY format
+            - date_of_expiry: Expiry date in DD/MM/YYYY format
+            
+            Pay special attention to accurately extracting:
+            1. The passport number
+            2. The surname and given names
+            3. The nationality
+            4. The date of birth
+            5. The gender/sex (report as "Male" or "Female", not as "M" or "F")
+            
+            Return ONLY a clean JSON object with these exact field names. Use "." for any missing fields.
+            """
+        elif doc_type == 'emirates_id':
+            extraction_prompt = """
+            Extract the following information from this Emirates ID card:
+            - emirates_id: The ID number in format 784-XXXX-XXXXXXX-X (MUST CONTAIN THE HYPHENS)
+            - name_en: The full name in English
+            - name_ar: The full name in Arabic if present
+            - nationality: The person's nationality
+            - gender: M or F
+            - date_of_birth: Birth date in DD/MM/YYYY format
+            - expiry_date: Expiry date in DD/MM/YYYY format
+            
+            Return ONLY a clean JSON object with these exact field names. Use "." for any missing fields.
+            """
+        elif doc_type == 'visa':
+            extraction_prompt = """
+            YOUR MOST CRITICAL TASK IS TO EXTRACT THESE TWO DISTINCT NUMBERS:
+
+            1. unified_no (HIGHEST PRIORITY):
+            - CONTAINS ONLY DIGITS, NO SLASHES OR HYPHENS
+            - Usually 8-15 digits long (e.g., "12345678" or "784123456789321" etc.)
+            - Appears near text like "U.I.D. No.", "ID Number", "Unified No.", "Unified Number", or "UID"
+            - May be displayed as "UID: 12345678" or "Unified No: 12345678" or "241104237 : U.I.D No" or "784197228451752 : U.I.D No"
+            - IS COMPLETELY DIFFERENT FROM VISA FILE NUMBER
+            - NEVER includes slashes - if you see slashes, it's NOT the unified number
+            - OFTEN appears at the top part of the document
+
+            2. visa_file_number (SECOND HIGHEST PRIORITY):
+            - ALWAYS CONTAINS SLASHES in format XXX/YYYY/ZZ.... or XXX/YYYY/Z/......
+            - Examples: "201/2023/1234567" or "101/2024/987654"
+            - Usually labeled as "ENTRY PERMIT NO", "File", "File No", "Visa File Number"
+            - First section (before first slash) is often "201" (Dubai) or "101" (Abu Dhabi)
+            - ALWAYS has slashes separating the parts
+
+            CRITICAL: These are two different numbers. DO NOT extract one from the other.
+            NEVER create a unified_no by removing slashes from visa_file_number.
+            If you can't find the unified_no, use "." instead of guessing.
+
+  
+            Extract the following CRITICAL information from this visa/residence permit:
+            - entry_permit_no: The entry permit number (can be same as visa_file_number)
+            - unified_no: The unified number (digits only, NO SLASHES)
+            - visa_file_number: The visa file number (has SLASHES in it)
+            - full_name: The person's full name (HIGHEST PRIORITY)
+            - nationality: The person's nationality (CRITICAL)
+            - passport_number: The passport number (CRITICAL)
+            - date_of_birth: Birth date in DD/MM/YYYY format (CRITICAL)
+            - gender: "Male" or "Female" (CRITICAL)
+            - profession: The profession/occupation listed
+            - issue_date: Issue date in DD/MM/YYYY format
+            - expiry_date: Expiry date in DD/MM/YYYY format
+            - sponsor_name: The sponsor's name (employer)
+
+            
+            Pay special attention to accurately extracting:
+            
+            1. entry_permit_no - this is critical (may appear as "Entry Permit No", "File", or "File No.")
+            2. unified_no - this is critical (typically a 10-digit number WITHOUT slashes)
+            3. visa_file_number should contain '/' (slashes) and often starts with '20/' or '10/'
+            4. The full name
+            5. The passport number
+            
+            Note that the entry permit number and visa file number might be the same in some documents, and different in others.
+            The unified number is typically a 10-digit number WITHOUT slashes and often appears near "U.I.D No".
+            
+            Return ONLY a clean JSON object with these exact field names. Use "." for any missing fields.
+            """
+
+        else:
+            extraction_prompt = f"""
+            Extract all important information from this {doc_type} document.
+            Pay special attention to:
+            - Personal identification numbers (passport number, emirated ID number, Visa File Number, Unified Number)
+            - Full name
+            - Dates (birth, issue, expiry)
+            - Nationality
+            - Gender
+            
+            Return ONLY a clean JSON object with extracted fields. Use "." for any missing fields.
+            """
+        return extraction_prompt
+
+    def parse_response(self, content: str, doc_type: str,
+                       fields: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """
+        Post-processed fields from a model response.
+        
+        Args:
+            content: Response message content
+            doc_type: Document type
+            fields: Fields requested, if the prompt was scoped
+            
+        Returns:
+            Extracted fields, or None if the response holds no JSON object
+        """
+        try:
+            # Extract JSON from response if it contains other text
+            json_start = content.find('{')
+            json_end = content.rfind('}') + 1
+            if json_start >= 0 and json_end > json_start:
+                extracted_data = json.loads(content[json_start:json_end])
+            else:
+                extracted_data = json.loads(content)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Response is not JSON: {str(e)}")
+            return None
+        
+        # Process and standardize extracted data
+        processed_data = self._post_process_extracted_data(extracted_data, doc_type)
+        if fields:
+            processed_data = {field: processed_data.get(field, self.DEFAULT_VALUE) for field in fields}
+        return processed_data
+    
+    def _parse_with_regex(self, content: str, doc_type: str,
+                          fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """Fields recovered with regex from a response that is not valid JSON."""
+        extracted_data = self._extract_with_regex(content, doc_type)
+        if fields:
+            extracted_data = {field: extracted_data.get(field, self.DEFAULT_VALUE) for field in fields}
+        if extracted_data:
+            logger.info(f"Extracted {len(extracted_data)} fields using regex fallback")
+            return extracted_data
+        return {"error": "Failed to parse response", "raw_response": content}
     
     def _post_process_extracted_data(self, data: Dict[str, Any], doc_type: str) -> Dict[str, str]:
         """
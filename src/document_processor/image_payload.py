@@ -0,0 +1,228 @@
+"""Size-budgeted image payloads for GPT/DeepSeek vision calls.
+
+Vision requests used to upload the original file (or a 300-DPI render of a
+PDF page) as base64, several MB per document. Token cost and latency scale
+with the image size, while the fields we read only need legible text. Each
+document type gets an ImageBudget: the image is cropped to the document,
+downscaled, optionally converted to grayscale and re-encoded as JPEG until
+it fits the byte budget.
+"""
+import io
+import base64
+import logging
+import math
+import os
+from typing import Dict, Optional, Tuple
+
+from src.utils.pdf_rasterizer import get_pdf_rasterizer
+from config.settings import (
+    VISION_IMAGE_BUDGET_ENABLED, VISION_IMAGE_DETAIL, VISION_IMAGE_MAX_BYTES,
+    VISION_IMAGE_JPEG_QUALITY
+)
+
+logger = logging.getLogger(__name__)
+
+# Lowest JPEG quality tried before the image is downscaled further
+MIN_JPEG_QUALITY = 50
+DOWNSCALE_STEP = 0.85
+
+# Share of the page height, from the bottom, that holds a passport MRZ
+MRZ_BAND = 0.35
+
+# Largest side OpenAI keeps for high detail, and the tile size it bills by
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+TILE_SIZE = 512
+
+
+class ImageBudget:
+    """How much image a vision call gets for one document type."""
+
+    def __init__(self, max_side: int, max_bytes: int = VISION_IMAGE_MAX_BYTES,
+                 quality: int = VISION_IMAGE_JPEG_QUALITY, grayscale: bool = True,
+                 crop: Optional[str] = None, detail: str = VISION_IMAGE_DETAIL):
+        """Initialize budget.
+
+        Args:
+            max_side: Longest side in pixels after downscaling
+            max_bytes: Largest encoded JPEG size
+            quality: JPEG quality tried first
+            grayscale: Drop color before encoding
+            crop: None, 'document' (trim the scan background) or 'mrz'
+                (document crop, then only the bottom MRZ band)
+            detail: OpenAI image detail ('low', 'high' or 'auto')
+        """
+        self.max_side = max_side
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.grayscale = grayscale
+        self.crop = crop
+        self.detail = detail
+
+    def __repr__(self) -> str:
+        return (f"ImageBudget(max_side={self.max_side}, max_bytes={self.max_bytes}, "
+                f"quality={self.quality}, grayscale={self.grayscale}, crop={self.crop!r}, "
+                f"detail={self.detail!r})")
+
+
+# Emirates IDs are small cards; visas are dense A4 pages that need the most pixels
+DEFAULT_BUDGETS: Dict[str, ImageBudget] = {
+    'passport': ImageBudget(max_side=1600, crop='document'),
+    'emirates_id': ImageBudget(max_side=1200, crop='document'),
+    'visa': ImageBudget(max_side=2000),
+    'default': ImageBudget(max_side=1600, grayscale=False),
+}
+
+
+class ImagePayload:
+    """Encoded image ready for an image_url message part."""
+
+    def __init__(self, data: bytes, mime_type: str, width: int, height: int,
+                 detail: str, original_bytes: int):
+        self.data = data
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+        self.detail = detail
+        self.original_bytes = original_bytes
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+    @property
+    def estimated_tokens(self) -> int:
+        return estimate_image_tokens(self.width, self.height, self.detail)
+
+    def image_url(self) -> Dict:
+        """The image_url part of a chat message."""
+        return {"type": "image_url", "image_url": {"url": self.data_url, "detail": self.detail}}
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = 'high') -> int:
+    """Prompt tokens OpenAI bills for an image (85 base + 170 per 512px tile)."""
+    if detail == 'low':
+        return 85
+    scale = min(1.0, HIGH_DETAIL_MAX_SIDE / max(width, height, 1))
+    width, height = width * scale, height * scale
+    scale = min(1.0, HIGH_DETAIL_SHORT_SIDE / max(min(width, height), 1))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+
+def get_budget(doc_type: Optional[str], budgets: Optional[Dict[str, ImageBudget]] = None) -> ImageBudget:
+    """Budget for a document type, falling back to the 'default' entry."""
+    budgets = budgets or DEFAULT_BUDGETS
+    return budgets.get(doc_type or 'default') or budgets.get('default') or DEFAULT_BUDGETS['default']
+
+
+def load_image(file_path: str):
+    """Open an image, or the shared rendering of the first page of a PDF."""
+    from PIL import Image
+    if file_path.lower().endswith('.pdf'):
+        file_path = get_pdf_rasterizer().page_path(file_path, page=1)
+    image = Image.open(file_path)
+    image.load()
+    return image
+
+
+def crop_to_document(image, tolerance: int = 24, min_area: float = 0.2):
+    """Trim the flat scanner/table background around a card or page.
+
+    The background colour is taken from the corners; the crop is skipped when
+    it would keep less than min_area of the image (likely a bad guess).
+    """
+    from PIL import Image, ImageChops, ImageOps
+    gray = ImageOps.grayscale(image)
+    width, height = gray.size
+    corners = [gray.getpixel((0, 0)), gray.getpixel((width - 1, 0)),
+               gray.getpixel((0, height - 1)), gray.getpixel((width - 1, height - 1))]
+    background = sorted(corners)[len(corners) // 2]
+    diff = ImageChops.difference(gray, Image.new('L', gray.size, background))
+    bbox = diff.point(lambda value: 255 if value > tolerance else 0).getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    if (right - left) * (bottom - top) < min_area * width * height:
+        return image
+    return image.crop(bbox)
+
+
+def crop_to_mrz(image):
+    """Bottom band of a passport data page, where the MRZ is printed."""
+    width, height = image.size
+    return image.crop((0, int(height * (1 - MRZ_BAND)), width, height))
+
+
+def prepare_image_payload(file_path: str, doc_type: Optional[str] = None,
+                          budgets: Optional[Dict[str, ImageBudget]] = None,
+                          image=None) -> ImagePayload:
+    """Crop, downscale and re-encode a document image within its type's budget.
+
+    Args:
+        file_path: Image or PDF path
+        doc_type: Document type selecting the budget
+        budgets: Budgets by document type (defaults to DEFAULT_BUDGETS)
+        image: Already decoded image for file_path, if any
+
+    Returns:
+        ImagePayload (JPEG)
+    """
+    from PIL import Image, ImageOps
+    budget = get_budget(doc_type, budgets)
+    original_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    if image is None:
+        image = load_image(file_path)
+    image = ImageOps.exif_transpose(image)
+
+    if budget.crop in ('document', 'mrz'):
+        image = crop_to_document(image)
+    if budget.crop == 'mrz':
+        image = crop_to_mrz(image)
+
+    image = ImageOps.grayscale(image) if budget.grayscale else image.convert('RGB')
+    if max(image.size) > budget.max_side:
+        image.thumbnail((budget.max_side, budget.max_side), Image.LANCZOS)
+
+    data, image = _encode_within(image, budget)
+    logger.debug(f"Vision payload for {os.path.basename(file_path)} ({doc_type}): "
+                 f"{original_bytes} -> {len(data)} bytes, {image.size[0]}x{image.size[1]}")
+    return ImagePayload(data, 'image/jpeg', image.size[0], image.size[1], budget.detail, original_bytes)
+
+
+def _encode_within(image, budget: ImageBudget) -> Tuple[bytes, object]:
+    """JPEG bytes under budget.max_bytes, lowering quality before resolution."""
+    from PIL import Image
+    while True:
+        quality = budget.quality
+        while True:
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if len(data) <= budget.max_bytes or quality <= MIN_JPEG_QUALITY:
+                break
+            quality = max(MIN_JPEG_QUALITY, quality - 10)
+        if len(data) <= budget.max_bytes or max(image.size) <= 512:
+            return data, image
+        width, height = image.size
+        image = image.resize((int(width * DOWNSCALE_STEP), int(height * DOWNSCALE_STEP)), Image.LANCZOS)
+
+
+def encode_image_url(file_path: str, doc_type: Optional[str] = None,
+                     budgets: Optional[Dict[str, ImageBudget]] = None,
+                     enabled: bool = VISION_IMAGE_BUDGET_ENABLED) -> Dict:
+    """image_url message part for a document, budgeted unless disabled.
+
+    With the budget disabled (or Pillow missing) the file is sent as-is,
+    which is the previous behaviour.
+    """
+    if enabled:
+        try:
+            return prepare_image_payload(file_path, doc_type, budgets).image_url()
+        except ImportError as e:
+            logger.warning(f"Image budget unavailable, sending original file: {str(e)}")
+    import mimetypes
+    mime_type = mimetypes.guess_type(file_path)[0] or 'image/jpeg'
+    with open(file_path, 'rb') as f:
+        url = f"data:{mime_type};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+    return {"type": "image_url", "image_url": {"url": url, "detail": get_budget(doc_type, budgets).detail}}
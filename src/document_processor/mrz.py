@@ -0,0 +1,298 @@
+import re
+import itertools
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ICAO 9303 line lengths per document format
+FORMAT_LINES = {
+    'TD1': (3, 30),   # ID cards
+    'TD2': (2, 36),   # Older ID cards and visas
+    'TD3': (2, 44),   # Passports
+}
+
+CHECK_WEIGHTS = (7, 3, 1)
+
+# Characters OCR engines return in place of the '<' filler
+FILLER_CONFUSIONS = str.maketrans({'«': '<', '‹': '<', '(': '<', '[': '<', '{': '<', '¢': '<'})
+
+# Letter/digit confusions, applied according to what a field may contain
+TO_DIGIT = str.maketrans('OQDUILZSBG', '0000112586')
+TO_LETTER = str.maketrans('0125864', 'OIZSBGA')
+AMBIGUOUS = {'0': 'O', 'O': '0', '1': 'I', 'I': '1', '5': 'S', 'S': '5',
+             '8': 'B', 'B': '8', '2': 'Z', 'Z': '2'}
+
+# Shortest name line accepted once trailing fillers are lost
+MIN_NAME_LINE = 20
+
+# Ambiguous positions tried when repairing a document number against its check digit
+MAX_REPAIR_POSITIONS = 4
+
+
+def char_value(char: str) -> int:
+    """ICAO value of an MRZ character: digits as-is, A-Z as 10-35, '<' as 0."""
+    if char.isdigit():
+        return int(char)
+    if 'A' <= char <= 'Z':
+        return ord(char) - ord('A') + 10
+    if char == '<':
+        return 0
+    raise ValueError(f"Invalid MRZ character: {char!r}")
+
+
+def check_digit(value: str) -> str:
+    """ICAO 9303 check digit (weights 7, 3, 1 modulo 10) of a field."""
+    return str(sum(char_value(c) * CHECK_WEIGHTS[i % 3] for i, c in enumerate(value)) % 10)
+
+
+def is_valid(value: str, digit: str) -> bool:
+    """Whether a field matches its check digit ('<' counts as 0)."""
+    try:
+        return check_digit(value) == digit.replace('<', '0')
+    except ValueError:
+        return False
+
+
+def _digits(value: str) -> str:
+    return value.translate(TO_DIGIT)
+
+
+def _letters(value: str) -> str:
+    return value.translate(TO_LETTER)
+
+
+# Trailing filler of a name field, with runs of two or more 'K' OCR read for '<'
+TRAILING_FILLER = re.compile(r'(?:<+K{2,})*<*$')
+
+
+def _repair_names(value: str) -> str:
+    """Fix letters read as digits and 'K' read for the trailing filler of the name field.
+
+    Only runs of two or more K's after the last name part are rewritten, so a
+    one-letter 'K' name part survives (line 1 has no check digit to catch it).
+    """
+    value = _letters(value)
+    tail = TRAILING_FILLER.search(value)
+    return value[:tail.start()] + '<' * (tail.end() - tail.start())
+
+
+def _repair_document_number(number: str, digit: str) -> Tuple[str, bool]:
+    """Swap O/0, I/1 and similar look-alikes until the number matches its check digit."""
+    if is_valid(number, digit):
+        return number, True
+    positions = [i for i, c in enumerate(number) if c in AMBIGUOUS][:MAX_REPAIR_POSITIONS]
+    for count in range(1, len(positions) + 1):
+        for subset in itertools.combinations(positions, count):
+            candidate = list(number)
+            for i in subset:
+                candidate[i] = AMBIGUOUS[candidate[i]]
+            candidate = ''.join(candidate)
+            if is_valid(candidate, digit):
+                return candidate, True
+    return number, False
+
+
+def _format_date(yymmdd: str, future: bool) -> Optional[str]:
+    """YYMMDD to DD/MM/YYYY; birth dates resolve to the past, expiry dates to the future."""
+    try:
+        year, month, day = int(yymmdd[0:2]), int(yymmdd[2:4]), int(yymmdd[4:6])
+        current = datetime.now().year % 100
+        century = 2000 if (future or year <= current) else 1900
+        return datetime(century + year, month, day).strftime('%d/%m/%Y')
+    except ValueError:
+        return None
+
+
+def _names(field: str) -> Tuple[str, str]:
+    surname, _, given = field.partition('<<')
+    return surname.replace('<', ' ').strip(), given.replace('<', ' ').strip()
+
+
+class MRZResult:
+    """Parsed machine readable zone with per-field check-digit results."""
+
+    def __init__(self, doc_format: str, lines: List[str], fields: Dict[str, str],
+                 checks: Dict[str, bool], repaired: bool):
+        self.doc_format = doc_format
+        self.lines = lines
+        self.fields = fields
+        self.checks = checks
+        self.repaired = repaired
+
+    @property
+    def valid(self) -> bool:
+        """True when every check digit, including the composite, verifies."""
+        return bool(self.checks) and all(self.checks.values())
+
+    def to_passport_data(self, default_value: str = ".") -> Dict[str, str]:
+        """Fields in the shape TextractProcessor._extract_passport_data returns."""
+        data = {
+            'passport_number': self.fields.get('document_number') or default_value,
+            'surname': self.fields.get('surname') or default_value,
+            'given_names': self.fields.get('given_names') or default_value,
+            'nationality': self.fields.get('nationality') or default_value,
+            'date_of_birth': self.fields.get('date_of_birth') or default_value,
+            'place_of_birth': default_value,
+            'gender': self.fields.get('gender') or default_value,
+            'date_of_issue': default_value,
+            'date_of_expiry': self.fields.get('date_of_expiry') or default_value,
+            'mrz_line1': self.lines[0],
+            'mrz_line2': self.lines[1],
+        }
+        if len(self.lines) > 2:
+            data['mrz_line3'] = self.lines[2]
+        return data
+
+
+class MRZParser:
+    """ICAO 9303 MRZ reader for TD1, TD2 and TD3 documents.
+
+    Candidate lines are pulled from OCR text, normalized (filler look-alikes,
+    letters/digits according to each field's alphabet) and validated against
+    their check digits. Document numbers that fail their check digit are
+    repaired by trying O/0, I/1, S/5, B/8 and Z/2 swaps.
+    """
+
+    def find_lines(self, text: str) -> Optional[Tuple[str, List[str]]]:
+        """Find the MRZ lines in OCR text.
+
+        Returns:
+            (format, lines) padded to the format's line length, or None
+        """
+        candidates = []
+        for raw_line in text.splitlines():
+            line = raw_line.upper().translate(FILLER_CONFUSIONS).replace(' ', '')
+            if len(line) >= MIN_NAME_LINE and line.count('<') >= 2 and re.fullmatch(r'[A-Z0-9<]+', line):
+                candidates.append(line)
+
+        for doc_format in ('TD3', 'TD2', 'TD1'):
+            count, length = FORMAT_LINES[doc_format]
+            names_line = 2 if doc_format == 'TD1' else 0
+            for start in range(len(candidates) - count + 1):
+                group = candidates[start:start + count]
+                # OCR often drops trailing fillers: a few on data lines, any number after the names
+                if all((MIN_NAME_LINE if i == names_line else length - 4) <= len(line) <= length
+                       for i, line in enumerate(group)):
+                    return doc_format, [line.ljust(length, '<') for line in group]
+        return None
+
+    def parse(self, text: str) -> Optional[MRZResult]:
+        """Parse the MRZ found in OCR text, or return None if there is none."""
+        found = self.find_lines(text)
+        if not found:
+            return None
+        doc_format, lines = found
+        try:
+            if doc_format == 'TD1':
+                return self._parse_td1(lines)
+            return self._parse_two_line(doc_format, lines)
+        except Exception as e:
+            logger.debug(f"Error parsing {doc_format} MRZ: {str(e)}")
+            return None
+
+    def _parse_two_line(self, doc_format: str, lines: List[str]) -> MRZResult:
+        """TD2/TD3: names on line 1, numbers and dates on line 2."""
+        length = FORMAT_LINES[doc_format][1]
+        line1 = lines[0][:2] + _letters(lines[0][2:5]) + _repair_names(lines[0][5:])
+        l2 = lines[1]
+        number, number_ok = _repair_document_number(l2[0:9], _digits(l2[9]))
+        # TD3 closes the optional (personal number) field with its own check digit
+        optional_end = 42 if doc_format == 'TD3' else 35
+        composite = length - 1
+        line2 = (number + _digits(l2[9]) + _letters(l2[10:13]) + _digits(l2[13:20]) + l2[20]
+                 + _digits(l2[21:28]) + l2[28:optional_end] + _digits(l2[optional_end:length]))
+
+        checks = {
+            'document_number': number_ok,
+            'date_of_birth': is_valid(line2[13:19], line2[19]),
+            'date_of_expiry': is_valid(line2[21:27], line2[27]),
+            'composite': is_valid(line2[0:10] + line2[13:20] + line2[21:composite], line2[composite]),
+        }
+        if doc_format == 'TD3':
+            checks['personal_number'] = is_valid(line2[28:42], line2[42])
+
+        surname, given_names = _names(line1[5:])
+        fields = {
+            'document_type': line1[0:2].replace('<', ''),
+            'issuing_state': line1[2:5].replace('<', ''),
+            'surname': surname,
+            'given_names': given_names,
+            'document_number': number.replace('<', ''),
+            'nationality': line2[10:13].replace('<', ''),
+            'date_of_birth': _format_date(line2[13:19], future=False),
+            'gender': line2[20] if line2[20] in 'MF' else None,
+            'date_of_expiry': _format_date(line2[21:27], future=True),
+        }
+        repaired = [line1, line2] != lines
+        return MRZResult(doc_format, [line1, line2], fields, checks, repaired)
+
+    def _parse_td1(self, lines: List[str]) -> MRZResult:
+        """TD1: document number on line 1, dates on line 2, names on line 3."""
+        l1, l2 = lines[0], lines[1]
+        number, number_ok = _repair_document_number(l1[5:14], _digits(l1[14]))
+        line1 = l1[0:2] + _letters(l1[2:5]) + number + _digits(l1[14]) + l1[15:30]
+        line2 = (_digits(l2[0:7]) + l2[7] + _digits(l2[8:15]) + _letters(l2[15:18])
+                 + l2[18:29] + _digits(l2[29]))
+        line3 = _repair_names(lines[2])
+
+        checks = {
+            'document_number': number_ok,
+            'date_of_birth': is_valid(line2[0:6], line2[6]),
+            'date_of_expiry': is_valid(line2[8:14], line2[14]),
+            'composite': is_valid(line1[5:30] + line2[0:7] + line2[8:15] + line2[18:29], line2[29]),
+        }
+
+        surname, given_names = _names(line3)
+        fields = {
+            'document_type': line1[0:2].replace('<', ''),
+            'issuing_state': line1[2:5].replace('<', ''),
+            'surname': surname,
+            'given_names': given_names,
+            'document_number': number.replace('<', ''),
+            'nationality': line2[15:18].replace('<', ''),
+            'date_of_birth': _format_date(line2[0:6], future=False),
+            'gender': line2[7] if line2[7] in 'MF' else None,
+            'date_of_expiry': _format_date(line2[8:14], future=True),
+        }
+        repaired = [line1, line2, line3] != lines
+        return MRZResult('TD1', [line1, line2, line3], fields, checks, repaired)
+
+
+class MRZStats:
+    """Thread-safe counters for the MRZ fast path."""
+
+    def __init__(self):
+        self._counts = {'attempts': 0, 'found': 0, 'validated': 0, 'repaired': 0}
+        self._lock = threading.Lock()
+
+    def record(self, result: Optional[MRZResult]) -> None:
+        """Record one MRZ read attempt."""
+        with self._lock:
+            self._counts['attempts'] += 1
+            if result is not None:
+                self._counts['found'] += 1
+                if result.valid:
+                    self._counts['validated'] += 1
+                    self._counts['repaired'] += int(result.repaired)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Attempt, found, validated and repaired counts."""
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        with self._lock:
+            for key in self._counts:
+                self._counts[key] = 0
+
+
+_parser = MRZParser()
+
+
+def parse_mrz(text: str) -> Optional[MRZResult]:
+    """Parse the MRZ in OCR text with the shared parser."""
+    return _parser.parse(text)
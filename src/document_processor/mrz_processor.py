@@ -0,0 +1,109 @@
+import os
+import logging
+from typing import Callable, Dict, Optional
+
+from src.document_processor.image_payload import crop_to_mrz
+from src.document_processor.mrz import MRZStats, parse_mrz
+from src.utils.pdf_rasterizer import get_pdf_rasterizer
+
+logger = logging.getLogger(__name__)
+
+# Tesseract restricted to the MRZ alphabet, one uniform text block
+TESSERACT_MRZ_CONFIG = '--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<'
+
+_unavailable_logged = False
+
+
+def _log_unavailable(reason: str) -> None:
+    """Warn once per process that the local MRZ reader cannot run."""
+    global _unavailable_logged
+    if not _unavailable_logged:
+        _unavailable_logged = True
+        logger.warning(f"Local MRZ reading disabled: {reason}. Install pytesseract and the "
+                       f"tesseract binary, or set MRZ_FAST_PATH_ENABLED=False")
+
+
+def read_mrz_band(file_path: str) -> Optional[str]:
+    """OCR the bottom band of a document image locally with Tesseract.
+
+    Returns None (warning once) when pytesseract or the tesseract binary is
+    missing, or when a PDF cannot be rendered.
+    """
+    try:
+        import pytesseract
+        from PIL import Image, ImageOps
+    except ImportError:
+        _log_unavailable("pytesseract is not installed")
+        return None
+
+    if file_path.lower().endswith('.pdf'):
+        try:
+            image = Image.open(get_pdf_rasterizer().page_path(file_path, page=1))
+        except Exception as e:
+            logger.debug(f"Could not render {file_path} for MRZ reading: {str(e)}")
+            return None
+    else:
+        image = Image.open(file_path)
+
+    band = ImageOps.grayscale(crop_to_mrz(image))
+    try:
+        return pytesseract.image_to_string(band, config=TESSERACT_MRZ_CONFIG)
+    except pytesseract.TesseractNotFoundError:
+        _log_unavailable("the tesseract binary is not on PATH")
+        return None
+
+
+class MRZProcessor:
+    """Local passport reader for the front of the extraction chain.
+
+    Reads the MRZ band locally and returns passport fields only when every
+    ICAO check digit verifies, so GPT/Textract are never called for those
+    documents. Anything else returns a 'skipped' marker and the chain moves
+    on to the cloud providers.
+    """
+
+    # Fast-path counters shared by all instances
+    stats = MRZStats()
+
+    def __init__(self, text_reader: Callable[[str], Optional[str]] = read_mrz_band):
+        """Initialize processor.
+
+        Args:
+            text_reader: Returns OCR text for a document path, or None if unavailable
+        """
+        self.text_reader = text_reader
+        self.DEFAULT_VALUE = "."
+
+    def process_document(self, file_path: str, doc_type: Optional[str] = None) -> Dict[str, str]:
+        """Extract passport fields from a validated MRZ.
+
+        Args:
+            file_path: Path to the document
+            doc_type: Document type; only passports are read
+
+        Returns:
+            Passport fields, or {'skipped': reason} when there is no valid MRZ
+        """
+        if 'passport' not in (doc_type or '').lower():
+            return {'skipped': 'not a passport'}
+
+        try:
+            text = self.text_reader(file_path)
+        except Exception as e:
+            logger.warning(f"Local MRZ read failed for {os.path.basename(file_path)}: {str(e)}")
+            text = None
+        if not text:
+            return {'skipped': 'local OCR unavailable'}
+
+        result = parse_mrz(text)
+        self.stats.record(result)
+        if result is None or not result.valid:
+            return {'skipped': 'no valid MRZ'}
+
+        logger.info(f"Accepted {result.doc_format} MRZ for {os.path.basename(file_path)}"
+                    f"{' after OCR repair' if result.repaired else ''}")
+        return result.to_passport_data(self.DEFAULT_VALUE)
+
+    def get_stats(self) -> Dict[str, int]:
+        """MRZ fast-path attempt, found, validated and repaired counts."""
+        return self.stats.get_stats()
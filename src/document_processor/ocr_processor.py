@@ -8,6 +8,8 @@ import io
 from botocore.exceptions import BotoCoreError, ClientError
 import json
 
+from src.document_processor.textract_response import TextractResponse
+
 logger = logging.getLogger(__name__)
 
 class OCRProcessor:
@@ -65,14 +67,15 @@ class OCRProcessor:
             )
 
             # Extract text blocks
-            text_blocks = []
-            for item in response['Blocks']:
-                if item['BlockType'] == 'LINE':
-                    text_blocks.append({
-                        'text': item['Text'],
-                        'confidence': item['Confidence'],
-                        'boundingBox': item['Geometry']['BoundingBox']
-                    })
+            parsed = TextractResponse(response)
+            text_blocks = [
+                {
+                    'text': item['Text'],
+                    'confidence': item['Confidence'],
+                    'boundingBox': item['Geometry']['BoundingBox']
+                }
+                for item in parsed.lines
+            ]
 
             return {
                 'blocks': text_blocks,
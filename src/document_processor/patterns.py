@@ -0,0 +1,311 @@
+"""Precompiled regular expressions for document classification and field extraction.
+
+Every pattern is compiled once at import instead of going through the re
+module cache on each call. Classification keywords are kept as weighted
+tables and scored for all document types at once by KeywordScanner.
+"""
+import re
+from typing import Dict, Iterable, List, Match, Optional, Pattern, Sequence, Set, Tuple
+
+WHITESPACE = re.compile(r'\s+')
+ANY_WHITESPACE = re.compile(r'\s')
+
+
+def compile_patterns(patterns: Iterable[str], flags: int = 0) -> Tuple[Pattern, ...]:
+    """Compile an ordered list of patterns with shared flags."""
+    return tuple(re.compile(pattern, flags) for pattern in patterns)
+
+
+def first_match(patterns: Sequence[Pattern], text: str) -> Optional[Match]:
+    """First match of the first pattern (in order) that matches anywhere in text."""
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match
+    return None
+
+
+class KeywordScanner:
+    """Weighted keyword patterns for several labels, scored together.
+
+    Every label's patterns are compiled once and scored in a single call
+    that returns all labels at once. Each pattern keeps its own search:
+    CPython's re engine scans literal prefixes natively for a single
+    pattern, while a combined alternation is tried branch by branch at
+    every position and measured 8-13x slower on recorded OCR text (see
+    scripts/benchmark_patterns.py).
+    """
+
+    def __init__(self, patterns: Dict[str, Sequence[Tuple[str, float]]], flags: int = 0):
+        """Compile the keyword table.
+
+        Args:
+            patterns: Label -> [(pattern, weight)] in priority order
+            flags: Regex flags applied to every pattern
+        """
+        self.labels = list(patterns)
+        self._entries: List[Tuple[str, float, Pattern]] = [
+            (label, weight, re.compile(pattern, flags))
+            for label, label_patterns in patterns.items()
+            for pattern, weight in label_patterns
+        ]
+        self._totals = {label: len(label_patterns) for label, label_patterns in patterns.items()}
+
+    def matched(self, text: str) -> Set[int]:
+        """Indexes of the patterns that match anywhere in text."""
+        return {index for index, (_, _, pattern) in enumerate(self._entries) if pattern.search(text)}
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Sum of the weights of each label's matching patterns."""
+        scores = {label: 0.0 for label in self.labels}
+        for label, weight, pattern in self._entries:
+            if pattern.search(text):
+                scores[label] += weight
+        return scores
+
+    def match_counts(self, text: str) -> Dict[str, Tuple[int, int]]:
+        """(matching patterns, total patterns) per label."""
+        counts = {label: 0 for label in self.labels}
+        for label, _, pattern in self._entries:
+            if pattern.search(text):
+                counts[label] += 1
+        return {label: (counts[label], self._totals[label]) for label in self.labels}
+
+
+# --- Document type detection (DocumentClassifier, upper-cased text) ------------
+
+DOCUMENT_TYPE_KEYWORDS = KeywordScanner({
+    'visa': [
+        (r'E-?VISA', 0.8),
+        (r'ENTRY\s+PERMIT', 0.8),
+        (r'PERMIT\s+NO', 0.7),
+        (r'VISA\s+FILE', 0.8),
+        (r'RESIDENCE\s+VISA', 0.9),
+        (r'\d{3}\s*/\s*\d{4}\s*/\s*\d+', 0.6),  # Visa file number pattern
+        (r'UNIFIED\s+NUMBER', 0.7),
+    ],
+    'emirates_id': [
+        (r'IDENTITY\s+CARD', 0.8),
+        (r'EMIRATES\s+ID', 0.9),
+        (r'ID\s+NUMBER', 0.7),
+        (r'\d{3}-\d{4}-\d{7}-\d{1}', 0.95),  # Emirates ID number pattern
+        (r'الهوية الإماراتية', 0.9),  # Arabic text for Emirates ID
+        (r'UNITED\s+ARAB\s+EMIRATES', 0.6),
+    ],
+    'passport': [
+        (r'PASSPORT', 0.9),
+        (r'NATIONALITY', 0.7),
+        (r'DATE\s+OF\s+ISSUE', 0.6),
+        (r'PLACE\s+OF\s+BIRTH', 0.8),
+        (r'SURNAME', 0.8),
+        (r'GIVEN\s+NAMES?', 0.8),
+        (r'P<', 0.9),  # Common pattern in machine readable passport lines
+        (r'PASSEPORT', 0.9),  # French
+        (r'REISEPASS', 0.9),  # German
+        (r'جواز سفر', 0.9)  # Arabic
+    ],
+})
+
+# --- Shared field patterns -----------------------------------------------------
+
+DATE_OF_BIRTH = compile_patterns([
+    r'(?:Date of Birth|DOB)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+    r'(?:Date of Birth|DOB)[.:\s]*(\d{1,2}\s*(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s*\d{2,4})'
+], re.IGNORECASE)
+
+NATIONALITY = re.compile(r'Nationality[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)', re.IGNORECASE)
+GENDER = re.compile(r'(?:Sex|Gender)[.:\s]*([MF]|MALE|FEMALE)')
+
+# --- Emirates ID ---------------------------------------------------------------
+
+EID_NUMBER = compile_patterns([
+    r'ID\s+(?:Number|No)[.:\s]*(\d{3}[-\s]?\d{4}[-\s]?\d{7}[-\s]?\d{1})',
+    r'(?:Number|No)[.:\s]*(\d{3}[-\s]?\d{4}[-\s]?\d{7}[-\s]?\d{1})',
+    r'(?<!\d)(\d{3}[-\s]?\d{4}[-\s]?\d{7}[-\s]?\d{1})(?!\d)'  # Standalone EID pattern
+], re.IGNORECASE)
+
+EID_NAME = compile_patterns([
+    r'Name[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$|\s*\d)',
+    r'(?:^|\n)(?:Mr\.?|Mrs\.?|Ms\.?)?\s*([A-Za-z\s]+?)(?=\s*\n|\s*$|\s*ID|\s*Date)',
+], re.IGNORECASE)
+
+EID_EXPIRY = re.compile(r'(?:Expiry|Valid Until)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})', re.IGNORECASE)
+
+# --- Passport ------------------------------------------------------------------
+
+PASSPORT_NUMBER = compile_patterns([
+    r'Passport\s*No[.:\s]*([A-Z0-9]{6,12})',
+    r'Document\s*No[.:\s]*([A-Z0-9]{6,12})',
+    r'Passport\s*Number[.:\s]*([A-Z0-9]{6,12})',
+    r'No[.:\s]*([A-Z0-9]{6,12})(?=\s+|$)',
+    r'(?<!\w)([A-Z][0-9]{6,10})(?!\w)',  # Common passport format like A1234567
+    r'(?<!\w)([0-9]{6,9}[A-Z])(?!\w)',   # Format with numbers then letter like 1234567A
+    r'(?:^|\s)([A-Z][0-9]{6,9})(?:$|\s)' # Another common format
+], re.IGNORECASE)
+
+PASSPORT_NUMBER_CANDIDATES = re.compile(r'(?<!\w)([A-Z][0-9]{6,9}|[0-9]{6,9}[A-Z])(?!\w)')
+PASSPORT_SURNAME = re.compile(r'Surname[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*Given|\s*$)', re.IGNORECASE)
+PASSPORT_GIVEN_NAMES = re.compile(r'Given\s*Names?[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)', re.IGNORECASE)
+PASSPORT_GENDER = re.compile(r'(?:Sex|Gender)[.:\s]*([MF])')
+PASSPORT_PLACE_OF_BIRTH = re.compile(r'Place of Birth[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)', re.IGNORECASE)
+
+PASSPORT_DATES = {
+    'date_of_birth': DATE_OF_BIRTH,
+    'date_of_issue': compile_patterns([
+        r'(?:Date of Issue)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+        r'(?:Issued|Issue Date)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})'
+    ], re.IGNORECASE),
+    'date_of_expiry': compile_patterns([
+        r'(?:Date of Expiry|Expiry Date)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+        r'(?:Valid Until)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})'
+    ], re.IGNORECASE),
+}
+
+# --- Visa / entry permit (upper-cased text unless noted) -----------------------
+
+VISA_NATIONALITY = compile_patterns([
+    r'NATIONALITY\s*[:\.]*\s*([A-Za-z\s]+?)(?=\s*\n|\s*$|\s*\d)',
+    r'NATIONALITY\s*[:\.]*\s*([A-Za-z\s]+)',
+    r'NATIONALTY\s*[:\.]*\s*([A-Za-z\s]+)',  # Common misspelling
+    r'NATION[.:]\s*([A-Za-z\s]+?)(?=\s*\n|\s*$)'
+])
+
+VISA_UNIFIED_NO = compile_patterns([
+    r'UNIFIED\s*(?:NO|NUMBER)[.:\s]*(\d{7,10})',
+    r'U\.?I\.?D\.?\s*(?:NO)?[.:\s]*(\d{7,10})',
+    r'U\.?I\.?D\.?[.:\s#]*(\d{7,10})',
+    r'U[\.\s]*I[\.\s]*D[\.\s]*(?:NO|NUMBER)[\.\s]*[:]*\s*(\d[\d\s]*)',
+    r'(?:U\.?I\.?D\.?\s*No\.?|UNIFIED\s*(?:NO|NUMBER))[.:\s]*(\d[\d\s/]*)',
+    r'(?<!\w)U\.?I\.?D\.?\s*[:#]?\s*(\d[\d\s/]*)',
+    r'UNIFIED\s*(?:NO|NUMBER)[.:\s]*([0-9\s]{5,15})',
+    r'UID\s*[:\.#]*\s*(\d[\d\s]*)',
+    r'(?<!\w)(2\d{9})(?!\w)',  # Unified numbers often start with 2 and have 10 digits
+    r'(?:\s|^)(3\d{9})(?:\s|$)'  # Try similar pattern for 3-prefix
+])
+
+VISA_FILE_NUMBER = compile_patterns([
+    r'ENTRY\s+PERMIT\s+(?:NO|NUMBER)[\.\s]*[:]*\s*([0-9/\-\s]+)',
+    r'PERMIT\s+(?:NO|NUMBER)[\.\s]*[:]*\s*([0-9/\-\s]+)',
+    r'VISA\s+FILE\s+(?:NO|NUMBER)[\.\s]*[:]*\s*([0-9/\-\s]+)',
+    r'FILE\s+(?:NO|NUMBER)[\.\s]*[:]*\s*([0-9/\-\s]+)',
+    r'(?<!\w)(\d{3}[/\-]\d{4}[/\-]\d{4,10})(?!\w)',  # Common format like 101/2023/1234567
+    r'(?<!\w)(\d{3}\s*/\s*\d{4}\s*/\s*\d{4,10})(?!\w)',  # With spacing
+    r'(?<!\w)(\d{3}[-\s]/\s*\d{4}[-\s]/\s*\d{4,10})(?!\w)'  # Mixed delimiters
+])
+
+VISA_FILE_NUMBER_BROAD = compile_patterns([
+    r'(?<!\w)(\d{3}[\s/\-]\d{4}[\s/\-]\d+)(?!\w)',
+    r'(?<!\w)(\d{1,3}[\s/\-]\d{1,4}[\s/\-]\d{4,})(?!\w)'
+])
+
+# Original-case text, case-insensitive
+VISA_PERMIT_NO = compile_patterns([
+    r'Entry\s+permit\s+(?:no|number)[.:\s]*([A-Z0-9\s/\-]+)(?=\s*\n|\s*$)',
+    r'Permit\s+(?:no|number)[.:\s]*([A-Z0-9\s/\-]+)(?=\s*\n|\s*$)',
+    r'Visa\s+(?:no|number)[.:\s]*([A-Z0-9\s/\-]+)(?=\s*\n|\s*$)',
+    r'(?:no|number)[.:\s]*(\d+\s*\/\s*\d+\s*\/\s*[\d\/]+)(?=\s*\n|\s*$)'
+], re.IGNORECASE)
+
+VISA_FULL_NAME = compile_patterns([
+    r'Full Name[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)',
+    r'Name[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)',
+    r'(?:^|\n)(?:Mr\.?|Mrs\.?|Ms\.?)?\s*([A-Za-z\s]+?)(?=\s*\n|\s*Nationality|\s*$)'
+    r'NAME\s*[:.]\s*([A-Za-z\s]+)',
+    r'(?:EMPLOYEE|WORKER)\s+NAME\s*[:.]\s*([A-Za-z\s]+)'
+], re.IGNORECASE)
+
+VISA_PASSPORT_NUMBER = compile_patterns([
+    r'Passport(?:\s+No)?[.:\s]*([A-Z0-9]+)(?=\s*\n|\s*$)',
+    r'Passport\s*(?:Number|No\.?)[.:\s]*([A-Z0-9]+)',
+    r'(?<!\w)([A-Z][0-9]{6,9})(?!\w)'  # Common format like A1234567
+    r'PASSPORT\s*(?:NO|NUMBER)[.:\s]*([A-Z0-9]{6,12})',
+    r'PASSPORT\s*(?:[:.]\s*)([A-Z0-9]{6,12})'
+], re.IGNORECASE)
+
+VISA_DATE_OF_BIRTH = DATE_OF_BIRTH + compile_patterns([
+    r'Birth\s*Date[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+    r'DAT[ES]\s*OF\s*BIRTH[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+    r'DOB[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{4})',
+    r'BIRTH\s*DATE[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{4})'
+], re.IGNORECASE)
+
+VISA_PROFESSION = re.compile(r'(?:Profession|Occupation)[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)', re.IGNORECASE)
+
+VISA_DATES = {
+    'issue_date': compile_patterns([
+        r'(?:Date of Issue|Issue Date|Issued on)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+    ], re.IGNORECASE),
+    'expiry_date': compile_patterns([
+        r'(?:Date of Expiry|Expiry Date|Valid Until)[.:\s]*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+    ], re.IGNORECASE),
+}
+
+VISA_SPONSOR = re.compile(r'Sponsor[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)', re.IGNORECASE)
+
+VISA_TYPE = compile_patterns([
+    r'(?:Visa Type|Type)[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)',
+    r'RESIDENCE\s*(VISA|PERMIT)',
+    r'VISIT\s*(VISA|PERMIT)',
+    r'TOURIST\s*(VISA)'
+], re.IGNORECASE)
+
+# --- Generic extraction and last-resort text search ----------------------------
+
+GENERIC_ID_FIELDS = {
+    'passport_number': compile_patterns([
+        r'Passport\s*(?:No|Number)[.:\s]*([A-Z0-9]{6,12})',
+        r'(?<!\w)([A-Z]\d{7,9})(?!\w)'  # Common passport format
+    ], re.IGNORECASE),
+    'emirates_id': compile_patterns([
+        r'(?:Emirates ID|ID Number)[.:\s]*(\d{3}-\d{4}-\d{7}-\d{1})',
+        r'(?<!\d)(\d{3}-\d{4}-\d{7}-\d{1})(?!\d)'  # Standalone EID
+    ], re.IGNORECASE),
+    'visa_number': compile_patterns([
+        r'(?:Visa|Permit)\s*(?:No|Number)[.:\s]*([A-Z0-9\s/\-]+)',
+        r'(?<!\w)(\d{3}/\d{4}/\d{4,10})(?!\w)'  # Common visa format
+    ], re.IGNORECASE),
+}
+
+GENERIC_NAME = re.compile(r'Name[.:\s]*([A-Za-z\s]+?)(?=\s*\n|\s*$)', re.IGNORECASE)
+
+FALLBACK_PASSPORT_NUMBER = compile_patterns([
+    r'(?<!\w)([A-Z]\d{7,8})(?!\w)',  # Common passport format A1234567
+    r'(?<!\w)(\d{7,9}[A-Z])(?!\w)',  # Reversed format 1234567A
+    r'PASSPORT\s*(?:NO|NUMBER)[.:\s]*([A-Z0-9]{6,12})',  # With label
+    r'(?<!\w)([A-Z][0-9]{6,10})(?!\w)'  # Common format with 6-10 digits
+], re.IGNORECASE)
+
+FALLBACK_VISA_FILE_NUMBER = compile_patterns([
+    r'(?:\d{3}/\d{4}/\d{4,10})',  # Common visa file format
+    r'(?:FILE|VISA)[.:\s]*(?:NO|NUMBER)[.:\s]*(\d+[\d/]*\d+)',  # With label
+    r'\b(\d{3,4}[/-]\d{4,}[/-]\d{4,})\b'  # Generic format
+])
+
+FALLBACK_UNIFIED_NO = compile_patterns([
+    r'(?:U\.?I\.?D|UNIFIED)[.:\s]*(?:NO|NUMBER)[.:\s]*(\d[\d\s]*)',
+    r'\b(2\d{9})\b'  # Unified numbers often start with 2 and have 10 digits
+], re.IGNORECASE)
+
+# --- Date normalization --------------------------------------------------------
+
+DATE_FORMATS = [
+    (date_format, re.compile(pattern, re.IGNORECASE)) for date_format, pattern in [
+        ('%d/%m/%Y', r'\d{1,2}/\d{1,2}/\d{4}'),
+        ('%d-%m-%Y', r'\d{1,2}-\d{1,2}-\d{4}'),
+        ('%d.%m.%Y', r'\d{1,2}\.\d{1,2}\.\d{4}'),
+        ('%d %b %Y', r'\d{1,2} [A-Za-z]{3} \d{4}'),
+        ('%d %B %Y', r'\d{1,2} [A-Za-z]+ \d{4}'),
+        ('%Y/%m/%d', r'\d{4}/\d{1,2}/\d{1,2}'),
+        ('%Y-%m-%d', r'\d{4}-\d{1,2}-\d{1,2}'),
+        ('%m/%d/%Y', r'\d{1,2}/\d{1,2}/\d{4}')
+    ]
+]
+
+SHORT_YEAR_DATE_FORMATS = [
+    (date_format, re.compile(pattern, re.IGNORECASE)) for date_format, pattern in [
+        ('%d/%m/%y', r'\d{1,2}/\d{1,2}/\d{2}'),
+        ('%d-%m-%y', r'\d{1,2}-\d{1,2}-\d{2}'),
+        ('%d.%m.%y', r'\d{1,2}\.\d{1,2}\.\d{2}'),
+        ('%d %b %y', r'\d{1,2} [A-Za-z]{3} \d{2}')
+    ]
+]
@@ -0,0 +1,44 @@
+"""Perceptual hashes of document renders.
+
+Byte hashes only catch identical files; a passport re-scanned or a PDF
+re-saved by another tool hashes differently although the page looks the
+same. A difference hash (dHash) of the first page, cropped to the document
+and reduced to a small grayscale grid, changes little between such copies,
+so near-duplicates are found by Hamming distance.
+"""
+import logging
+from typing import Optional
+
+from src.document_processor.image_payload import crop_to_document, load_image
+
+logger = logging.getLogger(__name__)
+
+# Grid side of the hash (HASH_SIZE ** 2 bits)
+HASH_SIZE = 16
+
+
+def dhash(image, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a grayscale thumbnail."""
+    from PIL import Image, ImageOps
+    small = ImageOps.grayscale(image).resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits."""
+    return bin(a ^ b).count('1')
+
+
+def document_hash(file_path: str, hash_size: int = HASH_SIZE) -> Optional[int]:
+    """dHash of a document's first page cropped to the document, or None if it cannot be read."""
+    try:
+        return dhash(crop_to_document(load_image(file_path)), hash_size)
+    except Exception as e:
+        logger.debug(f"No perceptual hash for {file_path}: {str(e)}")
+        return None
@@ -0,0 +1,266 @@
+import os
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import boto3
+from botocore.exceptions import ClientError
+
+from src.utils.circuit_breaker import CircuitBreakerRegistry, get_circuit_registry, is_provider_fault
+from src.utils.error_handling import CircuitOpenError, ServiceError
+from src.utils.rate_limiter import RateLimiter, headers_from_error
+from src.utils.pdf_rasterizer import get_pdf_rasterizer
+from config.settings import (
+    TEXTRACT_S3_BUCKET, TEXTRACT_S3_PREFIX, TEXTRACT_POLL_INTERVAL,
+    TEXTRACT_JOB_TIMEOUT, TEXTRACT_PAGE_DPI, TEXTRACT_MAX_CONCURRENCY
+)
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException', 'ProvisionedThroughputExceededException', 'LimitExceededException'
+}
+
+# Rejections of the document or request itself: retrying cannot help and Textract is healthy
+DOCUMENT_ERROR_CODES = {
+    'UnsupportedDocumentException', 'BadDocumentException', 'InvalidParameterException',
+    'DocumentTooLargeException'
+}
+
+# Textract API calls in flight across the process. ExtractionExecutor caps
+# documents per provider, but a multi-page PDF fans out into page calls while
+# holding a single document slot; every call takes one of these slots too.
+TEXTRACT_CALL_SLOTS = threading.BoundedSemaphore(max(1, TEXTRACT_MAX_CONCURRENCY))
+
+# GetDocumentAnalysis returns at most 1000 blocks per call
+MAX_RESULTS_PER_PAGE = 1000
+MAX_POLL_INTERVAL = 10.0
+
+
+def is_document_error(error: Exception) -> bool:
+    """Whether Textract rejected the document or request rather than failing itself."""
+    return (isinstance(error, ClientError)
+            and error.response.get('Error', {}).get('Code') in DOCUMENT_ERROR_CODES)
+
+
+def render_pdf_pages(file_path: str, dpi: int = TEXTRACT_PAGE_DPI) -> List[bytes]:
+    """JPEG bytes of every page of a PDF, rendered through the shared rasterizer."""
+    return get_pdf_rasterizer().page_bytes(file_path, dpi)
+
+
+def merge_page_responses(responses: Sequence[Dict]) -> Dict:
+    """Merge single-page Textract responses into one multi-page response.
+
+    Blocks keep their order and are stamped with their 1-based page number.
+    """
+    blocks = []
+    for page_number, response in enumerate(responses, 1):
+        for block in response.get('Blocks', []):
+            block['Page'] = page_number
+            blocks.append(block)
+    return {'Blocks': blocks, 'DocumentMetadata': {'Pages': len(responses)}}
+
+
+class TextractDocumentAnalyzer:
+    """Multi-page PDF analysis for Textract.
+
+    AnalyzeDocument only reads single-page documents, so PDFs are either
+    sent as-is through the asynchronous StartDocumentAnalysis job flow (when
+    an S3 bucket is configured) or rendered page by page and analyzed with
+    page-parallel synchronous calls. Both paths return one response whose
+    'Blocks' cover every page. An empty feature list selects the cheaper
+    text-detection APIs (StartDocumentTextDetection/DetectDocumentText).
+    """
+
+    # Rendered PDFs kept for a later, escalated call on the same document
+    RENDER_MEMO_SIZE = 4
+
+    def __init__(self, textract: Any, s3: Any = None, bucket: str = TEXTRACT_S3_BUCKET,
+                 prefix: str = TEXTRACT_S3_PREFIX, rate_limiter: Optional[RateLimiter] = None,
+                 poll_interval: float = TEXTRACT_POLL_INTERVAL, timeout: float = TEXTRACT_JOB_TIMEOUT,
+                 max_workers: int = TEXTRACT_MAX_CONCURRENCY, dpi: int = TEXTRACT_PAGE_DPI,
+                 page_renderer: Callable[[str, int], List[bytes]] = render_pdf_pages,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic,
+                 circuits: Optional[CircuitBreakerRegistry] = None,
+                 call_slots: threading.Semaphore = TEXTRACT_CALL_SLOTS):
+        """Initialize analyzer.
+
+        Args:
+            textract: boto3 Textract client
+            s3: boto3 S3 client (created on first use when a bucket is set)
+            bucket: S3 bucket for asynchronous jobs; empty for page-parallel mode
+            prefix: Key prefix for uploaded documents
+            rate_limiter: Shared Textract limiter, acquired before every call
+            poll_interval: Initial delay between job status polls in seconds
+            timeout: Maximum time to wait for a job in seconds
+            max_workers: Pages analyzed at once in page-parallel mode (calls
+                still share call_slots with every other Textract caller)
+            dpi: Render resolution in page-parallel mode
+            page_renderer: Callable returning one image per PDF page
+            sleep: Sleep function (injectable for tests)
+            clock: Monotonic clock (injectable for tests)
+            circuits: Circuit breakers; defaults to the shared registry
+            call_slots: Semaphore bounding concurrent Textract calls
+        """
+        self.textract = textract
+        self._s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.rate_limiter = rate_limiter
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.dpi = dpi
+        self.page_renderer = page_renderer
+        self._sleep = sleep
+        self._clock = clock
+        # Shared Textract health, also fed by TextractProcessor's single-page calls
+        self.circuits = circuits or get_circuit_registry()
+        self.call_slots = call_slots
+        self._rendered: "OrderedDict[tuple, List[bytes]]" = OrderedDict()
+        self._render_lock = threading.Lock()
+
+    @property
+    def s3(self) -> Any:
+        """S3 client used to stage documents for asynchronous jobs."""
+        if self._s3 is None:
+            self._s3 = boto3.client(
+                's3',
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                region_name=os.getenv('AWS_REGION', 'us-east-1')
+            )
+        return self._s3
+
+    def analyze(self, file_path: str, feature_types: Sequence[str] = ('FORMS', 'TABLES')) -> Dict:
+        """Analyze every page of a document.
+
+        Args:
+            file_path: Path to the PDF
+            feature_types: Textract feature types; empty for text detection only
+
+        Returns:
+            Textract-style response with the blocks of all pages
+        """
+        if self.bucket:
+            return self.analyze_async(file_path, feature_types)
+        return self.analyze_pages(file_path, feature_types)
+
+    def _call(self, operation: Callable, max_attempts: int = 5, **kwargs) -> Dict:
+        """Call Textract under the rate limiter and circuit breaker, waiting out throttling errors."""
+        for attempt in range(max_attempts):
+            if not self.circuits.allow('textract'):
+                raise CircuitOpenError('textract')
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                with self.call_slots:
+                    start = time.monotonic()
+                    response = operation(**kwargs)
+            except Exception as e:
+                # Throttling and rejected documents are not an outage
+                self.circuits.record('textract', not is_provider_fault(e), time.monotonic() - start)
+                code = e.response.get('Error', {}).get('Code') if isinstance(e, ClientError) else None
+                if code not in THROTTLING_ERROR_CODES or attempt == max_attempts - 1:
+                    raise
+                logger.warning(f"Textract throttled ({code}), retrying")
+                if self.rate_limiter:
+                    self.rate_limiter.update_from_headers(headers_from_error(e))
+                    self.rate_limiter.penalize(1.0)
+                else:
+                    self._sleep(2 ** attempt)
+                continue
+            self.circuits.record('textract', True, time.monotonic() - start)
+            return response
+
+    def analyze_async(self, file_path: str, feature_types: Sequence[str] = ('FORMS', 'TABLES')) -> Dict:
+        """Run an asynchronous job on the PDF staged in S3 and collect every result page."""
+        key = f"{self.prefix}{uuid.uuid4().hex}/{os.path.basename(file_path)}"
+        location = {'S3Object': {'Bucket': self.bucket, 'Name': key}}
+        self.s3.upload_file(file_path, self.bucket, key)
+        try:
+            if feature_types:
+                job = self._call(self.textract.start_document_analysis,
+                                 DocumentLocation=location, FeatureTypes=list(feature_types))
+                get_results = self.textract.get_document_analysis
+            else:
+                job = self._call(self.textract.start_document_text_detection, DocumentLocation=location)
+                get_results = self.textract.get_document_text_detection
+            logger.info(f"Started Textract job {job['JobId']} for {os.path.basename(file_path)}")
+            return self._collect_job(job['JobId'], get_results)
+        finally:
+            try:
+                self.s3.delete_object(Bucket=self.bucket, Key=key)
+            except Exception as e:
+                logger.warning(f"Failed to delete staged document s3://{self.bucket}/{key}: {str(e)}")
+
+    def _collect_job(self, job_id: str, get_results: Callable) -> Dict:
+        """Poll a job until it finishes, then follow NextToken through all result pages."""
+        deadline = self._clock() + self.timeout
+        interval = self.poll_interval
+        while True:
+            page = self._call(get_results, JobId=job_id, MaxResults=MAX_RESULTS_PER_PAGE)
+            status = page.get('JobStatus')
+            if status != 'IN_PROGRESS':
+                break
+            if self._clock() >= deadline:
+                raise ServiceError(f"Textract job {job_id} did not finish within {self.timeout:.0f}s")
+            self._sleep(interval)
+            interval = min(interval * 1.5, MAX_POLL_INTERVAL)
+
+        if status == 'FAILED':
+            raise ServiceError(f"Textract job {job_id} failed: {page.get('StatusMessage', 'unknown error')}")
+        if status == 'PARTIAL_SUCCESS':
+            logger.warning(f"Textract job {job_id} partially succeeded: {page.get('Warnings')}")
+
+        metadata = page.get('DocumentMetadata', {})
+        blocks = list(page.get('Blocks', []))
+        requests = 1
+        while page.get('NextToken'):
+            page = self._call(get_results, JobId=job_id,
+                              MaxResults=MAX_RESULTS_PER_PAGE, NextToken=page['NextToken'])
+            blocks.extend(page.get('Blocks', []))
+            requests += 1
+
+        logger.info(f"Textract job {job_id}: {metadata.get('Pages', '?')} pages, "
+                    f"{len(blocks)} blocks in {requests} result pages")
+        return {'Blocks': blocks, 'DocumentMetadata': metadata, 'JobStatus': status}
+
+    def analyze_pages(self, file_path: str, feature_types: Sequence[str] = ('FORMS', 'TABLES')) -> Dict:
+        """Render each PDF page and analyze the pages concurrently."""
+        pages = self._render(file_path)
+        if not pages:
+            raise ServiceError(f"No pages rendered from {file_path}")
+
+        def _analyze(page_bytes: bytes) -> Dict:
+            if not feature_types:
+                return self._call(self.textract.detect_document_text, Document={'Bytes': page_bytes})
+            return self._call(self.textract.analyze_document,
+                              Document={'Bytes': page_bytes}, FeatureTypes=list(feature_types))
+
+        workers = min(self.max_workers, len(pages))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="textract-page") as pool:
+            responses = list(pool.map(_analyze, pages))
+
+        logger.info(f"Analyzed {len(pages)} pages of {os.path.basename(file_path)} with {workers} workers")
+        return merge_page_responses(responses)
+
+    def _render(self, file_path: str) -> List[bytes]:
+        """Render a PDF's pages, reusing the result for repeat calls on an unchanged file."""
+        stat = os.stat(file_path)
+        key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns, self.dpi)
+        with self._render_lock:
+            if key in self._rendered:
+                self._rendered.move_to_end(key)
+                return self._rendered[key]
+        pages = self.page_renderer(file_path, self.dpi)
+        with self._render_lock:
+            self._rendered[key] = pages
+            while len(self._rendered) > self.RENDER_MEMO_SIZE:
+                self._rendered.popitem(last=False)
+        return pages
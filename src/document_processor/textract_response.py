@@ -0,0 +1,140 @@
+import re
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+_TOKEN = re.compile(r'[A-Z0-9]+')
+
+
+class TextractResponse:
+    """Indexed view over a Textract AnalyzeDocument/DetectDocumentText response.
+
+    The block list is walked once to build an ``Id -> block`` map, per-type
+    block lists and CHILD/VALUE adjacency, so resolving a relationship is a
+    dictionary lookup instead of a scan of every block. Lines, words,
+    key-value pairs and tables are all read from that index.
+    """
+
+    def __init__(self, response: Dict):
+        """Index a raw Textract response.
+
+        Args:
+            response: Response dict with a 'Blocks' list
+        """
+        self.raw = response
+        self.blocks: List[Dict] = response.get('Blocks', [])
+        self.by_id: Dict[str, Dict] = {}
+        self.by_type: Dict[str, List[Dict]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._values: Dict[str, List[str]] = {}
+        self._word_confidence: Optional[Dict[str, float]] = None
+
+        for block in self.blocks:
+            block_id = block.get('Id')
+            if block_id is not None:
+                self.by_id[block_id] = block
+            self.by_type.setdefault(block.get('BlockType'), []).append(block)
+            for relationship in block.get('Relationships', []):
+                if relationship.get('Type') == 'CHILD':
+                    self._children.setdefault(block_id, []).extend(relationship.get('Ids', []))
+                elif relationship.get('Type') == 'VALUE':
+                    self._values.setdefault(block_id, []).extend(relationship.get('Ids', []))
+
+    @classmethod
+    def parse(cls, response: Union[Dict, 'TextractResponse']) -> 'TextractResponse':
+        """Return response as a TextractResponse, indexing it only if needed."""
+        return response if isinstance(response, cls) else cls(response)
+
+    def get_block(self, block_id: str) -> Optional[Dict]:
+        """Block with the given Id, or None."""
+        return self.by_id.get(block_id)
+
+    def get_children(self, block: Dict) -> List[Dict]:
+        """CHILD blocks of a block, in relationship order."""
+        return [self.by_id[child_id] for child_id in self._children.get(block.get('Id'), ())
+                if child_id in self.by_id]
+
+    def get_value_block(self, key_block: Dict) -> Optional[Dict]:
+        """VALUE block linked to a KEY block, or None."""
+        for value_id in self._values.get(key_block.get('Id'), ()):
+            value_block = self.by_id.get(value_id)
+            if value_block:
+                return value_block
+        return None
+
+    def get_text(self, block: Dict) -> str:
+        """Space-joined text of a block's CHILD blocks (words)."""
+        return ' '.join(child['Text'] for child in self.get_children(block) if 'Text' in child)
+
+    @property
+    def lines(self) -> List[Dict]:
+        """LINE blocks in reading order."""
+        return self.by_type.get('LINE', [])
+
+    @property
+    def words(self) -> List[Dict]:
+        """WORD blocks in reading order."""
+        return self.by_type.get('WORD', [])
+
+    @property
+    def text(self) -> str:
+        """Document text, one LINE per line."""
+        return '\n'.join(block.get('Text', '') for block in self.lines)
+
+    def value_confidence(self, value: str) -> Optional[float]:
+        """Lowest WORD confidence (0..1) over the tokens of an extracted value.
+
+        Each alphanumeric token of the value must be a whole token of some
+        WORD (case-insensitive), so a short value such as "M" does not borrow
+        the confidence of a longer word containing it; returns None when any
+        token cannot be traced back, e.g. a date that was reformatted.
+        """
+        if self._word_confidence is None:
+            self._word_confidence = {}
+            for word in self.words:
+                confidence = word.get('Confidence')
+                if confidence is None:
+                    continue
+                for token in _TOKEN.findall(word.get('Text', '').upper()):
+                    self._word_confidence[token] = max(confidence, self._word_confidence.get(token, 0.0))
+        tokens = _TOKEN.findall(str(value).upper())
+        if not tokens:
+            return None
+        confidences = []
+        for token in tokens:
+            confidence = self._word_confidence.get(token)
+            if confidence is None:
+                return None
+            confidences.append(confidence)
+        return min(confidences) / 100
+
+    def iter_key_value_blocks(self) -> Iterator[Tuple[Dict, Dict]]:
+        """Yield (key_block, value_block) for every FORMS key with a value."""
+        for block in self.by_type.get('KEY_VALUE_SET', []):
+            if 'KEY' in block.get('EntityTypes', []):
+                value_block = self.get_value_block(block)
+                if value_block:
+                    yield block, value_block
+
+    def key_value_pairs(self) -> Dict[str, str]:
+        """FORMS key-value pairs as text, keys stripped of a trailing colon."""
+        key_values = {}
+        for key_block, value_block in self.iter_key_value_blocks():
+            key = self.get_text(key_block)
+            value = self.get_text(value_block)
+            if key and value:
+                key_values[key.strip().rstrip(':')] = value.strip()
+        return key_values
+
+    def tables(self) -> List[List[List[str]]]:
+        """TABLES output as a list of tables, each a list of rows of cell text."""
+        tables = []
+        for table in self.by_type.get('TABLE', []):
+            cells = [cell for cell in self.get_children(table) if cell.get('BlockType') == 'CELL']
+            if not cells:
+                continue
+            rows = max(cell.get('RowIndex', 1) for cell in cells)
+            columns = max(cell.get('ColumnIndex', 1) for cell in cells)
+            grid = [[''] * columns for _ in range(rows)]
+            for cell in cells:
+                grid[cell.get('RowIndex', 1) - 1][cell.get('ColumnIndex', 1) - 1] = self.get_text(cell)
+            tables.append(grid)
+        return tables
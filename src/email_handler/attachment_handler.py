@@ -2,7 +2,7 @@ import os
 import base64
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
 import hashlib
 import shutil
 import re
@@ -10,7 +10,7 @@ import threading
 import mimetypes
 import magic  # python-magic package for better file type detection
 
-from config.settings import RAW_DATA_DIR, ATTACHMENT_TYPES
+from config.settings import RAW_DATA_DIR, ATTACHMENT_TYPES, ATTACHMENT_CHUNK_SIZE
 from config.constants import FILE_NAME_PATTERN
 from src.utils.exceptions import AttachmentError
 from src.utils.error_handling import handle_errors, ErrorCategory, ErrorSeverity
@@ -20,13 +20,21 @@ logger = logging.getLogger(__name__)
 class AttachmentHandler:
     """Enhanced attachment handler with improved validation and file handling."""
     
-    def __init__(self, download_dir: Optional[str] = None):
+    # Bytes buffered from the start of a stream for MIME detection
+    MIME_SNIFF_BYTES = 64 * 1024
+    
+    def __init__(self, download_dir: Optional[str] = None,
+                 content_fetcher: Optional[Callable[[str, str], Iterable[bytes]]] = None):
         """Initialize attachment handler.
         
         Args:
             download_dir: Optional custom directory for saving attachments
+            content_fetcher: Optional callable (email_id, attachment_id) -> byte
+                chunks, used to stream attachments listed without contentBytes
+                (e.g. OutlookClient.iter_attachment_content)
         """
         self.download_dir = download_dir or RAW_DATA_DIR
+        self.content_fetcher = content_fetcher
         self._processed_files: Set[str] = set()  # Track processed files
         self._lock = threading.RLock()  # Thread safety
         
@@ -151,45 +159,17 @@ class AttachmentHandler:
             
             logger.info(f"Saving attachment {original_name} to {file_path}")
             
-            # Get content bytes
+            # Stream content to disk: decode inline base64 in slices, or download
+            # attachments listed without contentBytes chunk by chunk
             content_bytes = attachment.get("contentBytes")
-            if not content_bytes:
+            if content_bytes:
+                chunks = self._iter_base64_chunks(content_bytes)
+            elif self.content_fetcher and attachment.get("id"):
+                chunks = self.content_fetcher(email_id, attachment["id"])
+            else:
                 raise AttachmentError(f"No content bytes in attachment {original_name}")
-                
-            # Decode content
-            try:
-                content = base64.b64decode(content_bytes)
-            except Exception as e:
-                raise AttachmentError(f"Failed to decode attachment content: {str(e)}")
-                
-            # Verify file isn't empty
-            if len(content) == 0:
-                raise AttachmentError(f"Attachment {original_name} has empty content")
-                
-            # Check actual file type with magic
-            detected_mime = self.mime_detector.from_buffer(content)
-            expected_mime = mimetypes.guess_type(original_name)[0] or 'application/octet-stream'
-            
-            # Verify mime type is consistent with extension
-            if not self._is_mimetype_valid(detected_mime, expected_mime, original_name):
-                raise AttachmentError(
-                    f"File type mismatch for {original_name}: "
-                    f"expected {expected_mime}, got {detected_mime}"
-                )
-            
-            # Write content to file
-            with open(file_path, "wb") as f:
-                f.write(content)
-            
-            # Verify file was written correctly
-            file_size = os.path.getsize(file_path)
-            if file_size != len(content):
-                raise AttachmentError(
-                    f"File size mismatch: expected {len(content)} bytes, got {file_size} bytes"
-                )
-                
-            # Calculate and log file hash for traceability
-            file_hash = hashlib.md5(content).hexdigest()
+            
+            file_size, file_hash = self._write_stream(chunks, file_path, original_name)
             logger.info(f"Successfully saved {original_name} ({file_size} bytes, MD5: {file_hash})")
             
             # Track this file as processed
@@ -209,6 +189,66 @@ class AttachmentHandler:
             logger.error(f"Failed to save attachment {attachment.get('name', 'unknown')}: {str(e)}")
             raise AttachmentError(f"Failed to save attachment: {str(e)}")
             
+    def _iter_base64_chunks(self, content_bytes: str,
+                            chunk_size: int = ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Decode base64 content in slices instead of materializing it at once."""
+        step = max(4, (chunk_size // 3) * 4)  # keep slices on 4-character boundaries
+        for start in range(0, len(content_bytes), step):
+            try:
+                yield base64.b64decode(content_bytes[start:start + step])
+            except Exception as e:
+                raise AttachmentError(f"Failed to decode attachment content: {str(e)}")
+    
+    def _write_stream(self, chunks: Iterable[bytes], file_path: str, original_name: str) -> tuple:
+        """Write chunks to disk, checking the MIME type on the first bytes.
+        
+        The leading MIME_SNIFF_BYTES are buffered and validated before anything
+        is written; the MD5 and byte count are updated as chunks are written.
+        
+        Returns:
+            Tuple of (bytes written, MD5 hex digest)
+            
+        Raises:
+            AttachmentError: If the content is empty or its type does not match
+        """
+        digest = hashlib.md5()
+        size = 0
+        head = b""
+        validated = False
+        
+        with open(file_path, "wb") as f:
+            for chunk in chunks:
+                if not validated:
+                    head += chunk
+                    if len(head) < self.MIME_SNIFF_BYTES:
+                        continue
+                    self._validate_content_type(head, original_name)
+                    validated, chunk, head = True, head, b""
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            
+            if not validated:
+                # Whole attachment fit in the sniff buffer
+                if not head:
+                    raise AttachmentError(f"Attachment {original_name} has empty content")
+                self._validate_content_type(head, original_name)
+                f.write(head)
+                digest.update(head)
+                size += len(head)
+        
+        return size, digest.hexdigest()
+    
+    def _validate_content_type(self, head: bytes, original_name: str) -> None:
+        """Check detected MIME type of the leading bytes against the file extension."""
+        detected_mime = self.mime_detector.from_buffer(head)
+        expected_mime = mimetypes.guess_type(original_name)[0] or 'application/octet-stream'
+        if not self._is_mimetype_valid(detected_mime, expected_mime, original_name):
+            raise AttachmentError(
+                f"File type mismatch for {original_name}: "
+                f"expected {expected_mime}, got {detected_mime}"
+            )
+    
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename for security."""
         # Remove control characters and common problematic characters
@@ -0,0 +1,87 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.settings import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaSyncStore:
+    """Persisted Graph delta-sync state per mailbox/folder.
+
+    For each mailbox/folder pair this keeps the latest ``@odata.deltaLink`` and
+    the messages a delta round surfaced that have not been processed yet. A
+    delta round only reports a message once, so pending messages are carried
+    over to later polls until they are processed or removed from the folder.
+    """
+
+    def __init__(self, storage_file: Optional[str] = None):
+        """Initialize delta sync store.
+
+        Args:
+            storage_file: JSON state file (defaults to data/graph_delta_state.json)
+        """
+        self.storage_file = storage_file or os.path.join(BASE_DIR, "data", "graph_delta_state.json")
+        self._lock = threading.RLock()
+        self._state = self._load()
+
+    @staticmethod
+    def make_key(mailbox: str, folder: str) -> str:
+        return f"{mailbox.lower()}:{folder.lower()}"
+
+    def _load(self) -> Dict:
+        if os.path.exists(self.storage_file):
+            try:
+                with open(self.storage_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading delta sync state: {str(e)}")
+        return {}
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.storage_file)), exist_ok=True)
+            temp_file = f"{self.storage_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(self._state, f, indent=2)
+            os.replace(temp_file, self.storage_file)
+        except Exception as e:
+            logger.error(f"Error saving delta sync state: {str(e)}")
+
+    def get_delta_link(self, mailbox: str, folder: str) -> Optional[str]:
+        """Get the stored deltaLink, or None if no delta round has completed."""
+        with self._lock:
+            return self._state.get(self.make_key(mailbox, folder), {}).get('delta_link')
+
+    def get_pending(self, mailbox: str, folder: str) -> List[Dict]:
+        """Messages surfaced by earlier rounds that are still awaiting processing."""
+        with self._lock:
+            return list(self._state.get(self.make_key(mailbox, folder), {}).get('pending', {}).values())
+
+    def save_round(self, mailbox: str, folder: str, delta_link: str,
+                   pending: List[Dict]) -> None:
+        """Persist the outcome of a completed delta round.
+
+        Args:
+            mailbox: Mailbox address
+            folder: Mail folder id or well-known name
+            delta_link: deltaLink returned on the last page of the round
+            pending: Messages not yet processed, carried to the next poll
+        """
+        with self._lock:
+            self._state[self.make_key(mailbox, folder)] = {
+                'delta_link': delta_link,
+                'updated': datetime.now().isoformat(),
+                'pending': {message['id']: message for message in pending}
+            }
+            self._save()
+
+    def reset(self, mailbox: str, folder: str) -> None:
+        """Drop the delta state so the next poll starts a fresh initial round."""
+        with self._lock:
+            if self._state.pop(self.make_key(mailbox, folder), None) is not None:
+                self._save()
@@ -1,7 +1,7 @@
 import os
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 import json
 from urllib.parse import quote
 import time
@@ -13,11 +13,15 @@ from requests.exceptions import RequestException, Timeout, ConnectionError
 
 from config.settings import (
     GRAPH_API_ENDPOINT, CLIENT_ID, CLIENT_SECRET, 
-    TENANT_ID, USER_EMAIL, TARGET_MAILBOX, MAX_EMAIL_FETCH
+    TENANT_ID, USER_EMAIL, TARGET_MAILBOX, MAX_EMAIL_FETCH,
+    GRAPH_DELTA_SYNC_ENABLED, GRAPH_DELTA_FOLDER, GRAPH_DELTA_INITIAL_DAYS,
+    ATTACHMENT_CHUNK_SIZE
 )
 from config.constants import SUBJECT_KEYWORDS
-from src.utils.error_handling import handle_errors, ErrorCategory, ErrorSeverity
-from src.utils.exceptions import AuthenticationError, EmailFetchError
+from src.utils.error_handling import handle_errors, ErrorCategory, ErrorSeverity, CircuitOpenError
+from src.utils.circuit_breaker import get_circuit_registry
+from src.utils.exceptions import AuthenticationError, EmailFetchError, DeltaTokenExpiredError
+from src.email_handler.delta_sync import DeltaSyncStore
 from src.email_tracker.email_tracker import EmailTracker
 
 logger = logging.getLogger(__name__)
@@ -104,8 +108,24 @@ class TokenManager:
 class OutlookClient:
     """Enhanced Outlook client with connection pooling and retry logic."""
     
-    def __init__(self):
-        """Initialize Outlook client with Microsoft Graph API."""
+    # Graph JSON batching limits
+    BATCH_MAX_REQUESTS = 20
+    BATCH_RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    # Attachment listing without contentBytes (content is streamed via /$value)
+    ATTACHMENT_METADATA_FIELDS = "id,name,contentType,size,isInline"
+    
+    # Graph error codes meaning a delta token can no longer be used
+    SYNC_STATE_ERROR_CODES = {'syncstatenotfound', 'syncstateinvalid', 'resyncrequired'}
+    
+    def __init__(self, delta_store: Optional[DeltaSyncStore] = None,
+                 use_delta_sync: bool = GRAPH_DELTA_SYNC_ENABLED):
+        """Initialize Outlook client with Microsoft Graph API.
+        
+        Args:
+            delta_store: Persisted delta-sync state (defaults to data/graph_delta_state.json)
+            use_delta_sync: Poll with messages/delta instead of re-scanning time windows
+        """
         # Validate configuration
         self._validate_config()
         
@@ -130,6 +150,13 @@ class OutlookClient:
         self._cache_expiry = {}
         self._cache_lock = threading.RLock()
         
+        # Processed-email tracker shared by all fetches (indexed SQLite lookups)
+        self.email_tracker = EmailTracker()
+        
+        # Incremental sync state
+        self.use_delta_sync = use_delta_sync
+        self.delta_store = delta_store or (DeltaSyncStore() if use_delta_sync else None)
+        
         logger.info("Initializing OutlookClient with:")
         logger.info(f"Service Account: {USER_EMAIL}")
         logger.info(f"Target Mailbox: {TARGET_MAILBOX}")
@@ -163,11 +190,13 @@ class OutlookClient:
         """
         Fetch emails from target mailbox with incremental filtering.
         
-        If last_check_time is provided, it is used directly; otherwise, the method
-        will attempt to fetch emails from these incremental time windows:
-        - Last 1 hour
+        If last_check_time is provided, it is used directly. Otherwise, with delta
+        sync enabled, only messages changed since the previous poll are fetched
+        via messages/delta; without delta sync (or when the delta token has
+        expired) the method fetches emails from these incremental time windows:
+        - Last 13 hours
         - Last 24 hours
-        - Last 5 day
+        - Last 5 days
         
         Returns:
             List of email dictionaries that pass client-side filtering.
@@ -176,9 +205,7 @@ class OutlookClient:
             EmailFetchError: If fetching emails fails.
         """
         try:
-            # Initialize EmailTracker directly inside the method to avoid reference issues
-            from src.email_tracker.email_tracker import EmailTracker
-            email_tracker = EmailTracker()
+            email_tracker = self.email_tracker
             
             if last_check_time is not None:
                 emails = self._fetch_emails_with_last_check(last_check_time)
@@ -195,6 +222,12 @@ class OutlookClient:
                     return unprocessed_emails
                 return []
             else:
+                if self.use_delta_sync:
+                    emails = self._fetch_emails_delta(email_tracker)
+                    if emails is not None:
+                        return emails
+                    logger.info("Delta sync unavailable, falling back to time window scan")
+                
                 now = datetime.now()
                 # Define incremental time windows: last 13 hours, last 24 hours, last 3 days.
                 time_windows = [now - timedelta(hours=13), now - timedelta(hours=24), now - timedelta(days=5)]
@@ -228,9 +261,8 @@ class OutlookClient:
             seen_subjects = {}   # Track by subject
             next_link = None
             
-            # Load previously processed emails
-            from src.email_tracker.email_tracker import EmailTracker
-            email_tracker = EmailTracker()
+            # Previously processed emails
+            email_tracker = self.email_tracker
             
             logger.info(f"Fetching emails since {last_check_time.isoformat()}")
             
@@ -293,12 +325,97 @@ class OutlookClient:
             logger.error(f"Failed to fetch emails: {str(e)}")
             raise EmailFetchError(f"Failed to fetch emails: {str(e)}")
 
+    def _fetch_emails_delta(self, email_tracker: EmailTracker,
+                            folder: str = GRAPH_DELTA_FOLDER) -> Optional[List[Dict]]:
+        """Fetch messages changed since the last poll using the Graph delta query.
+        
+        The first round (no stored deltaLink) enumerates the folder back to
+        GRAPH_DELTA_INITIAL_DAYS; later rounds resume from the stored deltaLink
+        and only transfer changed messages. Messages surfaced earlier but not yet
+        processed are carried over until they are processed or removed.
+        
+        Args:
+            email_tracker: Tracker used to drop already processed emails
+            folder: Mail folder id or well-known name
+            
+        Returns:
+            Unprocessed emails (newest first), or None if the delta token has
+            expired and the caller should fall back to a window scan
+        """
+        delta_link = self.delta_store.get_delta_link(TARGET_MAILBOX, folder)
+        if delta_link:
+            url, params = delta_link, None
+            logger.info(f"Resuming delta sync for folder '{folder}'")
+        else:
+            since = datetime.now() - timedelta(days=GRAPH_DELTA_INITIAL_DAYS)
+            url = f"{GRAPH_API_ENDPOINT}/users/{self.target_mailbox}/mailFolders/{folder}/messages/delta"
+            params = {
+                "$select": "id,subject,receivedDateTime,hasAttachments,importance,from",
+                "$filter": f"receivedDateTime ge {since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+            }
+            logger.info(f"Starting initial delta sync for folder '{folder}' since {since.isoformat()}")
+        
+        # Pending messages from earlier rounds, updated with this round's changes
+        messages = {message['id']: message for message in self.delta_store.get_pending(TARGET_MAILBOX, folder)}
+        changed = removed = 0
+        headers = {"Prefer": f"odata.maxpagesize={MAX_EMAIL_FETCH}"}
+        
+        try:
+            while True:
+                response = self._execute_request("GET", url, headers=headers, params=params)
+                data = response.json()
+                
+                for message in data.get("value", []):
+                    if "@removed" in message:
+                        messages.pop(message.get('id'), None)
+                        removed += 1
+                    elif message.get('id'):
+                        messages[message['id']] = message
+                        changed += 1
+                
+                if "@odata.nextLink" in data:
+                    url, params = data["@odata.nextLink"], None
+                    continue
+                delta_link = data.get("@odata.deltaLink")
+                break
+        except DeltaTokenExpiredError as e:
+            logger.warning(f"Delta token for folder '{folder}' expired, resetting sync state: {str(e)}")
+            self.delta_store.reset(TARGET_MAILBOX, folder)
+            return None
+        
+        if not delta_link:
+            logger.warning("Delta round ended without a deltaLink")
+            return None
+        
+        # Only candidates that pass the filter are carried over; rejected messages
+        # come back through the delta query if they change
+        unprocessed = [m for m in messages.values() if not email_tracker.is_processed(m['id'])]
+        candidates = self._filter_emails(unprocessed)
+        self.delta_store.save_round(TARGET_MAILBOX, folder, delta_link, candidates)
+        logger.info(f"Delta sync: {changed} changed, {removed} removed, {len(candidates)} awaiting processing")
+        
+        emails = self._latest_per_subject(candidates)
+        logger.info(f"After filtering processed emails: {len(emails)} emails remaining")
+        return emails
+    
+    def _latest_per_subject(self, emails: List[Dict]) -> List[Dict]:
+        """Keep only the most recent email per subject, sorted newest first."""
+        latest = {}
+        for email in emails:
+            subject = email.get('subject', '').strip()
+            if subject not in latest or email.get('receivedDateTime', '') > latest[subject].get('receivedDateTime', ''):
+                latest[subject] = email
+        return sorted(latest.values(), key=lambda x: x.get('receivedDateTime', ''), reverse=True)
+
     @handle_errors(ErrorCategory.NETWORK, ErrorSeverity.MEDIUM)
-    def get_attachments(self, email_id: str) -> List[Dict]:
+    def get_attachments(self, email_id: str, include_content: bool = True) -> List[Dict]:
         """Get attachments from an email with improved error handling.
         
         Args:
             email_id: Email identifier
+            include_content: Include base64 contentBytes; when False only
+                metadata is listed and content is fetched with
+                iter_attachment_content
             
         Returns:
             List of attachment dictionaries
@@ -308,10 +425,11 @@ class OutlookClient:
         """
         try:
             endpoint = f"{GRAPH_API_ENDPOINT}/users/{self.target_mailbox}/messages/{email_id}/attachments"
+            params = None if include_content else {"$select": self.ATTACHMENT_METADATA_FIELDS}
             logger.info(f"Fetching attachments for email {email_id}")
 
             # Execute request with proper error handling
-            response = self._execute_request("GET", endpoint)
+            response = self._execute_request("GET", endpoint, params=params)
             attachments = response.json().get("value", [])
             
             # Log attachment details
@@ -329,9 +447,32 @@ class OutlookClient:
             logger.error(f"Failed to get attachments for email {email_id}: {str(e)}")
             raise EmailFetchError(f"Failed to get attachments: {str(e)}")
 
+    def iter_attachment_content(self, email_id: str, attachment_id: str,
+                                chunk_size: int = ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream raw attachment bytes from /attachments/{id}/$value.
+        
+        Args:
+            email_id: Email identifier
+            attachment_id: Attachment identifier
+            chunk_size: Bytes per yielded chunk
+            
+        Yields:
+            Chunks of the attachment content
+        """
+        endpoint = (f"{GRAPH_API_ENDPOINT}/users/{self.target_mailbox}/messages/{email_id}"
+                    f"/attachments/{quote(attachment_id, safe='')}/$value")
+        response = self._execute_request("GET", endpoint, headers={"Accept": "*/*"}, stream=True)
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            response.close()
+
     def _execute_request(self, method: str, url: str, headers: Optional[Dict] = None, 
                         params: Optional[Dict] = None, json_data: Optional[Dict] = None,
-                        retry_count: int = 3, retry_delay: float = 1.0) -> requests.Response:
+                        retry_count: int = 3, retry_delay: float = 1.0,
+                        stream: bool = False) -> requests.Response:
         """Execute HTTP request with retry logic and token refresh.
         
         Args:
@@ -342,6 +483,7 @@ class OutlookClient:
             json_data: Optional JSON body
             retry_count: Maximum number of retries
             retry_delay: Initial delay between retries
+            stream: Defer downloading the response body (for large content)
             
         Returns:
             Response object
@@ -353,71 +495,154 @@ class OutlookClient:
         if headers:
             request_headers.update(headers)
             
-        for attempt in range(retry_count):
-            try:
-                # Ensure token is valid before request
-                self.token_manager.get_token()
-                request_headers['Authorization'] = f"Bearer {self.token_manager.access_token}"
+        # Fail fast while Graph is unhealthy instead of waiting through the backoff
+        circuits = get_circuit_registry()
+        if not circuits.allow('graph'):
+            raise CircuitOpenError('graph')
+        start = time.time()
+        # Client errors (4xx) mean Graph is answering; only these outcomes count as healthy
+        healthy = False
+        try:
+            for attempt in range(retry_count):
+                try:
+                    # Ensure token is valid before request
+                    self.token_manager.get_token()
+                    request_headers['Authorization'] = f"Bearer {self.token_manager.access_token}"
                 
-                response = self.session.request(
-                    method=method,
-                    url=url,
-                    headers=request_headers,
-                    params=params,
-                    json=json_data,
-                    timeout=(5, 30)  # Connection timeout, read timeout
-                )
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        headers=request_headers,
+                        params=params,
+                        json=json_data,
+                        timeout=(5, 30),  # Connection timeout, read timeout
+                        stream=stream
+                    )
                 
-                # Handle auth errors
-                if response.status_code == 401:
-                    logger.warning("Received 401 unauthorized, refreshing token...")
-                    self.token_manager.invalidate_token()
-                    continue
+                    # Handle auth errors
+                    if response.status_code == 401:
+                        logger.warning("Received 401 unauthorized, refreshing token...")
+                        self.token_manager.invalidate_token()
+                        continue
                 
-                # Handle rate limiting
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', retry_delay * (2 ** attempt)))
-                    logger.warning(f"Rate limited, waiting {retry_after} seconds...")
-                    time.sleep(retry_after)
-                    continue
+                    # Handle rate limiting
+                    if response.status_code == 429:
+                        retry_after = int(response.headers.get('Retry-After', retry_delay * (2 ** attempt)))
+                        logger.warning(f"Rate limited, waiting {retry_after} seconds...")
+                        time.sleep(retry_after)
+                        continue
                     
-                # Handle server errors
-                if response.status_code >= 500:
-                    backoff = retry_delay * (2 ** attempt)
-                    logger.warning(f"Server error {response.status_code}, retrying in {backoff:.1f}s...")
-                    time.sleep(backoff)
-                    continue
+                    # Handle server errors
+                    if response.status_code >= 500:
+                        backoff = retry_delay * (2 ** attempt)
+                        logger.warning(f"Server error {response.status_code}, retrying in {backoff:.1f}s...")
+                        time.sleep(backoff)
+                        continue
                 
-                # Raise for other error codes
-                response.raise_for_status()
-                return response
+                    # Raise for other error codes
+                    response.raise_for_status()
+                    healthy = True
+                    return response
                 
-            except (ConnectionError, Timeout) as e:
-                # Network errors are retryable
-                if attempt < retry_count - 1:
-                    backoff = retry_delay * (2 ** attempt)
-                    logger.warning(f"Network error on attempt {attempt+1}/{retry_count}: {str(e)}")
-                    logger.warning(f"Retrying in {backoff:.1f}s...")
-                    time.sleep(backoff)
-                else:
-                    logger.error(f"Network error, all retries failed: {str(e)}")
-                    raise
-            except RequestException as e:
-                # Handle other request exceptions
-                if response.status_code == 404:
-                    logger.error(f"Resource not found: {url}")
-                    raise EmailFetchError(f"Resource not found: {response.text}")
-                elif 400 <= response.status_code < 500:
-                    # Client errors are generally not retryable
-                    logger.error(f"Client error {response.status_code}: {response.text}")
-                    raise EmailFetchError(f"API error {response.status_code}: {response.text}")
-                else:
-                    # Unexpected error
-                    logger.error(f"Request failed: {str(e)}")
-                    raise
+                except (ConnectionError, Timeout) as e:
+                    # Network errors are retryable
+                    if attempt < retry_count - 1:
+                        backoff = retry_delay * (2 ** attempt)
+                        logger.warning(f"Network error on attempt {attempt+1}/{retry_count}: {str(e)}")
+                        logger.warning(f"Retrying in {backoff:.1f}s...")
+                        time.sleep(backoff)
+                    else:
+                        logger.error(f"Network error, all retries failed: {str(e)}")
+                        raise
+                except RequestException as e:
+                    # Handle other request exceptions
+                    healthy = getattr(e.response, 'status_code', 500) < 500
+                    if self._is_sync_state_error(response):
+                        raise DeltaTokenExpiredError(f"Delta token expired: {response.text}")
+                    if response.status_code == 404:
+                        logger.error(f"Resource not found: {url}")
+                        raise EmailFetchError(f"Resource not found: {response.text}")
+                    elif 400 <= response.status_code < 500:
+                        # Client errors are generally not retryable
+                        logger.error(f"Client error {response.status_code}: {response.text}")
+                        raise EmailFetchError(f"API error {response.status_code}: {response.text}")
+                    else:
+                        # Unexpected error
+                        logger.error(f"Request failed: {str(e)}")
+                        raise
                     
-        # If we get here, all retries failed
-        raise EmailFetchError(f"Request failed after {retry_count} attempts")
+            # If we get here, all retries failed
+            raise EmailFetchError(f"Request failed after {retry_count} attempts")
+        finally:
+            circuits.record('graph', healthy, time.time() - start)
+
+    def _is_sync_state_error(self, response: requests.Response) -> bool:
+        """Whether a failed delta request means the sync state must be rebuilt."""
+        if response.status_code == 410:
+            return True
+        if response.status_code != 400:
+            return False
+        try:
+            code = response.json().get('error', {}).get('code', '')
+        except ValueError:
+            return False
+        return str(code).lower() in self.SYNC_STATE_ERROR_CODES
+
+    def _execute_batch(self, requests_list: List[Dict], retry_count: int = 3,
+                       retry_delay: float = 1.0) -> Dict[str, Dict]:
+        """Execute sub-requests through Graph JSON batching.
+        
+        Requests are sent in $batch calls of at most BATCH_MAX_REQUESTS. Items
+        answered with 429 or a 5xx status are retried in a later batch after
+        the longest Retry-After among them (or exponential backoff).
+        
+        Args:
+            requests_list: Sub-requests with 'id', 'method', 'url' (relative to
+                the API version root, e.g. '/users/{mailbox}/messages/{id}')
+                and optional 'body'
+            retry_count: Maximum attempts per sub-request
+            retry_delay: Initial backoff when no Retry-After is given
+            
+        Returns:
+            Mapping of sub-request id to its response ({'status', 'headers', 'body'})
+        """
+        endpoint = f"{GRAPH_API_ENDPOINT}/$batch"
+        results = {}
+        pending = []
+        for request in requests_list:
+            item = {"id": str(request["id"]), "method": request["method"], "url": request["url"]}
+            if request.get("body") is not None:
+                item["body"] = request["body"]
+                item["headers"] = {"Content-Type": "application/json"}
+            pending.append(item)
+        
+        for attempt in range(retry_count):
+            retry = []
+            wait = 0.0
+            for start in range(0, len(pending), self.BATCH_MAX_REQUESTS):
+                chunk = pending[start:start + self.BATCH_MAX_REQUESTS]
+                response = self._execute_request("POST", endpoint, json_data={"requests": chunk})
+                by_id = {item["id"]: item for item in chunk}
+                
+                for item_response in response.json().get("responses", []):
+                    item_id = str(item_response.get("id"))
+                    results[item_id] = item_response
+                    status = item_response.get("status", 500)
+                    if status in self.BATCH_RETRY_STATUSES and item_id in by_id:
+                        retry.append(by_id[item_id])
+                        headers = {k.lower(): v for k, v in (item_response.get("headers") or {}).items()}
+                        try:
+                            wait = max(wait, float(headers.get("retry-after")))
+                        except (TypeError, ValueError):
+                            wait = max(wait, retry_delay * (2 ** attempt))
+            
+            if not retry or attempt == retry_count - 1:
+                break
+            logger.warning(f"Batch: {len(retry)} sub-requests throttled or failed, retrying in {wait:.1f}s...")
+            time.sleep(wait)
+            pending = retry
+        
+        return results
 
     def _get_headers(self) -> Dict[str, str]:
         """Get headers for API requests."""
@@ -656,4 +881,42 @@ class OutlookClient:
             
         except Exception as e:
             logger.error(f"Failed to get email details for {email_id}: {str(e)}")
-            raise EmailFetchError(f"Failed to get email details: {str(e)}")
\ No newline at end of file
+            raise EmailFetchError(f"Failed to get email details: {str(e)}")
+
+    def _batch_by_email(self, email_ids: List[str], method: str, path: str,
+                        body: Optional[Dict] = None) -> Dict[str, Dict]:
+        """Run the same request for several emails in batches, keyed by email id."""
+        requests_list = [
+            {
+                "id": str(index),
+                "method": method,
+                "url": f"/users/{self.target_mailbox}/messages/{email_id}{path}",
+                "body": body
+            }
+            for index, email_id in enumerate(email_ids)
+        ]
+        responses = self._execute_batch(requests_list)
+        return {email_id: responses.get(str(index), {}) for index, email_id in enumerate(email_ids)}
+
+    @handle_errors(ErrorCategory.NETWORK, ErrorSeverity.MEDIUM)
+    def get_attachments_batch(self, email_ids: List[str],
+                              include_content: bool = True) -> Dict[str, List[Dict]]:
+        """Get attachments for several emails with batched requests.
+        
+        Args:
+            email_ids: Email identifiers
+            include_content: Include base64 contentBytes (see get_attachments)
+            
+        Returns:
+            Mapping of email id to its attachments; emails whose request failed
+            are left out so callers can fall back to get_attachments
+        """
+        path = "/attachments" if include_content else f"/attachments?$select={self.ATTACHMENT_METADATA_FIELDS}"
+        attachments = {}
+        for email_id, response in self._batch_by_email(email_ids, "GET", path).items():
+            if response.get("status") == 200:
+                attachments[email_id] = (response.get("body") or {}).get("value", [])
+            else:
+                logger.error(f"Failed to get attachments for email {email_id}: status {response.get('status')}")
+        logger.info(f"Fetched attachments for {len(attachments)}/{len(email_ids)} emails in batch")
+        return attachments
@@ -1,67 +1,70 @@
 import os
-import json
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime
-import time
+from typing import Iterable, List, Optional, Set
+
+from config.settings import DEDUPE_LEDGER_FILE
+from src.utils.dedupe_ledger import EMAIL, DedupeLedger, get_dedupe_ledger
 
 logger = logging.getLogger(__name__)
 
 class EmailTracker:
-    def __init__(self, storage_file="processed_emails.json"):
+    """Tracks processed emails in the shared dedupe ledger.
+
+    Emails are the EMAIL kind of the ledger that also records processed
+    folders and documents, so every tracker in the process shares one
+    database and one in-memory hot set. An existing processed_emails.json
+    file is imported once on first use.
+    """
+
+    def __init__(self, storage_file="processed_emails.json", ledger: Optional[DedupeLedger] = None):
+        """Initialize email tracker.
+
+        Args:
+            storage_file: Legacy JSON tracking file, migrated on first use
+            ledger: Dedupe ledger (defaults to the ledger next to storage_file)
+        """
         self.storage_file = storage_file
         self.tracker_file = storage_file  # Add this line to fix the error
-        self.processed_emails = self._load_processed_emails()
-
-    def _load_processed_emails(self):
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading processed emails: {str(e)}")
-                return {}
-        return {}
+        self.ledger = ledger or get_dedupe_ledger(
+            os.path.join(os.path.dirname(storage_file), DEDUPE_LEDGER_FILE))
+        self.ledger.migrate_legacy_file(EMAIL, storage_file)
 
-    def _save_processed_emails(self):
-        try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.processed_emails, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving processed emails: {str(e)}")
+    @property
+    def db_path(self) -> str:
+        """Path of the ledger database."""
+        return self.ledger.db_path
 
     def is_processed(self, email_id: str) -> bool:
         """Check if email has been processed."""
-        return email_id in self.processed_emails
+        return self.ledger.is_processed(EMAIL, email_id)
 
     def mark_processed(self, email_id: str, metadata: dict = None):
-        self.processed_emails[email_id] = {
-            'timestamp': datetime.now().isoformat(),
-            'metadata': metadata or {}
-        }
-        self._save_processed_emails()
-        
+        """Record an email as processed (buffered while inside batch())."""
+        self.ledger.mark_processed(EMAIL, email_id, metadata)
+
+    def mark_processed_many(self, email_ids: Iterable[str], metadata: dict = None) -> None:
+        """Record several emails as processed in one transaction."""
+        self.ledger.mark_processed_many(EMAIL, email_ids, metadata)
+
+    def batch(self):
+        """Buffer mark_processed calls and write them in a single transaction on exit."""
+        return self.ledger.batch()
+
+    def flush(self) -> int:
+        """Write buffered marks to the database."""
+        return self.ledger.flush()
+
+    def filter_processed(self, email_ids: Iterable[str]) -> Set[str]:
+        """Return the subset of email_ids already processed."""
+        return self.ledger.filter_processed(EMAIL, email_ids)
+
+    def get_processed_ids(self) -> List[str]:
+        """All processed email ids."""
+        return self.ledger.get_keys(EMAIL)
+
     def reset_tracker(self) -> bool:
-        """Reset the email tracker."""
-        try:
-            # Backup existing file
-            if os.path.exists(self.storage_file):
-                backup = f"{self.storage_file}.bak.{int(datetime.now().timestamp())}"
-                try:
-                    os.rename(self.storage_file, backup)
-                    logger.info(f"Backed up tracker to {backup}")
-                except Exception:
-                    pass
-            
-            # Clear tracking data
-            self.processed_emails = {}
-            
-            # Create new empty file
-            with open(self.storage_file, 'w') as f:
-                json.dump({}, f)
-                
+        """Reset the email tracker (folders and documents are kept)."""
+        if self.ledger.reset(EMAIL):
             logger.info("Email tracker has been reset")
             return True
-        except Exception as e:
-            logger.error(f"Failed to reset email tracker: {str(e)}")
-            return False
\ No newline at end of file
+        return False
@@ -0,0 +1,264 @@
+"""Offline document extraction through the OpenAI Batch API.
+
+A backlog of documents (a mailbox backfill, a re-run after a prompt change)
+used to go through GPTProcessor one interactive call at a time, so it was
+bounded by the OpenAI requests-per-minute budget. BatchExtractor packages
+the same requests (identical messages via GPTProcessor.build_messages) into
+JSONL jobs for the /v1/batches endpoint, polls them to completion and writes
+the parsed results into the extraction cache under GPTProcessor's cache key.
+The interactive pipeline then serves those documents from the cache.
+
+Each submitted job leaves its input JSONL and a manifest (custom_id ->
+document) in the job directory, so a job can be collected with
+collect(batch_id) after the submitting process has exited.
+"""
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import (
+    OPENAI_BATCH_DIR, OPENAI_BATCH_MAX_REQUESTS, OPENAI_BATCH_MAX_BYTES,
+    OPENAI_BATCH_POLL_INTERVAL, OPENAI_BATCH_TIMEOUT
+)
+from src.document_processor.gpt_processor import GPTProcessor
+from src.utils.extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+# Batch statuses after which no more output will be produced
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchExtractor:
+    """Runs GPT extraction for many documents as OpenAI batch jobs."""
+
+    def __init__(self, gpt_processor: GPTProcessor, client: Any = None,
+                 cache: Optional[ExtractionCache] = None,
+                 job_dir: str = OPENAI_BATCH_DIR,
+                 max_requests: int = OPENAI_BATCH_MAX_REQUESTS,
+                 max_bytes: int = OPENAI_BATCH_MAX_BYTES,
+                 poll_interval: float = OPENAI_BATCH_POLL_INTERVAL,
+                 timeout: float = OPENAI_BATCH_TIMEOUT,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize batch extractor.
+
+        Args:
+            gpt_processor: Builds the request messages and parses responses
+            client: OpenAI client (or a stand-in with .files and .batches);
+                defaults to the processor's client
+            cache: Extraction cache receiving results; defaults to the processor's
+            job_dir: Directory for job input files and manifests
+            max_requests: Requests per job
+            max_bytes: Input file size per job (the API caps input files)
+            poll_interval: Seconds between status polls
+            timeout: Seconds to wait for a job before giving up on it
+            sleep: Sleep function (injectable for tests)
+        """
+        self.gpt = gpt_processor
+        self.client = client if client is not None else gpt_processor.client
+        self.cache = cache if cache is not None else gpt_processor.cache
+        self.job_dir = job_dir
+        self.max_requests = max(1, max_requests)
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._sleep = sleep
+        os.makedirs(self.job_dir, exist_ok=True)
+
+    def build_requests(self, documents: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Batch request lines for documents not already in the cache.
+
+        Args:
+            documents: (file_path, doc_type) pairs
+
+        Returns:
+            Dict with 'requests' (JSONL lines), 'manifest' (custom_id ->
+            document), and 'cached' / 'failed' counts
+        """
+        requests: List[str] = []
+        manifest: Dict[str, Dict[str, str]] = {}
+        seen = set()
+        cached = failed = 0
+        for file_path, doc_type in documents:
+            if not os.path.exists(file_path):
+                logger.warning(f"Skipping missing document: {file_path}")
+                failed += 1
+                continue
+            content_hash = self.cache.hash_file(file_path)
+            cache_type = self.gpt.cache_doc_type(doc_type)
+            if (content_hash, cache_type) in seen:
+                continue
+            seen.add((content_hash, cache_type))
+            if self.cache.get(content_hash, self.gpt.PROVIDER, cache_type, self.gpt.PROMPT_VERSION) is not None:
+                cached += 1
+                continue
+            try:
+                messages = self.gpt.build_messages(file_path, doc_type)
+            except Exception as e:
+                logger.error(f"Failed to encode {file_path} for batch extraction: {str(e)}")
+                failed += 1
+                continue
+
+            custom_id = f"{cache_type}-{content_hash[:32]}"
+            requests.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": self.gpt.vision_model,
+                    "messages": messages,
+                    "max_tokens": self.gpt.max_tokens(),
+                    "temperature": self.gpt.TEMPERATURE,
+                },
+            }))
+            manifest[custom_id] = {
+                "content_hash": content_hash,
+                "doc_type": doc_type,
+                "file_path": file_path,
+            }
+        return {"requests": requests, "manifest": manifest, "cached": cached, "failed": failed}
+
+    def _chunks(self, requests: List[str]) -> List[List[str]]:
+        """Split request lines into jobs within the request and size limits."""
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        size = 0
+        for line in requests:
+            line_size = len(line.encode("utf-8")) + 1
+            if current and (len(current) >= self.max_requests or size + line_size > self.max_bytes):
+                chunks.append(current)
+                current, size = [], 0
+            current.append(line)
+            size += line_size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def submit(self, requests: List[str], manifest: Dict[str, Dict[str, str]]) -> str:
+        """Upload one job's input file and create the batch.
+
+        Args:
+            requests: JSONL request lines
+            manifest: custom_id -> document for (at least) these requests
+
+        Returns:
+            Batch ID
+        """
+        input_path = os.path.join(self.job_dir, f"input-{uuid.uuid4().hex[:12]}.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(requests) + "\n")
+
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+        )
+
+        custom_ids = {json.loads(line)["custom_id"] for line in requests}
+        with open(self._manifest_path(batch.id), "w", encoding="utf-8") as f:
+            json.dump({cid: doc for cid, doc in manifest.items() if cid in custom_ids}, f)
+        logger.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    def wait(self, batch_id: str) -> Any:
+        """Poll a batch until it reaches a terminal status or the timeout.
+
+        Returns:
+            The last retrieved batch object
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                logger.info(f"Batch {batch_id} finished with status {batch.status}")
+                return batch
+            if time.monotonic() >= deadline:
+                logger.warning(f"Batch {batch_id} still {batch.status} after {self.timeout:.0f}s")
+                return batch
+            self._sleep(self.poll_interval)
+
+    def collect(self, batch_id: str, batch: Any = None) -> Dict[str, int]:
+        """Parse a batch's output into the extraction cache.
+
+        Expired or cancelled batches still yield the requests they completed.
+
+        Args:
+            batch_id: Batch ID returned by submit
+            batch: Batch object if already retrieved
+
+        Returns:
+            Counts of 'succeeded' and 'failed' requests
+        """
+        batch = batch or self.client.batches.retrieve(batch_id)
+        with open(self._manifest_path(batch_id), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        succeeded = 0
+        output_file_id = getattr(batch, "output_file_id", None)
+        if output_file_id:
+            for line in self.client.files.content(output_file_id).text.splitlines():
+                if line.strip() and self._store_result(json.loads(line), manifest):
+                    succeeded += 1
+        failed = len(manifest) - succeeded
+        if failed:
+            logger.warning(f"Batch {batch_id}: {failed} of {len(manifest)} requests produced no result")
+        return {"succeeded": succeeded, "failed": failed}
+
+    def _store_result(self, line: Dict[str, Any], manifest: Dict[str, Dict[str, str]]) -> bool:
+        """Cache one output line's fields; False if it has none."""
+        document = manifest.get(line.get("custom_id"))
+        response = line.get("response") or {}
+        if document is None or line.get("error") or response.get("status_code") != 200:
+            logger.debug(f"Batch request {line.get('custom_id')} failed: {line.get('error')}")
+            return False
+        try:
+            content = response["body"]["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return False
+
+        doc_type = document["doc_type"]
+        data = self.gpt.parse_response(content, doc_type)
+        if data is None:
+            logger.warning(f"Batch response for {document['file_path']} is not JSON")
+            return False
+        self.cache.put(document["content_hash"], self.gpt.PROVIDER,
+                       self.gpt.cache_doc_type(doc_type), self.gpt.PROMPT_VERSION, data)
+        return True
+
+    def run(self, documents: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Extract documents through batch jobs, waiting for each to finish.
+
+        Args:
+            documents: (file_path, doc_type) pairs
+
+        Returns:
+            Summary with batch IDs and request counts
+        """
+        if not self.client:
+            raise RuntimeError("OpenAI client not available for batch extraction")
+        built = self.build_requests(documents)
+        report = {
+            "batches": [],
+            "submitted": len(built["requests"]),
+            "already_cached": built["cached"],
+            "succeeded": 0,
+            "failed": built["failed"],
+        }
+        batch_ids = [self.submit(chunk, built["manifest"]) for chunk in self._chunks(built["requests"])]
+        for batch_id in batch_ids:
+            batch = self.wait(batch_id)
+            counts = self.collect(batch_id, batch)
+            report["batches"].append({"id": batch_id, "status": batch.status, **counts})
+            report["succeeded"] += counts["succeeded"]
+            report["failed"] += counts["failed"]
+        return report
+
+    def _manifest_path(self, batch_id: str) -> str:
+        return os.path.join(self.job_dir, f"{batch_id}.manifest.json")
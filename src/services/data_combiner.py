@@ -13,23 +13,29 @@ import json
 from functools import lru_cache
 
 from src.utils.error_handling import ServiceError, handle_errors, ErrorCategory, ErrorSeverity
+from src.services.extraction_planner import ExtractionPlanner
+from src.services.extraction_store import ExtractionResultStore
+from src.services.extraction_executor import ExtractionExecutor, flatten_document_paths
 
 logger = logging.getLogger(__name__)
 
 class DataCombiner:
     """Enhanced data combiner with improved merging logic and performance."""
     
-    def __init__(self, textract_processor, excel_processor, deepseek_processor=None):
+    def __init__(self, textract_processor, excel_processor, deepseek_processor=None,
+                 extraction_executor: Optional[ExtractionExecutor] = None):
         """Initialize the data combiner.
         
         Args:
             textract_processor: Processor for document text extraction
             excel_processor: Processor for Excel file handling
             deepseek_processor: Optional DeepSeek processor for name extraction
+            extraction_executor: Optional shared executor for concurrent extraction
         """
         self.textract_processor = textract_processor
         self.excel_processor = excel_processor
         self.deepseek_processor = deepseek_processor
+        self.extraction_executor = extraction_executor or ExtractionExecutor()
         self.DEFAULT_VALUE = '.'
         
         # Pre-initialize field mappings for better performance
@@ -136,8 +142,21 @@ class DataCombiner:
 
     @handle_errors(ErrorCategory.PROCESS, ErrorSeverity.MEDIUM)
     def combine_and_populate_template(self, template_path: str, output_path: str, 
-                                    extracted_data: Dict, excel_data: Any = None, document_paths: Dict[str, Any] = None) -> Dict:
-        """Combine data with better handling of multiple rows."""
+                                    extracted_data: Dict, excel_data: Any = None, document_paths: Dict[str, Any] = None,
+                                    documents_data: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Combine data with better handling of multiple rows.
+        
+        Args:
+            template_path: Path to the Excel template
+            output_path: Where to write the populated template
+            extracted_data: Combined fields extracted from all documents
+            excel_data: Client Excel rows (list of dicts, dict or DataFrame)
+            document_paths: Document paths by type
+            documents_data: Optional precomputed per-document data keyed by
+                '<doc_type>_<file name>' with 'type', 'path', 'data' and 'file_name'
+                entries (see ExtractionResultStore.to_documents_data). When given,
+                documents are not re-extracted.
+        """
         logger.info(f"Starting data combination with template: {template_path}")
         logger.info(f"Extracted data has {len(extracted_data)} fields: {list(extracted_data.keys())}")
         
@@ -263,11 +282,12 @@ class DataCombiner:
                 if not excel_data.empty:
                     logger.info(f"Processing {len(excel_data)} rows with document data")
                     result_df = self._process_multiple_rows(extracted_data, excel_data, 
-                                                    template_columns, field_mappings, document_paths)
+                                                    template_columns, field_mappings, document_paths,
+                                                    documents_data)
                 else:
                     logger.info("Using document data only")
                     result_df = self._process_single_row(extracted_data, template_columns, 
-                                                field_mappings, document_paths)
+                                                field_mappings, document_paths, documents_data)
                     # existing code...
             except Exception as e:
                 logger.error(f"Error in data processing: {str(e)}", exc_info=True)
@@ -593,7 +613,8 @@ class DataCombiner:
 
     def _process_multiple_rows(self, extracted_data: Dict, excel_data: pd.DataFrame, 
                 template_columns: List[str], field_mappings: Dict,
-                document_paths: Dict[str, Any] = None) -> pd.DataFrame:
+                document_paths: Dict[str, Any] = None,
+                documents_data: Optional[Dict[str, Dict]] = None) -> pd.DataFrame:
         """Process multiple rows with intelligent document matching."""
         # Store DEFAULT_VALUE locally
         DEFAULT_VALUE = self.DEFAULT_VALUE
@@ -605,90 +626,30 @@ class DataCombiner:
         logger.info(f"Excel data: {len(excel_data)} rows")
         logger.info(f"Extracted data: {len(extracted_data)} fields")
         
-        # Initialize data structure to hold per-document extracted data
-        documents_data = {}
+        # Use precomputed per-document data when the caller already extracted the documents
+        precomputed = documents_data is not None
+        if precomputed:
+            logger.info(f"Using {len(documents_data)} precomputed document extractions")
+            documents_data = dict(documents_data)
+        else:
+            documents_data = {}
         
         # CRITICAL: Handle multiple documents and store data for each document separately
-        if document_paths:
+        if document_paths and not precomputed:
             try:
-                logger.info(f"Processing document_paths with {len(document_paths)} document types")
-                
-                # Process each document type
-                for doc_type, paths in document_paths.items():
-                    if isinstance(paths, list):
-                        # Handle list of paths (new structure)
-                        logger.info(f"Processing {doc_type} with {len(paths)} documents")
-                        for path in paths:
-                            try:
-                                # Extract data from this document with GPT or Textract
-                                doc_data = None
-                                file_name = os.path.basename(path)
-                                
-                                # Try GPT first if available
-                                if self.deepseek_processor:
-                                    try:
-                                        doc_data = self.deepseek_processor.process_document(path, doc_type)
-                                        logger.info(f"GPT extracted data from {file_name}: {doc_data}")
-                                    except Exception as e:
-                                        logger.error(f"GPT extraction failed for {file_name}: {str(e)}")
-                                
-                                # Fallback to Textract if GPT failed or is not available
-                                if not doc_data and hasattr(self, 'textract_processor') and self.textract_processor:
-                                    try:
-                                        doc_data = self.textract_processor.process_document(path, doc_type)
-                                        logger.info(f"Textract extracted data from {file_name}: {doc_data}")
-                                    except Exception as e:
-                                        logger.error(f"Textract extraction failed for {file_name}: {str(e)}")
-                                
-                                # Store document data if we got any
-                                if doc_data and isinstance(doc_data, dict):
-                                    # Create a unique key for this document
-                                    doc_key = f"{doc_type}_{os.path.basename(path)}"
-                                    documents_data[doc_key] = {
-                                        'type': doc_type,
-                                        'path': path,
-                                        'data': doc_data,
-                                        'file_name': file_name
-                                    }
-                                    logger.info(f"Added document data for {doc_key}")
-                            except Exception as e:
-                                logger.error(f"Error processing document {path}: {str(e)}")
-                    
-                    elif paths is not None:  # Handle single path (old structure)
-                        try:
-                            # Extract data from this document
-                            doc_data = None
-                            file_name = os.path.basename(paths)
-                            
-                            # Try GPT first if available
-                            if self.deepseek_processor:
-                                try:
-                                    doc_data = self.deepseek_processor.process_document(paths, doc_type)
-                                    logger.info(f"GPT extracted data from {file_name}: {doc_data}")
-                                except Exception as e:
-                                    logger.error(f"GPT extraction failed for {file_name}: {str(e)}")
-                            
-                            # Fallback to Textract if GPT failed or is not available
-                            if not doc_data and hasattr(self, 'textract_processor') and self.textract_processor:
-                                try:
-                                    doc_data = self.textract_processor.process_document(paths, doc_type)
-                                    logger.info(f"Textract extracted data from {file_name}: {doc_data}")
-                                except Exception as e:
-                                    logger.error(f"Textract extraction failed for {file_name}: {str(e)}")
-                            
-                            # Store document data if we got any
-                            if doc_data and isinstance(doc_data, dict):
-                                # Create a unique key for this document
-                                doc_key = f"{doc_type}_{os.path.basename(paths)}"
-                                documents_data[doc_key] = {
-                                    'type': doc_type,
-                                    'path': paths,
-                                    'data': doc_data,
-                                    'file_name': file_name
-                                }
-                                logger.info(f"Added document data for {doc_key}")
-                        except Exception as e:
-                            logger.error(f"Error processing document {paths}: {str(e)}")
+                documents = flatten_document_paths(document_paths)
+                logger.info(f"Extracting {len(documents)} documents from {len(document_paths)} document types")
+                
+                # GPT first (passed in as deepseek_processor), Textract as fallback;
+                # only documents and fields the Excel rows still need are extracted
+                store = ExtractionResultStore(default_value=DEFAULT_VALUE)
+                planner = ExtractionPlanner(excel_data.to_dict('records'), DEFAULT_VALUE)
+                for _ in planner.extract(
+                    self.extraction_executor, store, documents,
+                    [('gpt', self.deepseek_processor), ('textract', self.textract_processor)]
+                ):
+                    pass
+                documents_data = store.to_documents_data()
             except Exception as e:
                 logger.error(f"Error processing document_paths: {str(e)}")
         
@@ -3402,10 +3363,18 @@ class DataCombiner:
                 row_data[col] = ''
                 
     def _process_single_row(self, extracted_data: Dict, template_columns: List[str],
-                  field_mappings: Dict, document_paths: Dict[str, Any] = None) -> pd.DataFrame:
+                  field_mappings: Dict, document_paths: Dict[str, Any] = None,
+                  documents_data: Optional[Dict[str, Dict]] = None) -> pd.DataFrame:
         """Process single row of data."""
+        # Merge precomputed per-document data instead of re-extracting
+        if documents_data is not None:
+            for doc_info in documents_data.values():
+                for key, value in doc_info.get('data', {}).items():
+                    if key not in extracted_data or (value != self.DEFAULT_VALUE and extracted_data[key] == self.DEFAULT_VALUE):
+                        extracted_data[key] = value
+        
         # Handle new document_paths structure with lists of paths if needed
-        if document_paths:
+        elif document_paths:
             has_lists = any(isinstance(paths, list) for paths in document_paths.values() if paths is not None)
             
             if has_lists:
@@ -1,14 +1,71 @@
 import os
+import time
 import logging
-from typing import Dict, Optional
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.tier_stats import TierStats
+from src.utils.field_result import FieldResult, critical_fields, merge_field_results
+from src.utils.circuit_breaker import CircuitBreakerRegistry, get_circuit_registry, provider_available
+from config.settings import (
+    HEDGED_EXTRACTION_ENABLED, HEDGE_LATENCY_PERCENTILE,
+    HEDGE_PARALLEL_FALLBACK_RATE, HEDGE_MIN_SAMPLES, FIELD_CONFIDENCE_THRESHOLD
+)
 
 logger = logging.getLogger(__name__)
 
+# Fields that decide whether Textract's result is sufficient or the whole
+# document goes to the fallback. Narrower than CRITICAL_FIELDS: a weak or
+# missing visa unified_no only gets a scoped fallback call.
+SUFFICIENCY_FIELDS = {
+    'passport': ['passport_number', 'surname', 'given_names'],
+    'emirates_id': ['emirates_id', 'name_en'],
+    'visa': ['entry_permit_no', 'full_name'],
+}
+
 class EnhancedDocumentProcessorService:
-    """Service for orchestrating document processing using multiple processors."""
+    """Service for orchestrating document processing using multiple processors.
+    
+    By default DeepSeek runs only after Textract fails or returns insufficient
+    data. When Textract read the document but some critical fields are
+    missing or low-confidence, a fallback exposing process_fields is asked
+    for just those fields; results are merged per field by confidence.
+    In hedged mode DeepSeek also starts once Textract runs past its
+    latency percentile for the document type, or right away for document
+    types that usually need the fallback; the first result with the critical
+    fields wins. A losing call that is already running cannot be interrupted
+    and finishes in the background; its result is discarded.
+    
+    While a provider's circuit breaker is open it is skipped: DeepSeek
+    answers alone, or Textract runs without a fallback.
+    """
+    
+    # Textract latency and whether it sufficed, per document type, shared by all instances
+    provider_stats = TierStats()
+    
+    # Threads for hedged calls, including losers still finishing in the background
+    HEDGE_POOL_WORKERS = 8
     
-    def __init__(self, textract_processor=None, deepseek_processor=None):
-        """Initialize with available processors."""
+    def __init__(self, textract_processor=None, deepseek_processor=None,
+                 hedged: bool = HEDGED_EXTRACTION_ENABLED,
+                 latency_percentile: float = HEDGE_LATENCY_PERCENTILE,
+                 parallel_fallback_rate: float = HEDGE_PARALLEL_FALLBACK_RATE,
+                 min_samples: int = HEDGE_MIN_SAMPLES,
+                 confidence_threshold: float = FIELD_CONFIDENCE_THRESHOLD,
+                 circuits: Optional[CircuitBreakerRegistry] = None):
+        """Initialize with available processors.
+        
+        Args:
+            textract_processor: Primary processor
+            deepseek_processor: Fallback processor
+            hedged: Start the fallback before the primary finishes (see class docstring)
+            latency_percentile: Primary latency percentile after which the fallback starts
+            parallel_fallback_rate: Fallback rate at which both start together
+            min_samples: Primary calls per document type needed before hedging
+            confidence_threshold: Critical fields below this get a scoped fallback call
+            circuits: Provider circuit breakers (defaults to the shared registry)
+        """
         self.textract_processor = textract_processor
         self.deepseek_processor = deepseek_processor
         
@@ -18,109 +75,197 @@ class EnhancedDocumentProcessorService:
         # Environment variable for controlling DeepSeek usage
         self.use_deepseek_fallback = os.getenv('USE_DEEPSEEK_FALLBACK', 'True').lower() == 'true'
         
+        self.hedged = hedged
+        self.latency_percentile = latency_percentile
+        self.parallel_fallback_rate = parallel_fallback_rate
+        self.min_samples = min_samples
+        self.confidence_threshold = confidence_threshold
+        self.circuits = circuits or get_circuit_registry()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_pool_lock = threading.Lock()
+        
         logger.info(f"Enhanced Document Processor initialized. DeepSeek available: {self.deepseek_available}")
         if self.deepseek_available:
-            logger.info(f"DeepSeek fallback enabled: {self.use_deepseek_fallback}")
+            logger.info(f"DeepSeek fallback enabled: {self.use_deepseek_fallback} (hedged: {self.hedged})")
         
     def process_document(self, file_path: str, doc_type: Optional[str] = None) -> Dict[str, str]:
         """Process document using available processors with fallback logic."""
         logger.info(f"Processing document: {file_path}")
         
-        # First attempt with Textract
-        textract_result = None
-        textract_error = None
+        fallback_enabled = (self.deepseek_available and self.use_deepseek_fallback
+                            and provider_available(self._fallback_source(), self.circuits))
         
-        try:
-            textract_result = self.textract_processor.process_document(file_path, doc_type)
-            logger.info(f"Textract processing complete: {len(textract_result)} fields extracted")
-        except Exception as e:
-            textract_error = str(e)
-            logger.warning(f"Textract processing failed: {textract_error}")
+        # Go straight to the fallback while Textract's circuit is open
+        if fallback_enabled and not provider_available('textract', self.circuits):
+            logger.warning("Textract circuit open; using the fallback processor directly")
+            deepseek_result, deepseek_error = self._run_deepseek(file_path, doc_type)
+            return self._combine_results(None, "Textract circuit open", deepseek_result, deepseek_error)
+        
+        if fallback_enabled and self.hedged:
+            return self._process_hedged(file_path, doc_type)
+        
+        # First attempt with Textract
+        textract_result, textract_error = self._run_textract(file_path, doc_type)
             
         # If DeepSeek is not available or fallback is disabled
-        if not self.deepseek_available or not self.use_deepseek_fallback:
+        if not fallback_enabled:
             if textract_error:
                 raise Exception(f"Document processing failed: {textract_error}")
             return textract_result
             
-        # Try with DeepSeek if Textract failed or returned insufficient data
-        deepseek_needed = (
-            textract_error or 
-            not textract_result or
-            self._is_insufficient_data(textract_result, doc_type)
-        )
+        # Ask the fallback for just the weak fields when Textract read the document
+        weak_fields = self._weak_fields(textract_result, doc_type)
+        if not textract_error and textract_result and weak_fields and hasattr(self.deepseek_processor, 'process_fields'):
+            deepseek_result, deepseek_error = self._run_deepseek(file_path, doc_type, weak_fields)
+            if deepseek_error is None:
+                return self._combine_results(textract_result, textract_error, deepseek_result, deepseek_error)
+            logger.warning(f"Scoped DeepSeek call failed ({deepseek_error}), retrying for the whole document")
         
-        if deepseek_needed:
-            try:
-                logger.info("Using DeepSeek for document processing")
-                deepseek_result = self.deepseek_processor.process_document(file_path, doc_type)
-                
-                # If Textract failed completely, return DeepSeek result
-                if textract_error or not textract_result:
-                    return deepseek_result
-                    
-                # Otherwise, merge the results
-                return self._merge_results(textract_result, deepseek_result)
-                
-            except Exception as e:
-                logger.error(f"DeepSeek processing failed: {str(e)}")
-                # If Textract succeeded but with limited data, return that
-                if textract_result:
-                    logger.info("Falling back to Textract results due to DeepSeek error")
-                    return textract_result
-                # Otherwise, if both processors failed, raise an error
-                if textract_error:
-                    raise Exception(f"Document processing failed with both processors: {textract_error}, {str(e)}")
-                # This shouldn't happen, but just in case
-                raise Exception(f"Document processing failed: {str(e)}")
+        # Try with DeepSeek if Textract failed or returned insufficient data
+        if textract_error or not self._is_sufficient(textract_result, doc_type):
+            deepseek_result, deepseek_error = self._run_deepseek(file_path, doc_type)
+            return self._combine_results(textract_result, textract_error, deepseek_result, deepseek_error)
                 
         # Return Textract result if it was sufficient
         return textract_result
+    
+    def _run_textract(self, file_path: str, doc_type: Optional[str]) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        """Call Textract and record its latency and whether it sufficed."""
+        start = time.time()
+        result, error = None, None
+        try:
+            result = FieldResult.wrap(self.textract_processor.process_document(file_path, doc_type), 'textract')
+            logger.info(f"Textract processing complete: {len(result)} fields extracted")
+        except Exception as e:
+            error = str(e)
+            logger.warning(f"Textract processing failed: {error}")
+        self.provider_stats.record(f"textract:{doc_type or 'auto'}", time.time() - start,
+                                   resolved=error is None and self._is_sufficient(result, doc_type))
+        return result, error
+    
+    def _run_deepseek(self, file_path: str, doc_type: Optional[str],
+                      fields: Optional[List[str]] = None) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        """Call the fallback processor, for the whole document or only the given fields."""
+        try:
+            if fields:
+                logger.info(f"Using DeepSeek for {', '.join(fields)} only")
+                result = self.deepseek_processor.process_fields(file_path, doc_type, fields)
+            else:
+                logger.info("Using DeepSeek for document processing")
+                result = self.deepseek_processor.process_document(file_path, doc_type)
+            if not isinstance(result, dict):
+                return None, f"unexpected result type {type(result).__name__}"
+            if 'error' in result:
+                return None, str(result['error'])
+            return FieldResult.wrap(result, self._fallback_source()), None
+        except Exception as e:
+            logger.error(f"DeepSeek processing failed: {str(e)}")
+            return None, str(e)
+    
+    def _combine_results(self, textract_result: Optional[Dict[str, str]], textract_error: Optional[str],
+                         deepseek_result: Optional[Dict[str, str]], deepseek_error: Optional[str]) -> Dict[str, str]:
+        """Final result once both processors have answered (or failed)."""
+        if deepseek_error is None:
+            # If Textract failed completely, return DeepSeek result
+            if textract_error or not textract_result:
+                return deepseek_result
+            # Otherwise, merge the results
+            return self._merge_results(textract_result, deepseek_result)
+        
+        # If Textract succeeded but with limited data, return that
+        if textract_result:
+            logger.info("Falling back to Textract results due to DeepSeek error")
+            return textract_result
+        # Otherwise, if both processors failed, raise an error
+        if textract_error:
+            raise Exception(f"Document processing failed with both processors: {textract_error}, {deepseek_error}")
+        # This shouldn't happen, but just in case
+        raise Exception(f"Document processing failed: {deepseek_error}")
+    
+    def _get_hedge_pool(self) -> ThreadPoolExecutor:
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=self.HEDGE_POOL_WORKERS,
+                                                      thread_name_prefix="hedge")
+            return self._hedge_pool
+    
+    def _hedge_delay(self, doc_type: Optional[str]) -> Optional[float]:
+        """Seconds to wait for Textract before starting the fallback, or None to wait for it."""
+        key = f"textract:{doc_type or 'auto'}"
+        hit_rate = self.provider_stats.hit_rate(key, self.min_samples)
+        if hit_rate is not None and 1 - hit_rate >= self.parallel_fallback_rate:
+            return 0.0
+        return self.provider_stats.latency_percentile(key, self.latency_percentile, self.min_samples)
+    
+    def _process_hedged(self, file_path: str, doc_type: Optional[str]) -> Dict[str, str]:
+        """Race Textract against a delayed (or immediate) DeepSeek call."""
+        pool = self._get_hedge_pool()
+        delay = self._hedge_delay(doc_type)
+        
+        primary = pool.submit(self._run_textract, file_path, doc_type)
+        fallback: Optional[Future] = None
+        if delay is not None and not wait([primary], timeout=delay).done:
+            logger.info(f"Textract still running after {delay:.2f}s for {doc_type}; starting DeepSeek")
+            fallback = pool.submit(self._run_deepseek, file_path, doc_type)
+        
+        answers = {}
+        pending = {primary} if fallback is None else {primary, fallback}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = 'textract' if future is primary else 'deepseek'
+                result, error = future.result()
+                answers[name] = (result, error)
+                if error is None and self._is_sufficient(result, doc_type):
+                    for other in pending:
+                        other.cancel()
+                    logger.info(f"Hedged extraction of {doc_type} answered by {name}")
+                    return result
+            # Textract answered without the critical fields before the hedge started
+            if fallback is None:
+                fallback = pool.submit(self._run_deepseek, file_path, doc_type)
+                pending.add(fallback)
+        
+        textract_result, textract_error = answers['textract']
+        deepseek_result, deepseek_error = answers['deepseek']
+        return self._combine_results(textract_result, textract_error, deepseek_result, deepseek_error)
+    
+    def _is_sufficient(self, result: Optional[Dict[str, str]], doc_type: Optional[str]) -> bool:
+        """Whether a result has enough of the document type's critical fields."""
+        return bool(result) and not self._is_insufficient_data(result, doc_type)
+        
+    def _default_value(self) -> str:
+        return self.textract_processor.DEFAULT_VALUE if hasattr(self.textract_processor, 'DEFAULT_VALUE') else "."
+    
+    def _fallback_source(self) -> str:
+        """Source name of the fallback processor's fields (a GPTProcessor may fill the slot)."""
+        return getattr(self.deepseek_processor, 'PROVIDER', 'deepseek')
+    
+    def _weak_fields(self, result: Optional[Dict[str, str]], doc_type: Optional[str]) -> List[str]:
+        """Critical fields missing from a result or below the confidence threshold."""
+        if not result:
+            return critical_fields(doc_type)
+        return FieldResult.wrap(result, 'textract').weak_fields(
+            critical_fields(doc_type), self.confidence_threshold, self._default_value()
+        )
         
     def _is_insufficient_data(self, result: Dict[str, str], doc_type: str) -> bool:
         """Check if extracted data is insufficient based on document type."""
-        DEFAULT_VALUE = self.textract_processor.DEFAULT_VALUE if hasattr(self.textract_processor, 'DEFAULT_VALUE') else "."
-        
-        # Critical fields by document type
-        critical_fields = {
-            'passport': ['passport_number', 'surname', 'given_names'],
-            'emirates_id': ['emirates_id', 'name_en'],
-            'visa': ['entry_permit_no', 'full_name']
-        }.get(doc_type, [])
+        DEFAULT_VALUE = self._default_value()
+        fields = SUFFICIENCY_FIELDS.get(doc_type, [])
         
         # Check if critical fields are missing
         missing_critical = [
-            field for field in critical_fields 
+            field for field in fields
             if field not in result or result[field] == DEFAULT_VALUE
         ]
         
         # If more than half of critical fields are missing, data is insufficient
-        return len(missing_critical) > len(critical_fields) / 2
+        return len(missing_critical) > len(fields) / 2
         
     def _merge_results(self, textract_result: Dict[str, str], deepseek_result: Dict[str, str]) -> Dict[str, str]:
-        """Merge results from both processors, prioritizing better data."""
-        DEFAULT_VALUE = self.textract_processor.DEFAULT_VALUE if hasattr(self.textract_processor, 'DEFAULT_VALUE') else "."
-        merged = textract_result.copy()
-        
-        # For each field in DeepSeek result
-        for field, deepseek_value in deepseek_result.items():
-            # Skip empty values
-            if deepseek_value == DEFAULT_VALUE:
-                continue
-                
-            # If field doesn't exist in Textract or has default value, use DeepSeek
-            if field not in merged or merged[field] == DEFAULT_VALUE:
-                merged[field] = deepseek_value
-                continue
-                
-            # For IDs and dates, prefer longer/more structured values
-            if field in ['emirates_id', 'passport_number', 'entry_permit_no'] or 'date' in field:
-                textract_value = merged[field]
-                
-                # Choose the value that seems more complete/structured
-                if len(deepseek_value) > len(textract_value) or (
-                    '-' in deepseek_value and '-' not in textract_value
-                ):
-                    merged[field] = deepseek_value
-                    
-        return merged
\ No newline at end of file
+        """Merge results from both processors, keeping the more confident value per field."""
+        return merge_field_results(
+            [FieldResult.wrap(textract_result, 'textract'), FieldResult.wrap(deepseek_result, self._fallback_source())],
+            self._default_value()
+        )
\ No newline at end of file
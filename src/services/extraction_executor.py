@@ -0,0 +1,176 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import (
+    EXTRACTION_MAX_WORKERS, TEXTRACT_MAX_CONCURRENCY,
+    OPENAI_MAX_CONCURRENCY, DEEPSEEK_MAX_CONCURRENCY
+)
+from src.services.extraction_store import ExtractionResult, ExtractionResultStore
+from src.utils.circuit_breaker import provider_available
+from src.utils.pdf_rasterizer import PDFRasterizer, get_pdf_rasterizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_LIMITS = {
+    'textract': TEXTRACT_MAX_CONCURRENCY,
+    'gpt': OPENAI_MAX_CONCURRENCY,
+    'deepseek': DEEPSEEK_MAX_CONCURRENCY
+}
+
+
+class _LimitedProcessor:
+    """Processor proxy that holds a provider slot for the duration of each call."""
+
+    def __init__(self, processor: Any, semaphore: threading.BoundedSemaphore):
+        self._processor = processor
+        self._semaphore = semaphore
+
+    def process_document(self, file_path: str, doc_type: str) -> Dict[str, str]:
+        with self._semaphore:
+            return self._processor.process_document(file_path, doc_type)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._processor, name)
+        if name == 'process_fields':
+            # Scoped follow-up calls take a provider slot too
+            def process_fields(file_path: str, doc_type: str, fields: List[str]) -> Dict[str, str]:
+                with self._semaphore:
+                    return attribute(file_path, doc_type, fields)
+            return process_fields
+        return attribute
+
+
+class ExtractionExecutor:
+    """Bounded thread pool for network-bound document extraction.
+
+    Documents are extracted concurrently, but each provider is capped at its
+    own concurrency limit so a burst of documents cannot exceed Textract or
+    OpenAI/DeepSeek quotas. Results are written to the ExtractionResultStore
+    in submission order, so merged output is identical to the serial loop.
+    """
+
+    def __init__(self, max_workers: int = EXTRACTION_MAX_WORKERS,
+                 provider_limits: Optional[Dict[str, int]] = None,
+                 rasterizer: Optional[PDFRasterizer] = None):
+        """Initialize executor.
+
+        Args:
+            max_workers: Maximum documents extracted at once
+            provider_limits: Per-provider concurrent call limits, merged over
+                DEFAULT_PROVIDER_LIMITS
+            rasterizer: PDF page cache warmed for a batch's PDFs before
+                extraction (defaults to the shared rasterizer)
+        """
+        self.max_workers = max(1, max_workers)
+        self._rasterizer = rasterizer
+        self.provider_limits = dict(DEFAULT_PROVIDER_LIMITS)
+        self.provider_limits.update(provider_limits or {})
+        self._semaphores = {
+            provider: threading.BoundedSemaphore(max(1, limit))
+            for provider, limit in self.provider_limits.items()
+        }
+        self._semaphore_lock = threading.Lock()
+
+    def _get_semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._semaphore_lock:
+            if provider not in self._semaphores:
+                self._semaphores[provider] = threading.BoundedSemaphore(self.max_workers)
+            return self._semaphores[provider]
+
+    def limit(self, provider: str, processor: Any) -> Any:
+        """Wrap a processor so calls respect the provider's concurrency limit."""
+        if processor is None:
+            return None
+        return _LimitedProcessor(processor, self._get_semaphore(provider))
+
+    def iter_extract(self, store: ExtractionResultStore,
+                     documents: List[Tuple[str, str]],
+                     processors: List[Tuple[str, Any]],
+                     fields: Optional[Dict[str, List[str]]] = None) -> Iterator[ExtractionResult]:
+        """Extract documents concurrently, yielding results as they complete.
+
+        Documents already in the store are skipped. Completed results are added
+        to the store in submission order once iteration finishes (or stops).
+
+        Args:
+            store: Per-email extraction store
+            documents: (doc_type, file_path) pairs in processing order
+            processors: Ordered (provider_name, processor) fallback chain
+            fields: Fields needed per document key, for documents that only
+                need some fields (see ExtractionPlanner)
+
+        Yields:
+            ExtractionResult for each newly extracted document
+        """
+        limited = [(provider, self.limit(provider, processor)) for provider, processor in processors]
+
+        pending = []
+        seen = set()
+        for doc_type, file_path in documents:
+            key = store.make_key(doc_type, file_path)
+            if key in seen or key in store:
+                continue
+            seen.add(key)
+            pending.append((key, doc_type, file_path))
+
+        if not pending:
+            return
+
+        # Render the first page of every PDF in parallel while the providers start
+        pdf_paths = [file_path for _, _, file_path in pending if file_path.lower().endswith('.pdf')]
+        if pdf_paths:
+            (self._rasterizer or get_pdf_rasterizer()).prefetch(pdf_paths)
+        # Let the first provider that will run start per-document CPU work (e.g. Textract
+        # preprocessing) in parallel; fallbacks prepare their input lazily if they are reached
+        first = next((processor for provider, processor in processors
+                      if processor is not None and provider_available(provider, store.circuits)), None)
+        if callable(getattr(first, 'prefetch', None)):
+            first.prefetch([file_path for _, _, file_path in pending])
+
+        completed = {}
+        try:
+            workers = min(self.max_workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as pool:
+                futures = {
+                    pool.submit(store.run_extraction, file_path, doc_type, limited,
+                                (fields or {}).get(key)): key
+                    for key, doc_type, file_path in pending
+                }
+                for future in as_completed(futures):
+                    result = future.result()
+                    completed[futures[future]] = result
+                    yield result
+        finally:
+            for key, _, _ in pending:
+                if key in completed:
+                    store.add(completed[key])
+
+    def extract_all(self, store: ExtractionResultStore,
+                    documents: List[Tuple[str, str]],
+                    processors: List[Tuple[str, Any]]) -> List[ExtractionResult]:
+        """Extract all documents and return results in submission order.
+
+        Args:
+            store: Per-email extraction store
+            documents: (doc_type, file_path) pairs in processing order
+            processors: Ordered (provider_name, processor) fallback chain
+
+        Returns:
+            ExtractionResult per document, in the order given
+        """
+        for _ in self.iter_extract(store, documents, processors):
+            pass
+        return [store.get_for_path(doc_type, file_path) for doc_type, file_path in documents]
+
+
+def flatten_document_paths(document_paths: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Flatten {doc_type: path | [paths]} into ordered (doc_type, path) pairs."""
+    documents = []
+    for doc_type, paths in (document_paths or {}).items():
+        if paths is None:
+            continue
+        for file_path in (paths if isinstance(paths, list) else [paths]):
+            documents.append((doc_type, file_path))
+    return documents
@@ -0,0 +1,278 @@
+"""Coverage-driven extraction planning.
+
+Each submission brings Excel rows (one per employee) and a set of documents.
+Many fields a document would contribute are already known: the Excel sheet
+often carries passport numbers or nationalities, a passport's MRZ gives the
+date of birth and gender, and a second scan of the same document adds
+nothing. The planner tracks, per Excel row, which of the fields the
+submission needs are already known and decides for each document whether it
+must be extracted at all and, if so, which fields the call has to return.
+
+Documents are attributed to a row before extraction when that is
+unambiguous (a single-row submission, or a filename naming exactly one
+employee); unattributed documents are always extracted in full. Passports
+are planned and extracted first so their fields count for the documents
+planned after them.
+
+DataCombiner lets document values override some Excel columns (passport
+number, nationality, date of birth and gender from a passport, document
+numbers from every type), so a document still corrects typos in the sheet.
+An Excel value therefore never makes such a field "known" for the document
+types that override it; only a value extracted from an earlier document
+does. In practice identity documents are always extracted, and the planner
+only drops the fields Excel fills for good.
+"""
+import os
+import re
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import EXTRACTION_PLANNER_ENABLED
+from src.services.extraction_executor import ExtractionExecutor
+from src.services.extraction_store import ExtractionResult, ExtractionResultStore
+
+logger = logging.getLogger(__name__)
+
+# Fields each document type contributes to a submission row (names always come from Excel)
+DOCUMENT_FIELDS = {
+    'passport': ['passport_number', 'nationality', 'date_of_birth', 'gender', 'date_of_expiry'],
+    'emirates_id': ['emirates_id', 'nationality', 'date_of_birth', 'gender'],
+    'visa': ['unified_no', 'visa_file_number', 'passport_number', 'nationality',
+             'date_of_birth', 'gender', 'profession', 'sponsor_name'],
+}
+
+# Fields DataCombiner matches documents to rows with; scoped calls always return them
+IDENTITY_FIELDS = {
+    'passport': ['passport_number', 'surname', 'given_names'],
+    'emirates_id': ['emirates_id', 'name_en'],
+    'visa': ['full_name', 'passport_number'],
+}
+
+# Fields whose document value replaces the Excel value in DataCombiner
+OVERRIDE_FIELDS = {
+    'passport': ['passport_number', 'nationality', 'date_of_birth', 'gender'],
+    'emirates_id': ['emirates_id'],
+    'visa': ['unified_no', 'visa_file_number', 'passport_number'],
+}
+
+# Excel columns holding each field
+EXCEL_COLUMNS = {
+    'passport_number': ['Passport No', 'passport_no', 'passport_number', 'PassportNo', 'PASSPORTNO', 'PassportNum'],
+    'emirates_id': ['Emirates Id', 'emirates_id', 'eid', 'EmiratesId', 'EMIRATESID', 'EIDNumber'],
+    'unified_no': ['Unified No', 'unified_no', 'UIDNO', 'UIDNo'],
+    'visa_file_number': ['Visa File Number', 'visa_file_number', 'VISAFILEREF', 'ResidentFileNumber'],
+    'nationality': ['Nationality', 'nationality', 'NATIONALITY'],
+    'date_of_birth': ['DOB', 'dob', 'date_of_birth', 'DateOfBirth'],
+    'gender': ['Gender', 'gender', 'GENDER'],
+    'date_of_expiry': ['Passport Expiry Date', 'passport_expiry_date'],
+    'profession': ['Occupation', 'profession'],
+}
+
+NAME_COLUMNS = ['First Name', 'Middle Name', 'Last Name', 'first_name', 'middle_name', 'last_name',
+                'FIRSTNAME', 'MIDDLENAME', 'LASTNAME', 'FULLNAME', 'full_name', 'name']
+
+# Document types extracted before the others, so their fields are known when planning the rest
+FIRST_STAGE_TYPES = ('passport',)
+
+
+def _tokens(text: str) -> set:
+    """Upper-case alphanumeric tokens of at least two characters."""
+    return {token for token in re.split(r'[^A-Z0-9]+', str(text).upper()) if len(token) >= 2}
+
+
+def _digits(value: str) -> str:
+    return re.sub(r'[^0-9]', '', str(value))
+
+
+def _identifier(field: str, value: str) -> str:
+    """Document number normalized the way DataCombiner compares it."""
+    if field == 'emirates_id':
+        return _digits(value)
+    return re.sub(r'\s+', '', str(value)).upper()
+
+
+def _filename_identifiers(file_name: str) -> set:
+    """Whole alphanumeric tokens of a filename, plus digit runs joined across '-' and spaces."""
+    name = os.path.splitext(file_name)[0]
+    return _tokens(name) | {_digits(run) for run in re.findall(r'\d[\d\- ]*\d', name)}
+
+
+class ExtractionPlan:
+    """Which documents to extract, with which fields, for one stage."""
+
+    def __init__(self):
+        self.documents: List[Tuple[str, str]] = []
+        # Scoped fields by document key (documents absent here are extracted in full)
+        self.fields: Dict[str, List[str]] = {}
+        # Reason by document key for documents that need no call
+        self.skipped: Dict[str, str] = {}
+
+
+class ExtractionPlanner:
+    """Plans extraction calls from the fields each Excel row still needs."""
+
+    def __init__(self, excel_rows: Optional[List[Dict[str, Any]]] = None,
+                 default_value: str = ".", enabled: bool = EXTRACTION_PLANNER_ENABLED):
+        """Initialize planner.
+
+        Args:
+            excel_rows: Submission rows (column -> value)
+            default_value: Placeholder for missing values
+            enabled: When disabled every document is extracted in full
+        """
+        self.rows = list(excel_rows or [])
+        self.DEFAULT_VALUE = default_value
+        self.enabled = enabled
+        self.known: List[Dict[str, str]] = [self._excel_fields(row) for row in self.rows]
+        # Fields of each row supplied by extracted documents rather than Excel
+        self._document_fields: List[set] = [set() for _ in self.rows]
+        self._row_names = [self._name_tokens(row) for row in self.rows]
+        # Row of each planned document key
+        self._doc_rows: Dict[str, int] = {}
+        self.stats = {'documents': 0, 'extracted': 0, 'scoped': 0, 'calls_avoided': 0}
+
+    def _is_value(self, value: Any) -> bool:
+        if value is None:
+            return False
+        text = str(value).strip()
+        return bool(text) and text != self.DEFAULT_VALUE and text.lower() != 'nan'
+
+    def _excel_fields(self, row: Dict[str, Any]) -> Dict[str, str]:
+        known = {}
+        for field, columns in EXCEL_COLUMNS.items():
+            for column in columns:
+                if self._is_value(row.get(column)):
+                    known[field] = str(row[column]).strip()
+                    break
+        return known
+
+    def _name_tokens(self, row: Dict[str, Any]) -> set:
+        tokens = set()
+        for column in NAME_COLUMNS:
+            if self._is_value(row.get(column)):
+                tokens |= _tokens(row[column])
+        return tokens
+
+    def attribute(self, file_path: str) -> Optional[int]:
+        """Row a document belongs to before extraction, if unambiguous."""
+        if len(self.rows) == 1:
+            return 0
+        name_tokens = _tokens(os.path.splitext(os.path.basename(file_path))[0])
+        identifiers = _filename_identifiers(os.path.basename(file_path))
+        candidates = []
+        for index, row_tokens in enumerate(self._row_names):
+            known = self.known[index]
+            if any(len(_digits(known.get(field, ''))) >= 6 and _identifier(field, known[field]) in identifiers
+                   for field in ('passport_number', 'emirates_id')):
+                candidates.append(index)
+            elif len(row_tokens) >= 2 and len(row_tokens & name_tokens) >= 2:
+                candidates.append(index)
+        return candidates[0] if len(candidates) == 1 else None
+
+    def _attribute_result(self, fields: Dict[str, str]) -> Optional[int]:
+        """Row whose identifiers or names match extracted fields, if unambiguous."""
+        for field in ('passport_number', 'emirates_id'):
+            if not self._is_value(fields.get(field)):
+                continue
+            value = _identifier(field, fields[field])
+            matches = [index for index, known in enumerate(self.known)
+                       if field in known and _identifier(field, known[field]) == value]
+            if len(matches) == 1:
+                return matches[0]
+        name = ' '.join(str(fields.get(field, '')) for field in
+                        ('full_name', 'name', 'name_en', 'given_names', 'surname')
+                        if self._is_value(fields.get(field)))
+        scores = [len(_tokens(name) & row_tokens) for row_tokens in self._row_names]
+        best = max(scores, default=0)
+        if best >= 2 and scores.count(best) == 1:
+            return scores.index(best)
+        return None
+
+    def needed_fields(self, doc_type: str, row: Optional[int]) -> Optional[List[str]]:
+        """Fields a document still has to supply; None means extract everything.
+
+        Fields the document overrides in DataCombiner are only covered by
+        values from earlier documents, never by Excel.
+        """
+        if not self.enabled or row is None or doc_type not in DOCUMENT_FIELDS:
+            return None
+        overrides = OVERRIDE_FIELDS.get(doc_type, [])
+        return [field for field in DOCUMENT_FIELDS[doc_type]
+                if field not in self.known[row]
+                or (field in overrides and field not in self._document_fields[row])]
+
+    def plan(self, documents: List[Tuple[str, str]]) -> ExtractionPlan:
+        """Plan (doc_type, file_path) documents against what the rows already know.
+
+        Documents whose row already knows every field they contribute are
+        skipped; documents missing only some fields are scoped to those
+        fields plus the identifiers used to match them to their row.
+        """
+        plan = ExtractionPlan()
+        for doc_type, file_path in documents:
+            key = ExtractionResultStore.make_key(doc_type, file_path)
+            row = self.attribute(file_path)
+            if row is not None:
+                self._doc_rows[key] = row
+            needed = self.needed_fields(doc_type, row)
+            self.stats['documents'] += 1
+            if needed is not None and not needed:
+                plan.skipped[key] = f"row {row + 1} already has {', '.join(DOCUMENT_FIELDS[doc_type])}"
+                self.stats['calls_avoided'] += 1
+                logger.info(f"Planner: skipping {os.path.basename(file_path)} ({plan.skipped[key]})")
+                continue
+            plan.documents.append((doc_type, file_path))
+            self.stats['extracted'] += 1
+            if needed is not None and len(needed) < len(DOCUMENT_FIELDS[doc_type]):
+                plan.fields[key] = list(dict.fromkeys(IDENTITY_FIELDS.get(doc_type, []) + needed))
+                self.stats['scoped'] += 1
+                logger.info(f"Planner: {os.path.basename(file_path)} needs only {needed}")
+        return plan
+
+    def record(self, result: ExtractionResult) -> None:
+        """Learn the fields of an extracted document for its row."""
+        if not result.succeeded:
+            return
+        row = self._doc_rows.get(result.doc_key)
+        if row is None:
+            row = self._attribute_result(result.fields)
+        if row is None:
+            return
+        for field in DOCUMENT_FIELDS.get(result.doc_type, []):
+            value = result.fields.get(field)
+            if not self._is_value(value):
+                continue
+            self._document_fields[row].add(field)
+            if field not in self.known[row]:
+                self.known[row][field] = str(value)
+
+    def extract(self, executor: ExtractionExecutor, store: ExtractionResultStore,
+                documents: List[Tuple[str, str]],
+                processors: List[Tuple[str, Any]]) -> Iterator[ExtractionResult]:
+        """Plan and run extraction in stages, yielding results as they complete.
+
+        Args:
+            executor: Runs each stage's calls concurrently
+            store: Per-email extraction store
+            documents: (doc_type, file_path) pairs in processing order
+            processors: Ordered (provider_name, processor) fallback chain
+
+        Yields:
+            ExtractionResult for each extracted document
+        """
+        documents = [(doc_type, path) for doc_type, path in documents
+                     if ExtractionResultStore.make_key(doc_type, path) not in store]
+        first = [doc for doc in documents if doc[0] in FIRST_STAGE_TYPES]
+        rest = [doc for doc in documents if doc[0] not in FIRST_STAGE_TYPES]
+        for stage in (first, rest):
+            if not stage:
+                continue
+            plan = self.plan(stage)
+            for result in executor.iter_extract(store, plan.documents, processors, plan.fields):
+                self.record(result)
+                yield result
+        logger.info(f"Extraction plan: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Documents planned, extracted, scoped to some fields, and calls avoided."""
+        return dict(self.stats)
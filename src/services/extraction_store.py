@@ -0,0 +1,346 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+from src.utils.field_result import FieldResult, critical_fields, merge_field_results
+from src.utils.circuit_breaker import CircuitBreakerRegistry, get_circuit_registry, provider_available
+from src.services.near_duplicate_index import NearDuplicateIndex, NearDuplicateMatch, get_near_duplicate_index
+from config.settings import FIELD_CONFIDENCE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value: str) -> str:
+    """Upper-case alphanumerics, for comparing values read from different scans."""
+    return ''.join(ch for ch in str(value).upper() if ch.isalnum())
+
+
+class ExtractionResult:
+    """Extraction outcome for a single document."""
+
+    def __init__(self, doc_key: str, doc_type: str, file_path: str,
+                 fields: Optional[Dict[str, str]] = None, provider: Optional[str] = None,
+                 confidence: float = 0.0, timings: Optional[Dict[str, float]] = None,
+                 error: Optional[str] = None, calls_saved: int = 0):
+        self.doc_key = doc_key
+        self.doc_type = doc_type
+        self.file_path = file_path
+        # Values with per-field confidence and source (FieldResult)
+        self.fields = FieldResult.wrap(fields or {}, provider)
+        self.provider = provider
+        self.confidence = confidence
+        self.timings = timings or {}
+        self.error = error
+        # Fallback providers in the chain that never had to be called
+        self.calls_saved = calls_saved
+
+    @property
+    def succeeded(self) -> bool:
+        """Whether any provider returned usable fields."""
+        return self.error is None and bool(self.fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for logging/debug output."""
+        return {
+            'doc_key': self.doc_key,
+            'doc_type': self.doc_type,
+            'file_path': self.file_path,
+            'fields': self.fields,
+            'field_confidence': {field: self.fields.confidence_of(field) for field in self.fields},
+            'field_sources': self.fields.sources,
+            'provider': self.provider,
+            'confidence': self.confidence,
+            'timings': self.timings,
+            'error': self.error,
+            'calls_saved': self.calls_saved
+        }
+
+
+class ExtractionResultStore:
+    """Per-email store of document extraction results.
+
+    Documents are extracted once and every later stage (employee matching,
+    match diagnostics, data combination) reads from the store instead of
+    calling the processors again.
+    """
+
+    def __init__(self, email_id: Optional[str] = None, default_value: str = ".",
+                 confidence_threshold: float = FIELD_CONFIDENCE_THRESHOLD,
+                 circuits: Optional[CircuitBreakerRegistry] = None,
+                 near_duplicates: Optional[NearDuplicateIndex] = None):
+        self.email_id = email_id
+        self.DEFAULT_VALUE = default_value
+        # Critical fields below this confidence get a scoped call to a later provider
+        self.confidence_threshold = confidence_threshold
+        # Providers behind an open circuit are skipped (see src/utils/circuit_breaker.py)
+        self.circuits = circuits or get_circuit_registry()
+        # Re-sent scans reuse earlier results (see src/services/near_duplicate_index.py)
+        self.near_duplicates = near_duplicates if near_duplicates is not None else get_near_duplicate_index()
+        self._results: Dict[str, ExtractionResult] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(doc_type: str, file_path: str) -> str:
+        """Build the document key (same format DataCombiner uses for documents_data)."""
+        return f"{doc_type}_{os.path.basename(file_path)}"
+
+    def __contains__(self, doc_key: str) -> bool:
+        return doc_key in self._results
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __iter__(self):
+        return iter(list(self._results.values()))
+
+    def get(self, doc_key: str) -> Optional[ExtractionResult]:
+        """Get result by document key."""
+        return self._results.get(doc_key)
+
+    def get_for_path(self, doc_type: str, file_path: str) -> Optional[ExtractionResult]:
+        """Get result for a document path."""
+        return self._results.get(self.make_key(doc_type, file_path))
+
+    def add(self, result: ExtractionResult) -> ExtractionResult:
+        """Store a result, replacing any previous result for the same document."""
+        with self._lock:
+            self._results[result.doc_key] = result
+        return result
+
+    def extract(self, file_path: str, doc_type: str,
+                processors: List[Tuple[str, Any]]) -> ExtractionResult:
+        """Extract a document once, trying processors in order.
+
+        If the document is already in the store the stored result is returned
+        without calling any processor.
+
+        Args:
+            file_path: Path to the document
+            doc_type: Document type
+            processors: Ordered (provider_name, processor) pairs; each processor
+                must expose process_document(file_path, doc_type)
+
+        Returns:
+            ExtractionResult for the document
+        """
+        with self._lock:
+            existing = self._results.get(self.make_key(doc_type, file_path))
+        if existing is not None:
+            return existing
+        return self.add(self.run_extraction(file_path, doc_type, processors))
+
+    def run_extraction(self, file_path: str, doc_type: str,
+                       processors: List[Tuple[str, Any]],
+                       fields: Optional[List[str]] = None) -> ExtractionResult:
+        """Run processors in order without touching the store.
+
+        The first provider returning fields without an 'error'/'skipped' marker
+        wins; exceptions are captured on the result rather than raised.
+        Providers whose circuit breaker is open are skipped without a call. If the
+        winner left critical fields missing or below the confidence threshold,
+        later providers exposing process_fields(file_path, doc_type, fields)
+        are asked for just those fields and the answers merged by confidence.
+
+        A near-duplicate of an earlier document (by perceptual hash) reuses its
+        fields once one critical field re-read from this document agrees. Same
+        template documents of different holders hash close together, so a
+        match no provider can verify is treated as a miss.
+
+        Args:
+            file_path: Path to the document
+            doc_type: Document type
+            processors: Ordered (provider_name, processor) pairs
+            fields: Only these fields are needed (see ExtractionPlanner);
+                providers exposing process_fields are asked for just them
+
+        Returns:
+            ExtractionResult (with error set if every provider failed)
+        """
+        doc_key = self.make_key(doc_type, file_path)
+        requested = fields
+        timings = {}
+        errors = []
+        match = self.near_duplicates.lookup(file_path, doc_type) if self.near_duplicates else None
+        if match is not None:
+            verdict = self._verify_near_duplicate(match, file_path, doc_type, processors, timings)
+            if verdict:
+                self.near_duplicates.record(True)
+                reused = FieldResult.wrap(match.fields, 'near_duplicate')
+                return ExtractionResult(
+                    doc_key, doc_type, file_path, reused, 'near_duplicate',
+                    self._estimate_confidence(reused), timings,
+                    calls_saved=sum(1 for _, processor in processors if processor is not None)
+                )
+            if verdict is None:
+                logger.info(f"Near-duplicate of {os.path.basename(file_path)} could not be verified; extracting it")
+            else:
+                self.near_duplicates.record(False)
+
+        for index, (provider, processor) in enumerate(processors):
+            if processor is None:
+                continue
+            if not provider_available(provider, self.circuits):
+                errors.append(f"{provider}: circuit open")
+                logger.info(f"Skipping {provider} for {os.path.basename(file_path)}: circuit open")
+                continue
+            start = time.time()
+            try:
+                if requested and hasattr(processor, 'process_fields'):
+                    data = processor.process_fields(file_path, doc_type, requested)
+                else:
+                    data = processor.process_document(file_path, doc_type)
+            except Exception as e:
+                data = {'error': str(e)}
+            timings[provider] = time.time() - start
+
+            if isinstance(data, dict) and data and 'error' not in data and 'skipped' not in data:
+                logger.info(f"{provider} extracted {len(data)} fields from {os.path.basename(file_path)} "
+                            f"in {timings[provider]:.2f}s")
+                fields = self._refine_weak_fields(
+                    FieldResult.wrap(data, provider), file_path, doc_type, processors[index + 1:], timings
+                )
+                if self.near_duplicates and not requested:
+                    self.near_duplicates.add(file_path, doc_type, fields)
+                return ExtractionResult(
+                    doc_key, doc_type, file_path, fields, provider,
+                    self._estimate_confidence(fields), timings,
+                    calls_saved=sum(1 for later, processor in processors[index + 1:]
+                                    if processor is not None and later not in timings)
+                )
+
+            if isinstance(data, dict) and 'skipped' in data:
+                # Fast-path providers decline documents they cannot settle locally
+                errors.append(f"{provider}: skipped ({data['skipped']})")
+                logger.debug(f"{provider} skipped {os.path.basename(file_path)}: {data['skipped']}")
+                continue
+
+            error = data.get('error') if isinstance(data, dict) else 'empty result'
+            errors.append(f"{provider}: {error}")
+            logger.warning(f"{provider} extraction failed for {os.path.basename(file_path)}: {error}")
+
+        return ExtractionResult(
+            doc_key, doc_type, file_path, timings=timings,
+            error='; '.join(errors) or 'no processor available'
+        )
+
+    def _verify_near_duplicate(self, match: NearDuplicateMatch, file_path: str, doc_type: str,
+                               processors: List[Tuple[str, Any]], timings: Dict[str, float]) -> Optional[bool]:
+        """Whether a near-duplicate's fields belong to this document.
+
+        Returns:
+            True to reuse them, False if a re-read critical field disagrees, or
+            None if verification is off or no provider could re-read one
+        """
+        if match.exact:
+            return True
+        if not self.near_duplicates.verify:
+            return None
+        known = FieldResult.wrap(match.fields, None)
+        field = next((field for field in critical_fields(doc_type)
+                      if known.confidence_of(field, self.DEFAULT_VALUE) > 0), None)
+        if field is None:
+            return None
+        for provider, processor in processors:
+            if processor is None or not hasattr(processor, 'process_fields'):
+                continue
+            if not provider_available(provider, self.circuits):
+                continue
+            start = time.time()
+            try:
+                data = processor.process_fields(file_path, doc_type, [field])
+            except Exception as e:
+                data = {'error': str(e)}
+            timings[f"{provider}:verify"] = time.time() - start
+            if not isinstance(data, dict) or 'error' in data or 'skipped' in data:
+                continue
+            value = data.get(field)
+            if not value or value == self.DEFAULT_VALUE:
+                continue
+            same = _normalize(value) == _normalize(known[field])
+            logger.info(f"Near-duplicate {field} {'matches' if same else 'differs'} for {os.path.basename(file_path)}")
+            return same
+        return None
+
+    def _refine_weak_fields(self, fields: FieldResult, file_path: str, doc_type: str,
+                            later: List[Tuple[str, Any]], timings: Dict[str, float]) -> FieldResult:
+        """Ask later providers for only the weak critical fields and merge by confidence."""
+        weak = fields.weak_fields(critical_fields(doc_type), self.confidence_threshold, self.DEFAULT_VALUE)
+        for provider, processor in later:
+            if not weak:
+                break
+            if processor is None or not hasattr(processor, 'process_fields'):
+                continue
+            if not provider_available(provider, self.circuits):
+                continue
+            start = time.time()
+            try:
+                data = processor.process_fields(file_path, doc_type, weak)
+            except Exception as e:
+                data = {'error': str(e)}
+            timings[provider] = time.time() - start
+            if not isinstance(data, dict) or not data or 'error' in data or 'skipped' in data:
+                logger.warning(f"{provider} could not refine {weak} for {os.path.basename(file_path)}")
+                continue
+            logger.info(f"{provider} re-read {weak} from {os.path.basename(file_path)} "
+                        f"in {timings[provider]:.2f}s")
+            fields = merge_field_results([fields, FieldResult.wrap(data, provider)], self.DEFAULT_VALUE)
+            weak = fields.weak_fields(weak, self.confidence_threshold, self.DEFAULT_VALUE)
+        return fields
+
+    def _estimate_confidence(self, fields: Dict[str, str]) -> float:
+        """Share of fields with a non-default value."""
+        if not fields:
+            return 0.0
+        filled = sum(1 for value in fields.values() if value and value != self.DEFAULT_VALUE)
+        return filled / len(fields)
+
+    def fields_by_type(self) -> Dict[str, Dict[str, str]]:
+        """Merge fields of successful results by document type."""
+        by_type = {}
+        for result in self:
+            if result.succeeded:
+                by_type.setdefault(result.doc_type, {}).update(result.fields)
+        return by_type
+
+    def merged_fields(self) -> FieldResult:
+        """Combine all document fields, keeping the most confident value per field.
+
+        Ties keep the value of the document extracted first.
+        """
+        return merge_field_results((result.fields for result in self if result.succeeded), self.DEFAULT_VALUE)
+
+    def to_documents_data(self) -> Dict[str, Dict[str, Any]]:
+        """Export successful results in the documents_data shape DataCombiner consumes."""
+        return {
+            result.doc_key: {
+                'type': result.doc_type,
+                'path': result.file_path,
+                'data': result.fields,
+                'file_name': os.path.basename(result.file_path)
+            }
+            for result in self if result.succeeded
+        }
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Provider usage and timing summary for logging."""
+        providers = {}
+        calls_saved = {}
+        for result in self:
+            name = result.provider or 'failed'
+            providers[name] = providers.get(name, 0) + 1
+            if result.calls_saved:
+                calls_saved[name] = calls_saved.get(name, 0) + result.calls_saved
+        results = list(self)
+        return {
+            'email_id': self.email_id,
+            'documents': len(results),
+            'providers': providers,
+            'provider_calls': sum(len(r.timings) for r in results),
+            'provider_calls_saved': calls_saved,
+            'extraction_time': sum(sum(r.timings.values()) for r in results),
+            'open_circuits': sorted(name for name, stats in self.circuits.get_stats().items()
+                                    if stats['state'] != 'closed'),
+            'near_duplicates': self.near_duplicates.get_stats() if self.near_duplicates else None
+        }
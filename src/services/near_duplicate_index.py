@@ -0,0 +1,137 @@
+"""Reuse of extraction results for re-sent scans.
+
+HR teams often send the same passport or Emirates ID again as a new scan or
+a re-saved PDF. The bytes differ, so the content-addressed extraction cache
+misses and every provider runs again. The index keeps each document's
+merged extraction result under the perceptual hash of its first page (see
+src/document_processor/perceptual_hash.py); a later document of the same
+type within the Hamming threshold is a near-duplicate. ExtractionResultStore
+reuses its fields only after re-reading one critical field confirms it is the
+same document: the same passport or Emirates ID template with another
+holder's details hashes within the threshold too.
+"""
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+from config.settings import (
+    NEAR_DUPLICATE_ENABLED, NEAR_DUPLICATE_MAX_DISTANCE, NEAR_DUPLICATE_VERIFY
+)
+from src.document_processor.perceptual_hash import document_hash
+from src.utils.extraction_cache import ExtractionCache, get_extraction_cache
+from src.utils.field_result import FieldResult
+
+logger = logging.getLogger(__name__)
+
+
+class NearDuplicateMatch:
+    """Earlier document whose first page looks like this one."""
+
+    def __init__(self, fields: Dict[str, str], distance: int, content_hash: str, exact: bool = False):
+        self.fields = fields
+        self.distance = distance
+        self.content_hash = content_hash
+        # Same bytes as the indexed document, so there is nothing to verify
+        self.exact = exact
+
+
+class NearDuplicateIndex:
+    """Perceptual-hash index of extraction results, backed by the extraction cache."""
+
+    def __init__(self, cache: ExtractionCache,
+                 max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+                 verify: bool = NEAR_DUPLICATE_VERIFY):
+        """Initialize index.
+
+        Args:
+            cache: Extraction cache holding the perceptual index table
+            max_distance: Largest Hamming distance treated as the same document
+            verify: Re-read one critical field before reusing a near match;
+                without it only byte-identical matches are reused
+        """
+        self.cache = cache
+        self.max_distance = max_distance
+        self.verify = verify
+        self.lookups = 0
+        self.hits = 0
+        self.reused = 0
+        self.rejected = 0
+        # Perceptual hashes by content hash, so lookup and add hash each document once
+        self._hashes: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+
+    def _hash(self, file_path: str) -> Optional[tuple]:
+        """(content_hash, perceptual hash) of a document, or None if it cannot be hashed."""
+        if not os.path.exists(file_path):
+            return None
+        content_hash = self.cache.hash_file(file_path)
+        with self._lock:
+            if content_hash in self._hashes:
+                phash = self._hashes[content_hash]
+                return (content_hash, phash) if phash is not None else None
+        phash = document_hash(file_path)
+        with self._lock:
+            self._hashes[content_hash] = phash
+        return (content_hash, phash) if phash is not None else None
+
+    def lookup(self, file_path: str, doc_type: str) -> Optional[NearDuplicateMatch]:
+        """Closest earlier document of the same type within the threshold."""
+        hashed = self._hash(file_path)
+        if hashed is None:
+            return None
+        content_hash, phash = hashed
+        found = self.cache.find_perceptual(doc_type, phash, self.max_distance)
+        with self._lock:
+            self.lookups += 1
+            if found is not None:
+                self.hits += 1
+        if found is None:
+            return None
+        fields, distance, source_hash = found
+        logger.info(f"Near-duplicate {doc_type}: {os.path.basename(file_path)} is {distance} bits "
+                    f"from {source_hash[:12]}")
+        return NearDuplicateMatch(fields, distance, source_hash, exact=source_hash == content_hash)
+
+    def add(self, file_path: str, doc_type: str, fields: FieldResult) -> None:
+        """Index a document's extraction result."""
+        hashed = self._hash(file_path)
+        if hashed is not None:
+            self.cache.put_perceptual(hashed[0], doc_type, hashed[1], fields)
+
+    def record(self, reused: bool) -> None:
+        """Count whether a match was reused or rejected by verification."""
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.rejected += 1
+
+    def get_stats(self) -> Dict:
+        """Lookups, matches, reuses and the hit rate."""
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'reused': self.reused,
+                'rejected': self.rejected,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+            }
+
+
+_default_index: Optional[NearDuplicateIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """Get the shared index, or None when disabled or the extraction cache is off."""
+    global _default_index
+    if not NEAR_DUPLICATE_ENABLED:
+        return None
+    cache = get_extraction_cache()
+    if cache is None:
+        return None
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = NearDuplicateIndex(cache)
+        return _default_index
@@ -176,7 +176,7 @@ class ImprovedWorkflowOrchestrator:
                     ocr_text = self.textract_processor.extract_text(file_path)
                     
                     # Classify document
-                    doc_type = self.document_classifier.classify_document(ocr_text, os.path.basename(file_path))
+                    doc_type = self.document_classifier.classify_document(ocr_text, file_path)
                     logger.info(f"Classified {file_path} as {doc_type}")
                     
                     # Extract data based on document type
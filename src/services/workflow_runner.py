@@ -2,7 +2,6 @@ import os
 import sys
 import logging
 from datetime import datetime
-import re
 from typing import Dict, Optional
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -11,6 +10,7 @@ from src.email_handler.outlook_client import OutlookClient
 from src.email_handler.attachment_handler import AttachmentHandler
 from src.document_processor.textract_processor import TextractProcessor
 from src.document_processor.excel_processor import ExcelProcessor
+from src.document_processor.document_classifier import DocumentClassifier
 from src.services.data_combiner import DataCombiner
 from src.utils.process_tracker import ProcessTracker
 from src.services.data_integrator import DataIntegrator
@@ -25,6 +25,7 @@ class WorkflowRunner:
         self.attachment_handler = AttachmentHandler()
         self.textract_processor = TextractProcessor()
         self.excel_processor = ExcelProcessor()
+        self.classifier = DocumentClassifier()
         self.data_combiner = DataCombiner(self.textract_processor, self.excel_processor)
         self.process_tracker = ProcessTracker()
 
@@ -142,38 +143,8 @@ class WorkflowRunner:
             }
 
     def _determine_file_type(self, file_path: str, content_text: Optional[str] = None) -> str:
-        """Determine file type from both filename and content when available."""
-        name = file_path.lower()
-        
-        # First check file extension
-        if name.endswith(('.xlsx', '.xls')):
-            return 'excel'
-            
-        # If we have OCR text, use it for better classification
-        if content_text:
-            content_lower = content_text.lower()
-            
-            # Passport indicators
-            if any(term in content_lower for term in ['passport no', 'surname', 'given names', 'nationality', 'date of birth', 'place of issue']):
-                return 'passport'
-                
-            # Emirates ID indicators
-            if any(term in content_lower for term in ['emirates id', 'id number', 'united arab emirates', 'id card']) or re.search(r'\d{3}-\d{4}-\d{7}-\d{1}', content_text):
-                return 'emirates_id'
-                
-            # Visa indicators
-            if any(term in content_lower for term in ['visa', 'permit no', 'entry permit', 'sponsor']):
-                return 'visa'
-        
-        # Fallback to filename-based classification
-        if 'passport' in name:
-            return 'passport'
-        elif 'emirates' in name or 'eid' in name or 'id card' in name:
-            return 'emirates_id'
-        elif 'visa' in name or 'permit' in name or 'residence' in name:
-            return 'visa'
-            
-        return 'unknown'
+        """Determine file type from filename and header, using content text when the two leave it open."""
+        return self.classifier.classify(file_path, ocr_text=content_text).doc_type
     
     def run(self):
         # Wrap the sequence of operations
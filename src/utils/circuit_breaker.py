@@ -0,0 +1,259 @@
+"""Per-provider circuit breakers.
+
+A degraded provider used to cost every document the full retry schedule
+(retry_on_error's fixed sleeps, the Graph client's backoff) before the
+fallback ran. Each provider (Textract, OpenAI, DeepSeek, Graph) gets a
+breaker over a rolling window of recent calls: when the share of failed or
+slow calls crosses the threshold the circuit opens and calls fail fast with
+CircuitOpenError, so routing can go straight to a healthy provider. After a
+cool-down one probe call is let through (half-open); its outcome closes or
+re-opens the circuit.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from src.utils.error_handling import CircuitOpenError
+from config.settings import (
+    CIRCUIT_BREAKER_ENABLED, CIRCUIT_WINDOW, CIRCUIT_MIN_CALLS,
+    CIRCUIT_FAILURE_RATE, CIRCUIT_SLOW_CALL_SECONDS, CIRCUIT_RESET_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Circuit guarding each extraction provider name used in processor chains
+PROVIDER_CIRCUITS = {
+    'textract': 'textract',
+    'gpt': 'openai',
+    'deepseek': 'deepseek',
+}
+
+
+class CircuitBreaker:
+    """Rolling error-rate/latency circuit breaker for one provider."""
+
+    def __init__(self, name: str, window: int = CIRCUIT_WINDOW,
+                 min_calls: int = CIRCUIT_MIN_CALLS,
+                 failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 slow_call_seconds: Optional[float] = CIRCUIT_SLOW_CALL_SECONDS or None,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize breaker.
+
+        Args:
+            name: Provider name used in logs
+            window: Recent calls considered
+            min_calls: Calls in the window before the circuit can open
+            failure_rate: Share of failed (or slow) calls that opens the circuit
+            slow_call_seconds: Calls slower than this count as failures (None disables)
+            reset_seconds: Time open before a half-open probe is allowed
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.name = name
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._calls = deque(maxlen=max(1, window))  # (failed, latency)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state; an open circuit past its cool-down reports half-open."""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now (claims the probe when half-open)."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._state = HALF_OPEN
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def is_available(self) -> bool:
+        """Whether a call would be allowed, without claiming the half-open probe."""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight)
+
+    def record_success(self, latency: float = 0.0) -> None:
+        slow = self.slow_call_seconds is not None and latency > self.slow_call_seconds
+        self._record(slow, latency)
+
+    def record_failure(self, latency: float = 0.0) -> None:
+        self._record(True, latency)
+
+    def _record(self, failed: bool, latency: float) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit {self.name} closed after a successful probe")
+                return
+            self._calls.append((failed, latency))
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for call_failed, _ in self._calls if call_failed)
+                if failures / len(self._calls) >= self.failure_rate:
+                    self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self.times_opened += 1
+        logger.warning(f"Circuit {self.name} opened; failing fast for {self.reset_seconds:.0f}s")
+
+    def call(self, func: Callable, *args, **kwargs):
+        """Run func through the breaker, raising CircuitOpenError when open."""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        start = self._clock()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure(self._clock() - start)
+            raise
+        self.record_success(self._clock() - start)
+        return result
+
+    def get_stats(self) -> Dict:
+        """State and rolling window counters for monitoring."""
+        with self._lock:
+            calls = list(self._calls)
+            failures = sum(1 for failed, _ in calls if failed)
+            latencies = sorted(latency for _, latency in calls)
+            return {
+                'state': self._current_state(),
+                'calls': len(calls),
+                'failure_rate': failures / len(calls) if calls else 0.0,
+                'p95_latency': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Process-wide breakers by provider name."""
+
+    def __init__(self, enabled: bool = CIRCUIT_BREAKER_ENABLED, **defaults):
+        """Initialize registry.
+
+        Args:
+            enabled: With breakers disabled every provider reports available
+            **defaults: CircuitBreaker arguments for breakers created here
+        """
+        self.enabled = enabled
+        self.defaults = defaults
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, **self.defaults)
+            return self._breakers[name]
+
+    def is_available(self, name: str) -> bool:
+        """Whether calls to a provider would currently be allowed."""
+        return not self.enabled or self.get(name).is_available()
+
+    def allow(self, name: str) -> bool:
+        return not self.enabled or self.get(name).allow()
+
+    def record(self, name: str, succeeded: bool, latency: float = 0.0) -> None:
+        if not self.enabled:
+            return
+        breaker = self.get(name)
+        if succeeded:
+            breaker.record_success(latency)
+        else:
+            breaker.record_failure(latency)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Stats of every breaker created so far."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.get_stats() for name, breaker in breakers.items()}
+
+
+_default_registry: Optional[CircuitBreakerRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_circuit_registry() -> CircuitBreakerRegistry:
+    """Get the shared circuit breaker registry."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = CircuitBreakerRegistry()
+        return _default_registry
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a failed OpenAI, requests or botocore call, if it got a response."""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if status is None and isinstance(response, dict):
+            status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return status
+
+
+def is_provider_fault(error: Exception) -> bool:
+    """Whether a failed call counts against the provider's circuit.
+
+    Only 5xx responses, timeouts and connection errors do. A 4xx (throttling,
+    a bad document or image, an invalid parameter) is about this request and
+    says nothing about the provider's health.
+    """
+    status = error_status(error)
+    if status is not None:
+        return status >= 500
+    transport_errors = [TimeoutError, ConnectionError]
+    try:
+        from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError
+        transport_errors += [BotoConnectionError, HTTPClientError]
+    except ImportError:
+        pass
+    try:
+        from openai import APIConnectionError
+        transport_errors.append(APIConnectionError)
+    except ImportError:
+        pass
+    return isinstance(error, tuple(transport_errors))
+
+
+def provider_available(provider: str, registry: Optional[CircuitBreakerRegistry] = None) -> bool:
+    """Whether an extraction provider ('textract', 'gpt', ...) is not behind an open circuit.
+
+    Providers without a circuit (e.g. the local MRZ reader) are always available.
+    """
+    circuit = PROVIDER_CIRCUITS.get(provider)
+    return circuit is None or (registry or get_circuit_registry()).is_available(circuit)
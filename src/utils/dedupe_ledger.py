@@ -0,0 +1,405 @@
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import DEDUPE_LEDGER_FILE, DEDUPE_LEDGER_HOT_SIZE
+from src.utils.base_db_handler import BaseDBHandler
+from src.utils.extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+EMAIL = "email"
+FOLDER = "folder"
+DOCUMENT = "document"
+
+# Tracking files replaced by the ledger, imported once and renamed to <file>.migrated
+LEGACY_EMAILS_FILE = "processed_emails_simple.txt"
+LEGACY_FOLDERS_FILE = "processed_folders.json"
+LEGACY_DOCUMENTS_FILE = "processed_documents.json"
+
+
+class DedupeLedger(BaseDBHandler):
+    """Single record of processed emails, folders and documents.
+
+    Every item is a ``(kind, key)`` row in one indexed SQLite table (WAL
+    mode). Emails are keyed on their Graph id; documents and folders on the
+    SHA-256 of their contents, so a file re-sent under another name or a
+    folder re-dropped with the same files is still recognised. Keys seen as
+    processed are kept in an in-memory hot set, making repeated checks a set
+    lookup instead of a query.
+    """
+
+    def __init__(self, db_path: str = DEDUPE_LEDGER_FILE, hot_size: int = DEDUPE_LEDGER_HOT_SIZE):
+        """Initialize dedupe ledger.
+
+        Args:
+            db_path: Path to SQLite database
+            hot_size: Maximum number of keys held in memory per kind
+        """
+        self.hot_size = hot_size
+        self._hot: Dict[str, Set[str]] = {}
+        self._pending: Dict[Tuple[str, str], Tuple[str, Optional[str], str]] = {}
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+        super().__init__(db_path)
+        self._warm()
+
+    def _create_tables(self, cursor: sqlite3.Cursor) -> None:
+        """Create ledger table and indexes."""
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dedupe_ledger (
+                kind TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                content_hash TEXT,
+                processed_at TEXT NOT NULL,
+                metadata TEXT,
+                PRIMARY KEY (kind, item_key)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_dedupe_ledger_processed_at
+            ON dedupe_ledger (kind, processed_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_dedupe_ledger_content_hash
+            ON dedupe_ledger (content_hash)
+        """)
+
+    def _warm(self) -> None:
+        """Load the most recently processed keys of each kind into the hot set."""
+        for kind in (EMAIL, FOLDER, DOCUMENT):
+            rows = self.execute_query(
+                "SELECT item_key FROM dedupe_ledger WHERE kind = ? ORDER BY processed_at DESC LIMIT ?",
+                (kind, self.hot_size)
+            )
+            self._hot[kind] = {row[0] for row in rows}
+
+    def _remember(self, kind: str, keys: Iterable[str]) -> None:
+        """Add keys to the hot set, starting over when it reaches hot_size."""
+        with self._lock:
+            hot = self._hot.setdefault(kind, set())
+            for key in keys:
+                if len(hot) >= self.hot_size:
+                    hot.clear()
+                hot.add(key)
+
+    # Content hashing
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """SHA-256 of a file, shared with the extraction cache (computed once per file)."""
+        return ExtractionCache.hash_file(file_path)
+
+    @classmethod
+    def hash_files(cls, file_paths: Iterable[str]) -> str:
+        """Order-independent content hash of a set of files (used for folders)."""
+        digest = hashlib.sha256()
+        for content_hash in sorted(cls.hash_file(path) for path in file_paths):
+            digest.update(content_hash.encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def _folder_hash(cls, folder_path: Optional[str]) -> Optional[str]:
+        """Content hash of the visible files directly in a folder, or None if there are none."""
+        if not folder_path or not os.path.isdir(folder_path):
+            return None
+        files = [os.path.join(folder_path, name) for name in os.listdir(folder_path)
+                 if not name.startswith('.') and os.path.isfile(os.path.join(folder_path, name))]
+        return cls.hash_files(files) if files else None
+
+    # Generic API
+
+    def is_processed(self, kind: str, key: str) -> bool:
+        """Check whether an item has been processed.
+
+        Args:
+            kind: Item kind (EMAIL, FOLDER or DOCUMENT)
+            key: Email id or content hash
+
+        Returns:
+            True if the item is recorded in the ledger
+        """
+        with self._lock:
+            if key in self._hot.get(kind, ()) or (kind, key) in self._pending:
+                return True
+        rows = self.execute_query(
+            "SELECT 1 FROM dedupe_ledger WHERE kind = ? AND item_key = ?", (kind, key)
+        )
+        if rows:
+            self._remember(kind, [key])
+        return bool(rows)
+
+    def mark_processed(self, kind: str, key: str, metadata: Optional[Dict] = None,
+                       content_hash: Optional[str] = None) -> None:
+        """Record an item as processed (buffered while inside batch()).
+
+        Args:
+            kind: Item kind (EMAIL, FOLDER or DOCUMENT)
+            key: Email id or content hash
+            metadata: Optional details stored alongside the key
+            content_hash: Content hash of the item, when it is not the key itself
+        """
+        row = (datetime.now().isoformat(), content_hash, json.dumps(metadata or {}, default=str))
+        with self._lock:
+            self._pending[(kind, key)] = row
+            if self._batch_depth:
+                return
+        self.flush()
+
+    def mark_processed_many(self, kind: str, keys: Iterable[str], metadata: Optional[Dict] = None) -> None:
+        """Record several items of one kind in a single transaction."""
+        with self.batch():
+            for key in keys:
+                self.mark_processed(kind, key, metadata)
+
+    @contextmanager
+    def batch(self):
+        """Buffer mark_processed calls and write them in a single transaction on exit."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                outermost = self._batch_depth == 0
+            if outermost:
+                self.flush()
+
+    def flush(self) -> int:
+        """Write buffered marks to the database.
+
+        Marks stay in the pending buffer (and so count for is_processed)
+        until the write commits, then move to the hot set.
+
+        Returns:
+            Number of items written
+        """
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return 0
+        rows = [(kind, key, content_hash, processed_at, metadata)
+                for (kind, key), (processed_at, content_hash, metadata) in pending.items()]
+
+        def _store(cursor: sqlite3.Cursor) -> None:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO dedupe_ledger
+                (kind, item_key, content_hash, processed_at, metadata)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+
+        try:
+            self._execute_with_retry(_store)
+        except Exception as e:
+            logger.error(f"Error saving dedupe ledger entries: {str(e)}")
+            raise
+        with self._lock:
+            for (kind, key), row in pending.items():
+                self._remember(kind, [key])
+                # A mark re-recorded during the write is left for the next flush
+                if self._pending.get((kind, key)) is row:
+                    del self._pending[(kind, key)]
+        return len(rows)
+
+    def filter_processed(self, kind: str, keys: Iterable[str]) -> Set[str]:
+        """Return the subset of keys already processed, in one query per 500 keys."""
+        self.flush()
+        keys = list(keys)
+        with self._lock:
+            hot = self._hot.get(kind, set())
+            processed = {key for key in keys if key in hot}
+        unknown = [key for key in keys if key not in processed]
+        for start in range(0, len(unknown), 500):
+            chunk = unknown[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self.execute_query(
+                f"SELECT item_key FROM dedupe_ledger WHERE kind = ? AND item_key IN ({placeholders})",
+                (kind, *chunk)
+            )
+            found = [row[0] for row in rows]
+            processed.update(found)
+            self._remember(kind, found)
+        return processed
+
+    def get_keys(self, kind: str) -> List[str]:
+        """All processed keys of one kind."""
+        self.flush()
+        return [row[0] for row in self.execute_query(
+            "SELECT item_key FROM dedupe_ledger WHERE kind = ?", (kind,)
+        )]
+
+    def get_entry(self, kind: str, key: str) -> Optional[Dict]:
+        """Stored details of a processed item, or None."""
+        self.flush()
+        rows = self.execute_query(
+            "SELECT content_hash, processed_at, metadata FROM dedupe_ledger WHERE kind = ? AND item_key = ?",
+            (kind, key)
+        )
+        if not rows:
+            return None
+        content_hash, processed_at, metadata = rows[0]
+        return {
+            'content_hash': content_hash,
+            'processed_at': processed_at,
+            'metadata': json.loads(metadata) if metadata else {}
+        }
+
+    def reset(self, kind: Optional[str] = None) -> bool:
+        """Forget processed items, backing up the database first.
+
+        Args:
+            kind: Only reset this kind (all kinds when None)
+
+        Returns:
+            True on success
+        """
+        try:
+            backup = f"{self.db_path}.bak.{int(datetime.now().timestamp())}"
+            try:
+                with sqlite3.connect(self.db_path) as source, sqlite3.connect(backup) as target:
+                    source.backup(target)
+                logger.info(f"Backed up dedupe ledger to {backup}")
+            except Exception:
+                pass
+
+            with self._lock:
+                self._pending = {item: row for item, row in self._pending.items()
+                                 if kind is not None and item[0] != kind}
+                for hot_kind in ([kind] if kind else list(self._hot)):
+                    self._hot[hot_kind] = set()
+            if kind:
+                self.execute_update("DELETE FROM dedupe_ledger WHERE kind = ?", (kind,))
+            else:
+                self.execute_update("DELETE FROM dedupe_ledger")
+
+            logger.info(f"Dedupe ledger has been reset ({kind or 'all kinds'})")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to reset dedupe ledger: {str(e)}")
+            return False
+
+    # Documents and folders
+
+    def is_document_processed(self, file_path: str) -> bool:
+        """Check whether a document with the same contents has been processed."""
+        return self.is_processed(DOCUMENT, self.hash_file(file_path))
+
+    def mark_document_processed(self, file_path: str, metadata: Optional[Dict] = None) -> str:
+        """Record a document's content hash as processed.
+
+        Returns:
+            The document's content hash
+        """
+        content_hash = self.hash_file(file_path)
+        details = {'path': file_path, 'file_name': os.path.basename(file_path)}
+        details.update(metadata or {})
+        self.mark_processed(DOCUMENT, content_hash, details)
+        return content_hash
+
+    def is_folder_processed(self, file_paths: Iterable[str]) -> bool:
+        """Check whether a folder with the same set of files has been processed."""
+        return self.is_processed(FOLDER, self.hash_files(file_paths))
+
+    # Migration
+
+    def import_entries(self, kind: str, entries: Iterable[Tuple[str, Optional[str], Dict]]) -> int:
+        """Bulk-import (key, processed_at, metadata) tuples without overwriting existing rows."""
+        rows = [(kind, key, processed_at or datetime.now().isoformat(), json.dumps(metadata or {}, default=str))
+                for key, processed_at, metadata in entries]
+
+        def _import(cursor: sqlite3.Cursor) -> None:
+            cursor.executemany("""
+                INSERT OR IGNORE INTO dedupe_ledger (kind, item_key, processed_at, metadata)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+
+        self._execute_with_retry(_import)
+        self._remember(kind, [row[1] for row in rows])
+        return len(rows)
+
+    def migrate_legacy_file(self, kind: str, path: str) -> int:
+        """Import a legacy tracking file once, then rename it to ``<path>.migrated``.
+
+        Plain-text files hold one key per line; JSON files map keys to entries.
+        Legacy document entries were keyed on an MD5 digest and folder entries
+        on a per-run id, so both are re-keyed from the recorded path (file or
+        folder contents) and dropped when it is gone.
+
+        Args:
+            kind: Item kind the file tracked
+            path: Legacy file path
+
+        Returns:
+            Number of entries imported
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                if path.endswith('.json'):
+                    legacy = json.load(f)
+                else:
+                    legacy = {line.strip(): {} for line in f if line.strip()}
+        except Exception as e:
+            logger.error(f"Error loading {path} for migration: {str(e)}")
+            return 0
+
+        entries = []
+        for key, entry in legacy.items():
+            entry = entry if isinstance(entry, dict) else {}
+            processed_at = entry.get('processed_at') or entry.get('timestamp')
+            if kind == DOCUMENT:
+                if not entry.get('path') or not os.path.exists(entry['path']):
+                    continue
+                key = self.hash_file(entry['path'])
+            elif kind == FOLDER:
+                key = self._folder_hash(entry.get('folder_path'))
+                if key is None:
+                    continue
+            entries.append((key, processed_at, entry.get('metadata', entry)))
+
+        imported = self.import_entries(kind, entries)
+        try:
+            os.replace(path, f"{path}.migrated")
+        except FileNotFoundError:
+            pass  # Migrated concurrently by another process
+        logger.info(f"Migrated {imported} of {len(legacy)} {kind} entries from {path} to {self.db_path}")
+        return imported
+
+    def migrate_legacy_files(self, base_dir: str = "") -> int:
+        """Import the workflow's legacy email, folder and document tracking files."""
+        return sum(
+            self.migrate_legacy_file(kind, os.path.join(base_dir, name))
+            for kind, name in ((EMAIL, LEGACY_EMAILS_FILE),
+                               (FOLDER, LEGACY_FOLDERS_FILE),
+                               (DOCUMENT, LEGACY_DOCUMENTS_FILE))
+        )
+
+
+_ledgers: Dict[str, DedupeLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_dedupe_ledger(db_path: str = DEDUPE_LEDGER_FILE) -> DedupeLedger:
+    """Return the process-wide ledger for db_path, creating it on first use.
+
+    Sharing one instance per database keeps a single hot set for every
+    tracker in the process. Legacy tracking files next to the database are
+    migrated when the ledger is first opened.
+    """
+    key = os.path.abspath(db_path)
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = DedupeLedger(db_path)
+            ledger.migrate_legacy_files(os.path.dirname(db_path))
+            _ledgers[key] = ledger
+        return ledger
@@ -47,6 +47,12 @@ class ServiceError(ApplicationError):
             details
         )
 
+class CircuitOpenError(ServiceError):
+    """Call rejected because the provider's circuit breaker is open."""
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit open for {provider}", {'provider': provider})
+        self.provider = provider
+
 def handle_errors(error_category: ErrorCategory, error_severity: ErrorSeverity) -> Callable:
     """Decorator for standardized error handling."""
     def decorator(func: Callable) -> Callable:
@@ -72,8 +78,12 @@ def handle_errors(error_category: ErrorCategory, error_severity: ErrorSeverity)
         return wrapper
     return decorator
 
-def retry_on_error(max_attempts: int = 3, delay_seconds: int = 1) -> Callable:
-    """Decorator for retrying operations on failure."""
+def retry_on_error(max_attempts: int = 3, delay_seconds: int = 1,
+                   retry_if: Optional[Callable[[Exception], bool]] = None) -> Callable:
+    """Decorator for retrying operations on failure.
+
+    Errors for which retry_if returns False are raised at once.
+    """
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
@@ -83,8 +93,13 @@ def retry_on_error(max_attempts: int = 3, delay_seconds: int = 1) -> Callable:
             for attempt in range(max_attempts):
                 try:
                     return func(*args, **kwargs)
+                except CircuitOpenError:
+                    # Retrying cannot help until the circuit's cool-down ends
+                    raise
                 except Exception as e:
                     last_error = e
+                    if retry_if is not None and not retry_if(e):
+                        raise
                     if attempt < max_attempts - 1:
                         time.sleep(delay_seconds)
                         continue
@@ -99,6 +114,7 @@ __all__ = [
     'ErrorCategory',
     'ApplicationError',
     'ServiceError',
+    'CircuitOpenError',
     'handle_errors',
     'retry_on_error'
 ]
\ No newline at end of file
@@ -12,4 +12,8 @@ class AttachmentError(Exception):
 
 class OCRError(Exception):
     """Raised when there's an error in OCR processing."""
-    pass
\ No newline at end of file
+    pass
+
+class DeltaTokenExpiredError(EmailFetchError):
+    """Raised when a Graph delta token is no longer valid and a full resync is needed."""
+    pass
@@ -0,0 +1,359 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.settings import (
+    BASE_DIR, EXTRACTION_CACHE_ENABLED,
+    EXTRACTION_CACHE_TTL_DAYS, EXTRACTION_CACHE_MAX_ENTRIES
+)
+from src.utils.base_db_handler import BaseDBHandler
+from src.utils.field_result import FieldResult
+
+logger = logging.getLogger(__name__)
+
+# Digests by (path, size, mtime) so each file is hashed once per process
+_HASH_MEMO: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_HASH_MEMO_SIZE = 4096
+_hash_memo_lock = threading.Lock()
+
+
+class ExtractionCache(BaseDBHandler):
+    """Content-addressed, disk-backed cache for document extraction results.
+
+    Entries are keyed on the SHA-256 of the document bytes together with the
+    provider, document type and prompt version, so the same document saved
+    under a different path (or re-attached to a new email) is a cache hit,
+    while a prompt change invalidates only that provider's entries.
+    """
+
+    def __init__(self, db_path: Optional[str] = None,
+                 ttl_seconds: float = EXTRACTION_CACHE_TTL_DAYS * 86400,
+                 max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES):
+        """Initialize extraction cache.
+
+        Args:
+            db_path: Path to SQLite database (defaults to data/extraction_cache.db)
+            ttl_seconds: Age after which an entry is treated as expired
+            max_entries: Maximum number of entries kept before LRU eviction
+        """
+        db_path = db_path or os.path.join(BASE_DIR, "data", "extraction_cache.db")
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        super().__init__(db_path)
+
+    def _create_tables(self, cursor: sqlite3.Cursor) -> None:
+        """Create cache table and indexes."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                cache_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                doc_type TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_access
+            ON extraction_cache (last_access)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_extraction_cache_content_hash
+            ON extraction_cache (content_hash)
+        """)
+        # Merged results of earlier documents by first-page perceptual hash
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS perceptual_index (
+                content_hash TEXT NOT NULL,
+                doc_type TEXT NOT NULL,
+                phash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (content_hash, doc_type)
+            )
+        """)
+        # Covers the distance scan, so lookups never read the stored payloads
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_perceptual_index_scan
+            ON perceptual_index (doc_type, created_at, phash, content_hash)
+        """)
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Compute the SHA-256 of a file's contents.
+
+        The digest is memoized on the file's path, size and modification
+        time, so the extraction cache, the dedupe ledger and every provider
+        share one read of each file.
+
+        Args:
+            file_path: Path to the file
+            chunk_size: Read size in bytes
+
+        Returns:
+            Hex digest of the file contents
+        """
+        stat = os.stat(file_path)
+        memo_key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+        with _hash_memo_lock:
+            if memo_key in _HASH_MEMO:
+                _HASH_MEMO.move_to_end(memo_key)
+                return _HASH_MEMO[memo_key]
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        with _hash_memo_lock:
+            _HASH_MEMO[memo_key] = content_hash
+            while len(_HASH_MEMO) > _HASH_MEMO_SIZE:
+                _HASH_MEMO.popitem(last=False)
+        return content_hash
+
+    @staticmethod
+    def make_key(content_hash: str, provider: str,
+                 doc_type: Optional[str], prompt_version: str) -> str:
+        """Build the cache key for a document/provider/prompt combination."""
+        return f"{content_hash}:{provider}:{doc_type or 'auto'}:{prompt_version}"
+
+    def get(self, content_hash: str, provider: str,
+            doc_type: Optional[str], prompt_version: str) -> Optional[Dict]:
+        """Look up a cached extraction result.
+
+        Args:
+            content_hash: SHA-256 of the document bytes
+            provider: Extraction provider name (e.g. 'textract', 'gpt')
+            doc_type: Document type, or None for auto-detection
+            prompt_version: Provider prompt/extraction logic version
+
+        Returns:
+            Cached extraction dict (FieldResult if stored as one), or None on
+            a miss or expired entry
+        """
+        key = self.make_key(content_hash, provider, doc_type, prompt_version)
+        now = time.time()
+
+        def _lookup(cursor: sqlite3.Cursor) -> Optional[str]:
+            cursor.execute(
+                "SELECT data, created_at FROM extraction_cache WHERE cache_key = ?",
+                (key,)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                cursor.execute("DELETE FROM extraction_cache WHERE cache_key = ?", (key,))
+                return None
+            cursor.execute(
+                "UPDATE extraction_cache SET last_access = ? WHERE cache_key = ?",
+                (now, key)
+            )
+            return row[0]
+
+        try:
+            payload = self._execute_with_retry(_lookup)
+        except Exception as e:
+            logger.warning(f"Extraction cache lookup failed: {str(e)}")
+            payload = None
+
+        with self._stats_lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if payload is None:
+            return None
+        logger.info(f"Extraction cache hit for {provider}/{doc_type or 'auto'} ({content_hash[:12]})")
+        return FieldResult.from_cache(json.loads(payload))
+
+    def put(self, content_hash: str, provider: str, doc_type: Optional[str],
+            prompt_version: str, data: Dict) -> None:
+        """Store an extraction result.
+
+        Results carrying an 'error' or 'skipped' marker are not cached.
+
+        Args:
+            content_hash: SHA-256 of the document bytes
+            provider: Extraction provider name
+            doc_type: Document type, or None for auto-detection
+            prompt_version: Provider prompt/extraction logic version
+            data: Extracted fields (a FieldResult keeps its confidences and sources)
+        """
+        if not data or "error" in data or "skipped" in data:
+            return
+
+        key = self.make_key(content_hash, provider, doc_type, prompt_version)
+        now = time.time()
+        if isinstance(data, FieldResult):
+            data = data.to_cache()
+        payload = json.dumps(data, ensure_ascii=False)
+
+        def _store(cursor: sqlite3.Cursor) -> None:
+            cursor.execute("""
+                INSERT OR REPLACE INTO extraction_cache
+                (cache_key, content_hash, provider, doc_type, prompt_version,
+                 data, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, content_hash, provider, doc_type or "auto",
+                  prompt_version, payload, now, now))
+            self._evict(cursor, now)
+
+        try:
+            self._execute_with_retry(_store)
+        except Exception as e:
+            logger.warning(f"Extraction cache store failed: {str(e)}")
+
+    def put_perceptual(self, content_hash: str, doc_type: Optional[str],
+                       phash: int, data: Dict) -> None:
+        """Store a document's extraction result under its perceptual hash.
+
+        Args:
+            content_hash: SHA-256 of the document bytes
+            doc_type: Document type
+            phash: Perceptual hash of the first page
+            data: Extracted fields (a FieldResult keeps its confidences and sources)
+        """
+        if not data or "error" in data or "skipped" in data:
+            return
+        if isinstance(data, FieldResult):
+            data = data.to_cache()
+        payload = json.dumps(data, ensure_ascii=False)
+
+        def _store(cursor: sqlite3.Cursor) -> None:
+            cursor.execute("""
+                INSERT OR REPLACE INTO perceptual_index
+                (content_hash, doc_type, phash, data, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (content_hash, doc_type or "auto", format(phash, "x"), payload, time.time()))
+
+        try:
+            self._execute_with_retry(_store)
+        except Exception as e:
+            logger.warning(f"Perceptual index store failed: {str(e)}")
+
+    def find_perceptual(self, doc_type: Optional[str], phash: int,
+                        max_distance: int) -> Optional[Tuple[Dict, int, str]]:
+        """Find the closest earlier document of a type by perceptual hash.
+
+        Args:
+            doc_type: Document type
+            phash: Perceptual hash of the document's first page
+            max_distance: Largest Hamming distance accepted
+
+        Returns:
+            (fields, distance, content_hash) of the closest entry within
+            max_distance, or None
+        """
+        doc_type = doc_type or "auto"
+        try:
+            # Scan hashes only; the payload is read for the closest entry alone
+            rows = self.execute_query(
+                "SELECT content_hash, phash FROM perceptual_index "
+                "WHERE doc_type = ? AND created_at >= ?",
+                (doc_type, time.time() - self.ttl_seconds)
+            )
+            best = None
+            for content_hash, stored in rows:
+                distance = bin(int(stored, 16) ^ phash).count("1")
+                if distance <= max_distance and (best is None or distance < best[1]):
+                    best = (content_hash, distance)
+            if best is None:
+                return None
+            payload = self.execute_query(
+                "SELECT data FROM perceptual_index WHERE content_hash = ? AND doc_type = ?",
+                (best[0], doc_type)
+            )
+        except Exception as e:
+            logger.warning(f"Perceptual index lookup failed: {str(e)}")
+            return None
+        if not payload:
+            return None
+        return FieldResult.from_cache(json.loads(payload[0][0])), best[1], best[0]
+
+    def _evict(self, cursor: sqlite3.Cursor, now: float) -> int:
+        """Drop expired entries, then least recently used ones over the size limit."""
+        cursor.execute(
+            "DELETE FROM extraction_cache WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        )
+        removed = cursor.rowcount
+        cursor.execute(
+            "DELETE FROM perceptual_index WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        )
+        cursor.execute("SELECT COUNT(*) FROM extraction_cache")
+        overflow = cursor.fetchone()[0] - self.max_entries
+        if overflow > 0:
+            cursor.execute("""
+                DELETE FROM extraction_cache WHERE cache_key IN (
+                    SELECT cache_key FROM extraction_cache
+                    ORDER BY last_access ASC LIMIT ?
+                )
+            """, (overflow,))
+            removed += cursor.rowcount
+        cursor.execute("""
+            DELETE FROM perceptual_index WHERE rowid NOT IN (
+                SELECT rowid FROM perceptual_index ORDER BY created_at DESC LIMIT ?
+            )
+        """, (self.max_entries,))
+        return removed
+
+    def evict(self) -> int:
+        """Run eviction now.
+
+        Returns:
+            Number of entries removed
+        """
+        return self._execute_with_retry(self._evict, time.time())
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        self.execute_update("DELETE FROM extraction_cache")
+        self.execute_update("DELETE FROM perceptual_index")
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and current entry count."""
+        entries = self.execute_query("SELECT COUNT(*) FROM extraction_cache")[0][0]
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+_default_cache: Optional[ExtractionCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Get the shared extraction cache, or None when caching is disabled."""
+    global _default_cache
+    if os.getenv("EXTRACTION_CACHE_ENABLED", str(EXTRACTION_CACHE_ENABLED)).lower() != "true":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = ExtractionCache()
+            except Exception as e:
+                logger.warning(f"Extraction cache unavailable: {str(e)}")
+                return None
+        return _default_cache
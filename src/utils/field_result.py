@@ -0,0 +1,133 @@
+"""Extraction results carrying per-field confidence and source.
+
+Providers return flat field -> value dicts. FieldResult is still that dict,
+so every existing consumer keeps working, but it also records for each
+field how sure the provider was (0..1) and which provider supplied it.
+Merges keep the most confident value per field instead of the first
+non-default one, and fallback calls can be scoped to the weak fields.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from config.settings import FIELD_CONFIDENCE_THRESHOLD
+
+# Confidence of a value whose provider gave no per-field score. MRZ values
+# are check-digit validated; DeepSeek's 0.7 is the long-standing OCR default.
+PROVIDER_CONFIDENCE = {
+    'mrz': 0.99,
+    'gpt': 0.85,
+    'textract': 0.8,
+    'deepseek': 0.7,
+}
+UNKNOWN_CONFIDENCE = 0.5
+
+# Fields that decide whether a document was read, by document type
+CRITICAL_FIELDS = {
+    'passport': ['passport_number', 'surname', 'given_names'],
+    'emirates_id': ['emirates_id', 'name_en'],
+    'visa': ['entry_permit_no', 'unified_no', 'full_name'],
+}
+
+# Reserved keys used to keep the metadata in JSON (extraction cache)
+_CONFIDENCE_KEY = '_confidence'
+_SOURCES_KEY = '_sources'
+
+
+class FieldResult(dict):
+    """Field -> value dict with a confidence and source for each field."""
+
+    def __init__(self, fields: Optional[Dict[str, str]] = None, source: Optional[str] = None,
+                 confidence: Optional[Dict[str, float]] = None):
+        """Initialize result.
+
+        Args:
+            fields: Extracted values
+            source: Provider of every field in fields
+            confidence: Known per-field confidences (0..1); other fields use
+                the provider's prior
+        """
+        super().__init__(fields or {})
+        self.confidence: Dict[str, float] = dict(confidence or {})
+        self.sources: Dict[str, str] = {field: source for field in self} if source else {}
+
+    @classmethod
+    def wrap(cls, data: Optional[Dict[str, str]], source: Optional[str]) -> 'FieldResult':
+        """data as a FieldResult, tagging fields without a source with this one."""
+        if isinstance(data, cls):
+            if source:
+                for field in data:
+                    data.sources.setdefault(field, source)
+            return data
+        return cls(data, source)
+
+    def set(self, field: str, value: str, confidence: Optional[float], source: Optional[str]) -> None:
+        """Set a value together with its confidence and source."""
+        self[field] = value
+        if confidence is None:
+            self.confidence.pop(field, None)
+        else:
+            self.confidence[field] = confidence
+        if source:
+            self.sources[field] = source
+
+    def source_of(self, field: str) -> Optional[str]:
+        return self.sources.get(field)
+
+    def confidence_of(self, field: str, default_value: str = ".") -> float:
+        """Confidence of a field's value; 0 when missing or default."""
+        value = self.get(field)
+        if value is None or value == default_value or value == "":
+            return 0.0
+        if field in self.confidence:
+            return self.confidence[field]
+        return PROVIDER_CONFIDENCE.get(self.sources.get(field), UNKNOWN_CONFIDENCE)
+
+    def weak_fields(self, fields: Optional[Iterable[str]] = None,
+                    threshold: float = FIELD_CONFIDENCE_THRESHOLD,
+                    default_value: str = ".") -> List[str]:
+        """Fields (all by default) that are missing or below the threshold."""
+        fields = list(self) if fields is None else list(fields)
+        return [field for field in fields if self.confidence_of(field, default_value) < threshold]
+
+    def to_cache(self) -> Dict:
+        """Plain JSON-serializable dict keeping the metadata under reserved keys."""
+        data = dict(self)
+        data[_CONFIDENCE_KEY] = self.confidence
+        data[_SOURCES_KEY] = self.sources
+        return data
+
+    @classmethod
+    def from_cache(cls, data: Dict) -> Dict:
+        """Inverse of to_cache; dicts stored without metadata are returned as-is."""
+        if _CONFIDENCE_KEY not in data and _SOURCES_KEY not in data:
+            return data
+        data = dict(data)
+        confidence = data.pop(_CONFIDENCE_KEY, None) or {}
+        sources = data.pop(_SOURCES_KEY, None) or {}
+        result = cls(data, confidence=confidence)
+        result.sources = sources
+        return result
+
+
+def critical_fields(doc_type: Optional[str]) -> List[str]:
+    """Critical fields of a document type (empty for unknown types)."""
+    return CRITICAL_FIELDS.get(doc_type, [])
+
+
+def merge_field_results(results: Iterable[Optional[Dict[str, str]]],
+                        default_value: str = ".") -> FieldResult:
+    """Merge results keeping the most confident non-default value per field.
+
+    Plain dicts count as UNKNOWN_CONFIDENCE; ties keep the earlier result.
+    """
+    merged = FieldResult()
+    best: Dict[str, float] = {}
+    for result in results:
+        if not result:
+            continue
+        result = FieldResult.wrap(result, None)
+        for field, value in result.items():
+            confidence = result.confidence_of(field, default_value)
+            if field not in merged or confidence > best[field]:
+                merged.set(field, value, result.confidence.get(field), result.source_of(field))
+                best[field] = confidence
+    return merged
@@ -0,0 +1,232 @@
+import os
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.settings import (
+    BASE_DIR, PDF_RASTER_CACHE_DIR, PDF_RASTER_CACHE_MAX_MB,
+    PDF_RASTER_MAX_WORKERS, PDF_RASTER_DPI
+)
+from src.utils.extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+
+def _render_to_disk(pdf_path: str, dpi: int, output_stem: str,
+                    first_page: Optional[int] = None, last_page: Optional[int] = None) -> int:
+    """Render PDF pages to '<output_stem>_p<page>.jpg' files (runs in a worker process).
+
+    Returns:
+        Number of pages rendered
+    """
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+    for offset, image in enumerate(images):
+        page = (first_page or 1) + offset
+        final_path = f"{output_stem}_p{page}.jpg"
+        tmp_path = f"{final_path}.{os.getpid()}.tmp"
+        image.convert('RGB').save(tmp_path, 'JPEG')
+        os.replace(tmp_path, final_path)
+    return len(images)
+
+
+class PDFRasterizer:
+    """Content-addressed, disk-backed cache of rendered PDF pages.
+
+    Pages are keyed on the SHA-256 of the PDF bytes, the page number and the
+    DPI, so Textract, GPT and the MRZ reader share one render of each page
+    however many times (or under whichever path) the PDF is seen. Rendering
+    runs in a process pool, so several PDFs of one email render in parallel;
+    concurrent requests for the same page wait for the same render. Files
+    over the size budget are evicted least recently used first.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_bytes: int = PDF_RASTER_CACHE_MAX_MB * 1024 * 1024,
+                 max_workers: int = PDF_RASTER_MAX_WORKERS):
+        """Initialize rasterizer.
+
+        Args:
+            cache_dir: Directory for rendered pages (defaults to data/pdf_pages)
+            max_bytes: Disk budget for rendered pages before LRU eviction
+            max_workers: Render processes; 0 renders in the calling thread
+        """
+        self.cache_dir = cache_dir or PDF_RASTER_CACHE_DIR or os.path.join(BASE_DIR, "data", "pdf_pages")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_workers = max(0, max_workers)
+        self.hits = 0
+        self.renders = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Tuple[str, int, int], Future] = {}
+        self._lock = threading.Lock()
+
+    def _stem(self, content_hash: str, dpi: int) -> str:
+        directory = os.path.join(self.cache_dir, content_hash[:2])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{content_hash}_{dpi}")
+
+    def _page_file(self, content_hash: str, page: int, dpi: int) -> str:
+        return f"{self._stem(content_hash, dpi)}_p{page}.jpg"
+
+    def _count_file(self, content_hash: str, dpi: int) -> str:
+        return f"{self._stem(content_hash, dpi)}.pages"
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers == 0:
+            return None
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"PDF render pool unavailable, rendering inline: {str(e)}")
+                self.max_workers = 0
+        return self._pool
+
+    def _submit(self, pdf_path: str, content_hash: str, dpi: int, page: int) -> Future:
+        """Start (or join) the render of one page, or of every page when page is 0."""
+        key = (content_hash, dpi, page)
+        first_last = (page, page) if page else (None, None)
+        args = (pdf_path, dpi, self._stem(content_hash, dpi)) + first_last
+        with self._lock:
+            for inflight_key in (key, (content_hash, dpi, 0)):
+                if inflight_key in self._inflight:
+                    return self._inflight[inflight_key]
+            pool = self._get_pool()
+            future = pool.submit(_render_to_disk, *args) if pool is not None else Future()
+            self._inflight[key] = future
+            self.renders += 1
+        if pool is None:
+            try:
+                future.set_result(_render_to_disk(*args))
+            except Exception as e:
+                future.set_exception(e)
+        future.add_done_callback(lambda _: self._finish(key))
+        return future
+
+    def _finish(self, key: Tuple[str, int, int]) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        self.evict()
+
+    def _touch(self, path: str) -> str:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def page_path(self, pdf_path: str, page: int = 1, dpi: int = PDF_RASTER_DPI) -> str:
+        """Path of a rendered JPEG of one PDF page, rendering it on a miss.
+
+        The file belongs to the cache: callers must not delete or modify it.
+        """
+        content_hash = ExtractionCache.hash_file(pdf_path)
+        path = self._page_file(content_hash, page, dpi)
+        if os.path.exists(path):
+            return self._touch(path)
+        rendered = self._submit(pdf_path, content_hash, dpi, page).result()
+        if not os.path.exists(path):
+            raise ValueError(f"PDF conversion failed - page {page} not rendered ({rendered} pages)")
+        return path
+
+    def page_paths(self, pdf_path: str, dpi: int = PDF_RASTER_DPI) -> List[str]:
+        """Paths of rendered JPEGs of every PDF page, in page order."""
+        content_hash = ExtractionCache.hash_file(pdf_path)
+        count_file = self._count_file(content_hash, dpi)
+        count = self._read_count(count_file)
+        paths = [self._page_file(content_hash, page, dpi) for page in range(1, (count or 0) + 1)]
+        if count and all(os.path.exists(path) for path in paths):
+            return [self._touch(path) for path in paths]
+
+        count = self._submit(pdf_path, content_hash, dpi, 0).result()
+        with open(count_file, 'w') as f:
+            f.write(str(count))
+        return [self._page_file(content_hash, page, dpi) for page in range(1, count + 1)]
+
+    def page_bytes(self, pdf_path: str, dpi: int = PDF_RASTER_DPI) -> List[bytes]:
+        """JPEG bytes of every PDF page, in page order."""
+        pages = []
+        for path in self.page_paths(pdf_path, dpi):
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return pages
+
+    def prefetch(self, pdf_paths: Iterable[str], dpi: int = PDF_RASTER_DPI, page: int = 1) -> None:
+        """Start rendering a page of several PDFs in parallel without waiting."""
+        for pdf_path in pdf_paths:
+            try:
+                content_hash = ExtractionCache.hash_file(pdf_path)
+                if not os.path.exists(self._page_file(content_hash, page, dpi)):
+                    self._submit(pdf_path, content_hash, dpi, page)
+            except Exception as e:
+                logger.debug(f"Could not prefetch {pdf_path}: {str(e)}")
+
+    @staticmethod
+    def _read_count(count_file: str) -> Optional[int]:
+        try:
+            with open(count_file) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def evict(self) -> int:
+        """Delete least recently used page files over the disk budget.
+
+        Returns:
+            Number of files removed
+        """
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"Evicted {removed} rendered PDF pages")
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Cache hits and renders started."""
+        with self._lock:
+            return {"hits": self.hits, "renders": self.renders, "inflight": len(self._inflight)}
+
+    def shutdown(self) -> None:
+        """Stop the render processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_default_rasterizer: Optional[PDFRasterizer] = None
+_default_rasterizer_lock = threading.Lock()
+
+
+def get_pdf_rasterizer() -> PDFRasterizer:
+    """Get the shared PDF rasterizer."""
+    global _default_rasterizer
+    with _default_rasterizer_lock:
+        if _default_rasterizer is None:
+            _default_rasterizer = PDFRasterizer()
+        return _default_rasterizer
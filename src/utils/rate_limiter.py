@@ -0,0 +1,323 @@
+import re
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Mapping, Optional
+
+from src.utils.circuit_breaker import get_circuit_registry, is_provider_fault
+from src.utils.error_handling import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Continuously refilling bucket that allows its level to go negative.
+
+    A negative level is outstanding debt: callers reserve capacity up front and
+    are told how long to wait for the debt to be repaid, so reservations are
+    O(1) and the caller sleeps outside any lock.
+    """
+
+    def __init__(self, capacity: float, per_seconds: float, clock: Callable[[], float]):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self._clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Debit the bucket and return seconds until the debit is covered."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.level
+
+    def set_remaining(self, remaining: float, reset_seconds: Optional[float], now: float) -> None:
+        """Align the bucket with a server-reported remaining budget."""
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+        if remaining <= 0 and reset_seconds:
+            # Server says we are out until reset: carry that as debt
+            self.level = min(self.level, -reset_seconds * self.rate)
+
+
+class RateLimiter:
+    """Thread-safe requests-per-minute / tokens-per-minute limiter.
+
+    The lock is only held to update bucket state; any waiting happens after it
+    is released, so concurrent callers are spaced out rather than serialized
+    behind a sleeping thread. Limits adapt to Retry-After and x-ratelimit-*
+    response headers.
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, min_interval: float = 0.0,
+                 max_wait: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize rate limiter.
+
+        Args:
+            name: Provider name used in logs
+            requests_per_minute: Request budget (None for unlimited)
+            tokens_per_minute: Token budget (None for unlimited)
+            min_interval: Minimum spacing between request starts in seconds
+            max_wait: Optional cap on a single wait in seconds
+            clock: Monotonic time source (injectable for tests)
+            sleep: Sleep function (injectable for tests)
+        """
+        self.name = name
+        self.min_interval = min_interval
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        now = clock()
+        self._requests = TokenBucket(requests_per_minute, 60.0, clock) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, 60.0, clock) if tokens_per_minute else None
+        self._next_slot = now
+        self._blocked_until = now
+
+        self.total_requests = 0
+        self.total_wait = 0.0
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request (and optional tokens) and return the required delay.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            now = self._clock()
+            delay = max(0.0, self._blocked_until - now)
+            if self._requests:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens and tokens:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            if self.min_interval:
+                start = max(now + delay, self._next_slot)
+                self._next_slot = start + self.min_interval
+                delay = start - now
+            if self.max_wait is not None:
+                delay = min(delay, self.max_wait)
+            self.total_requests += 1
+            self.total_wait += delay
+            return delay
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block (outside the lock) until a request may be sent.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Seconds waited
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            logger.info(f"{self.name} rate limit: waiting {delay:.2f}s")
+            self._sleep(delay)
+        return delay
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take capacity only if it is available right now."""
+        with self._lock:
+            now = self._clock()
+            if now < self._blocked_until or now < self._next_slot:
+                return False
+            if self._requests and self._requests.available(now) < 1:
+                return False
+            if self._tokens and tokens and self._tokens.available(now) < min(tokens, self._tokens.capacity):
+                return False
+        return self.reserve(tokens) == 0
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if not self._tokens:
+            return
+        with self._lock:
+            now = self._clock()
+            self._tokens._refill(now)
+            self._tokens.level -= (actual_tokens - estimated_tokens)
+
+    def penalize(self, seconds: float) -> None:
+        """Hold all requests for the given number of seconds (e.g. after a 429)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+        logger.warning(f"{self.name} rate limit: pausing requests for {seconds:.2f}s")
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Adapt to Retry-After and x-ratelimit-* response headers."""
+        if not headers:
+            return
+        headers = {str(k).lower(): v for k, v in dict(headers).items()}
+
+        retry_after = parse_retry_after(headers.get('retry-after-ms'), milliseconds=True) \
+            or parse_retry_after(headers.get('retry-after'))
+        if retry_after:
+            self.penalize(retry_after)
+
+        with self._lock:
+            now = self._clock()
+            for bucket, kind in ((self._requests, 'requests'), (self._tokens, 'tokens')):
+                limit = _to_float(headers.get(f'x-ratelimit-limit-{kind}'))
+                remaining = _to_float(headers.get(f'x-ratelimit-remaining-{kind}'))
+                reset = parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+                if bucket is None or remaining is None:
+                    continue
+                if limit and limit < bucket.capacity:
+                    bucket.capacity = limit
+                    bucket.rate = limit / 60.0
+                bucket.set_remaining(remaining, reset, now)
+
+    def get_stats(self) -> Dict:
+        """Limiter counters for monitoring."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'requests': self.total_requests,
+                'total_wait': self.total_wait,
+                'blocked_for': max(0.0, self._blocked_until - self._clock())
+            }
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+def parse_duration(value) -> Optional[float]:
+    """Parse OpenAI-style reset durations ('1s', '6m0s', '250ms') or plain seconds."""
+    if value is None:
+        return None
+    number = _to_float(value)
+    if number is not None:
+        return number
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+def parse_retry_after(value, milliseconds: bool = False) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date)."""
+    if value is None:
+        return None
+    number = _to_float(value)
+    if number is not None:
+        return number / 1000.0 if milliseconds else number
+    try:
+        retry_at = parsedate_to_datetime(str(value))
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Flat per-image estimate; vision tokens depend on size/detail and are corrected by record_usage
+IMAGE_TOKEN_ESTIMATE = 1000
+LOW_DETAIL_IMAGE_TOKENS = 85
+
+
+def estimate_chat_tokens(messages: List[Dict], max_tokens: int = 0) -> int:
+    """Rough token estimate for a chat request (prompt text, images and completion)."""
+    estimate = max_tokens
+    for message in messages:
+        content = message.get('content')
+        parts = content if isinstance(content, list) else [{'type': 'text', 'text': content or ''}]
+        for part in parts:
+            if part.get('type') == 'image_url':
+                low = (part.get('image_url') or {}).get('detail') == 'low'
+                estimate += LOW_DETAIL_IMAGE_TOKENS if low else IMAGE_TOKEN_ESTIMATE
+            else:
+                estimate += len(part.get('text') or '') // 4
+    return estimate
+
+
+def headers_from_error(error: Exception) -> Optional[Mapping[str, str]]:
+    """Response headers attached to an OpenAI or botocore error, if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers is None and isinstance(response, dict):
+        headers = response.get('ResponseMetadata', {}).get('HTTPHeaders')
+    return headers
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an error is a 429 response, judged by its status rather than its message."""
+    try:
+        from openai import RateLimitError
+        if isinstance(error, RateLimitError):
+            return True
+    except ImportError:
+        pass
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429
+
+
+def create_chat_completion(client, limiter: RateLimiter, **kwargs):
+    """Call an OpenAI-compatible chat completion through a rate limiter.
+
+    Reserves the request and its estimated tokens, reads rate-limit headers from
+    the raw response and corrects the token budget with the reported usage.
+    On errors the response headers (e.g. Retry-After on a 429) are applied
+    before the exception propagates. Calls also go through the circuit breaker
+    named after the limiter, raising CircuitOpenError while it is open.
+    """
+    circuits = get_circuit_registry()
+    if not circuits.allow(limiter.name):
+        raise CircuitOpenError(limiter.name)
+    estimated = estimate_chat_tokens(kwargs.get('messages', []), kwargs.get('max_tokens') or 0)
+    limiter.acquire(tokens=estimated)
+    start = time.monotonic()
+    try:
+        raw = client.chat.completions.with_raw_response.create(**kwargs)
+    except Exception as e:
+        headers = headers_from_error(e)
+        limiter.update_from_headers(headers)
+        # A 429 is our quota and a 400 a bad request, not an outage
+        circuits.record(limiter.name, not is_provider_fault(e), time.monotonic() - start)
+        raise
+    circuits.record(limiter.name, True, time.monotonic() - start)
+    limiter.update_from_headers(raw.headers)
+    response = raw.parse()
+    usage = getattr(response, 'usage', None)
+    if usage is not None and getattr(usage, 'total_tokens', None):
+        limiter.record_usage(estimated, usage.total_tokens)
+    return response
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, **kwargs) -> RateLimiter:
+    """Get the process-wide limiter for a provider, creating it on first use.
+
+    Args:
+        name: Provider name (e.g. 'openai', 'deepseek', 'textract')
+        **kwargs: RateLimiter arguments used only when the limiter is created
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name, **kwargs)
+        return _limiters[name]
@@ -4,6 +4,8 @@ from typing import Dict, Optional
 from datetime import datetime, timedelta
 import time
 
+from src.utils.circuit_breaker import CircuitBreakerRegistry, get_circuit_registry
+
 logger = logging.getLogger(__name__)
 
 class ServiceStatus:
@@ -12,7 +14,18 @@ class ServiceStatus:
     DEGRADED = "degraded"
 
 class ServiceMonitor:
-    def __init__(self):
+    # Services answered from the provider circuit breakers (live traffic) instead of a probe
+    CIRCUIT_SERVICES = {
+        "email_service": "graph",
+        "graph": "graph",
+        "document_processor": "textract",
+        "textract": "textract",
+        "openai": "openai",
+        "deepseek": "deepseek",
+    }
+
+    def __init__(self, circuits: Optional[CircuitBreakerRegistry] = None):
+        self.circuits = circuits or get_circuit_registry()
         self.services = {
             "nas_portal": {
                 "url": "https://nas-portal-url.com/health",  # Replace with actual URL
@@ -122,11 +135,17 @@ class ServiceMonitor:
     def is_service_available(self, service_name: str, max_age: int = 300) -> bool:
         """
         Check if service is available using cached status if recent.
+        Provider services (CIRCUIT_SERVICES) are answered from their circuit
+        breaker, which tracks the real calls, without a probe request.
         
         Args:
             service_name: Name of the service to check
             max_age: Maximum age of cached status in seconds
         """
+        circuit = self.CIRCUIT_SERVICES.get(service_name)
+        if circuit is not None:
+            return self.circuits.is_available(circuit)
+
         service = self.services.get(service_name)
         if not service:
             return False
@@ -144,6 +163,10 @@ class ServiceMonitor:
         result = self.check_service(service_name)
         return result["status"] == ServiceStatus.OK
 
+    def get_circuit_status(self) -> Dict[str, Dict]:
+        """Circuit breaker state and rolling error/latency stats per provider."""
+        return self.circuits.get_stats()
+
     def wait_for_service(self, service_name: str, timeout: int = 300, 
                         check_interval: int = 10) -> bool:
         """
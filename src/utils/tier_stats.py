@@ -0,0 +1,84 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class TierStats:
+    """Thread-safe per-tier counters for tiered (escalating) provider calls.
+
+    For each tier it records how many documents reached it, how many were
+    resolved there without escalating, and a rolling window of call
+    latencies for percentiles.
+    """
+
+    def __init__(self, window: int = 500):
+        """Initialize stats.
+
+        Args:
+            window: Number of recent latencies kept per tier
+        """
+        self.window = window
+        self._attempts: Dict[str, int] = {}
+        self._resolved: Dict[str, int] = {}
+        self._latency_total: Dict[str, float] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, latency: float, resolved: bool) -> None:
+        """Record one document passing through a tier.
+
+        Args:
+            tier: Tier name
+            latency: Call latency in seconds
+            resolved: Whether the document was finished at this tier
+        """
+        with self._lock:
+            self._attempts[tier] = self._attempts.get(tier, 0) + 1
+            self._resolved[tier] = self._resolved.get(tier, 0) + int(resolved)
+            self._latency_total[tier] = self._latency_total.get(tier, 0.0) + latency
+            self._latencies.setdefault(tier, deque(maxlen=self.window)).append(latency)
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> float:
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def latency_percentile(self, tier: str, fraction: float, min_samples: int = 1) -> Optional[float]:
+        """Latency percentile of a tier, or None with fewer than min_samples calls."""
+        with self._lock:
+            samples = list(self._latencies.get(tier, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return self._percentile(samples, fraction)
+
+    def hit_rate(self, tier: str, min_samples: int = 1) -> Optional[float]:
+        """Share of documents resolved at a tier, or None with fewer than min_samples."""
+        with self._lock:
+            attempts = self._attempts.get(tier, 0)
+            if attempts < max(1, min_samples):
+                return None
+            return self._resolved[tier] / attempts
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-tier attempts, resolved count, hit rate and latency (seconds)."""
+        with self._lock:
+            stats = {}
+            for tier, attempts in self._attempts.items():
+                samples = list(self._latencies[tier])
+                stats[tier] = {
+                    'attempts': attempts,
+                    'resolved': self._resolved[tier],
+                    'hit_rate': self._resolved[tier] / attempts,
+                    'avg_latency': self._latency_total[tier] / attempts,
+                    'p50_latency': self._percentile(samples, 0.5),
+                    'p95_latency': self._percentile(samples, 0.95),
+                }
+            return stats
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        with self._lock:
+            self._attempts.clear()
+            self._resolved.clear()
+            self._latency_total.clear()
+            self._latencies.clear()
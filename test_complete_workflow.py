@@ -7,12 +7,13 @@ import logging
 import pandas as pd
 import re
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Iterator, Tuple
 import json
 import argparse
 import shutil
-import time
 import copy 
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -28,18 +29,25 @@ from src.utils.file_sharer import FileSharer
 from src.utils.teams_notifier import TeamsNotifier
 from src.utils.email_sender import EmailSender
 from src.document_processor.gpt_processor import GPTProcessor
+from src.document_processor.mrz_processor import MRZProcessor, read_mrz_band
+from src.document_processor.document_classifier import DocumentClassifier
 
 # Import original workflow components
 from src.utils.process_tracker import ProcessTracker
 from src.services.data_combiner import DataCombiner
+from src.services.extraction_store import ExtractionResultStore
+from src.services.extraction_executor import ExtractionExecutor, flatten_document_paths
+from src.services.extraction_planner import ExtractionPlanner
 from src.document_processor.excel_processor import EnhancedExcelProcessor as ExcelProcessor
 from src.folder_processor import FolderProcessor
+from src.utils.dedupe_ledger import EMAIL, FOLDER, get_dedupe_ledger
+from config.settings import ATTACHMENT_STREAMING_ENABLED, EMAIL_MAX_WORKERS, MRZ_FAST_PATH_ENABLED
 
 class FolderProcessor:
     def __init__(self, *args, **kwargs):
         """Initialize folder processor with watch folder configuration."""
         self.watch_folder = "input_documents"
-        self.processed_folders_file = "processed_folders.json"
+        self.ledger = get_dedupe_ledger()
         
         # Create the watch folder if it doesn't exist
         os.makedirs(self.watch_folder, exist_ok=True)
@@ -86,10 +94,12 @@ class FolderProcessor:
                     'files': files_in_root,
                     'id': f"local_{datetime.now().strftime('%Y%m%d%H%M%S')}_{len(files_in_root)}",
                     'subject': f"Local Submission - {len(files_in_root)} files - {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+                    'content_hash': self.ledger.hash_files(
+                        os.path.join(self.your_documents_folder, f) for f in files_in_root),
                 }
                 
                 # Check if already processed
-                if not self._is_folder_processed(folder_info['id']):
+                if not self._is_folder_processed(folder_info['content_hash']):
                     folders.append(folder_info)
                 else:
                     logger.info(f"Skipping already processed root folder: {folder_info['id']}")
@@ -114,10 +124,11 @@ class FolderProcessor:
                         'files': files,
                         'id': f"local_{subdir}_{datetime.now().strftime('%Y%m%d%H%M%S')}",
                         'subject': f"Local Submission - {subdir} - {len(files)} files",
+                        'content_hash': self.ledger.hash_files(os.path.join(dir_path, f) for f in files),
                     }
                     
                     # Check if already processed
-                    if not self._is_folder_processed(folder_info['id']):
+                    if not self._is_folder_processed(folder_info['content_hash']):
                         folders.append(folder_info)
                     else:
                         logger.info(f"Skipping already processed subfolder: {folder_info['id']}")
@@ -191,29 +202,15 @@ class FolderProcessor:
             result: Optional result information
         """
         try:
-            # Load existing processed folders
-            processed_folders = {}
-            if os.path.exists(self.processed_folders_file):
-                try:
-                    with open(self.processed_folders_file, 'r') as f:
-                        processed_folders = json.load(f)
-                except json.JSONDecodeError:
-                    logger.error("Error parsing processed_folders.json, treating as empty")
-                    processed_folders = {}
-            
-            # Add this folder with processing information
-            processed_folders[folder_info['id']] = {
+            # Record the folder contents with processing information
+            self.ledger.mark_processed(FOLDER, folder_info.get('content_hash') or folder_info['id'], {
+                'id': folder_info['id'],
                 'folder_name': folder_info['folder_name'],
                 'folder_path': folder_info['folder_path'],
                 'total_files': folder_info['total_files'],
                 'status': status,
-                'processed_at': datetime.now().isoformat(),
                 'result': result
-            }
-            
-            # Save updated processed folders
-            with open(self.processed_folders_file, 'w') as f:
-                json.dump(processed_folders, f, indent=2)
+            })
                 
             logger.info(f"Marked folder {folder_info['folder_name']} as {status}")
             
@@ -248,49 +245,48 @@ class FolderProcessor:
         except Exception as e:
             logger.error(f"Error marking folder as processed: {str(e)}", exc_info=True)
     
-    def _is_folder_processed(self, folder_id):
+    def _is_folder_processed(self, folder_key):
         """
         Check if a folder has already been processed.
         
         Args:
-            folder_id: Unique identifier for the folder
+            folder_key: Content hash of the folder's files
             
         Returns:
             Boolean indicating if the folder has been processed
         """
         try:
-            # Load existing processed folders
-            if not os.path.exists(self.processed_folders_file):
-                return False
-                
-            with open(self.processed_folders_file, 'r') as f:
-                processed_folders = json.load(f)
-                
-            return folder_id in processed_folders
+            return self.ledger.is_processed(FOLDER, folder_key)
         except Exception as e:
             logger.error(f"Error checking if folder is processed: {str(e)}", exc_info=True)
             return False
 
 def is_email_processed(email_id):
-    """Simple check if email has been processed."""
-    processed_file = "processed_emails_simple.txt"
-    
-    # Check if file exists and contains the email ID
-    if os.path.exists(processed_file):
-        with open(processed_file, 'r') as f:
-            processed_ids = [line.strip() for line in f.readlines()]
-            return email_id in processed_ids
-    return False
+    """Check if email has been processed."""
+    return get_dedupe_ledger().is_processed(EMAIL, email_id)
 
 def mark_email_processed(email_id):
-    """Mark email as processed in simple tracking file."""
-    processed_file = "processed_emails_simple.txt"
-    
-    # Append email ID to file
-    with open(processed_file, 'a') as f:
-        f.write(f"{email_id}\n")
+    """Mark email as processed in the dedupe ledger."""
+    get_dedupe_ledger().mark_processed(EMAIL, email_id)
     logger.info(f"Marked email {email_id} as processed")
 
+# Debug JSON files are written from concurrent email workers
+_debug_file_lock = threading.Lock()
+
+def write_debug_json(path, data):
+    """Write a debug JSON file one writer at a time, replacing it atomically."""
+    with _debug_file_lock:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+def debug_file_name(prefix, email_id=None):
+    """Per-email debug file name (Graph ids reduced to filesystem-safe characters)."""
+    if not email_id:
+        return f"{prefix}.json"
+    return f"{prefix}_{re.sub(r'[^A-Za-z0-9_-]', '_', str(email_id))[-48:]}.json"
+
 # Create WorkflowTester class from the original file
 class CompletedSubmission:
     def __init__(self, process_id: str, documents: Dict[str, str], final_excel: str):
@@ -304,7 +300,8 @@ class WorkflowTester:
     def __init__(self):
         # Initialize services
         self.outlook = OutlookClient()
-        self.attachment_handler = AttachmentHandler()
+        # Attachments are listed without contentBytes and streamed straight to disk
+        self.attachment_handler = AttachmentHandler(content_fetcher=self.outlook.iter_attachment_content)
         self.textract = TextractProcessor()
         self.DEFAULT_VALUE = "."  
         
@@ -318,16 +315,31 @@ class WorkflowTester:
         except Exception as e:
             logger.warning(f"Failed to initialize GPT: {str(e)}")
             self.gpt = None
+        
+        # Passports with a valid MRZ are read locally before any cloud provider
+        self.mrz = MRZProcessor() if MRZ_FAST_PATH_ENABLED else None
+        
+        # Attachments are routed by filename, then file header and local MRZ
+        self.classifier = DocumentClassifier(mrz_reader=read_mrz_band if MRZ_FAST_PATH_ENABLED else None)
             
         self.document_processor = EnhancedDocumentProcessorService(self.textract, self.gpt)
         self.file_sharer = FileSharer()
         
         self.excel_processor = ExcelProcessor()
-        self.data_combiner = DataCombiner(self.textract, self.excel_processor, self.gpt)
+        self.extraction_executor = ExtractionExecutor()
+        self.data_combiner = DataCombiner(self.textract, self.excel_processor, self.gpt,
+                                          extraction_executor=self.extraction_executor)
         self.process_tracker = ProcessTracker()
         self.teams_notifier = TeamsNotifier()
         self.email_sender = EmailSender()
         
+        # Attachments fetched ahead of processing via Graph batch requests
+        self._prefetched_attachments = {}
+        self._prefetch_lock = threading.Lock()
+        
+        # Emails processed concurrently per poll
+        self.email_max_workers = max(1, EMAIL_MAX_WORKERS)
+        
         # Validate templates
         self._validate_templates()
         
@@ -386,40 +398,11 @@ class WorkflowTester:
             
             
     def _is_document_processed(self, file_path: str) -> bool:
-        """Check if a document has already been processed by computing a hash of the file."""
-        import hashlib
-        
-        # Generate a hash of the file content to uniquely identify it regardless of name
+        """Check if a document with the same content has already been processed."""
         try:
-            with open(file_path, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
-                
-            processed_docs_file = "processed_documents.json"
-            processed_docs = {}
-            
-            # Load existing processed documents
-            if os.path.exists(processed_docs_file):
-                try:
-                    with open(processed_docs_file, 'r') as f:
-                        processed_docs = json.load(f)
-                except json.JSONDecodeError:
-                    logger.error("Error parsing processed_documents.json, treating as empty")
-                    # Create a backup of the corrupted file
-                    backup_name = f"processed_documents.json.corrupted.{int(time.time())}"
-                    shutil.copy2(processed_docs_file, backup_name)
-                    logger.info(f"Created backup of corrupted file: {backup_name}")
-                    
-                    # Create a new empty file
-                    with open(processed_docs_file, "w") as f_new:
-                        f_new.write("{}")
-                    processed_docs = {}
-                    
-            # Check if file hash exists in processed documents
-            if file_hash in processed_docs:
-                logger.info(f"Document already processed: {file_path} (hash: {file_hash})")
+            if get_dedupe_ledger().is_document_processed(file_path):
+                logger.info(f"Document already processed: {file_path}")
                 return True
-                
-            # Not processed yet
             return False
         except Exception as e:
             logger.error(f"Error checking document processed status: {str(e)}")
@@ -427,40 +410,109 @@ class WorkflowTester:
             return False
 
     def _mark_document_processed(self, file_path: str) -> None:
-        """Mark a document as processed by saving its hash."""
-        import hashlib
+        """Mark a document as processed by recording its content hash."""
+        try:
+            file_hash = get_dedupe_ledger().mark_document_processed(file_path)
+            logger.info(f"Marked document as processed: {file_path} (hash: {file_hash})")
+        except Exception as e:
+            logger.error(f"Error marking document as processed: {str(e)}")
+
+    def _prefetch_attachments(self, email_ids: List[str], email_id: str) -> None:
+        """Batch-fetch attachments for email_id and the emails queued after it.
         
+        One Graph $batch call covers up to OutlookClient.BATCH_MAX_REQUESTS
+        emails; failures are left for get_attachments to retry per email.
+        """
+        with self._prefetch_lock:
+            if email_id in self._prefetched_attachments or email_id not in email_ids:
+                return
+            start = email_ids.index(email_id)
+            window = email_ids[start:start + self.outlook.BATCH_MAX_REQUESTS]
+            try:
+                self._prefetched_attachments.update(self.outlook.get_attachments_batch(
+                    window, include_content=not ATTACHMENT_STREAMING_ENABLED))
+            except Exception as e:
+                logger.warning(f"Batch attachment fetch failed, falling back to per-email requests: {str(e)}")
+
+    def _process_email_isolated(self, email: Dict, pending_ids: List[str]) -> Dict:
+        """Process one email in a worker thread, turning any exception into an error result."""
         try:
-            # Generate a hash of the file content
-            with open(file_path, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
-                
-            processed_docs_file = "processed_documents.json"
-            processed_docs = {}
-            
-            # Load existing processed documents
-            if os.path.exists(processed_docs_file):
-                try:
-                    with open(processed_docs_file, 'r') as f:
-                        processed_docs = json.load(f)
-                except json.JSONDecodeError:
-                    logger.error("Error parsing processed_documents.json, treating as empty")
-                    processed_docs = {}
-            
-            # Add this document hash with file path and timestamp
-            processed_docs[file_hash] = {
-                "path": file_path,
-                "processed_at": datetime.now().isoformat(),
-                "file_name": os.path.basename(file_path)
+            self._prefetch_attachments(pending_ids, email['id'])
+            return self._process_single_email(email)
+        except Exception as e:
+            logger.error(f"Uncaught exception processing email {email.get('subject', '')}: {str(e)}", exc_info=True)
+            return {"status": "error", "error": str(e)}
+
+    def _iter_process_emails(self, emails: List[Dict]) -> Iterator[Tuple[Dict, Dict]]:
+        """Process emails on a bounded worker pool, yielding (email, result) as each finishes.
+        
+        Each email gets its own submission directory and extraction store, and
+        a failure in one email never affects the others. Provider concurrency
+        is still capped globally by the shared ExtractionExecutor.
+        """
+        pending_ids = [email['id'] for email in emails]
+        workers = min(self.email_max_workers, len(emails))
+        if workers <= 1:
+            for email in emails:
+                yield email, self._process_email_isolated(email, pending_ids)
+            return
+        
+        logger.info(f"Processing {len(emails)} emails with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email") as pool:
+            futures = {
+                pool.submit(self._process_email_isolated, email, pending_ids): email
+                for email in emails
             }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _extract_documents(self, document_paths: Dict[str, List[str]],
+                           extraction_store: ExtractionResultStore,
+                           excel_rows: Optional[List[Dict]] = None) -> ExtractionResultStore:
+        """
+        Extract the documents the submission still needs into the per-email store.
+        
+        The extraction planner skips documents whose Excel row already has every
+        field they would supply (from the sheet, the MRZ or an earlier document)
+        and scopes the rest to the missing fields. Passports are first read
+        locally from a check-digit validated MRZ; otherwise GPT is tried first
+        with Textract as fallback, with documents extracted concurrently under
+        per-provider limits. All later stages (employee matching, match
+        diagnostics and the data combiner) read from the store.
+        
+        Args:
+            document_paths: Document paths by type
+            extraction_store: Store for this email's extraction results
+            excel_rows: Submission rows, used to plan which documents and fields to extract
             
-            # Save updated processed documents
-            with open(processed_docs_file, 'w') as f:
-                json.dump(processed_docs, f, indent=2)
-                
-            logger.info(f"Marked document as processed: {file_path} (hash: {file_hash})")
+        Returns:
+            The populated extraction store
+        """
+        processors = [('mrz', self.mrz), ('gpt', self.gpt), ('textract', self.textract)]
+        documents = flatten_document_paths(document_paths)
+        planner = ExtractionPlanner(excel_rows, self.DEFAULT_VALUE)
+        logger.info(f"Extracting {len(documents)} documents "
+                    f"(up to {self.extraction_executor.max_workers} concurrently)")
+        try:
+            for result in planner.extract(self.extraction_executor, extraction_store, documents, processors):
+                if result.succeeded:
+                    self._mark_document_processed(result.file_path)
+                else:
+                    logger.warning(f"No data extracted from {result.doc_type} document {result.file_path}: {result.error}")
         except Exception as e:
-            logger.error(f"Error marking document as processed: {str(e)}")
+            logger.error(f"Error extracting documents: {str(e)}", exc_info=True)
+        return extraction_store
+    
+    def _read_excel_rows(self, excel_files: List[str]) -> List[Dict]:
+        """Rows of the submission's Excel files, as read for extraction planning."""
+        rows = []
+        for excel_path in excel_files:
+            try:
+                df, _ = self.excel_processor.process_excel(excel_path, dayfirst=True)
+                rows.extend(df.to_dict('records'))
+            except Exception as e:
+                logger.warning(f"Could not read {os.path.basename(excel_path)} for extraction planning: {str(e)}")
+        return rows
            
     def run_complete_workflow(self, bypass_dedup=False) -> Dict:
         """Run complete workflow from email to final Excel."""
@@ -534,26 +586,11 @@ class WorkflowTester:
             from src.email_tracker.email_tracker import EmailTracker
             email_tracker = EmailTracker()
             
-            # Check tracker file integrity
+            # Processed state of the fetched emails, read in one indexed query
             processed_ids = set()
             try:
-                if os.path.exists("processed_emails.json"):
-                    with open("processed_emails.json", "r") as f:
-                        try:
-                            processed_data = json.load(f)
-                            for email_id in processed_data:
-                                processed_ids.add(email_id)
-                            logger.info(f"Loaded {len(processed_ids)} processed email IDs from tracking file")
-                        except json.JSONDecodeError:
-                            logger.error("Error parsing processed_emails.json, treating as empty")
-                            # Create a backup of the corrupted file
-                            import shutil
-                            backup_name = f"processed_emails.json.corrupted.{int(time.time())}"
-                            shutil.copy2("processed_emails.json", backup_name)
-                            logger.info(f"Created backup of corrupted file: {backup_name}")
-                            # Create a new empty file
-                            with open("processed_emails.json", "w") as f_new:
-                                f_new.write("{}")
+                processed_ids = email_tracker.filter_processed(email['id'] for email in emails if 'id' in email)
+                logger.info(f"{len(processed_ids)} of {len(emails)} fetched emails already in tracker")
             except Exception as e:
                 logger.error(f"Error loading processed email IDs: {str(e)}")
             
@@ -587,62 +624,30 @@ class WorkflowTester:
             if bypass_dedup and len(processed_ids) > 0:
                 logger.warning(f"Reset flag was used but {len(processed_ids)} processed emails still in tracker")
                 
-            results = []
             successful = 0
             skipped = 0
             failed = 0
             failed_emails = []  # Track details of failed emails
             
+            # Emails that will be processed, in fetch order
+            to_process = []
+            queued_ids = set()
             for email in emails:
                 try:
                     email_id = email['id']
                     subject = email.get('subject', '').strip()
                     
-                    # Double-check processing status
-                    is_processed_tracker = email_tracker.is_processed(email_id)
-                    is_processed_direct = email_id in processed_ids
-                    is_processed = is_processed_tracker or is_processed_direct
-                    
                     # Skip if already processed (unless bypassing)
-                    if not bypass_dedup and is_email_processed(email_id):
+                    if not bypass_dedup and (email_id in processed_ids or is_email_processed(email_id)):
                         logger.info(f"Skipping already processed email: {subject}")
                         skipped += 1
                         continue
-                        
-                    # Process email
-                    logger.info(f"Processing email: {subject}")
-                    try:
-                        result = self._process_single_email(email)
-                        results.append(result)
-                        
-                        # Record result
-                        if result['status'] == 'success':
-                            logger.info(f"Successfully processed email: {subject}")
-                            successful += 1
-                            # Record as processed if successful
-                            if not bypass_dedup:
-                                mark_email_processed(email_id)
-                                # Also update our direct tracking set
-                                processed_ids.add(email_id)
-                        else:
-                            logger.error(f"Failed to process email: {subject}, Error: {result.get('error', 'Unknown error')}")
-                            failed += 1
-                            failed_emails.append({
-                                'id': email_id,
-                                'subject': subject,
-                                'error': result.get('error', 'Unknown error'),
-                                'received': email.get('receivedDateTime', 'Unknown')
-                            })
-                            
-                    except Exception as e:
-                        logger.error(f"Uncaught exception processing email {subject}: {str(e)}", exc_info=True)
-                        failed += 1
-                        failed_emails.append({
-                            'id': email_id,
-                            'subject': subject,
-                            'error': str(e),
-                            'received': email.get('receivedDateTime', 'Unknown')
-                        })
+                    if email_id in queued_ids:
+                        logger.info(f"Skipping duplicate of queued email: {subject}")
+                        skipped += 1
+                        continue
+                    to_process.append(email)
+                    queued_ids.add(email_id)
                         
                 except Exception as e:
                     logger.error(f"Error accessing email information: {str(e)}", exc_info=True)
@@ -653,12 +658,35 @@ class WorkflowTester:
                         'error': str(e),
                         'received': email.get('receivedDateTime', 'Unknown')
                     })
-                    continue
+            
+            # Process emails concurrently; counts and tracker updates happen here,
+            # on the calling thread, as each email finishes
+            for email, result in self._iter_process_emails(to_process):
+                email_id = email['id']
+                subject = email.get('subject', '').strip()
+                
+                # Record result
+                if result['status'] == 'success':
+                    logger.info(f"Successfully processed email: {subject}")
+                    successful += 1
+                    # Record as processed if successful
+                    if not bypass_dedup:
+                        mark_email_processed(email_id)
+                        # Also update our direct tracking set
+                        processed_ids.add(email_id)
+                else:
+                    logger.error(f"Failed to process email: {subject}, Error: {result.get('error', 'Unknown error')}")
+                    failed += 1
+                    failed_emails.append({
+                        'id': email_id,
+                        'subject': subject,
+                        'error': result.get('error', 'Unknown error'),
+                        'received': email.get('receivedDateTime', 'Unknown')
+                    })
             
             # Save failed emails info to file for inspection
             if failed_emails:
-                with open('failed_emails_debug.json', 'w') as f:
-                    json.dump(failed_emails, f, indent=2, default=str)
+                write_debug_json('failed_emails_debug.json', failed_emails)
                 logger.info(f"Saved details of {len(failed_emails)} failed emails to failed_emails_debug.json")
             
             logger.info(f"Email processing summary:")
@@ -744,37 +772,10 @@ class WorkflowTester:
             
             logger.info(f"Categorized files: {len(excel_files)} Excel files, {len(document_paths)} documents")
             
-            # Process documents
-            extracted_data = {}
-            if self.gpt:
-                for doc_type, paths in document_paths.items():
-                    if isinstance(paths, list):
-                        for file_path in paths:
-                            try:
-                                # Check if document already processed
-                                if hasattr(self, '_is_document_processed') and self._is_document_processed(file_path):
-                                    logger.info(f"Skipping already processed document: {file_path}")
-                                    # Try to get cached data if available
-                                    if hasattr(self.gpt, '_extracted_cache'):
-                                        for key, value in self.gpt._extracted_cache.items():
-                                            if key not in extracted_data or value != self.DEFAULT_VALUE:
-                                                extracted_data[key] = value
-                                                logger.info(f"Using cached data for {key}: {value}")
-                                    continue
-                                
-                                # Process with GPT
-                                gpt_data = self.gpt.process_document(file_path, doc_type)
-                                
-                                # Mark as processed if successful
-                                if gpt_data and 'error' not in gpt_data and hasattr(self, '_mark_document_processed'):
-                                    self._mark_document_processed(file_path)
-                                    
-                                    # Update extracted data with GPT results
-                                    for key, value in gpt_data.items():
-                                        if key not in extracted_data or value != self.DEFAULT_VALUE:
-                                            extracted_data[key] = value
-                            except Exception as e:
-                                logger.error(f"Error processing {doc_type} with GPT: {str(e)}")
+            # Process documents once; the combiner reuses these results
+            extraction_store = ExtractionResultStore(email_id, self.DEFAULT_VALUE)
+            self._extract_documents(document_paths, extraction_store, self._read_excel_rows(excel_files))
+            extracted_data = extraction_store.merged_fields()
             
             # Process Excel files
             all_excel_rows = []
@@ -853,7 +854,8 @@ class WorkflowTester:
                 output_path,
                 extracted_data,
                 all_excel_rows,
-                document_paths
+                document_paths,
+                documents_data=extraction_store.to_documents_data()
             )
             
             # Create a submission object
@@ -963,14 +965,21 @@ class WorkflowTester:
         process_id = f"{subject}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         try:
-            # Create submission directory
-            submission_dir = os.path.join("processed_submissions", re.sub(r'[^a-zA-Z0-9]', '_', process_id)[:50])
+            # Create submission directory (suffixed with the email id so emails
+            # with the same subject processed in the same second never share one)
+            submission_dir = os.path.join(
+                "processed_submissions",
+                f"{re.sub(r'[^a-zA-Z0-9]', '_', process_id)[:50]}_{re.sub(r'[^a-zA-Z0-9]', '', email_id)[-8:]}"
+            )
             os.makedirs(submission_dir, exist_ok=True)
             
             # Step 2: Get and save attachments
             logger.info(f"Processing email {email_id} with subject: {subject}")
             try:
-                attachments = self.outlook.get_attachments(email_id)
+                attachments = self._prefetched_attachments.pop(email_id, None)
+                if attachments is None:
+                    attachments = self.outlook.get_attachments(
+                        email_id, include_content=not ATTACHMENT_STREAMING_ENABLED)
                 logger.info(f"Retrieved {len(attachments)} attachments from email")    
                 logger.info("=" * 80)
                 
@@ -1149,72 +1158,16 @@ class WorkflowTester:
                     logger.error(f"Error in large client Excel detection: {str(e)}")
                     # Continue with normal processing
 
-            # Step 4: Process all documents
+            # Step 4: Process all documents (once - later stages read from the store)
             try:
                 logger.info(f"Processing {len(document_paths)} documents")
-                extracted_data = {}
-                
-                # Process documents with GPT only
-                if self.gpt:
-                    for doc_type, paths in document_paths.items():
-                        if isinstance(paths, list):
-                            # Handle list of paths (new structure)
-                            for file_path in paths:
-                                try:
-                                    # Check if document already processed
-                                    if self._is_document_processed(file_path):
-                                        logger.info(f"Skipping already processed document: {file_path}")
-                                        continue
-                                        
-                                    logger.info(f"Processing {doc_type} with GPT: {file_path}")
-                                    gpt_data = self.gpt.process_document(file_path, doc_type)
-                                    
-                                    # Mark as processed if successful
-                                    if gpt_data and 'error' not in gpt_data:
-                                        self._mark_document_processed(file_path)
-                                    
-                                    # Check if GPT extraction was successful
-                                    if gpt_data and 'error' not in gpt_data:
-                                        logger.info(f"GPT successfully extracted data from {doc_type}")
-                                        # Update extracted data, giving priority to GPT results
-                                        for key, value in gpt_data.items():
-                                            if key not in extracted_data or value != self.DEFAULT_VALUE:
-                                                extracted_data[key] = value
-                                    else:
-                                        logger.warning(f"GPT extraction failed for {doc_type}")
-                                except Exception as e:
-                                    logger.error(f"Error processing {doc_type} with GPT: {str(e)}", exc_info=True)
-                        else:
-                            # Handle single path (old structure)
-                            try:
-                                # Check if document already processed
-                                if self._is_document_processed(paths):
-                                    logger.info(f"Skipping already processed document: {paths}")
-                                    continue
-                                    
-                                logger.info(f"Processing {doc_type} with GPT: {paths}")
-                                gpt_data = self.gpt.process_document(paths, doc_type)
-                                
-                                # Mark as processed if successful
-                                if gpt_data and 'error' not in gpt_data:
-                                    self._mark_document_processed(paths)
-                                
-                                # Check if GPT extraction was successful
-                                if gpt_data and 'error' not in gpt_data:
-                                    logger.info(f"GPT successfully extracted data from {doc_type}")
-                                    # Update extracted data, giving priority to GPT results
-                                    for key, value in gpt_data.items():
-                                        if key not in extracted_data or value != self.DEFAULT_VALUE:
-                                            extracted_data[key] = value
-                                else:
-                                    logger.warning(f"GPT extraction failed for {doc_type}")
-                            except Exception as e:
-                                logger.error(f"Error processing {doc_type} with GPT: {str(e)}", exc_info=True)
-                else:
-                    logger.warning("GPT processor not available. Document processing will be limited.")
+                extraction_store = ExtractionResultStore(email_id, self.DEFAULT_VALUE)
+                self._extract_documents(document_paths, extraction_store, self._read_excel_rows(excel_files))
+                extracted_data = extraction_store.merged_fields()
                 
                 # Log the combined extracted data
                 logger.info(f"Combined extracted data contains {len(extracted_data)} fields: {list(extracted_data.keys())}")
+                logger.info(f"Extraction summary: {extraction_store.get_summary()}")
                 
             except Exception as e:
                 logger.error(f"Error processing documents: {str(e)}", exc_info=True)
@@ -1348,158 +1301,9 @@ class WorkflowTester:
             if document_paths and all_excel_rows:
                 logger.info(f"Attempting to match {len(document_paths)} documents to {len(all_excel_rows)} employees")
                 
-                # Process each document type to extract data
-                doc_data_by_type = {}
-                for doc_type, paths in document_paths.items():
-                    if isinstance(paths, list):
-                        # Handle list of paths (new structure)
-                        for file_path in paths:
-                            try:
-                                # Check if document already processed
-                                if self._is_document_processed(file_path):
-                                    logger.info(f"Skipping already processed document: {file_path}")
-                                    continue
-                                    
-                                # Process with GPT first if available
-                                if self.gpt:
-                                    try:
-                                        doc_data = self.gpt.process_document(file_path, doc_type)
-                                        
-                                        # Mark as processed if successful
-                                        if doc_data and 'error' not in doc_data:
-                                            self._mark_document_processed(file_path)
-                                            
-                                            if doc_type not in doc_data_by_type:
-                                                doc_data_by_type[doc_type] = {}
-                                            # Merge with existing data
-                                            for key, value in doc_data.items():
-                                                doc_data_by_type[doc_type][key] = value
-                                            continue
-                                    except Exception as e:
-                                        logger.warning(f"GPT extraction failed for {doc_type}, using Textract: {str(e)}")
-
-                                # Fallback to Textract
-                                doc_data = self.textract.process_document(file_path, doc_type)
-                                # Mark as processed after Textract (if not marked already by GPT)
-                                self._mark_document_processed(file_path)
-                                if doc_type not in doc_data_by_type:
-                                    doc_data_by_type[doc_type] = {}
-                                # Merge with existing data
-                                for key, value in doc_data.items():
-                                    doc_data_by_type[doc_type][key] = value
-                            except Exception as e:
-                                logger.error(f"Error processing {doc_type} document: {str(e)}")
-                    else:
-                        # Handle single path (old structure)
-                        try:
-                            # Check if document already processed
-                            if self._is_document_processed(paths):
-                                logger.info(f"Skipping already processed document: {paths}")
-                                continue
-                                
-                            # Process with GPT first if available
-                            if self.gpt:
-                                try:
-                                    doc_data = self.gpt.process_document(paths, doc_type)
-                                    
-                                    # Mark as processed if successful
-                                    if doc_data and 'error' not in doc_data:
-                                        self._mark_document_processed(paths)
-                                        doc_data_by_type[doc_type] = doc_data
-                                        continue
-                                except Exception as e:
-                                    logger.warning(f"GPT extraction failed for {doc_type}, using Textract: {str(e)}")
-
-                            # Fallback to Textract
-                            doc_data = self.textract.process_document(paths, doc_type)
-                            # Mark as processed after Textract (if not marked already by GPT)
-                            self._mark_document_processed(paths)
-                            doc_data_by_type[doc_type] = doc_data
-                        except Exception as e:
-                            logger.error(f"Error processing {doc_type} document: {str(e)}")
-                
                 # Process each Excel row INDIVIDUALLY with better matching logic
                 all_excel_rows = []
-                doc_data_by_type = {}
-
-                # First extract data from all documents
-                for doc_type, paths in document_paths.items():
-                    if isinstance(paths, list):
-                        # Handle list of paths (new structure)
-                        for file_path in paths:
-                            try:
-                                # Check if document already processed
-                                if self._is_document_processed(file_path):
-                                    logger.info(f"Skipping already processed document: {file_path}")
-                                    continue
-                                    
-                                # Process with GPT first if available (prioritize GPT as mentioned)
-                                if self.gpt:
-                                    try:
-                                        doc_data = self.gpt.process_document(file_path, doc_type)
-                                        if doc_data and 'error' not in doc_data:
-                                            # Mark as processed if successful
-                                            self._mark_document_processed(file_path)
-                                            
-                                            if doc_type not in doc_data_by_type:
-                                                doc_data_by_type[doc_type] = {}
-                                            # Merge with existing data
-                                            for key, value in doc_data.items():
-                                                doc_data_by_type[doc_type][key] = value
-                                            logger.info(f"GPT successfully extracted data from {doc_type}")
-                                            continue  # Skip Textract if GPT succeeded
-                                    except Exception as e:
-                                        logger.warning(f"GPT extraction failed for {doc_type}, using Textract: {str(e)}")
-
-                                # Fallback to Textract
-                                doc_data = self.textract.process_document(file_path, doc_type)
-                                # Mark as processed after Textract (if not marked already by GPT)
-                                self._mark_document_processed(file_path)
-                                if doc_type not in doc_data_by_type:
-                                    doc_data_by_type[doc_type] = {}
-                                # Merge with existing data
-                                for key, value in doc_data.items():
-                                    doc_data_by_type[doc_type][key] = value
-                                logger.info(f"Textract extracted data from {doc_type}")
-                            except Exception as e:
-                                logger.error(f"Error processing {doc_type} document: {str(e)}")
-                    else:
-                        # Handle single path (old structure)
-                        try:
-                            # Check if document already processed
-                            if self._is_document_processed(paths):
-                                logger.info(f"Skipping already processed document: {paths}")
-                                continue
-                                
-                            # Process with GPT first if available (prioritize GPT as mentioned)
-                            if self.gpt:
-                                try:
-                                    doc_data = self.gpt.process_document(paths, doc_type)
-                                    if doc_data and 'error' not in doc_data:
-                                        # Mark as processed if successful
-                                        self._mark_document_processed(paths)
-                                        
-                                        doc_data_by_type[doc_type] = doc_data
-                                        logger.info(f"GPT successfully extracted data from {doc_type}")
-                                        continue  # Skip Textract if GPT succeeded
-                                except Exception as e:
-                                    logger.warning(f"GPT extraction failed for {doc_type}, using Textract: {str(e)}")
-
-                            # Fallback to Textract
-                            doc_data = self.textract.process_document(paths, doc_type)
-                            # Mark as processed after Textract (if not marked already by GPT)
-                            self._mark_document_processed(paths)
-                            doc_data_by_type[doc_type] = doc_data
-                            logger.info(f"Textract extracted data from {doc_type}")
-                        except Exception as e:
-                            logger.error(f"Error processing {doc_type} document: {str(e)}")
-
-                # Combine all document data into one dictionary for template population
-                extracted_data = {}
-                for doc_data in doc_data_by_type.values():
-                    for key, value in doc_data.items():
-                        if key not in extracted_data or (value != self.DEFAULT_VALUE and extracted_data[key] == self.DEFAULT_VALUE):
-                            extracted_data[key] = value
+                doc_data_by_type = extraction_store.fields_by_type()
 
                 # Process each Excel row with individual document matching
                 for excel_file in excel_files:
@@ -1507,7 +1311,7 @@ class WorkflowTester:
                         df, errors = self.excel_processor.process_excel(excel_file, dayfirst=True)
                         if not df.empty:
                             # Create document matching diagnostics
-                            self._log_document_matches(document_paths, df.to_dict('records'), doc_data_by_type)
+                            self._log_document_matches(document_paths, df.to_dict('records'), extraction_store)
                             
                             # Process each row individually
                             for _, row in df.iterrows():
@@ -1713,72 +1517,6 @@ class WorkflowTester:
                             # Check if we're using GPT or Textract
                             logger.info(f"OCR processors: GPT available: {self.gpt is not None}, Textract available: {self.textract is not None}")
 
-                            # Add this fix to ensure document data is properly processed
-                            # If no document data was extracted and documents exist, force processing with Textract
-                            if not doc_data_by_type and document_paths:
-                                logger.warning("No document data extracted but documents exist. Forcing extraction with Textract...")
-                                
-                                # Force processing with Textract
-                                for doc_type, paths in document_paths.items():
-                                    if isinstance(paths, list):
-                                        # Handle list of paths (new structure)
-                                        for file_path in paths:
-                                            try:
-                                                # Check if document already processed
-                                                if self._is_document_processed(file_path):
-                                                    logger.info(f"Skipping already processed document: {file_path}")
-                                                    continue
-                                                    
-                                                logger.info(f"Force processing {doc_type} with Textract: {file_path}")
-                                                textract_data = self.textract.process_document(file_path, doc_type)
-                                                
-                                                # Mark as processed after Textract
-                                                self._mark_document_processed(file_path)
-                                                if doc_type not in doc_data_by_type:
-                                                    doc_data_by_type[doc_type] = {}
-                                                # Merge with existing data
-                                                for key, value in textract_data.items():
-                                                    doc_data_by_type[doc_type][key] = value
-                                                
-                                                # Update the combined extracted data
-                                                for key, value in textract_data.items():
-                                                    if key not in extracted_data or (value != self.DEFAULT_VALUE and extracted_data[key] == self.DEFAULT_VALUE):
-                                                        extracted_data[key] = value
-                                            except Exception as e:
-                                                logger.error(f"Error in forced processing of {doc_type} document: {str(e)}", exc_info=True)
-                                    else:
-                                        # Handle single path (old structure)
-                                        try:
-                                            # Check if document already processed
-                                            if self._is_document_processed(paths):
-                                                logger.info(f"Skipping already processed document: {paths}")
-                                                continue
-                                                
-                                            logger.info(f"Force processing {doc_type} with Textract: {paths}")
-                                            textract_data = self.textract.process_document(paths, doc_type)
-                                            
-                                            # Mark as processed after Textract
-                                            self._mark_document_processed(paths)
-                                            doc_data_by_type[doc_type] = textract_data
-                                            
-                                            # Update the combined extracted data
-                                            for key, value in textract_data.items():
-                                                if key not in extracted_data or (value != self.DEFAULT_VALUE and extracted_data[key] == self.DEFAULT_VALUE):
-                                                    extracted_data[key] = value
-                                        except Exception as e:
-                                            logger.error(f"Error in forced processing of {doc_type} document: {str(e)}", exc_info=True)
-                                
-                                # Log the updated extracted data
-                                if doc_data_by_type:
-                                    logger.info("Updated document data after forced extraction:")
-                                    for doc_type, doc_data in doc_data_by_type.items():
-                                        logger.info(f"Data from {doc_type}:")
-                                        for key, value in doc_data.items():
-                                            if value != self.DEFAULT_VALUE:
-                                                logger.info(f"  - {key}: {value}")
-                                else:
-                                    logger.error("STILL NO DOCUMENT DATA AFTER FORCED EXTRACTION!")
-
                             # Also check Excel data
                             logger.info("Excel data diagnostics:")
                             logger.info(f"Excel files found: {len(excel_files)}")
@@ -1874,7 +1612,8 @@ class WorkflowTester:
                     output_path,
                     extracted_data,
                     all_excel_rows,  # Pass the Excel data directly
-                    document_paths
+                    document_paths,
+                    documents_data=extraction_store.to_documents_data()
                 )
                 
                 logger.info(f"Data combination result: {result['status']}, rows processed: {result.get('rows_processed', 0)}")
@@ -2420,26 +2159,8 @@ class WorkflowTester:
             }
 
     def _determine_file_type(self, file_path: str) -> str:
-        """Determine file type from filename and content if possible."""
-        name = file_path.lower()
-        
-        # First check extensions for common file types
-        if name.endswith(('.xlsx', '.xls')):
-            return 'excel'
-            
-        # If content-based detection is available, use it here
-        # For now, fallback to filename-based classification with improvements
-        if 'passport' in name:
-            return 'passport'
-        elif 'emirates' in name or 'eid' in name or 'id card' in name:
-            return 'emirates_id'
-        elif 'visa' in name or 'permit' in name or 'residence' in name:
-            return 'visa'
-            
-        # Try additional checks for content if unable to determine from filename
-        # For example, check file size, basic content patterns, etc.
-        
-        return 'unknown'
+        """Route a saved attachment by filename and file header, without cloud OCR."""
+        return self.classifier.classify(file_path).doc_type
     
     def get_completed_submissions(self) -> List[CompletedSubmission]:
         """Get list of completed submissions."""
@@ -2506,10 +2227,21 @@ class WorkflowTester:
             logger.error(f"Error checking data transfer: {str(e)}")
             return False
     
-    def _match_documents_to_employees(self, document_paths: Dict[str, str], all_excel_rows: List[Dict]) -> Dict[int, Dict[str, str]]:
-        """Match documents to specific employees based on name matching."""
+    def _match_documents_to_employees(self, document_paths: Dict[str, str], all_excel_rows: List[Dict],
+                                      extraction_store: Optional[ExtractionResultStore] = None) -> Dict[int, Dict[str, str]]:
+        """Match documents to specific employees based on name matching.
+        
+        Args:
+            document_paths: Document paths by type
+            all_excel_rows: Excel rows for the submission
+            extraction_store: Per-email extraction results; documents missing from
+                the store are extracted with Textract and added to it
+        """
         if not document_paths or not all_excel_rows:
             return {}
+        
+        if extraction_store is None:
+            extraction_store = ExtractionResultStore(default_value=self.DEFAULT_VALUE)
             
         # Extract employee names from Excel
         employee_names = []
@@ -2524,66 +2256,12 @@ class WorkflowTester:
                 'full_name': full_name
             })
         
-        # For each document, try to extract name and match to employee
+        # For each document, look up extracted name and match to employee
         document_matches = {}
         for doc_type, paths in document_paths.items():
-            if isinstance(paths, list):
-                # Handle list of paths (new structure)
-                for file_path in paths:
-                    try:
-                        # Check if document already processed
-                        if self._is_document_processed(file_path):
-                            logger.info(f"Skipping already processed document: {file_path}")
-                            continue
-                            
-                        # Process document to extract data
-                        doc_data = self.textract.process_document(file_path, doc_type)
-
-                        # Mark as processed
-                        self._mark_document_processed(file_path)
-                        
-                        # Look for name in extracted data
-                        extracted_name = None
-                        for field in ['name', 'full_name']:
-                            if field in doc_data and doc_data[field] != '.':
-                                extracted_name = doc_data[field]
-                                break
-                        
-                        if not extracted_name:
-                            continue
-                            
-                        # Find best employee match
-                        best_match = None
-                        best_score = 0
-                        for emp in employee_names:
-                            score = self._calculate_name_match_score(extracted_name, emp['full_name'])
-                            if score > best_score:
-                                best_score = score
-                                best_match = emp
-                        
-                        # If good match found, assign document to employee
-                        if best_match and best_score > 50:
-                            idx = best_match['index']
-                            if idx not in document_matches:
-                                document_matches[idx] = {}
-                            document_matches[idx][doc_type] = file_path
-                            logger.info(f"Matched {doc_type} to employee {best_match['full_name']} (score: {best_score})")
-                            
-                    except Exception as e:
-                        logger.error(f"Error matching document {doc_type} ({file_path}): {str(e)}")
-            else:
-                # Handle single path (old structure)
+            for file_path in (paths if isinstance(paths, list) else [paths]):
                 try:
-                    # Check if document already processed
-                    if self._is_document_processed(file_path):
-                        logger.info(f"Skipping already processed document: {file_path}")
-                        continue
-                        
-                    # Process document to extract data
-                    doc_data = self.textract.process_document(file_path, doc_type)
-
-                    # Mark as processed
-                    self._mark_document_processed(file_path)
+                    doc_data = extraction_store.extract(file_path, doc_type, [('textract', self.textract)]).fields
                     
                     # Look for name in extracted data
                     extracted_name = None
@@ -2609,11 +2287,11 @@ class WorkflowTester:
                         idx = best_match['index']
                         if idx not in document_matches:
                             document_matches[idx] = {}
-                        document_matches[idx][doc_type] = paths
+                        document_matches[idx][doc_type] = file_path
                         logger.info(f"Matched {doc_type} to employee {best_match['full_name']} (score: {best_score})")
                         
                 except Exception as e:
-                    logger.error(f"Error matching document {doc_type} ({paths}): {str(e)}")
+                    logger.error(f"Error matching document {doc_type} ({file_path}): {str(e)}")
 
         return document_matches
 
@@ -3300,6 +2978,13 @@ class WorkflowTester:
             
     # This function needs to be fixed in test_complete_workflow.py to prevent the TypeError
 
+    def _get_document_data(self, extracted_data_by_document, doc_type: str, path: str) -> Dict[str, str]:
+        """Look up extracted fields for one document from the store (or a by-type dict)."""
+        if isinstance(extracted_data_by_document, ExtractionResultStore):
+            result = extracted_data_by_document.get_for_path(doc_type, path)
+            return result.fields if result else {}
+        return extracted_data_by_document.get(doc_type, {})
+
     def _log_document_matches(self, document_paths, excel_data, extracted_data_by_document):
         """
         Create detailed debug logs for document to employee matching.
@@ -3307,7 +2992,8 @@ class WorkflowTester:
         Args:
             document_paths: Dict of document paths by type
             excel_data: List of dictionaries with Excel data
-            extracted_data_by_document: Dict of extracted data by document type
+            extracted_data_by_document: ExtractionResultStore for the email, or a
+                dict of extracted data by document type
         
         Returns:
             Dict with matching statistics
@@ -3339,9 +3025,7 @@ class WorkflowTester:
                         }
                         
                         # Extract key identifiers from document
-                        doc_data = {}
-                        if doc_type in extracted_data_by_document:
-                            doc_data = extracted_data_by_document[doc_type]
+                        doc_data = self._get_document_data(extracted_data_by_document, doc_type, path)
                         
                         # Add key identifiers
                         for id_type, field_names in [
@@ -3371,9 +3055,7 @@ class WorkflowTester:
                     }
                     
                     # Extract key identifiers from document
-                    doc_data = {}
-                    if doc_type in extracted_data_by_document:
-                        doc_data = extracted_data_by_document[doc_type]
+                    doc_data = self._get_document_data(extracted_data_by_document, doc_type, paths)
                     
                     # Add key identifiers
                     for id_type, field_names in [
@@ -3532,9 +3214,9 @@ class WorkflowTester:
         
         # Save diagnostics to file
         try:
-            with open('document_matches.json', 'w') as f:
-                json.dump(diagnostics, f, indent=2, default=str)
-            logger.info(f"Saved document matching diagnostics to document_matches.json")
+            debug_file = debug_file_name('document_matches', getattr(extracted_data_by_document, 'email_id', None))
+            write_debug_json(debug_file, diagnostics)
+            logger.info(f"Saved document matching diagnostics to {debug_file}")
         except Exception as e:
             logger.error(f"Error saving document matching diagnostics: {str(e)}")
         
@@ -3739,17 +3421,8 @@ def run_validation(output_dir: str):
     return valid_count == len(validation_results)
 
 def reset_processed_emails():
-    """Simple reset for email tracking."""
-    processed_file = "processed_emails_simple.txt"
-    
-    # Delete and recreate the file
-    if os.path.exists(processed_file):
-        os.remove(processed_file)
-        logger.info(f"Removed {processed_file}")
-    
-    # Create empty file
-    with open(processed_file, 'w') as f:
-        pass
+    """Reset email tracking (processed folders and documents are kept)."""
+    get_dedupe_ledger().reset(EMAIL)
     logger.info("Reset processed emails tracking")
         
 def run_diagnostics():
@@ -3800,14 +3473,12 @@ def run_diagnostics():
     
     
 def force_deduplication(emails, processed_file="processed_emails.json"):
-    """Force deduplication by directly checking the file."""
-    if not os.path.exists(processed_file):
-        return emails
-        
+    """Force deduplication against the email tracker database."""
     try:
-        with open(processed_file, 'r') as f:
-            processed = json.load(f)
-            processed_ids = set(processed.keys())
+        from src.email_tracker.email_tracker import EmailTracker
+        processed_ids = EmailTracker(processed_file).filter_processed(
+            e.get('id') for e in emails if e.get('id')
+        )
             
         original_count = len(emails)
         emails = [e for e in emails if e.get('id') not in processed_ids]
@@ -196,7 +196,8 @@ def test_document_processing():
             logger.info(f"Original: {date_str}, Normalized: {normalized}")
         
         # Test caching mechanism (can only verify it doesn't error)
-        cache_key = processor._get_cache_key("test_file.pdf", "passport")
+        from src.utils.extraction_cache import ExtractionCache
+        cache_key = ExtractionCache.make_key("0" * 64, "textract", "passport", processor.PROMPT_VERSION)
         logger.info(f"Generated cache key: {cache_key}")
         
         # We can't fully test extraction without real AWS credentials
@@ -8,6 +8,11 @@ from unittest.mock import Mock
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keep processors from reading/writing the shared on-disk extraction cache during tests
+os.environ.setdefault("EXTRACTION_CACHE_ENABLED", "False")
+# Failures simulated by one test must not open a provider circuit for the next
+os.environ.setdefault("CIRCUIT_BREAKER_ENABLED", "False")
+
 def pytest_configure(config):
     """Configure test environment."""
     # Register custom markers
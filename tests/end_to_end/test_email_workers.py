@@ -0,0 +1,83 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import test_complete_workflow as workflow
+from src.email_tracker.email_tracker import EmailTracker
+
+SERVICES = (
+    "OutlookClient", "AttachmentHandler", "TextractProcessor", "FolderProcessor",
+    "GPTProcessor", "EnhancedDocumentProcessorService", "FileSharer", "ExcelProcessor",
+    "ExtractionExecutor", "DataCombiner", "ProcessTracker", "TeamsNotifier", "EmailSender",
+)
+
+
+@pytest.fixture
+def tester(tmp_path, monkeypatch):
+    """WorkflowTester with stubbed Graph and processors, running in a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    with patch.multiple(workflow, **{name: MagicMock() for name in SERVICES}):
+        tester = workflow.WorkflowTester()
+    tester.folder_processor.check_for_documents.return_value = []
+    tester.outlook.get_attachments_batch.return_value = {}
+    tester.email_max_workers = 4
+    return tester
+
+
+def emails(count):
+    return [{"id": f"m{i}", "subject": f"Addition {i}"} for i in range(count)]
+
+
+def test_emails_are_processed_concurrently_with_consistent_counts(tester):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def process(email):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        if email["id"] == "m3":
+            raise RuntimeError("extractor crashed")
+        if email["id"] == "m5":
+            return {"status": "error", "error": "No valid attachments found"}
+        return {"status": "success"}
+
+    tester._process_single_email = process
+    tester.outlook.fetch_emails.return_value = emails(12) + [{"id": "m0", "subject": "Addition 0"}]
+
+    result = tester.run_complete_workflow()
+
+    assert (result["successful"], result["failed"], result["skipped"]) == (10, 2, 1)
+    assert 1 < peak[0] <= 4
+    assert set(EmailTracker().get_processed_ids()) == {f"m{i}" for i in range(12)} - {"m3", "m5"}
+
+
+def test_processed_emails_are_skipped_on_the_next_poll(tester):
+    tester._process_single_email = MagicMock(return_value={"status": "success"})
+    tester.outlook.fetch_emails.return_value = emails(5)
+
+    tester.run_complete_workflow()
+    result = tester.run_complete_workflow()
+
+    assert (result["successful"], result["failed"]) == (0, 0)
+    assert tester._process_single_email.call_count == 5
+
+
+def test_document_match_diagnostics_are_written_per_email(tester, tmp_path):
+    def process(email):
+        store = MagicMock(email_id=f"AAMk/{email['id']}==")
+        tester._log_document_matches({}, [{"First Name": email["id"]}], store)
+        return {"status": "success"}
+
+    tester._process_single_email = process
+    tester.outlook.fetch_emails.return_value = emails(6)
+
+    tester.run_complete_workflow()
+
+    written = sorted(p.name for p in tmp_path.glob("document_matches_*.json"))
+    assert written == [f"document_matches_AAMk_m{i}__.json" for i in range(6)]
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,78 @@
+import pytest
+
+from src.document_processor.document_classifier import DocumentClassifier
+
+# ICAO 9303 specimen passport MRZ
+TD3 = ("P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\n"
+       "L898902C36UTO7408122F1204159ZE184226B<<<<<10")
+
+
+def _fail_reader(path):
+    raise AssertionError(f"OCR should not run for {path}")
+
+
+@pytest.mark.parametrize('name, doc_type', [
+    ('members.xlsx', 'excel'),
+    ('PASSPORT_front.pdf', 'passport'),
+    ('eid_back.jpg', 'emirates_id'),
+    ('residence_permit.pdf', 'visa'),
+    ('EmiratesID-2.jpg', 'emirates_id'),
+    ('ID Card.png', 'emirates_id'),
+    # Keywords inside other words do not count ('eid' in Heidi and Reid)
+    ('Heidi_Mueller_visa.pdf', 'visa'),
+    ('Reid_residence.pdf', 'visa'),
+])
+def test_filename_decides_without_ocr(name, doc_type):
+    result = DocumentClassifier().classify(name, text_reader=_fail_reader)
+
+    assert result.doc_type == doc_type
+    assert result.stage == 'filename'
+
+
+def test_keyword_inside_a_word_leaves_the_type_to_the_text(tmp_path):
+    scan = tmp_path / 'Heidi_Mueller.pdf'
+    scan.write_bytes(b'%PDF-1.4\n')
+
+    result = DocumentClassifier().classify(str(scan), text_reader=lambda path: "ENTRY PERMIT VISA")
+
+    assert (result.doc_type, result.stage) == ('visa', 'text')
+
+
+def test_local_mrz_decides_from_header(tmp_path):
+    scan = tmp_path / 'scan_001.jpg'
+    scan.write_bytes(b'\xff\xd8\xff\xe0' + b'\x00' * 16)
+    classifier = DocumentClassifier(mrz_reader=lambda path: TD3)
+
+    result = classifier.classify(str(scan), text_reader=_fail_reader)
+
+    assert (result.doc_type, result.stage) == ('passport', 'header')
+
+
+def test_non_document_files_are_unknown_without_ocr(tmp_path):
+    notes = tmp_path / 'notes.txt'
+    notes.write_text('PASSPORT NO A1234567')
+
+    result = DocumentClassifier().classify(str(notes), text_reader=_fail_reader)
+
+    assert result.doc_type == 'unknown'
+
+
+def test_text_stage_reads_only_when_needed(tmp_path):
+    scan = tmp_path / 'scan_002.pdf'
+    scan.write_bytes(b'%PDF-1.4\n')
+    calls = []
+
+    def reader(path):
+        calls.append(path)
+        return "UNITED ARAB EMIRATES IDENTITY CARD ID NUMBER 784-1990-1234567-1"
+
+    result = DocumentClassifier().classify(str(scan), text_reader=reader)
+
+    assert (result.doc_type, result.stage) == ('emirates_id', 'text')
+    assert calls == [str(scan)]
+
+
+def test_mrz_in_text_overrides_keywords():
+    doc_type, confidence = DocumentClassifier().classify_text("VISA ENTRY PERMIT\n" + TD3)
+
+    assert (doc_type, confidence) == ('passport', 1.0)
@@ -0,0 +1,46 @@
+import pytest
+
+from src.document_processor.image_payload import (
+    DEFAULT_BUDGETS, ImageBudget, estimate_image_tokens, get_budget
+)
+from src.utils.rate_limiter import estimate_chat_tokens
+
+
+def test_image_tokens_follow_tile_pricing():
+    assert estimate_image_tokens(4000, 3000, 'low') == 85
+    # 4000x3000 -> 2048x1536 -> 1024x768: 2x2 tiles
+    assert estimate_image_tokens(4000, 3000) == 85 + 170 * 4
+    assert estimate_image_tokens(1200, 760) == 85 + 170 * 6
+
+
+def test_budget_falls_back_to_default():
+    assert get_budget('emirates_id') is DEFAULT_BUDGETS['emirates_id']
+    assert get_budget('unknown') is DEFAULT_BUDGETS['default']
+    assert get_budget(None, {'default': DEFAULT_BUDGETS['visa']}) is DEFAULT_BUDGETS['visa']
+
+
+def test_low_detail_images_reserve_fewer_tokens():
+    low = [{'role': 'user', 'content': [{'type': 'image_url', 'image_url': {'url': 'x', 'detail': 'low'}}]}]
+    high = [{'role': 'user', 'content': [{'type': 'image_url', 'image_url': {'url': 'x', 'detail': 'high'}}]}]
+
+    assert estimate_chat_tokens(low) < estimate_chat_tokens(high)
+
+
+def test_scan_is_cropped_downscaled_and_fits_budget(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    from src.document_processor.image_payload import prepare_image_payload
+
+    # Noisy card on a white scanner bed
+    scan = Image.new('RGB', (2800, 2000), 'white')
+    card = Image.effect_noise((1712, 1080), 80).convert('RGB')
+    scan.paste(card, (500, 400))
+    path = tmp_path / 'eid.png'
+    scan.save(path)
+    budget = ImageBudget(max_side=1200, max_bytes=150 * 1024, crop='document')
+
+    payload = prepare_image_payload(str(path), 'emirates_id', {'emirates_id': budget})
+
+    assert len(payload.data) <= budget.max_bytes
+    assert max(payload.width, payload.height) <= 1200
+    assert abs(payload.width / payload.height - 1712 / 1080) < 0.02
+    assert payload.image_url()['image_url']['url'].startswith('data:image/jpeg;base64,')
@@ -0,0 +1,50 @@
+import pytest
+
+from src.document_processor.image_preprocessing import (
+    ImagePreprocessor, ImageQuality, plan_steps, preprocess_image
+)
+
+
+def test_clean_scan_needs_no_steps():
+    assert plan_steps(ImageQuality(2000, 1300, blur=450, contrast=70, noise=2)) == []
+
+
+@pytest.mark.parametrize('quality, steps', [
+    (ImageQuality(4000, 3000, blur=450, contrast=70, noise=2), ['downscale']),
+    (ImageQuality(800, 500, blur=450, contrast=70, noise=2), ['upscale']),
+    (ImageQuality(2000, 1300, blur=40, contrast=25, noise=2), ['contrast', 'sharpen']),
+    # Denoising already smooths, so a noisy image is not sharpened as well
+    (ImageQuality(2000, 1300, blur=40, contrast=70, noise=12), ['denoise']),
+])
+def test_only_needed_steps_are_planned(quality, steps):
+    assert plan_steps(quality) == steps
+
+
+def test_clean_image_bytes_pass_through(tmp_path):
+    cv2 = pytest.importorskip('cv2')
+    np = pytest.importorskip('numpy')
+    rng = np.random.default_rng(0)
+    image = np.kron(rng.integers(0, 2, (100, 150), dtype=np.uint8) * 255, np.ones((12, 12), np.uint8))
+    path = tmp_path / 'eid.png'
+    cv2.imwrite(str(path), image)
+
+    data, steps = preprocess_image(str(path))
+
+    assert steps == []
+    assert data == path.read_bytes()
+    assert not list(tmp_path.glob('*_processed*'))
+
+
+def test_flat_small_scan_is_prepared_in_memory(tmp_path):
+    cv2 = pytest.importorskip('cv2')
+    np = pytest.importorskip('numpy')
+    image = np.full((400, 600), 120, np.uint8)
+    cv2.putText(image, 'PASSPORT', (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 2, 140, 3)
+    path = tmp_path / 'passport.jpg'
+    cv2.imwrite(str(path), image)
+
+    data = ImagePreprocessor(max_workers=0).preprocess(str(path))
+    prepared = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+    assert max(prepared.shape) == 1600
+    assert [p.name for p in tmp_path.iterdir()] == ['passport.jpg']
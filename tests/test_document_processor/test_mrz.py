@@ -0,0 +1,135 @@
+import logging
+import sys
+
+import pytest
+
+from src.document_processor import mrz_processor
+from src.document_processor.mrz import check_digit, parse_mrz
+from src.document_processor.mrz_processor import MRZProcessor, read_mrz_band
+from src.document_processor.textract_processor import TextractProcessor
+from src.services.extraction_store import ExtractionResultStore
+
+# ICAO 9303 specimen documents
+TD3 = ("P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\n"
+       "L898902C36UTO7408122F1204159ZE184226B<<<<<10")
+TD2 = ("I<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<\n"
+       "D231458907UTO7408122F1204159<<<<<<<6")
+TD1 = ("I<UTOD231458907<<<<<<<<<<<<<<<\n"
+       "7408122F1204159UTO<<<<<<<<<<<6\n"
+       "ERIKSSON<<ANNA<MARIA<<<<<<<<<<")
+
+
+def test_check_digit():
+    assert check_digit('L898902C3') == '6'
+    assert check_digit('740812') == '2'
+    assert check_digit('<<<<<<<<<<<<<<') == '0'
+
+
+@pytest.mark.parametrize('text, doc_format, number', [
+    (TD3, 'TD3', 'L898902C3'),
+    (TD2, 'TD2', 'D23145890'),
+    (TD1, 'TD1', 'D23145890'),
+])
+def test_parses_every_format(text, doc_format, number):
+    mrz = parse_mrz("REPUBLIC OF UTOPIA\nPASSPORT\n" + text)
+
+    assert mrz.doc_format == doc_format
+    assert mrz.valid and not mrz.repaired
+    assert mrz.fields['document_number'] == number
+    assert mrz.fields['surname'] == 'ERIKSSON'
+    assert mrz.fields['given_names'] == 'ANNA MARIA'
+    assert mrz.fields['date_of_birth'] == '12/08/1974'
+    assert mrz.fields['date_of_expiry'] == '15/04/2012'
+    assert mrz.fields['gender'] == 'F'
+
+
+def test_repairs_ocr_confusions():
+    # O/0 and I/1 swapped, fillers read as '«' and trailing fillers dropped
+    text = ("P<UT0ERIKSSON«<ANNA<MARIA<<<<<\n"
+            "L8989O2C36UT07408I22F12O4159ZE184226B<<<<<10")
+
+    mrz = parse_mrz(text)
+
+    assert mrz.valid and mrz.repaired
+    assert mrz.fields['document_number'] == 'L898902C3'
+    assert mrz.fields['nationality'] == 'UTO'
+    assert mrz.lines[0] == TD3.splitlines()[0]
+
+
+def test_only_trailing_k_runs_are_read_as_filler():
+    # A one-letter 'K' given name, and trailing fillers OCR'd as K's
+    line2 = TD3.splitlines()[1]
+
+    mrz = parse_mrz("P<UTOKIM<<K<<<<<<<<<<<<<<<<<<<KKKK<<<<KKKKKK\n" + line2)
+
+    assert mrz.fields['surname'] == 'KIM'
+    assert mrz.fields['given_names'] == 'K'
+    assert mrz.lines[0] == "P<UTOKIM<<K" + "<" * 33
+
+
+def test_bad_check_digit_is_not_valid():
+    mrz = parse_mrz(TD3[:-1] + '9')
+
+    assert not mrz.valid
+    assert mrz.checks['composite'] is False
+
+
+def test_processor_accepts_only_validated_mrz():
+    processor = MRZProcessor(text_reader=lambda path: TD3)
+    MRZProcessor.stats.reset()
+
+    data = processor.process_document('/tmp/passport.jpg', 'passport')
+    assert data['passport_number'] == 'L898902C3'
+    assert data['date_of_issue'] == '.'
+
+    assert 'skipped' in processor.process_document('/tmp/visa.jpg', 'visa')
+    processor.text_reader = lambda path: TD3[:-1] + '9'
+    assert processor.process_document('/tmp/passport.jpg', 'passport') == {'skipped': 'no valid MRZ'}
+    processor.text_reader = lambda path: None
+    assert processor.process_document('/tmp/passport.jpg', 'passport') == {'skipped': 'local OCR unavailable'}
+
+    assert processor.get_stats() == {'attempts': 2, 'found': 2, 'validated': 1, 'repaired': 0}
+
+
+def test_validated_mrz_skips_cloud_providers():
+    gpt_calls = []
+
+    class Provider:
+        def process_document(self, file_path, doc_type):
+            gpt_calls.append(file_path)
+            return {'passport_number': 'X'}
+
+    store = ExtractionResultStore("email_1")
+    processors = [('mrz', MRZProcessor(text_reader=lambda path: TD3)),
+                  ('gpt', Provider()), ('textract', Provider())]
+
+    result = store.extract('/tmp/a/passport.jpg', 'passport', processors)
+    store.extract('/tmp/a/visa.jpg', 'visa', processors)
+
+    assert result.provider == 'mrz'
+    assert gpt_calls == ['/tmp/a/visa.jpg']
+    assert store.get_summary()['provider_calls_saved'] == {'mrz': 2, 'gpt': 1}
+
+
+def test_textract_passport_uses_validated_mrz():
+    processor = TextractProcessor(cache=None, document_analyzer=None)
+
+    data = processor._extract_passport_data("PASSPORT\nPassport No: Z9999999\n" + TD3)
+
+    assert data['passport_number'] == 'L898902C3'
+    assert data['surname'] == 'ERIKSSON'
+    assert data['mrz_line2'] == TD3.splitlines()[1]
+
+
+def test_missing_local_ocr_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, 'pytesseract', None)
+    monkeypatch.setattr(mrz_processor, '_unavailable_logged', False)
+
+    with caplog.at_level(logging.WARNING, logger=mrz_processor.__name__):
+        assert read_mrz_band('passport.jpg') is None
+        assert MRZProcessor().process_document('passport.jpg', 'passport') == {'skipped': 'local OCR unavailable'}
+
+    assert [record.message for record in caplog.records if 'MRZ' in record.message] == [
+        "Local MRZ reading disabled: pytesseract is not installed. Install pytesseract and the "
+        "tesseract binary, or set MRZ_FAST_PATH_ENABLED=False"
+    ]
@@ -0,0 +1,53 @@
+import json
+import os
+import re
+
+import pytest
+
+from src.document_processor import patterns
+from src.document_processor.document_classifier import DocumentClassifier
+from src.document_processor.textract_processor import TextractProcessor
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test_files', 'ocr_corpus.json')
+
+with open(CORPUS, encoding='utf-8') as f:
+    DOCUMENTS = json.load(f)
+
+
+@pytest.mark.parametrize('document', DOCUMENTS, ids=[d['name'] for d in DOCUMENTS])
+def test_keyword_scanner_agrees_with_individual_searches(document):
+    text = patterns.WHITESPACE.sub(' ', document['text'].upper())
+    scanner = patterns.DOCUMENT_TYPE_KEYWORDS
+
+    expected = {label: 0.0 for label in scanner.labels}
+    for label, weight, pattern in scanner._entries:
+        if re.search(pattern.pattern, text):
+            expected[label] += weight
+
+    assert scanner.scores(text) == expected
+
+
+@pytest.mark.parametrize('name, doc_type', [
+    ('passport_india', 'passport'),
+    ('passport_philippines', 'passport'),
+    ('eid_front', 'emirates_id'),
+    ('visa_residence', 'visa'),
+    ('blank_scan', 'unknown'),
+])
+def test_recorded_texts_are_classified(name, doc_type):
+    text = next(d['text'] for d in DOCUMENTS if d['name'] == name)
+
+    assert TextractProcessor(cache=None, document_analyzer=None).detect_document_type(text) == doc_type
+    assert DocumentClassifier().classify_document(text, name) == doc_type
+
+
+def test_field_extraction_uses_precompiled_patterns():
+    processor = TextractProcessor(cache=None, document_analyzer=None)
+    text = next(d['text'] for d in DOCUMENTS if d['name'] == 'visa_entry_permit')
+
+    data = processor._extract_visa_data(text)
+
+    assert data['entry_permit_no'] == '201/2024/1234567'
+    assert data['unified_no'] == '2001234567'
+    assert data['date_of_birth'] == '10/10/1980'
+    assert all(isinstance(p, re.Pattern) for p in patterns.VISA_UNIFIED_NO + patterns.DATE_OF_BIRTH)
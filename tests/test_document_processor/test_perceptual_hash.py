@@ -0,0 +1,35 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from src.document_processor.perceptual_hash import HASH_SIZE, dhash, document_hash, hamming
+
+
+def make_card(shade=0, seed=0):
+    """Draw a card-like image with a few text-like bars."""
+    image = Image.new("L", (340, 220), 230 - shade)
+    for index in range(6):
+        top = 30 + index * 28
+        width = 120 + ((index * 37 + seed * 53) % 150)
+        image.paste(40 - shade // 2, (20, top, 20 + width, top + 12))
+    return image
+
+
+def test_rescan_stays_within_threshold():
+    """A brightness shift and a resize change only a few bits."""
+    original = dhash(make_card())
+    rescanned = dhash(make_card(shade=15).resize((300, 194)))
+
+    assert hamming(original, rescanned) <= 20
+    assert original.bit_length() <= HASH_SIZE ** 2
+
+
+def test_different_documents_are_far_apart():
+    assert hamming(dhash(make_card(seed=0)), dhash(make_card(seed=1))) > 20
+
+
+def test_unreadable_document_has_no_hash(tmp_path):
+    path = tmp_path / "broken.jpg"
+    path.write_bytes(b"not an image")
+
+    assert document_hash(str(path)) is None
@@ -0,0 +1,145 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.document_processor.textract_document_analysis import TextractDocumentAnalyzer
+from src.document_processor.textract_processor import TextractProcessor
+from src.document_processor.textract_response import TextractResponse
+from src.utils.circuit_breaker import OPEN, CircuitBreakerRegistry
+from src.utils.error_handling import CircuitOpenError, ServiceError
+
+from tests.test_document_processor.textract_stub import FakeS3, FakeTextract
+
+PAGES = {
+    1: ['UNITED ARAB EMIRATES', 'ENTRY PERMIT'],
+    2: ['Name: JOHN SMITH', 'Nationality: INDIA'],
+    3: ['Passport No: A1234567'],
+}
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "submission.pdf"
+    path.write_bytes(b"%PDF-1.4 three pages")
+    return str(path)
+
+
+def make_analyzer(textract, s3=None, bucket="", sleeps=None, **kwargs):
+    return TextractDocumentAnalyzer(
+        textract, s3=s3, bucket=bucket, poll_interval=1.0, timeout=60,
+        page_renderer=lambda path, dpi: [f"page-{n}".encode() for n in sorted(PAGES)],
+        sleep=(sleeps.append if sleeps is not None else lambda s: None), **kwargs
+    )
+
+
+def test_async_job_polls_and_follows_pagination(pdf):
+    s3 = FakeS3()
+    textract = FakeTextract(PAGES, s3=s3, polls_before_done=2, result_page_size=3)
+    sleeps = []
+
+    response = make_analyzer(textract, s3, bucket="docs", sleeps=sleeps).analyze(pdf)
+
+    parsed = TextractResponse(response)
+    assert parsed.text.splitlines() == [line for n in sorted(PAGES) for line in PAGES[n]]
+    assert response['DocumentMetadata']['Pages'] == 3
+    # 2 in-progress polls, then 8 blocks returned 3 at a time
+    assert len(textract.calls_to('GetDocumentAnalysis')) == 2 + 3
+    assert sleeps == [1.0, 1.5]
+    assert not textract.calls_to('AnalyzeDocument')
+    assert s3.objects == {}
+
+
+def test_failed_job_raises_and_cleans_up(pdf):
+    s3 = FakeS3()
+    textract = FakeTextract(PAGES, s3=s3, fail_job=True)
+
+    with pytest.raises(ServiceError, match="Unsupported document format"):
+        make_analyzer(textract, s3, bucket="docs").analyze(pdf)
+    assert s3.objects == {}
+
+
+def test_pages_are_analyzed_in_parallel_and_renumbered(pdf):
+    textract = FakeTextract(PAGES, throttle_first=1)
+
+    response = make_analyzer(textract).analyze(pdf)
+
+    assert len(textract.calls_to('AnalyzeDocument')) == 3 + 1
+    lines = TextractResponse(response).lines
+    assert [(line['Page'], line['Text']) for line in lines][-1] == (3, 'Passport No: A1234567')
+    assert response['DocumentMetadata']['Pages'] == 3
+
+
+def test_page_calls_share_the_textract_call_slots(pdf):
+    class CountingTextract(FakeTextract):
+        def __init__(self):
+            super().__init__(PAGES)
+            self.active = self.peak = 0
+
+        def analyze_document(self, Document, FeatureTypes):
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.05)
+            with self._lock:
+                self.active -= 1
+            return super().analyze_document(Document, FeatureTypes)
+
+    textract = CountingTextract()
+    slots = threading.BoundedSemaphore(2)
+    analyzers = [make_analyzer(textract, max_workers=3, call_slots=slots) for _ in range(2)]
+
+    # Two documents with three page workers each still make at most two calls at once
+    threads = [threading.Thread(target=analyzer.analyze, args=(pdf,)) for analyzer in analyzers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(textract.calls_to('AnalyzeDocument')) == 6
+    assert textract.peak == 2
+
+
+def test_page_calls_go_through_the_textract_circuit(pdf):
+    circuits = CircuitBreakerRegistry(enabled=True, min_calls=1, window=1)
+    textract = FakeTextract(PAGES)
+    textract.analyze_document = MagicMock(side_effect=ClientError(
+        {'Error': {'Code': 'InternalServerError'}, 'ResponseMetadata': {'HTTPStatusCode': 500}},
+        'AnalyzeDocument'))
+    analyzer = make_analyzer(textract, max_workers=1, circuits=circuits)
+
+    with pytest.raises(ClientError):
+        analyzer.analyze(pdf)
+    assert circuits.get_stats()['textract']['state'] == OPEN
+
+    # The open circuit stops the next document before it reaches Textract
+    with pytest.raises(CircuitOpenError):
+        analyzer.analyze(pdf)
+    assert textract.analyze_document.call_count == 1
+
+
+def test_processor_reads_every_page(pdf):
+    textract = FakeTextract(PAGES)
+    processor = TextractProcessor(cache=None, document_analyzer=make_analyzer(textract), tiered=False)
+    processor.textract = textract
+
+    data = processor.process_document(pdf, 'passport')
+
+    assert data['passport_number'] == 'A1234567'
+    assert len(textract.calls_to('AnalyzeDocument')) == 3
+
+
+def test_processor_falls_back_to_first_page(pdf):
+    textract = FakeTextract(PAGES, s3=FakeS3(), fail_job=True)
+    processor = TextractProcessor(cache=None, document_analyzer=make_analyzer(textract, textract.s3, bucket="docs"),
+                                  tiered=False)
+    processor.textract = FakeTextract({1: ['Passport No: B7654321']})
+    processor._prepare_single_page = lambda path, ext: b'page-1'
+
+    data = processor.process_document(pdf, 'passport')
+
+    assert data['passport_number'] == 'B7654321'
+    assert textract.calls_to('StartDocumentAnalysis')
+    assert len(processor.textract.calls_to('AnalyzeDocument')) == 1
@@ -0,0 +1,73 @@
+import time
+
+from src.document_processor.textract_response import TextractResponse
+
+
+def word(block_id, text):
+    return {'BlockType': 'WORD', 'Id': block_id, 'Text': text}
+
+
+def key_value(index, key, value):
+    """KEY and VALUE blocks with one child word each."""
+    return [
+        {'BlockType': 'KEY_VALUE_SET', 'EntityTypes': ['KEY'], 'Id': f'k{index}',
+         'Relationships': [{'Type': 'VALUE', 'Ids': [f'v{index}']},
+                           {'Type': 'CHILD', 'Ids': [f'kw{index}']}]},
+        {'BlockType': 'KEY_VALUE_SET', 'EntityTypes': ['VALUE'], 'Id': f'v{index}',
+         'Relationships': [{'Type': 'CHILD', 'Ids': [f'vw{index}']}]},
+        word(f'kw{index}', key),
+        word(f'vw{index}', value),
+    ]
+
+
+def test_lines_words_and_key_values():
+    blocks = [
+        {'BlockType': 'LINE', 'Id': 'l1', 'Text': 'UNITED ARAB EMIRATES'},
+        {'BlockType': 'LINE', 'Id': 'l2', 'Text': 'Passport No: A1234567'},
+    ] + key_value(1, 'Passport No:', 'A1234567') + key_value(2, 'Surname', 'SMITH')
+    parsed = TextractResponse({'Blocks': blocks})
+
+    assert parsed.text == 'UNITED ARAB EMIRATES\nPassport No: A1234567'
+    assert [w['Text'] for w in parsed.words] == ['Passport No:', 'A1234567', 'Surname', 'SMITH']
+    assert parsed.key_value_pairs() == {'Passport No': 'A1234567', 'Surname': 'SMITH'}
+    assert TextractResponse.parse(parsed) is parsed
+
+
+def test_value_confidence_is_lowest_word_confidence():
+    blocks = [dict(word('w1', 'RAHUL'), Confidence=99.1), dict(word('w2', 'SHARMA'), Confidence=71.0),
+              dict(word('w3', 'UID:12345678'), Confidence=88.0)]
+    parsed = TextractResponse({'Blocks': blocks})
+
+    assert parsed.value_confidence('Rahul Sharma') == 0.71
+    assert parsed.value_confidence('12345678') == 0.88
+    assert parsed.value_confidence('15/03/1990') is None
+    # Short values must match a whole token, not a substring of a longer word
+    assert parsed.value_confidence('H') is None
+    assert parsed.value_confidence('1') is None
+
+
+def test_tables_are_laid_out_by_cell_index():
+    blocks = [
+        {'BlockType': 'TABLE', 'Id': 't1', 'Relationships': [{'Type': 'CHILD', 'Ids': ['c1', 'c2', 'c3']}]},
+        {'BlockType': 'CELL', 'Id': 'c1', 'RowIndex': 1, 'ColumnIndex': 1,
+         'Relationships': [{'Type': 'CHILD', 'Ids': ['w1']}]},
+        {'BlockType': 'CELL', 'Id': 'c2', 'RowIndex': 1, 'ColumnIndex': 2,
+         'Relationships': [{'Type': 'CHILD', 'Ids': ['w2', 'w3']}]},
+        {'BlockType': 'CELL', 'Id': 'c3', 'RowIndex': 2, 'ColumnIndex': 2},
+        word('w1', 'Name'), word('w2', 'John'), word('w3', 'Smith'),
+    ]
+
+    assert TextractResponse({'Blocks': blocks}).tables() == [[['Name', 'John Smith'], ['', '']]]
+
+
+def test_dense_forms_are_linear():
+    """Thousands of FORMS keys resolve without rescanning the block list."""
+    blocks = []
+    for i in range(5000):
+        blocks.extend(key_value(i, f'Field {i}', f'Value {i}'))
+
+    start = time.perf_counter()
+    pairs = TextractResponse({'Blocks': blocks}).key_value_pairs()
+
+    assert len(pairs) == 5000 and pairs['Field 4999'] == 'Value 4999'
+    assert time.perf_counter() - start < 2.0
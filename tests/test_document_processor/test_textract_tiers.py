@@ -0,0 +1,94 @@
+import pytest
+
+from src.document_processor.textract_document_analysis import TextractDocumentAnalyzer
+from src.document_processor.textract_processor import TextractProcessor
+
+from tests.test_document_processor.textract_stub import FakeS3, FakeTextract, page_blocks
+
+
+class EscalatingTextract(FakeTextract):
+    """Text detection misses the passport number; FORMS analysis finds it."""
+
+    def __init__(self):
+        super().__init__({1: ['PASSPORT', 'Name: JOHN SMITH']})
+
+    def analyze_document(self, Document, FeatureTypes):
+        self._record('AnalyzeDocument', Document=Document, FeatureTypes=FeatureTypes)
+        return {'Blocks': page_blocks(1, ['PASSPORT', 'Name: JOHN SMITH', 'Passport No: A1234567'])}
+
+
+@pytest.fixture(autouse=True)
+def reset_tier_stats():
+    TextractProcessor.tier_stats.reset()
+    yield
+    TextractProcessor.tier_stats.reset()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "scan.jpg"
+    path.write_bytes(b"jpeg")
+    return str(path)
+
+
+def make_processor(textract, **kwargs):
+    processor = TextractProcessor(cache=None, document_analyzer=None, tiered=True, **kwargs)
+    processor.textract = textract
+    prepared = []
+    processor._prepare_single_page = lambda path, ext: prepared.append(path) or b'page-1'
+    return processor, prepared
+
+
+def test_complete_text_detection_is_not_escalated(image):
+    textract = FakeTextract({1: ['PASSPORT', 'Passport No: A1234567']})
+    processor, _ = make_processor(textract)
+
+    data = processor.process_document(image, 'passport')
+
+    assert data['passport_number'] == 'A1234567'
+    assert len(textract.calls_to('DetectDocumentText')) == 1
+    assert not textract.calls_to('AnalyzeDocument')
+    stats = processor.get_tier_stats()
+    assert stats['TEXT']['attempts'] == 1 and stats['TEXT']['hit_rate'] == 1.0
+    assert 'FORMS' not in stats
+
+
+def test_incomplete_text_detection_escalates_to_forms(image):
+    textract = EscalatingTextract()
+    processor, prepared = make_processor(textract)
+
+    data = processor.process_document(image, 'passport')
+
+    assert data['passport_number'] == 'A1234567'
+    assert textract.calls_to('AnalyzeDocument')[0]['FeatureTypes'] == ['FORMS']
+    # The page is read and preprocessed once for both tiers
+    assert len(prepared) == 1
+    stats = processor.get_tier_stats()
+    assert stats['TEXT']['resolved'] == 0
+    assert stats['FORMS']['resolved'] == 1
+
+
+def test_untiered_processor_calls_forms_and_tables(image):
+    textract = FakeTextract({1: ['PASSPORT', 'Passport No: A1234567']})
+    processor, _ = make_processor(textract)
+    processor.feature_tiers = [['FORMS', 'TABLES']]
+
+    processor.process_document(image, 'passport')
+
+    assert not textract.calls_to('DetectDocumentText')
+    assert textract.calls_to('AnalyzeDocument')[0]['FeatureTypes'] == ['FORMS', 'TABLES']
+
+
+def test_async_pdf_text_detection_uses_text_detection_job(tmp_path):
+    pdf = tmp_path / "submission.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    s3 = FakeS3()
+    textract = FakeTextract({1: ['Passport No: A1234567']}, s3=s3, polls_before_done=0)
+    analyzer = TextractDocumentAnalyzer(textract, s3=s3, bucket="docs", sleep=lambda s: None)
+
+    response = analyzer.analyze(str(pdf), [])
+
+    assert len(response['Blocks']) == 2
+    assert textract.calls_to('StartDocumentTextDetection')
+    assert not textract.calls_to('StartDocumentAnalysis')
+    assert s3.objects == {}
@@ -0,0 +1,124 @@
+"""Local stand-in for the Textract and S3 APIs used by TextractDocumentAnalyzer."""
+import itertools
+import threading
+
+from botocore.exceptions import ClientError
+
+
+def page_blocks(page_number, lines):
+    """PAGE plus LINE blocks for one page, the way Textract lays them out."""
+    blocks = [{'BlockType': 'PAGE', 'Id': f'p{page_number}', 'Page': page_number}]
+    for index, text in enumerate(lines):
+        blocks.append({'BlockType': 'LINE', 'Id': f'p{page_number}-l{index}',
+                       'Text': text, 'Page': page_number})
+    return blocks
+
+
+class FakeS3:
+    """Records staged objects."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, file_path, bucket, key):
+        with open(file_path, 'rb') as f:
+            self.objects[(bucket, key)] = f.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+class FakeTextract:
+    """Textract stand-in.
+
+    ``pages`` maps page numbers to LINE texts. Asynchronous jobs report
+    IN_PROGRESS for ``polls_before_done`` polls and then return their blocks
+    ``result_page_size`` at a time with NextToken pagination. Synchronous
+    calls look the page up from the document bytes (b'page-<n>').
+    """
+
+    def __init__(self, pages, s3=None, polls_before_done=2, result_page_size=3,
+                 fail_job=False, throttle_first=0):
+        self.pages = pages
+        self.s3 = s3
+        self.polls_before_done = polls_before_done
+        self.result_page_size = result_page_size
+        self.fail_job = fail_job
+        self.throttle_first = throttle_first
+        self.calls = []
+        self.jobs = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _record(self, operation, **kwargs):
+        with self._lock:
+            self.calls.append((operation, kwargs))
+            if self.throttle_first:
+                self.throttle_first -= 1
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+                                  operation)
+
+    def calls_to(self, operation):
+        return [kwargs for name, kwargs in self.calls if name == operation]
+
+    def all_blocks(self):
+        return [block for number in sorted(self.pages) for block in page_blocks(number, self.pages[number])]
+
+    def _single_page(self, Document):
+        page_number = int(Document['Bytes'].decode().split('-')[1])
+        # Synchronous responses always number their single page 1
+        blocks = page_blocks(page_number, self.pages[page_number])
+        for block in blocks:
+            block['Page'] = 1
+        return {'Blocks': blocks, 'DocumentMetadata': {'Pages': 1}}
+
+    def analyze_document(self, Document, FeatureTypes):
+        self._record('AnalyzeDocument', Document=Document, FeatureTypes=FeatureTypes)
+        return self._single_page(Document)
+
+    def detect_document_text(self, Document):
+        self._record('DetectDocumentText', Document=Document)
+        return self._single_page(Document)
+
+    def _start_job(self, DocumentLocation):
+        location = DocumentLocation['S3Object']
+        assert self.s3 is None or (location['Bucket'], location['Name']) in self.s3.objects
+        job_id = f"job-{next(self._job_ids)}"
+        self.jobs[job_id] = {'polls': 0}
+        return {'JobId': job_id}
+
+    def start_document_analysis(self, DocumentLocation, FeatureTypes):
+        self._record('StartDocumentAnalysis', DocumentLocation=DocumentLocation, FeatureTypes=FeatureTypes)
+        return self._start_job(DocumentLocation)
+
+    def start_document_text_detection(self, DocumentLocation):
+        self._record('StartDocumentTextDetection', DocumentLocation=DocumentLocation)
+        return self._start_job(DocumentLocation)
+
+    def get_document_analysis(self, JobId, MaxResults, NextToken=None):
+        self._record('GetDocumentAnalysis', JobId=JobId, MaxResults=MaxResults, NextToken=NextToken)
+        return self._job_results(JobId, MaxResults, NextToken)
+
+    def get_document_text_detection(self, JobId, MaxResults, NextToken=None):
+        self._record('GetDocumentTextDetection', JobId=JobId, MaxResults=MaxResults, NextToken=NextToken)
+        return self._job_results(JobId, MaxResults, NextToken)
+
+    def _job_results(self, JobId, MaxResults, NextToken):
+        job = self.jobs[JobId]
+        if job['polls'] < self.polls_before_done:
+            job['polls'] += 1
+            return {'JobStatus': 'IN_PROGRESS'}
+        if self.fail_job:
+            return {'JobStatus': 'FAILED', 'StatusMessage': 'Unsupported document format'}
+
+        blocks = self.all_blocks()
+        start = int(NextToken or 0)
+        end = start + min(MaxResults, self.result_page_size)
+        response = {
+            'JobStatus': 'SUCCEEDED',
+            'DocumentMetadata': {'Pages': len(self.pages)},
+            'Blocks': blocks[start:end],
+        }
+        if end < len(blocks):
+            response['NextToken'] = str(end)
+        return response
@@ -0,0 +1,35 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.email_handler.delta_sync import DeltaSyncStore
+from src.email_handler.outlook_client import OutlookClient
+from tests.test_email_handler.graph_stub import GraphStandIn
+
+
+@pytest.fixture
+def graph():
+    with GraphStandIn(page_size=2) as stand_in:
+        yield stand_in
+
+
+@pytest.fixture
+def client_factory(graph, tmp_path, monkeypatch):
+    """Build OutlookClients pointed at the local Graph stand-in."""
+    monkeypatch.chdir(tmp_path)
+    patcher = patch.multiple(
+        "src.email_handler.outlook_client",
+        GRAPH_API_ENDPOINT=graph.base_url,
+        CLIENT_ID="client", CLIENT_SECRET="secret", TENANT_ID="tenant",
+        USER_EMAIL="service@example.com", TARGET_MAILBOX="mailbox@example.com"
+    )
+    patcher.start()
+    state_file = str(tmp_path / "delta_state.json")
+
+    def make_client():
+        client = OutlookClient(delta_store=DeltaSyncStore(state_file), use_delta_sync=True)
+        client.token_manager = MagicMock(access_token="token")
+        return client
+
+    yield make_client
+    patcher.stop()
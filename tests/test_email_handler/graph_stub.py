@@ -0,0 +1,184 @@
+"""Local Microsoft Graph stand-in for OutlookClient tests.
+
+Serves the subset of the Graph mail API the client uses over real HTTP on
+127.0.0.1, so request building, paging and error handling are exercised end
+to end without network access.
+"""
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class GraphStandIn:
+    """In-memory mailbox served over HTTP.
+
+    Every change (add, update, remove) bumps a version counter; delta tokens
+    encode the version they were issued at, so a delta round returns exactly
+    the messages changed since that token.
+    """
+
+    def __init__(self, page_size: int = 2):
+        self.page_size = page_size
+        self.messages = {}
+        self.changes = []  # (version, message_id, removed)
+        self.version = 0
+        self.expired_tokens = set()
+        self.attachments = {}
+        # Path -> number of upcoming requests to answer with 429
+        self.throttle = {}
+        self.requests = []
+        self._lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stand_in._handle(self, "GET")
+
+            def do_POST(self):
+                stand_in._handle(self, "POST")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1.0"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Mailbox mutations
+
+    def add_message(self, message_id: str, subject: str, received: str = "2024-01-30T10:00:00Z",
+                    has_attachments: bool = True, **extra):
+        with self._lock:
+            self.version += 1
+            self.messages[message_id] = dict({
+                "id": message_id,
+                "subject": subject,
+                "receivedDateTime": received,
+                "hasAttachments": has_attachments,
+                "importance": "normal"
+            }, **extra)
+            self.changes.append((self.version, message_id, False))
+
+    def remove_message(self, message_id: str):
+        with self._lock:
+            self.version += 1
+            self.messages.pop(message_id, None)
+            self.changes.append((self.version, message_id, True))
+
+    def requests_to(self, fragment: str):
+        return [r for r in self.requests if fragment in r["path"]]
+
+    # Request handling
+
+    def _send(self, handler, status: int, body):
+        raw = isinstance(body, bytes)
+        payload = body if raw else json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _handle(self, handler, method: str):
+        url = urlparse(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length)) if length else None
+        with self._lock:
+            self.requests.append({"method": method, "path": url.path, "query": query,
+                                  "headers": dict(handler.headers), "body": body})
+
+        if method == "POST" and url.path.endswith("/$batch"):
+            return self._send(handler, 200, self._batch(body))
+        status, response_body = self._dispatch(method, url.path, query, body)[:2]
+        return self._send(handler, status, response_body)
+
+    def _batch(self, body):
+        """Answer a JSON batch by dispatching each sub-request in turn."""
+        assert len(body["requests"]) <= 20, "Graph rejects batches over 20 requests"
+        responses = []
+        for request in body["requests"]:
+            url = urlparse(request["url"])
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            status, response_body, headers = self._dispatch(
+                request["method"], "/v1.0" + url.path, query, request.get("body"))
+            responses.append({"id": request["id"], "status": status,
+                              "headers": headers, "body": response_body})
+        return {"responses": responses}
+
+    def _dispatch(self, method, path, query, body):
+        """Route a request to the mailbox; returns (status, body, headers)."""
+        with self._lock:
+            if self.throttle.get(path, 0) > 0:
+                self.throttle[path] -= 1
+                return 429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": "0"}
+
+        parts = path.split("/")
+        if path.endswith("/messages/delta"):
+            return self._delta(query) + ({},)
+        if method == "GET" and path.endswith("/messages"):
+            with self._lock:
+                values = list(self.messages.values())
+            return 200, {"value": values}, {}
+        if "messages" in parts:
+            message_id = parts[parts.index("messages") + 1] if parts[-1] != "messages" else None
+            message = self.messages.get(message_id)
+            if message is None:
+                return 404, {"error": {"code": "ErrorItemNotFound", "message": path}}, {}
+            if path.endswith("/attachments") and method == "GET":
+                attachments = self.attachments.get(message_id, [])
+                if "$select" in query:
+                    fields = query["$select"].split(",")
+                    attachments = [{k: v for k, v in a.items() if k in fields} for a in attachments]
+                return 200, {"value": attachments}, {}
+            if path.endswith("/$value") and method == "GET":
+                attachment_id = unquote(parts[-2])
+                for attachment in self.attachments.get(message_id, []):
+                    if attachment["id"] == attachment_id:
+                        return 200, base64.b64decode(attachment["contentBytes"]), {}
+            if method == "GET":
+                return 200, message, {}
+        return 404, {"error": {"code": "ErrorItemNotFound", "message": path}}, {}
+
+    def _delta(self, query):
+        base = f"{self.base_url}/users/mailbox/mailFolders/inbox/messages/delta"
+        if "$deltatoken" in query:
+            token = query["$deltatoken"]
+            if token in self.expired_tokens:
+                return 410, {"error": {"code": "SyncStateNotFound", "message": "Sync state expired"}}
+            since = int(token)
+        else:
+            since = int(query.get("since", 0))
+
+        with self._lock:
+            changed = {}
+            for version, message_id, removed in self.changes:
+                if version > since:
+                    changed[message_id] = removed
+            items = [
+                {"id": message_id, "@removed": {"reason": "deleted"}} if removed
+                else dict(self.messages[message_id])
+                for message_id, removed in changed.items()
+                if removed or message_id in self.messages
+            ]
+            version = self.version
+
+        skip = int(query.get("$skiptoken", 0))
+        page = items[skip:skip + self.page_size]
+        body = {"value": page}
+        if skip + self.page_size < len(items):
+            body["@odata.nextLink"] = f"{base}?since={since}&$skiptoken={skip + self.page_size}"
+        else:
+            body["@odata.deltaLink"] = f"{base}?$deltatoken={version}"
+        return 200, body
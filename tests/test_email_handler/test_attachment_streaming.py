@@ -0,0 +1,72 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+from src.email_handler.attachment_handler import AttachmentHandler
+from src.utils.error_handling import ApplicationError
+
+
+def make_pdf(size):
+    body = b"%PDF-1.4\n" + os.urandom(size)
+    return body + b"\n%%EOF\n"
+
+
+@pytest.fixture
+def handler(tmp_path):
+    return AttachmentHandler(download_dir=str(tmp_path / "raw"))
+
+
+def test_streams_large_attachment_via_value_endpoint(graph, client_factory, tmp_path):
+    content = make_pdf(3 * 1024 * 1024)
+    graph.add_message("m1", "Addition")
+    graph.attachments["m1"] = [{
+        "id": "AAMk/att+1=", "name": "scan.pdf", "contentType": "application/pdf",
+        "size": len(content), "isInline": False,
+        "contentBytes": base64.b64encode(content).decode()
+    }]
+    client = client_factory()
+    handler = AttachmentHandler(download_dir=str(tmp_path / "raw"),
+                                content_fetcher=client.iter_attachment_content)
+
+    listing = client.get_attachments("m1", include_content=False)
+    assert "contentBytes" not in listing[0]
+
+    paths = handler.process_attachments(listing, "m1")
+
+    with open(paths[0], "rb") as f:
+        saved = f.read()
+    assert hashlib.md5(saved).digest() == hashlib.md5(content).digest()
+    value_requests = graph.requests_to("/$value")
+    assert len(value_requests) == 1
+    assert value_requests[0]["path"].endswith("/attachments/AAMk%2Fatt%2B1%3D/$value")
+
+
+def test_type_mismatch_is_detected_from_first_chunk(handler):
+    consumed = []
+
+    def fetcher(email_id, attachment_id):
+        for i in range(10):
+            consumed.append(i)
+            yield b"MZ\x90\x00" + b"\x00" * (handler.MIME_SNIFF_BYTES - 4)
+
+    handler.content_fetcher = fetcher
+    with pytest.raises(ApplicationError, match="File type mismatch"):
+        handler.save_attachment({"id": "a1", "name": "passport.pdf", "size": 10}, "m1")
+
+    assert consumed == [0]
+    saved = [f for _, _, files in os.walk(handler.download_dir) for f in files]
+    assert saved == []
+
+
+def test_inline_base64_is_decoded_in_slices(handler):
+    content = make_pdf(200 * 1024)
+    encoded = base64.b64encode(content).decode()
+
+    chunks = list(handler._iter_base64_chunks(encoded, chunk_size=30000))
+    path = handler.save_attachment({"name": "visa.pdf", "contentBytes": encoded}, "m1")
+
+    assert len(chunks) > 1 and b"".join(chunks) == content
+    with open(path, "rb") as f:
+        assert f.read() == content
@@ -0,0 +1,85 @@
+from src.email_handler.delta_sync import DeltaSyncStore
+from src.email_tracker.email_tracker import EmailTracker
+
+
+def delta_requests(graph):
+    return graph.requests_to("/messages/delta")
+
+
+def test_initial_round_pages_and_persists_delta_link(graph, client_factory):
+    for i in range(5):
+        graph.add_message(f"m{i}", f"Addition request {i}", received=f"2024-01-30T10:0{i}:00Z")
+
+    emails = client_factory().fetch_emails()
+
+    assert [e["id"] for e in emails] == ["m4", "m3", "m2", "m1", "m0"]
+    assert len(delta_requests(graph)) == 3
+    assert "$filter" in delta_requests(graph)[0]["query"]
+    assert "odata.maxpagesize" in delta_requests(graph)[0]["headers"]["Prefer"]
+
+    # A new client instance resumes from the persisted deltaLink
+    store = DeltaSyncStore(client_factory().delta_store.storage_file)
+    assert "$deltatoken=5" in store.get_delta_link("mailbox@example.com", "inbox")
+
+
+def test_later_polls_only_transfer_changes(graph, client_factory):
+    graph.add_message("m1", "Addition - John")
+    graph.add_message("m2", "Addition - Jane")
+    client = client_factory()
+    client.fetch_emails()
+    tracker = EmailTracker()
+    tracker.mark_processed("m1")
+    tracker.mark_processed("m2")
+
+    graph.add_message("m3", "Add employee", received="2024-01-31T09:00:00Z")
+    graph.remove_message("m1")
+    graph.requests.clear()
+
+    emails = client.fetch_emails()
+
+    assert [e["id"] for e in emails] == ["m3"]
+    assert len(delta_requests(graph)) == 1
+    assert delta_requests(graph)[0]["query"] == {"$deltatoken": "2"}
+    assert not graph.requests_to("/users/mailbox%40example.com/messages")
+
+
+def test_unprocessed_messages_carry_over_between_polls(graph, client_factory):
+    graph.add_message("m1", "Addition - John")
+    client = client_factory()
+
+    assert [e["id"] for e in client.fetch_emails()] == ["m1"]
+    # Not processed (e.g. the workflow failed): still returned on the next poll
+    assert [e["id"] for e in client.fetch_emails()] == ["m1"]
+
+    EmailTracker().mark_processed("m1")
+    assert client.fetch_emails() == []
+
+
+def test_expired_token_falls_back_to_window_scan(graph, client_factory):
+    graph.add_message("m1", "Addition - John", received="2099-01-01T00:00:00Z")
+    client = client_factory()
+    client.fetch_emails()
+    graph.expired_tokens.add("1")
+    graph.requests.clear()
+
+    emails = client.fetch_emails()
+
+    assert [e["id"] for e in emails] == ["m1"]
+    assert graph.requests_to("/users/mailbox%40example.com/messages")
+    assert client.delta_store.get_delta_link("mailbox@example.com", "inbox") is None
+
+    # Next poll restarts with a fresh initial delta round
+    graph.requests.clear()
+    client.fetch_emails()
+    assert "$deltatoken" not in delta_requests(graph)[0]["query"]
+
+
+def test_filtered_out_messages_are_not_carried_over(graph, client_factory):
+    graph.add_message("m1", "Addition - John")
+    graph.add_message("m2", "Lunch menu")
+    graph.add_message("m3", "Addition - Jane", has_attachments=False)
+    client = client_factory()
+
+    assert [e["id"] for e in client.fetch_emails()] == ["m1"]
+    pending = client.delta_store.get_pending("mailbox@example.com", "inbox")
+    assert [message["id"] for message in pending] == ["m1"]
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+
+def add_backlog(graph, count):
+    for i in range(count):
+        graph.add_message(f"m{i}", f"Addition {i}")
+        graph.attachments[f"m{i}"] = [{"id": f"a{i}", "name": f"passport_{i}.pdf", "contentBytes": "UEs="}]
+
+
+def test_backlog_uses_a_handful_of_round_trips(graph, client_factory):
+    """Attachments for 50 emails fit in three $batch calls."""
+    add_backlog(graph, 50)
+    client = client_factory()
+    ids = [f"m{i}" for i in range(50)]
+
+    attachments = client.get_attachments_batch(ids)
+
+    assert attachments["m7"][0]["name"] == "passport_7.pdf"
+    assert len(attachments) == 50
+    assert len(graph.requests_to("/$batch")) == 3
+    assert len(graph.requests) == 3
+
+
+def test_throttled_items_are_retried(graph, client_factory):
+    add_backlog(graph, 3)
+    graph.throttle["/v1.0/users/mailbox%40example.com/messages/m1/attachments"] = 2
+    client = client_factory()
+
+    with patch("src.email_handler.outlook_client.time.sleep") as sleep:
+        attachments = client.get_attachments_batch(["m0", "m1", "m2"])
+
+    assert set(attachments) == {"m0", "m1", "m2"}
+    batches = graph.requests_to("/$batch")
+    assert [len(b["body"]["requests"]) for b in batches] == [3, 1, 1]
+    sleep.assert_called_with(0.0)
+
+
+def test_failed_items_are_reported_per_email(graph, client_factory):
+    add_backlog(graph, 2)
+    client = client_factory()
+
+    attachments = client.get_attachments_batch(["m0", "missing", "m1"])
+
+    assert set(attachments) == {"m0", "m1"}
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from src.email_tracker.email_tracker import EmailTracker
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    path = tmp_path / "processed_emails.json"
+    path.write_text(json.dumps({
+        "m1": {"timestamp": "2024-01-01T10:00:00", "metadata": {"subject": "Addition"}},
+        "m2": {"timestamp": "2024-01-02T10:00:00", "metadata": {}}
+    }))
+    return str(path)
+
+
+def test_json_is_migrated_once(legacy_file):
+    tracker = EmailTracker(legacy_file)
+
+    assert tracker.is_processed("m1") and tracker.is_processed("m2")
+    assert not os.path.exists(legacy_file)
+    assert os.path.exists(f"{legacy_file}.migrated")
+    assert tracker.db_path.endswith("dedupe_ledger.db")
+
+    # A later tracker reads the database without touching the JSON file
+    assert set(EmailTracker(legacy_file).get_processed_ids()) == {"m1", "m2"}
+
+
+def test_database_uses_wal(legacy_file):
+    tracker = EmailTracker(legacy_file)
+    assert tracker.ledger.execute_query("PRAGMA journal_mode")[0][0] == "wal"
+
+
+def test_mark_processed_is_persisted(tmp_path):
+    storage = str(tmp_path / "tracker.json")
+    EmailTracker(storage).mark_processed("m3", {"subject": "Add employee"})
+
+    tracker = EmailTracker(storage)
+    assert tracker.is_processed("m3")
+    assert not tracker.is_processed("m4")
+
+
+def test_batch_writes_in_one_flush(tmp_path):
+    tracker = EmailTracker(str(tmp_path / "tracker.json"))
+
+    with tracker.batch():
+        for i in range(100):
+            tracker.mark_processed(f"id{i}")
+        # Buffered marks are visible before the flush
+        assert tracker.is_processed("id5")
+        assert tracker.ledger.execute_query("SELECT COUNT(*) FROM dedupe_ledger")[0][0] == 0
+
+    assert tracker.ledger.execute_query("SELECT COUNT(*) FROM dedupe_ledger")[0][0] == 100
+    assert tracker.filter_processed(["id1", "id99", "other"]) == {"id1", "id99"}
+
+
+def test_reset_clears_and_backs_up(tmp_path):
+    tracker = EmailTracker(str(tmp_path / "tracker.json"))
+    tracker.mark_processed_many(["a", "b"])
+
+    assert tracker.reset_tracker()
+
+    assert not tracker.is_processed("a")
+    assert any(name.startswith("dedupe_ledger.db.bak.") for name in os.listdir(tmp_path))
+
@@ -0,0 +1,67 @@
+"""Local stand-in for the OpenAI Files and Batches APIs used by BatchExtractor."""
+import itertools
+import json
+from types import SimpleNamespace
+
+
+class FakeBatchClient:
+    """OpenAI client stand-in exposing ``files`` and ``batches``.
+
+    ``responder(custom_id, body)`` returns the assistant message content for
+    a request, or None to make that request fail. Batches report
+    in_progress for ``polls_before_done`` polls and then ``final_status``
+    (expired batches keep the output of the requests they finished).
+    """
+
+    def __init__(self, responder, polls_before_done=2, final_status="completed"):
+        self.responder = responder
+        self.polls_before_done = polls_before_done
+        self.final_status = final_status
+        self.uploaded = {}
+        self.jobs = {}
+        self.polls = 0
+        self._ids = itertools.count(1)
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch)
+
+    def _create_file(self, file, purpose):
+        assert purpose == "batch"
+        file_id = f"file-{next(self._ids)}"
+        self.uploaded[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self.uploaded[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{next(self._ids)}"
+        requests = [json.loads(line) for line in self.uploaded[input_file_id].splitlines() if line]
+        assert all(request["url"] == endpoint for request in requests)
+        self.jobs[batch_id] = {"requests": requests, "polls": 0, "output_file_id": None}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    def _retrieve_batch(self, batch_id):
+        self.polls += 1
+        job = self.jobs[batch_id]
+        job["polls"] += 1
+        if job["polls"] <= self.polls_before_done:
+            return SimpleNamespace(id=batch_id, status="in_progress", output_file_id=None)
+        if job["output_file_id"] is None:
+            job["output_file_id"] = self._write_output(job["requests"])
+        return SimpleNamespace(id=batch_id, status=self.final_status, output_file_id=job["output_file_id"])
+
+    def _write_output(self, requests):
+        lines = []
+        for request in requests:
+            content = self.responder(request["custom_id"], request["body"])
+            if content is None:
+                line = {"custom_id": request["custom_id"], "response": None,
+                        "error": {"code": "server_error", "message": "simulated failure"}}
+            else:
+                line = {"custom_id": request["custom_id"], "error": None,
+                        "response": {"status_code": 200, "body": {
+                            "choices": [{"message": {"role": "assistant", "content": content}}]}}}
+            lines.append(json.dumps(line))
+        file_id = f"file-{next(self._ids)}"
+        self.uploaded[file_id] = "\n".join(lines) + "\n"
+        return file_id
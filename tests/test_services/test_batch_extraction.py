@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from src.document_processor.gpt_processor import GPTProcessor
+from src.services.batch_extraction import BatchExtractor
+from src.utils.extraction_cache import ExtractionCache
+from tests.test_services.batch_stub import FakeBatchClient
+
+PASSPORT_JSON = json.dumps({'passport_number': 'K1234567', 'surname': 'SHARMA', 'given_names': 'RAHUL'})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(db_path=str(tmp_path / "extraction_cache.db"))
+
+
+@pytest.fixture
+def gpt(cache, monkeypatch):
+    processor = GPTProcessor(api_key=None, cache=cache)
+    monkeypatch.setattr(processor, '_encode_image_part', lambda file_path, doc_type: {
+        'type': 'image_url', 'image_url': {'url': f'data:image/jpeg;base64,{file_path}', 'detail': 'high'}})
+    return processor
+
+
+def make_documents(tmp_path, count):
+    documents = []
+    for index in range(count):
+        path = tmp_path / f"passport_{index}.jpg"
+        path.write_bytes(f"passport-{index}".encode())
+        documents.append((str(path), 'passport'))
+    return documents
+
+
+def make_extractor(gpt, client, tmp_path, **kwargs):
+    return BatchExtractor(gpt, client=client, job_dir=str(tmp_path / "jobs"),
+                          poll_interval=0, sleep=lambda seconds: None, **kwargs)
+
+
+def test_batch_results_fill_the_interactive_cache(gpt, cache, tmp_path):
+    client = FakeBatchClient(lambda custom_id, body: PASSPORT_JSON)
+    documents = make_documents(tmp_path, 3)
+
+    report = make_extractor(gpt, client, tmp_path, max_requests=2).run(documents + documents[:1])
+
+    assert report['submitted'] == 3
+    assert report['succeeded'] == 3
+    assert len(report['batches']) == 2
+    assert client.polls >= 2 * (client.polls_before_done + 1)
+    # The interactive path is now served from the cache without a client
+    result = gpt.process_document(documents[0][0], 'passport')
+    assert result['passport_number'] == 'K1234567'
+    assert result['given_names'] == 'RAHUL'
+
+
+def test_cached_documents_are_not_resubmitted_and_failures_are_counted(gpt, cache, tmp_path):
+    documents = make_documents(tmp_path, 3)
+    cached_hash = cache.hash_file(documents[0][0])
+    cache.put(cached_hash, 'gpt', 'passport', GPTProcessor.PROMPT_VERSION, {'passport_number': 'X1'})
+    failing = {}
+
+    def responder(custom_id, body):
+        if not failing:
+            failing[custom_id] = True
+            return None
+        return PASSPORT_JSON
+
+    client = FakeBatchClient(responder, final_status="expired")
+    report = make_extractor(gpt, client, tmp_path).run(documents)
+
+    assert report['already_cached'] == 1
+    assert report['submitted'] == 2
+    assert report['succeeded'] == 1
+    assert report['failed'] == 1
+    assert report['batches'][0]['status'] == 'expired'
+
+
+def test_submitted_job_can_be_collected_later(gpt, cache, tmp_path):
+    client = FakeBatchClient(lambda custom_id, body: PASSPORT_JSON, polls_before_done=0)
+    documents = make_documents(tmp_path, 1)
+    extractor = make_extractor(gpt, client, tmp_path)
+    built = extractor.build_requests(documents)
+    request = json.loads(built['requests'][0])
+    batch_id = extractor.submit(built['requests'], built['manifest'])
+
+    counts = make_extractor(gpt, client, tmp_path).collect(batch_id)
+
+    assert request['body']['model'] == gpt.vision_model
+    assert request['body']['messages'][0]['content'] == GPTProcessor.SYSTEM_PROMPT
+    assert counts == {'succeeded': 1, 'failed': 0}
+    assert cache.get(cache.hash_file(documents[0][0]), 'gpt', 'passport', GPTProcessor.PROMPT_VERSION)
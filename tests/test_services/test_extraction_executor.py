@@ -0,0 +1,128 @@
+import threading
+import time
+import unittest
+
+from src.services.extraction_executor import ExtractionExecutor, flatten_document_paths
+from src.services.extraction_store import ExtractionResultStore
+
+
+class StubProvider:
+    """Provider stub with injected latency that records peak concurrency."""
+
+    def __init__(self, latency=0.05, fail_on=None):
+        self.latency = latency
+        self.fail_on = fail_on or set()
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def process_document(self, file_path, doc_type):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            if file_path in self.fail_on:
+                return {"error": "stub failure"}
+            return {"passport_number": f"P{file_path[-3:]}", "surname": "SMITH"}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestExtractionExecutor(unittest.TestCase):
+    def setUp(self):
+        self.documents = [("passport", f"/tmp/docs/passport_{i:03d}.jpg") for i in range(12)]
+
+    def test_respects_provider_limit(self):
+        """No more than the provider limit runs at once, even with more workers."""
+        gpt = StubProvider(latency=0.03)
+        executor = ExtractionExecutor(max_workers=8, provider_limits={'gpt': 3})
+
+        executor.extract_all(ExtractionResultStore(), self.documents, [('gpt', gpt)])
+
+        self.assertEqual(gpt.calls, 12)
+        self.assertLessEqual(gpt.peak, 3)
+        self.assertGreater(gpt.peak, 1)
+
+    def test_store_order_matches_submission_order(self):
+        """Results land in the store in submission order regardless of completion order."""
+        store = ExtractionResultStore()
+        executor = ExtractionExecutor(max_workers=6, provider_limits={'gpt': 6})
+
+        results = executor.extract_all(store, self.documents, [('gpt', StubProvider(latency=0.01))])
+
+        expected_keys = [store.make_key(t, p) for t, p in self.documents]
+        self.assertEqual([r.doc_key for r in results], expected_keys)
+        self.assertEqual([r.doc_key for r in store], expected_keys)
+
+    def test_fallback_and_error_semantics(self):
+        """Per-document failures fall back to the next provider without aborting the batch."""
+        failing_path = self.documents[0][1]
+        gpt = StubProvider(latency=0.01, fail_on={failing_path})
+        textract = StubProvider(latency=0.01)
+        store = ExtractionResultStore()
+
+        results = ExtractionExecutor(max_workers=4).extract_all(
+            store, self.documents, [('gpt', gpt), ('textract', textract)]
+        )
+
+        self.assertEqual(results[0].provider, "textract")
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertEqual(textract.calls, 1)
+
+    def test_skips_documents_already_in_store(self):
+        """Documents already extracted for this email are not resubmitted."""
+        gpt = StubProvider(latency=0)
+        store = ExtractionResultStore()
+        executor = ExtractionExecutor(max_workers=4)
+
+        executor.extract_all(store, self.documents[:4], [('gpt', gpt)])
+        executor.extract_all(store, self.documents[:4] + self.documents[:2], [('gpt', gpt)])
+
+        self.assertEqual(gpt.calls, 4)
+
+    def test_concurrent_faster_than_serial(self):
+        """Network-bound extraction scales with the provider limit."""
+        latency = 0.05
+        serial = ExtractionExecutor(max_workers=1)
+        concurrent = ExtractionExecutor(max_workers=8, provider_limits={'gpt': 4})
+
+        start = time.perf_counter()
+        serial.extract_all(ExtractionResultStore(), self.documents, [('gpt', StubProvider(latency))])
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent.extract_all(ExtractionResultStore(), self.documents, [('gpt', StubProvider(latency))])
+        concurrent_time = time.perf_counter() - start
+
+        self.assertLess(concurrent_time, serial_time / 2)
+
+    def test_only_first_provider_prefetches(self):
+        """Fallback providers do not start preprocessing for documents they may never see."""
+        class PrefetchingProvider(StubProvider):
+            def __init__(self):
+                super().__init__(latency=0)
+                self.prefetched = []
+
+            def prefetch(self, file_paths):
+                self.prefetched.extend(file_paths)
+
+        executor = ExtractionExecutor(max_workers=2)
+        first, fallback = PrefetchingProvider(), PrefetchingProvider()
+
+        executor.extract_all(ExtractionResultStore(), self.documents[:3], [('gpt', first), ('textract', fallback)])
+
+        self.assertEqual(first.prefetched, [path for _, path in self.documents[:3]])
+        self.assertEqual(fallback.prefetched, [])
+
+    def test_flatten_document_paths(self):
+        """Both list and single-path document_paths structures are supported."""
+        documents = flatten_document_paths({'passport': ['/a.jpg', '/b.jpg'], 'visa': '/c.pdf', 'eid': None})
+        self.assertEqual(documents, [('passport', '/a.jpg'), ('passport', '/b.jpg'), ('visa', '/c.pdf')])
+
+
+if __name__ == '__main__':
+    unittest.main()
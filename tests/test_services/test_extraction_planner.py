@@ -0,0 +1,92 @@
+from src.services.extraction_executor import ExtractionExecutor
+from src.services.extraction_planner import ExtractionPlanner
+from src.services.extraction_store import ExtractionResultStore
+
+PASSPORT = {'passport_number': 'K1234567', 'surname': 'SHARMA', 'given_names': 'RAHUL',
+            'nationality': 'India', 'date_of_birth': '01/01/1990', 'gender': 'Male',
+            'date_of_expiry': '01/01/2030'}
+
+
+class RecordingProcessor:
+    """Processor stub recording full and scoped calls."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def process_document(self, file_path, doc_type):
+        self.calls.append((file_path, None))
+        return dict(self.results[doc_type])
+
+    def process_fields(self, file_path, doc_type, fields):
+        self.calls.append((file_path, list(fields)))
+        return {field: self.results[doc_type].get(field, '.') for field in fields}
+
+
+def run(planner, documents, processor):
+    store = ExtractionResultStore()
+    results = list(planner.extract(ExtractionExecutor(max_workers=2), store, documents, [('gpt', processor)]))
+    return store, results
+
+
+def test_excel_values_scope_but_never_skip_identity_documents():
+    """Documents still extract the fields they override, so they can correct Excel typos."""
+    row = {'First Name': 'Rahul', 'Last Name': 'Sharma', 'Passport No': 'K1234576',
+           'Nationality': 'India', 'DOB': '01/01/1990', 'Gender': 'Male',
+           'Passport Expiry Date': '01/01/2030', 'Emirates Id': '784-1990-1234567-1'}
+    processor = RecordingProcessor({
+        'passport': PASSPORT,
+        'emirates_id': {'emirates_id': '784-1990-1234567-1', 'name_en': 'RAHUL SHARMA'},
+    })
+    planner = ExtractionPlanner([row])
+
+    store, _ = run(planner, [('passport', 'passport.jpg'), ('emirates_id', 'eid.jpg')], processor)
+
+    # The expiry date has no override, so Excel's value stands and the passport skips it
+    assert processor.calls == [
+        ('passport.jpg', ['passport_number', 'surname', 'given_names', 'nationality', 'date_of_birth', 'gender']),
+        ('eid.jpg', ['emirates_id', 'name_en']),
+    ]
+    assert store.get_for_path('passport', 'passport.jpg').fields['passport_number'] == 'K1234567'
+    assert planner.get_stats() == {'documents': 2, 'extracted': 2, 'scoped': 2, 'calls_avoided': 0}
+
+
+def test_filenames_match_rows_on_whole_identifiers():
+    planner = ExtractionPlanner([
+        {'First Name': 'Rahul', 'Last Name': 'Sharma', 'Passport No': 'K1234567'},
+        {'First Name': 'Anna', 'Last Name': 'Smith', 'Emirates Id': '784-1990-7654321-1'},
+    ])
+
+    assert planner.attribute('passport_K1234567.pdf') == 0
+    assert planner.attribute('eid 784-1990-7654321-1.jpg') == 1
+    # Digits that merely contain an identifier do not pin the document to a row
+    assert planner.attribute('scan_20241234567.jpg') is None
+
+
+def test_earlier_documents_narrow_later_calls():
+    processor = RecordingProcessor({
+        'passport': PASSPORT,
+        'emirates_id': {'emirates_id': '784-1990-1234567-1', 'name_en': 'RAHUL SHARMA'},
+    })
+    planner = ExtractionPlanner([{'First Name': 'Rahul', 'Last Name': 'Sharma'},
+                                 {'First Name': 'Anna', 'Last Name': 'Smith'}])
+
+    run(planner, [('emirates_id', 'eid_rahul_sharma.jpg'), ('passport', 'scan_001.jpg'),
+                  ('passport', 'passport_copy.jpg')], processor)
+
+    # Passports go first; unattributed ones are extracted in full and then matched by name
+    assert sorted(processor.calls[:2]) == [('passport_copy.jpg', None), ('scan_001.jpg', None)]
+    assert processor.calls[2] == ('eid_rahul_sharma.jpg', ['emirates_id', 'name_en'])
+    assert planner.known[0]['date_of_birth'] == '01/01/1990'
+    assert planner.known[1] == {}
+
+
+def test_disabled_planner_extracts_everything_in_full():
+    processor = RecordingProcessor({'passport': PASSPORT})
+    planner = ExtractionPlanner([{'Passport No': 'K1234567', 'Nationality': 'India', 'DOB': '01/01/1990',
+                                  'Gender': 'Male', 'Passport Expiry Date': '01/01/2030'}], enabled=False)
+
+    run(planner, [('passport', 'passport.jpg')], processor)
+
+    assert processor.calls == [('passport.jpg', None)]
+    assert planner.get_stats()['calls_avoided'] == 0
@@ -0,0 +1,163 @@
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from src.services.extraction_store import ExtractionResultStore
+from src.services.data_combiner import DataCombiner
+from src.utils.field_result import FieldResult
+from src.utils.circuit_breaker import CircuitBreakerRegistry
+
+
+class TestExtractionResultStore(unittest.TestCase):
+    def setUp(self):
+        self.gpt = MagicMock(spec=['process_document'])
+        self.textract = MagicMock(spec=['process_document'])
+        self.processors = [('gpt', self.gpt), ('textract', self.textract)]
+        self.store = ExtractionResultStore("email_1")
+
+        self.passport_data = {
+            "passport_number": "A1234567",
+            "surname": "SMITH",
+            "given_names": "JOHN",
+            "nationality": "."
+        }
+
+    def test_extract_runs_once_per_document(self):
+        """Repeated lookups for the same document do not call processors again."""
+        self.gpt.process_document.return_value = self.passport_data
+
+        first = self.store.extract("/tmp/a/passport.jpg", "passport", self.processors)
+        second = self.store.extract("/tmp/a/passport.jpg", "passport", self.processors)
+
+        self.assertIs(first, second)
+        self.gpt.process_document.assert_called_once()
+        self.textract.process_document.assert_not_called()
+        self.assertEqual(first.provider, "gpt")
+        self.assertEqual(first.confidence, 0.75)
+        self.assertIn("gpt", first.timings)
+
+    def test_falls_back_on_error_result(self):
+        """An error dict from the first provider falls through to the next."""
+        self.gpt.process_document.return_value = {"error": "API call failed"}
+        self.textract.process_document.return_value = {"emirates_id": "784-1990-1234567-1"}
+
+        result = self.store.extract("/tmp/a/eid.jpg", "emirates_id", self.processors)
+
+        self.assertTrue(result.succeeded)
+        self.assertEqual(result.provider, "textract")
+        self.assertEqual(set(result.timings), {"gpt", "textract"})
+
+    def test_failed_extraction_is_recorded(self):
+        """Documents no provider could read are stored with an error and not retried."""
+        self.gpt.process_document.side_effect = Exception("timeout")
+        self.textract.process_document.return_value = {}
+
+        result = self.store.extract("/tmp/a/visa.pdf", "visa", self.processors)
+        self.store.extract("/tmp/a/visa.pdf", "visa", self.processors)
+
+        self.assertFalse(result.succeeded)
+        self.assertIn("timeout", result.error)
+        self.assertEqual(self.gpt.process_document.call_count, 1)
+        self.assertEqual(self.store.to_documents_data(), {})
+
+    def test_exports(self):
+        """Merged, by-type and documents_data views agree with stored results."""
+        self.gpt.process_document.side_effect = [
+            self.passport_data,
+            {"entry_permit_no": "201/2024/1234567", "nationality": "INDIA"}
+        ]
+        self.store.extract("/tmp/a/passport.jpg", "passport", self.processors)
+        self.store.extract("/tmp/a/visa.pdf", "visa", self.processors)
+
+        merged = self.store.merged_fields()
+        self.assertEqual(merged["nationality"], "INDIA")
+        self.assertEqual(merged["passport_number"], "A1234567")
+
+        self.assertEqual(set(self.store.fields_by_type()), {"passport", "visa"})
+
+        documents_data = self.store.to_documents_data()
+        self.assertEqual(set(documents_data), {"passport_passport.jpg", "visa_visa.pdf"})
+        self.assertEqual(documents_data["visa_visa.pdf"]["file_name"], "visa.pdf")
+
+        summary = self.store.get_summary()
+        self.assertEqual(summary["documents"], 2)
+        self.assertEqual(summary["provider_calls"], 2)
+
+    def test_weak_critical_fields_get_scoped_call(self):
+        """Only low-confidence critical fields are re-read by a later provider."""
+        visa = FieldResult({"entry_permit_no": "201/2024/1234567", "unified_no": "1234S678",
+                            "full_name": "JOHN SMITH"}, "textract", {"unified_no": 0.42})
+        textract = MagicMock(spec=['process_document'])
+        textract.process_document.return_value = visa
+        gpt = MagicMock(spec=['process_document', 'process_fields'])
+        gpt.process_fields.return_value = {"unified_no": "12345678"}
+
+        result = self.store.extract("/tmp/a/visa.pdf", "visa", [('textract', textract), ('gpt', gpt)])
+
+        gpt.process_fields.assert_called_once_with("/tmp/a/visa.pdf", "visa", ["unified_no"])
+        gpt.process_document.assert_not_called()
+        self.assertEqual(result.provider, "textract")
+        self.assertEqual(result.fields["unified_no"], "12345678")
+        self.assertEqual(result.fields.source_of("unified_no"), "gpt")
+        self.assertEqual(result.fields["entry_permit_no"], "201/2024/1234567")
+        self.assertEqual(result.calls_saved, 0)
+
+    def test_merged_fields_prefer_confident_values(self):
+        """Across documents the more confident value wins, not the first."""
+        self.textract.process_document.side_effect = [
+            FieldResult({"passport_number": "A1234S67"}, "textract", {"passport_number": 0.5}),
+            FieldResult({"passport_number": "A1234567"}, "textract", {"passport_number": 0.98}),
+        ]
+        processors = [('textract', self.textract)]
+        self.store.extract("/tmp/a/visa.pdf", "visa", processors)
+        self.store.extract("/tmp/a/passport.jpg", "passport", processors)
+
+        merged = self.store.merged_fields()
+        self.assertEqual(merged["passport_number"], "A1234567")
+        self.assertEqual(merged.confidence_of("passport_number"), 0.98)
+
+    def test_open_circuit_skips_provider(self):
+        """A provider behind an open circuit is not called; the next one answers."""
+        circuits = CircuitBreakerRegistry(enabled=True, min_calls=1, window=1)
+        circuits.record('openai', False)
+        store = ExtractionResultStore("email_2", circuits=circuits)
+        self.textract.process_document.return_value = self.passport_data
+
+        result = store.extract("/tmp/a/passport.jpg", "passport", self.processors)
+
+        self.gpt.process_document.assert_not_called()
+        self.assertEqual(result.provider, "textract")
+        self.assertEqual(set(result.timings), {"textract"})
+        self.assertEqual(store.get_summary()["open_circuits"], ["openai"])
+
+
+class TestDataCombinerPrecomputedDocuments(unittest.TestCase):
+    def test_multiple_rows_uses_precomputed_documents(self):
+        """Combiner must not call processors when documents_data is supplied."""
+        textract = MagicMock()
+        gpt = MagicMock()
+        combiner = DataCombiner(textract, MagicMock(), gpt)
+
+        excel_data = pd.DataFrame([{"First Name": "John", "Last Name": "Smith", "Passport No": "A1234567"}])
+        documents_data = {
+            "passport_p.jpg": {
+                "type": "passport",
+                "path": "/tmp/p.jpg",
+                "data": {"passport_number": "A1234567", "surname": "SMITH"},
+                "file_name": "p.jpg"
+            }
+        }
+
+        result = combiner._process_multiple_rows(
+            {}, excel_data, ["First Name", "Last Name", "Passport No"], {},
+            {"passport": ["/tmp/p.jpg"]}, documents_data
+        )
+
+        self.assertEqual(len(result), 1)
+        textract.process_document.assert_not_called()
+        gpt.process_document.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+from src.services.enhanced_document_processor import EnhancedDocumentProcessorService
+from src.utils.field_result import FieldResult
+from src.utils.tier_stats import TierStats
+
+PASSPORT = {'passport_number': 'K1234567', 'surname': 'SHARMA', 'given_names': 'RAHUL'}
+EMPTY_PASSPORT = {'passport_number': '.', 'surname': '.', 'given_names': '.'}
+
+
+class SlowProcessor:
+    """Processor stub returning a fixed result after a delay."""
+
+    DEFAULT_VALUE = "."
+
+    def __init__(self, result, delay=0.0, api_key="key"):
+        self.result = result
+        self.delay = delay
+        self.api_key = api_key
+        self.calls = 0
+
+    def process_document(self, file_path, doc_type):
+        self.calls += 1
+        time.sleep(self.delay)
+        return dict(self.result)
+
+
+def make_service(textract, deepseek, **kwargs):
+    kwargs.setdefault('hedged', True)
+    service = EnhancedDocumentProcessorService(textract, deepseek, min_samples=3, **kwargs)
+    service.provider_stats = TierStats()
+    service.use_deepseek_fallback = True
+    return service
+
+
+def test_without_history_fallback_waits_for_primary():
+    textract, deepseek = SlowProcessor(PASSPORT), SlowProcessor(PASSPORT)
+    service = make_service(textract, deepseek)
+
+    assert service.process_document('p.jpg', 'passport') == PASSPORT
+    assert deepseek.calls == 0
+
+
+def test_slow_primary_is_hedged_after_latency_percentile():
+    textract, deepseek = SlowProcessor(PASSPORT, delay=0.01), SlowProcessor(PASSPORT, delay=0.05)
+    service = make_service(textract, deepseek, latency_percentile=0.9)
+    for _ in range(3):
+        service.process_document('p.jpg', 'passport')
+
+    textract.delay = 0.5
+    start = time.monotonic()
+    result = service.process_document('p.jpg', 'passport')
+    elapsed = time.monotonic() - start
+    service._get_hedge_pool().shutdown(wait=True)
+
+    assert result == PASSPORT
+    assert deepseek.calls == 1
+    assert elapsed < 0.3
+
+
+def test_high_fallback_rate_starts_both_at_once():
+    textract, deepseek = SlowProcessor(EMPTY_PASSPORT, delay=0.2), SlowProcessor(PASSPORT, delay=0.01)
+    service = make_service(textract, deepseek, parallel_fallback_rate=0.5)
+    for _ in range(3):
+        service.process_document('p.jpg', 'passport')
+
+    start = time.monotonic()
+    result = service.process_document('p.jpg', 'passport')
+    elapsed = time.monotonic() - start
+    service._get_hedge_pool().shutdown(wait=True)
+
+    assert result == PASSPORT
+    assert elapsed < 0.15
+
+
+def test_insufficient_answers_are_merged():
+    textract = SlowProcessor({'passport_number': 'K1234567', 'surname': '.', 'given_names': '.'})
+    deepseek = SlowProcessor({'passport_number': '.', 'surname': 'SHARMA', 'given_names': '.'})
+    service = make_service(textract, deepseek)
+
+    result = service.process_document('p.jpg', 'passport')
+
+    assert result == {'passport_number': 'K1234567', 'surname': 'SHARMA', 'given_names': '.'}
+
+
+def test_both_failing_raises():
+    class Failing(SlowProcessor):
+        def process_document(self, file_path, doc_type):
+            raise RuntimeError("down")
+
+    service = make_service(Failing({}), Failing({}))
+
+    with pytest.raises(Exception, match="both processors"):
+        service.process_document('p.jpg', 'passport')
+
+
+def test_weak_field_gets_scoped_fallback():
+    class FieldsProcessor(SlowProcessor):
+        PROVIDER = "gpt"
+
+        def process_fields(self, file_path, doc_type, fields):
+            self.fields = fields
+            return {field: self.result[field] for field in fields}
+
+    textract = SlowProcessor({})
+    textract.process_document = lambda file_path, doc_type: FieldResult(PASSPORT, 'textract', {'surname': 0.45})
+    gpt = FieldsProcessor({'surname': 'SHARMA'})
+    service = make_service(textract, gpt, hedged=False)
+
+    result = service.process_document('p.jpg', 'passport')
+
+    assert gpt.fields == ['surname'] and gpt.calls == 0
+    assert result == PASSPORT
+    assert result.source_of('surname') == 'gpt'
+
+
+def test_visa_without_unified_no_is_sufficient():
+    visa = {'entry_permit_no': '201/2024/1234567', 'full_name': '.', 'unified_no': '.'}
+    textract, deepseek = SlowProcessor(visa), SlowProcessor({'full_name': 'RAHUL SHARMA'})
+    service = make_service(textract, deepseek, hedged=False)
+
+    # Sufficiency still counts only entry_permit_no and full_name, so no full fallback
+    assert service.process_document('v.jpg', 'visa') == visa
+    assert deepseek.calls == 0
@@ -0,0 +1,133 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services import near_duplicate_index
+from src.services.extraction_store import ExtractionResultStore
+from src.services.near_duplicate_index import NearDuplicateIndex
+from src.utils.circuit_breaker import CircuitBreakerRegistry
+from src.utils.extraction_cache import ExtractionCache
+from src.utils.field_result import FieldResult
+
+PASSPORT = {"passport_number": "A1234567", "surname": "SMITH", "given_names": "JOHN"}
+
+# Two holders of the same passport template
+HOLDERS = [
+    {"tone": 150, "lines": ["SHARMA", "RAHUL", "INDIAN", "01 JAN 1990", "K1234567"],
+     "mrz": ["P<INDSHARMA<<RAHUL<<<<<<<<<<<<<<<<<<<<<<<<<<", "K1234567<4IND9001011M3001015<<<<<<<<<<<<<<02"]},
+    {"tone": 120, "lines": ["SMITH", "ANNA MARIA", "BRITISH", "15 JUN 1985", "B7654321"],
+     "mrz": ["P<GBRSMITH<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<<<<", "B7654321<2GBR8506152F2812318<<<<<<<<<<<<<<06"]},
+]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """Index over a temporary cache; perceptual hashes come from the file's first byte."""
+    hashes = {b"a": 0b1111_0000, b"b": 0b1111_0001, b"z": 2 ** 200 - 1}
+    monkeypatch.setattr(near_duplicate_index, "document_hash",
+                        lambda path: hashes[open(path, "rb").read(1)])
+    cache = ExtractionCache(db_path=str(tmp_path / "cache.db"))
+    return NearDuplicateIndex(cache, max_distance=4, verify=True)
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def make_store(index):
+    return ExtractionResultStore("email_1", circuits=CircuitBreakerRegistry(enabled=False),
+                                 near_duplicates=index)
+
+
+def test_lookup_finds_closest_document_of_same_type(index, tmp_path):
+    first = write(tmp_path, "passport.jpg", b"a-scan-1")
+    index.add(first, "passport", FieldResult(PASSPORT, "gpt"))
+
+    match = index.lookup(write(tmp_path, "rescan.jpg", b"b-scan-2"), "passport")
+
+    assert match.distance == 1 and not match.exact
+    assert match.fields["passport_number"] == "A1234567"
+    assert match.fields.source_of("surname") == "gpt"
+    assert index.lookup(write(tmp_path, "other.jpg", b"z-scan"), "passport") is None
+    assert index.lookup(write(tmp_path, "eid.jpg", b"b-eid"), "emirates_id") is None
+    assert index.get_stats()["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_verified_near_duplicate_skips_full_extraction(index, tmp_path):
+    index.add(write(tmp_path, "passport.jpg", b"a-scan-1"), "passport", FieldResult(PASSPORT, "gpt"))
+    gpt = MagicMock(spec=["process_document", "process_fields"])
+    gpt.process_fields.return_value = {"passport_number": "a123 4567"}
+    textract = MagicMock(spec=["process_document"])
+
+    result = make_store(index).run_extraction(write(tmp_path, "rescan.jpg", b"b-scan-2"), "passport",
+                                              [("gpt", gpt), ("textract", textract)])
+
+    assert result.provider == "near_duplicate"
+    assert result.fields["surname"] == "SMITH"
+    gpt.process_fields.assert_called_once_with(str(tmp_path / "rescan.jpg"), "passport", ["passport_number"])
+    gpt.process_document.assert_not_called()
+    assert result.calls_saved == 2
+    assert index.get_stats()["reused"] == 1
+
+
+def test_mismatched_near_duplicate_is_extracted_and_indexed(index, tmp_path):
+    index.add(write(tmp_path, "passport.jpg", b"a-scan-1"), "passport", FieldResult(PASSPORT, "gpt"))
+    gpt = MagicMock(spec=["process_document", "process_fields"])
+    gpt.process_fields.return_value = {"passport_number": "B7654321"}
+    gpt.process_document.return_value = {"passport_number": "B7654321", "surname": "JONES"}
+    rescan = write(tmp_path, "sibling.jpg", b"b-scan-2")
+
+    result = make_store(index).run_extraction(rescan, "passport", [("gpt", gpt)])
+
+    assert result.provider == "gpt"
+    assert result.fields["surname"] == "JONES"
+    assert index.get_stats()["rejected"] == 1
+    assert index.lookup(rescan, "passport").exact
+
+
+def write_passport(tmp_path, name, holder):
+    """Draw a passport data page: shared template, holder-specific photo tone and text."""
+    Image = pytest.importorskip("PIL.Image")
+    from PIL import ImageDraw
+    image = Image.new("RGB", (625, 440), (214, 226, 236))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 625, 50), fill=(40, 70, 120))
+    draw.rectangle((25, 80, 185, 290), fill=(holder["tone"],) * 3)
+    for index, text in enumerate(holder["lines"]):
+        top = 85 + index * 40
+        draw.rectangle((215, top, 330, top + 8), fill=(90, 90, 90))
+        draw.text((215, top + 14), text, fill=(20, 20, 20))
+    draw.rectangle((20, 350, 605, 420), fill=(240, 240, 240))
+    for index, line in enumerate(holder["mrz"]):
+        draw.text((30, 360 + index * 30), line, fill=(0, 0, 0))
+    path = tmp_path / name
+    image.save(str(path))
+    return str(path)
+
+
+def test_unverifiable_match_of_another_holder_is_extracted(tmp_path):
+    index = NearDuplicateIndex(ExtractionCache(db_path=str(tmp_path / "cache.db")), max_distance=20, verify=True)
+    first = write_passport(tmp_path, "sharma.jpg", HOLDERS[0])
+    second = write_passport(tmp_path, "smith.jpg", HOLDERS[1])
+    index.add(first, "passport", FieldResult(
+        {"passport_number": "K1234567", "surname": "SHARMA", "given_names": "RAHUL"}, "gpt"))
+    smith = {"passport_number": "B7654321", "surname": "SMITH", "given_names": "."}
+    # No process_fields, so nothing can re-read a field to verify the match
+    textract = MagicMock(spec=["process_document"])
+    textract.process_document.return_value = smith
+
+    # The perceptual hash alone cannot tell the two holders apart
+    assert index.lookup(second, "passport").distance <= index.max_distance
+
+    result = make_store(index).run_extraction(second, "passport", [("textract", textract)])
+
+    assert result.provider == "textract"
+    assert dict(result.fields) == smith
+
+    textract.process_document.return_value = {"error": "Textract unavailable"}
+    failed = make_store(index).run_extraction(write_passport(tmp_path, "smith2.png", HOLDERS[1]),
+                                              "passport", [("textract", textract)])
+
+    assert failed.error and not failed.fields
@@ -0,0 +1,119 @@
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from src.document_processor.textract_processor import TextractProcessor
+from src.utils.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, is_provider_fault, provider_available
+)
+from src.utils.error_handling import CircuitOpenError, retry_on_error
+from src.utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    kwargs.setdefault('window', 4)
+    kwargs.setdefault('min_calls', 4)
+    kwargs.setdefault('failure_rate', 0.5)
+    kwargs.setdefault('reset_seconds', 30)
+    return CircuitBreaker('textract', clock=clock, **kwargs)
+
+
+def test_opens_on_error_rate_and_recovers_through_probe():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for failed in (False, True, False, True):
+        breaker.record_failure() if failed else breaker.record_success()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.get_stats()['rejected'] == 1
+
+    clock.now = 31
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_and_slow_calls_count_as_failures():
+    clock = FakeClock()
+    breaker = make_breaker(clock, slow_call_seconds=5.0)
+    for _ in range(4):
+        breaker.record_success(latency=10.0)
+    assert breaker.state == OPEN
+
+    clock.now = 31
+    with pytest.raises(RuntimeError):
+        breaker.call(lambda: (_ for _ in ()).throw(RuntimeError("down")))
+    assert breaker.state == OPEN
+    assert breaker.get_stats()['times_opened'] == 2
+
+
+def test_open_circuit_is_not_retried():
+    calls = []
+
+    @retry_on_error(max_attempts=3, delay_seconds=0)
+    def call():
+        calls.append(1)
+        raise CircuitOpenError('openai')
+
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert len(calls) == 1
+
+
+def test_registry_routes_around_open_providers():
+    registry = CircuitBreakerRegistry(enabled=True, min_calls=2, window=2)
+    registry.record('openai', False)
+    registry.record('openai', False)
+
+    assert not provider_available('gpt', registry)
+    assert provider_available('textract', registry)
+    assert provider_available('mrz', registry)
+    assert registry.get_stats()['openai']['state'] == OPEN
+    assert CircuitBreakerRegistry(enabled=False).is_available('openai')
+
+
+def textract_error(code, status):
+    return ClientError({'Error': {'Code': code, 'Message': code},
+                        'ResponseMetadata': {'HTTPStatusCode': status}}, 'AnalyzeDocument')
+
+
+def test_only_server_and_transport_errors_are_provider_faults():
+    class APIError(Exception):
+        def __init__(self, status_code):
+            super().__init__(f"status {status_code}")
+            self.status_code = status_code
+
+    assert is_provider_fault(APIError(503))
+    assert is_provider_fault(textract_error('InternalServerError', 500))
+    assert is_provider_fault(EndpointConnectionError(endpoint_url='https://textract'))
+    assert is_provider_fault(TimeoutError())
+    assert not is_provider_fault(APIError(400))
+    assert not is_provider_fault(APIError(429))
+    assert not is_provider_fault(textract_error('UnsupportedDocumentException', 400))
+
+
+def test_rejected_documents_neither_retry_nor_open_the_textract_circuit():
+    processor = TextractProcessor(cache=None, rate_limiter=RateLimiter('textract'), document_analyzer=None)
+    processor.circuits = CircuitBreakerRegistry(enabled=True, min_calls=2, window=4)
+    processor.textract = MagicMock()
+    processor.textract.analyze_document.side_effect = textract_error('UnsupportedDocumentException', 400)
+
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            processor._get_textract_response(b'corrupt')
+
+    assert processor.textract.analyze_document.call_count == 2
+    assert processor.circuits.get_stats()['textract']['failure_rate'] == 0.0
+    assert processor.circuits.is_available('textract')
@@ -0,0 +1,114 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.dedupe_ledger import DOCUMENT, EMAIL, FOLDER, DedupeLedger, get_dedupe_ledger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """Create dedupe ledger backed by a temporary database."""
+    return DedupeLedger(str(tmp_path / "dedupe_ledger.db"))
+
+
+@pytest.fixture
+def document(tmp_path):
+    """Create a document file."""
+    path = tmp_path / "passport.pdf"
+    path.write_bytes(b"passport scan bytes")
+    return str(path)
+
+
+def test_kinds_are_independent(ledger):
+    ledger.mark_processed(EMAIL, "abc")
+
+    assert ledger.is_processed(EMAIL, "abc")
+    assert not ledger.is_processed(FOLDER, "abc")
+    assert not ledger.is_processed(DOCUMENT, "abc")
+
+
+def test_documents_are_keyed_on_content(ledger, document, tmp_path):
+    ledger.mark_document_processed(document)
+
+    copy = tmp_path / "renamed.pdf"
+    copy.write_bytes(b"passport scan bytes")
+    other = tmp_path / "visa.pdf"
+    other.write_bytes(b"visa scan bytes")
+
+    assert ledger.is_document_processed(str(copy))
+    assert not ledger.is_document_processed(str(other))
+    assert ledger.get_entry(DOCUMENT, ledger.hash_file(document))["metadata"]["file_name"] == "passport.pdf"
+
+
+def test_file_is_hashed_once(ledger, document):
+    with patch("src.utils.extraction_cache.open", create=True, side_effect=open) as opened:
+        ledger.is_document_processed(document)
+        ledger.mark_document_processed(document)
+        ledger.is_folder_processed([document])
+
+    assert opened.call_count == 1
+
+
+def test_marks_stay_visible_while_they_are_written(ledger):
+    seen_during_write = []
+    store = ledger._execute_with_retry
+
+    def observed_store(operation):
+        # What another worker's is_processed sees before the INSERT commits
+        seen_during_write.append(ledger.is_processed(EMAIL, "abc"))
+        return store(operation)
+
+    with patch.object(ledger, "_execute_with_retry", side_effect=observed_store):
+        ledger.mark_processed(EMAIL, "abc")
+
+    assert seen_during_write == [True]
+    assert ledger._pending == {}
+    assert ledger.is_processed(EMAIL, "abc")
+
+
+def test_hot_keys_skip_the_database(tmp_path):
+    db_path = str(tmp_path / "dedupe_ledger.db")
+    DedupeLedger(db_path).mark_processed_many(EMAIL, ["m1", "m2"])
+
+    ledger = DedupeLedger(db_path)
+    with patch.object(ledger, "execute_query") as query:
+        assert ledger.is_processed(EMAIL, "m1")
+        assert ledger.filter_processed(EMAIL, ["m1", "m2"]) == {"m1", "m2"}
+    query.assert_not_called()
+
+
+def test_reset_one_kind(ledger, document):
+    ledger.mark_processed(EMAIL, "m1")
+    ledger.mark_document_processed(document)
+
+    assert ledger.reset(EMAIL)
+
+    assert not ledger.is_processed(EMAIL, "m1")
+    assert ledger.is_document_processed(document)
+
+
+def test_legacy_files_are_migrated(tmp_path, document):
+    (tmp_path / "processed_emails_simple.txt").write_text("m1\nm2\n")
+    submission = tmp_path / "abc"
+    submission.mkdir()
+    (submission / "passport.pdf").write_bytes(b"passport")
+    (tmp_path / "processed_folders.json").write_text(json.dumps({
+        "local_abc_20240101100000": {"folder_name": "abc", "folder_path": str(submission),
+                                     "processed_at": "2024-01-01T10:00:00"},
+        "local_gone_20240101100000": {"folder_name": "gone", "folder_path": str(tmp_path / "gone")}
+    }))
+    (tmp_path / "processed_documents.json").write_text(json.dumps({
+        "md5-present": {"path": document, "processed_at": "2024-01-01T10:00:00"},
+        "md5-gone": {"path": str(tmp_path / "deleted.pdf")}
+    }))
+
+    ledger = get_dedupe_ledger(str(tmp_path / "dedupe_ledger.db"))
+
+    assert ledger.filter_processed(EMAIL, ["m1", "m2", "m3"]) == {"m1", "m2"}
+    assert ledger.get_keys(FOLDER) == [ledger.hash_files([str(submission / "passport.pdf")])]
+    assert ledger.is_document_processed(document)
+    assert ledger.get_keys(DOCUMENT) == [ledger.hash_file(document)]
+    assert os.path.exists(tmp_path / "processed_documents.json.migrated")
+    assert get_dedupe_ledger(str(tmp_path / "dedupe_ledger.db")) is ledger
@@ -0,0 +1,93 @@
+import time
+import pytest
+
+from src.utils.extraction_cache import ExtractionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create extraction cache backed by a temporary database."""
+    return ExtractionCache(db_path=str(tmp_path / "extraction_cache.db"), max_entries=3)
+
+
+@pytest.fixture
+def document(tmp_path):
+    """Create a document file."""
+    path = tmp_path / "passport.jpg"
+    path.write_bytes(b"passport image bytes")
+    return str(path)
+
+
+def test_hit_is_content_addressed(cache, document, tmp_path):
+    """Same bytes under a different path should hit the cache."""
+    data = {"passport_number": "A1234567", "surname": "SMITH"}
+    cache.put(cache.hash_file(document), "gpt", "passport", "v1", data)
+
+    copy = tmp_path / "renamed_copy.jpg"
+    copy.write_bytes(b"passport image bytes")
+
+    assert cache.get(cache.hash_file(str(copy)), "gpt", "passport", "v1") == data
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_key_includes_provider_doc_type_and_prompt_version(cache, document):
+    """Provider, doc type and prompt version each partition the cache."""
+    content_hash = cache.hash_file(document)
+    cache.put(content_hash, "gpt", "passport", "v1", {"surname": "SMITH"})
+
+    assert cache.get(content_hash, "textract", "passport", "v1") is None
+    assert cache.get(content_hash, "gpt", "visa", "v1") is None
+    assert cache.get(content_hash, "gpt", "passport", "v2") is None
+    assert cache.get_stats()["misses"] == 3
+
+
+def test_error_results_are_not_cached(cache, document):
+    """Error and skipped markers should never be served from cache."""
+    content_hash = cache.hash_file(document)
+    cache.put(content_hash, "gpt", "passport", "v1", {"error": "API call failed"})
+    cache.put(content_hash, "deepseek", "passport", "v1", {"skipped": "yes"})
+
+    assert cache.get(content_hash, "gpt", "passport", "v1") is None
+    assert cache.get(content_hash, "deepseek", "passport", "v1") is None
+
+
+def test_ttl_expiry(tmp_path, document):
+    """Entries older than the TTL should be treated as misses."""
+    cache = ExtractionCache(db_path=str(tmp_path / "ttl.db"), ttl_seconds=0.05)
+    content_hash = cache.hash_file(document)
+    cache.put(content_hash, "textract", None, "v1", {"emirates_id": "784-1990-1234567-1"})
+    time.sleep(0.1)
+
+    assert cache.get(content_hash, "textract", None, "v1") is None
+
+
+def test_size_eviction_drops_least_recently_used(cache):
+    """Oldest-accessed entries are evicted once max_entries is exceeded."""
+    for i in range(3):
+        cache.put(f"hash{i}", "gpt", "visa", "v1", {"unified_no": str(i)})
+        time.sleep(0.01)
+
+    # Touch the oldest entry so it survives eviction
+    assert cache.get("hash0", "gpt", "visa", "v1") is not None
+    cache.put("hash3", "gpt", "visa", "v1", {"unified_no": "3"})
+
+    assert cache.get_stats()["entries"] == 3
+    assert cache.get("hash1", "gpt", "visa", "v1") is None
+    assert cache.get("hash0", "gpt", "visa", "v1") is not None
+
+
+def test_perceptual_lookup_reads_only_the_closest_payload(cache):
+    cache.put_perceptual("far", "passport", 0b1111, {"passport_number": "A1"})
+    cache.put_perceptual("near", "passport", 0b0001, {"passport_number": "B2"})
+    cache.put_perceptual("other", "visa", 0b0000, {"unified_no": "C3"})
+
+    fields, distance, content_hash = cache.find_perceptual("passport", 0b0000, max_distance=2)
+
+    assert (fields["passport_number"], distance, content_hash) == ("B2", 1, "near")
+    assert cache.find_perceptual("passport", 0b1111 << 8, max_distance=2) is None
+    # The distance scan is answered from the index without touching the stored payloads
+    plan = cache.execute_query(
+        "EXPLAIN QUERY PLAN SELECT content_hash, phash FROM perceptual_index "
+        "WHERE doc_type = ? AND created_at >= ?", ("passport", 0)
+    )
+    assert any("COVERING INDEX" in row[-1] for row in plan)
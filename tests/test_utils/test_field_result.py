@@ -0,0 +1,35 @@
+from src.utils.field_result import FieldResult, merge_field_results
+
+
+def test_confidence_defaults_to_provider_prior():
+    result = FieldResult({'passport_number': 'K1234567', 'surname': '.'}, 'gpt', {'passport_number': 0.6})
+
+    assert result.confidence_of('passport_number') == 0.6
+    assert result.confidence_of('surname') == 0.0
+    assert FieldResult({'surname': 'SHARMA'}, 'mrz').confidence_of('surname') == 0.99
+    assert result.weak_fields(['passport_number', 'surname', 'given_names']) == \
+        ['passport_number', 'surname', 'given_names']
+
+
+def test_merge_keeps_most_confident_value_per_field():
+    textract = FieldResult({'unified_no': '1234S678', 'full_name': 'RAHUL SHARMA'}, 'textract',
+                           {'unified_no': 0.41, 'full_name': 0.97})
+    gpt = FieldResult({'unified_no': '12345678', 'full_name': 'RAHUL SHARMAA'}, 'gpt')
+
+    merged = merge_field_results([textract, gpt, {'profession': 'ENGINEER'}])
+
+    assert merged == {'unified_no': '12345678', 'full_name': 'RAHUL SHARMA', 'profession': 'ENGINEER'}
+    assert merged.source_of('unified_no') == 'gpt'
+    assert merged.source_of('full_name') == 'textract'
+    assert merged.confidence_of('full_name') == 0.97
+
+
+def test_cache_round_trip():
+    result = FieldResult({'emirates_id': '784-1990-1234567-1'}, 'textract', {'emirates_id': 0.93})
+
+    restored = FieldResult.from_cache(result.to_cache())
+
+    assert restored == result
+    assert restored.confidence_of('emirates_id') == 0.93
+    assert restored.source_of('emirates_id') == 'textract'
+    assert FieldResult.from_cache({'surname': 'SMITH'}) == {'surname': 'SMITH'}
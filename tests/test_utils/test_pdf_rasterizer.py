@@ -0,0 +1,75 @@
+import os
+import pytest
+
+from src.utils import pdf_rasterizer
+from src.utils.pdf_rasterizer import PDFRasterizer
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Replace poppler with a stub that writes a 3-page document and records calls."""
+    calls = []
+
+    def fake_render(pdf_path, dpi, output_stem, first_page=None, last_page=None):
+        calls.append((os.path.basename(pdf_path), dpi, first_page))
+        pages = range(first_page, last_page + 1) if first_page else range(1, 4)
+        for page in pages:
+            with open(f"{output_stem}_p{page}.jpg", 'wb') as f:
+                f.write(b'x' * 100)
+        return len(pages)
+
+    monkeypatch.setattr(pdf_rasterizer, '_render_to_disk', fake_render)
+    return calls
+
+
+@pytest.fixture
+def rasterizer(tmp_path):
+    """Rasterizer rendering inline into a temporary cache."""
+    return PDFRasterizer(cache_dir=str(tmp_path / "pages"), max_workers=0)
+
+
+def _pdf(tmp_path, name, content=b"%PDF-1.4 visa"):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_page_is_rendered_once_per_content(rasterizer, renders, tmp_path):
+    """The same PDF under another path reuses the rendered page."""
+    first = rasterizer.page_path(_pdf(tmp_path, "visa.pdf"), page=1, dpi=300)
+    second = rasterizer.page_path(_pdf(tmp_path, "visa_copy.pdf"), page=1, dpi=300)
+
+    assert first == second
+    assert renders == [("visa.pdf", 300, 1)]
+    assert rasterizer.get_stats()["hits"] == 1
+
+
+def test_key_includes_page_and_dpi(rasterizer, renders, tmp_path):
+    pdf = _pdf(tmp_path, "visa.pdf")
+
+    rasterizer.page_path(pdf, page=1, dpi=300)
+    rasterizer.page_path(pdf, page=2, dpi=300)
+    rasterizer.page_path(pdf, page=1, dpi=150)
+
+    assert len(renders) == 3
+
+
+def test_all_pages_cover_later_single_page_requests(rasterizer, renders, tmp_path):
+    pdf = _pdf(tmp_path, "passport.pdf")
+
+    assert len(rasterizer.page_bytes(pdf, dpi=300)) == 3
+    assert len(rasterizer.page_paths(pdf, dpi=300)) == 3
+    rasterizer.page_path(pdf, page=2, dpi=300)
+
+    assert renders == [("passport.pdf", 300, None)]
+
+
+def test_eviction_drops_least_recently_used_pages(tmp_path, renders):
+    rasterizer = PDFRasterizer(cache_dir=str(tmp_path / "pages"), max_bytes=250, max_workers=0)
+    old = rasterizer.page_path(_pdf(tmp_path, "a.pdf", b"%PDF a"), page=1)
+    os.utime(old, (1, 1))
+    rasterizer.page_path(_pdf(tmp_path, "b.pdf", b"%PDF b"), page=1)
+    rasterizer.page_path(_pdf(tmp_path, "c.pdf", b"%PDF c"), page=1)
+
+    assert not os.path.exists(old)
+    assert len(renders) == 3
@@ -0,0 +1,159 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.utils.circuit_breaker import CircuitBreakerRegistry
+from src.utils.rate_limiter import (
+    RateLimiter, create_chat_completion, estimate_chat_tokens, is_rate_limit_error,
+    parse_duration, parse_retry_after
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_limiter(clock, **kwargs):
+    return RateLimiter("test", clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_requests_per_minute_budget(clock):
+    """Burst up to the RPM budget, then requests are spaced at the refill rate."""
+    limiter = make_limiter(clock, requests_per_minute=3)
+
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+    assert limiter.reserve() == pytest.approx(20.0)
+    assert limiter.reserve() == pytest.approx(40.0)
+
+
+def test_tokens_per_minute_budget(clock):
+    """Token reservations wait for the TPM bucket; actual usage corrects the estimate."""
+    limiter = make_limiter(clock, tokens_per_minute=6000)
+
+    assert limiter.reserve(tokens=6000) == 0
+    assert limiter.reserve(tokens=3000) == pytest.approx(30.0)
+
+    limiter.record_usage(estimated_tokens=3000, actual_tokens=0)
+    assert limiter.reserve(tokens=3000) == pytest.approx(30.0)
+
+
+def test_min_interval_spaces_requests(clock):
+    limiter = make_limiter(clock, min_interval=0.3)
+
+    delays = [limiter.reserve() for _ in range(3)]
+
+    assert delays == pytest.approx([0.0, 0.3, 0.6])
+
+
+def test_retry_after_and_ratelimit_headers(clock):
+    """Retry-After blocks all callers; x-ratelimit-* shrinks the local budget."""
+    limiter = make_limiter(clock, requests_per_minute=100, tokens_per_minute=100000)
+
+    limiter.update_from_headers({"Retry-After": "7"})
+    assert limiter.reserve() == pytest.approx(7.0)
+    assert not limiter.try_acquire()
+
+    clock.now += 7
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2s",
+    })
+    assert limiter.reserve() == pytest.approx(3.0)
+
+
+def test_header_parsing():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("250ms") == pytest.approx(0.25)
+    assert parse_duration("1.5") == 1.5
+    assert parse_retry_after("1500", milliseconds=True) == 1.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+def test_waiting_threads_do_not_hold_the_lock():
+    """Threads sleep outside the lock, so a waiting caller never blocks reservations."""
+    limiter = RateLimiter("test", requests_per_minute=60)
+    for _ in range(60):
+        limiter.reserve()
+
+    waiter = threading.Thread(target=limiter.acquire)
+    waiter.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    acquired = limiter._lock.acquire(timeout=0.5)
+    assert acquired
+    limiter._lock.release()
+    assert time.monotonic() - start < 0.1
+    waiter.join(timeout=3)
+
+
+def test_chat_completion_reads_headers_and_usage(clock):
+    limiter = make_limiter(clock, requests_per_minute=10, tokens_per_minute=10000)
+    raw = MagicMock()
+    raw.headers = {"x-ratelimit-remaining-tokens": "500"}
+    raw.parse.return_value.usage.total_tokens = 200
+    client = MagicMock()
+    client.chat.completions.with_raw_response.create.return_value = raw
+
+    messages = [{"role": "user", "content": [
+        {"type": "text", "text": "x" * 400},
+        {"type": "image_url", "image_url": {"url": "data:"}}
+    ]}]
+    response = create_chat_completion(client, limiter, model="m", messages=messages, max_tokens=100)
+
+    assert response is raw.parse.return_value
+    assert estimate_chat_tokens(messages, 100) == 1200
+    # Server reported 500 tokens left, then usage corrected the 1200 estimate to 200
+    assert limiter._tokens.level == pytest.approx(1500)
+
+
+def test_rate_limit_errors_are_recognised_by_status_only():
+    class APIError(Exception):
+        def __init__(self, message, status_code=None):
+            super().__init__(message)
+            self.status_code = status_code
+
+    assert is_rate_limit_error(APIError("Too many requests", status_code=429))
+    assert not is_rate_limit_error(APIError("Invalid image for request req_4291", status_code=400))
+    assert not is_rate_limit_error(Exception("max_tokens 4290 exceeds the limit"))
+
+
+def test_chat_completion_counts_only_server_errors_against_the_circuit(clock, monkeypatch):
+    class APIError(Exception):
+        def __init__(self, status_code):
+            super().__init__(f"status {status_code}")
+            self.status_code = status_code
+
+    registry = CircuitBreakerRegistry(enabled=True, min_calls=2, window=2, failure_rate=0.5)
+    monkeypatch.setattr("src.utils.rate_limiter.get_circuit_registry", lambda: registry)
+    limiter = make_limiter(clock)
+    client = MagicMock()
+
+    client.chat.completions.with_raw_response.create.side_effect = APIError(400)
+    for _ in range(2):
+        with pytest.raises(APIError):
+            create_chat_completion(client, limiter, model="m", messages=[])
+    assert registry.get_stats()["test"]["failure_rate"] == 0.0
+
+    client.chat.completions.with_raw_response.create.side_effect = APIError(503)
+    with pytest.raises(APIError):
+        create_chat_completion(client, limiter, model="m", messages=[])
+    assert registry.get_stats()["test"]["state"] == "open"
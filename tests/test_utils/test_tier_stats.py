@@ -0,0 +1,30 @@
+from src.utils.tier_stats import TierStats
+
+
+def test_hit_rate_and_latency_percentiles():
+    stats = TierStats(window=10)
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        stats.record('TEXT', latency, resolved=latency < 0.35)
+    stats.record('FORMS', 1.0, resolved=True)
+
+    result = stats.get_stats()
+
+    assert result['TEXT']['attempts'] == 4
+    assert result['TEXT']['hit_rate'] == 0.75
+    assert result['TEXT']['p50_latency'] == 0.3
+    assert result['TEXT']['p95_latency'] == 0.4
+    assert result['FORMS']['avg_latency'] == 1.0
+
+    stats.reset()
+    assert stats.get_stats() == {}
+
+
+def test_per_tier_queries_need_min_samples():
+    stats = TierStats()
+    for latency in (0.1, 0.2, 0.3):
+        stats.record('textract:passport', latency, resolved=latency < 0.15)
+
+    assert stats.latency_percentile('textract:passport', 0.9, min_samples=4) is None
+    assert stats.latency_percentile('textract:passport', 0.9, min_samples=3) == 0.3
+    assert stats.hit_rate('textract:passport', min_samples=3) == 1 / 3
+    assert stats.hit_rate('textract:visa') is None